@@ -1,12 +1,16 @@
 import streamlit as st
 from sidebar import render_sidebar
-from auth.auth import get_current_user
-from session_manager import get_chat_history, append_chat_message
+from auth.auth import get_current_user, get_user_id
+from auth.billing import get_user_tier
+from session_manager import get_chat_history, append_chat_message, get_conversation_memory, save_conversation_memory
 from chat_ui import render_chat_interface
-from chatbot import Chatbot
+from resources import get_registry
+from admission import AdmissionRejected
 
-# Initialize chatbot backend once
-chatbot = Chatbot()
+# Heavy backend objects live in a process-wide registry that survives script reruns
+# and is shared by all sessions; start building them before the first question
+resources = get_registry()
+resources.warmup()
 
 def main():
     st.set_page_config(page_title="ChatVet - Your Virtual Vet Assistant ", layout="wide")
@@ -23,22 +27,36 @@ def main():
 
     st.subheader("Ask about your pet's symptoms or health concerns!")
 
-    # Retrieve chat history from session state or backend
-    chat_history = get_chat_history(user)
+    # Recent messages from the persistent history store (bounded by limits.max_chat_history)
+    user_id = get_user_id()
+    chat_history = get_chat_history(user_id)
 
     # Render chat UI and get user input
     user_input = render_chat_interface(chat_history)
 
     if user_input:
         # Append user's message immediately
-        append_chat_message(user, "user", user_input)
+        append_chat_message(user_id, "user", user_input)
 
-        # Generate chatbot response
-        with st.spinner("ChatVet is thinking..."):
-            response = chatbot.ask(user_input)
+        # Stream the chatbot response, re-rendering the message as tokens arrive
+        placeholder = st.empty()
+        placeholder.markdown("**ChatVet:** _thinking..._")
+        response = ""
+        # Running summary + recent turns, so follow-up questions keep their context at a bounded prompt size
+        memory = get_conversation_memory(user_id)
+        try:
+            # LLM answers count against the quota of the user's subscription tier
+            for token in resources.get("chatbot").ask_stream(user_input, memory, user_id, get_user_tier(user_id)):
+                response += token
+                placeholder.markdown(f"**ChatVet:** {response}▌")
+        except AdmissionRejected as e:
+            response = e.message
+        response = response.strip()
+        placeholder.markdown(f"**ChatVet:** {response}")
 
         # Append bot's response
-        append_chat_message(user, "bot", response)
+        append_chat_message(user_id, "bot", response)
+        save_conversation_memory(user_id, memory)
 
         # Rerun to update UI with new messages
         st.experimental_rerun()
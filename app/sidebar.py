@@ -2,6 +2,8 @@ import streamlit as st
 from auth.auth import login_user, logout_user, get_current_user
 from auth.billing import get_subscription_status, toggle_subscription
 from session_manager import clear_chat_history
+from config import get_setting
+from tracing import get_tracer
 
 def render_sidebar():
     st.sidebar.header("User Account")
@@ -26,3 +28,29 @@ def render_sidebar():
         if new_status != sub_status:
             toggle_subscription(user, new_status)
             st.experimental_rerun()
+
+    # Developer view of where recent answers spent their time
+    if get_setting("dev", "enable_logs", False):
+        render_debug_panel()
+
+def render_debug_panel(limit: int = 10):
+    with st.sidebar.expander("Debug: recent requests"):
+        traces = get_tracer().recent(limit)
+        if not traces:
+            st.write("No requests traced yet.")
+            return
+        for trace in traces:
+            details = [f"**{trace.get('source', '?')}** in {trace['duration_ms']:.0f} ms"]
+            if "ttft_ms" in trace:
+                details.append(f"first token {trace['ttft_ms']:.0f} ms")
+            if "cache_hit" in trace:
+                details.append("cache hit" if trace["cache_hit"] else "cache miss")
+            if trace.get("prompt_tokens"):
+                details.append(f"{trace['prompt_tokens']} prompt / {trace.get('completion_tokens', 0)} completion tokens")
+            st.markdown(" · ".join(details))
+            if trace.get("error"):
+                st.error(trace["error"])
+            st.table([
+                {"stage": span["name"], "start (ms)": span["start_ms"], "duration (ms)": span["duration_ms"]}
+                for span in trace["spans"]
+            ])
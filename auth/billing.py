@@ -20,6 +20,18 @@ def get_subscription_status(user_id: str) -> bool:
         return False
     return _subscription_db.get(user_id, False)
 
+def get_user_tier(user_id: str) -> str:
+    """
+    Map the user's subscription status to their tier for LLM quotas.
+
+    Args:
+        user_id (str): The username or user ID.
+
+    Returns:
+        str: "subscriber" or "free", a tier of `admission.tiers` in configs/settings.yaml.
+    """
+    return "subscriber" if get_subscription_status(user_id) else "free"
+
 def toggle_subscription(user_id: str, new_status: bool):
     """
     Toggle the user's subscription status.
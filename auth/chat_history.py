@@ -0,0 +1,198 @@
+# auth/chat_history.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from config import get_setting
+
+DEFAULT_CHAT_HISTORY_PATH = "data/chat_history.sqlite"
+
+
+class _Window:
+    __slots__ = ("messages", "last_id", "generation")
+
+    def __init__(self, size: int, generation: int):
+        self.messages = deque(maxlen=size)
+        self.last_id = 0
+        self.generation = generation
+
+
+class ChatHistoryStore:
+    def __init__(self, path: Optional[str] = DEFAULT_CHAT_HISTORY_PATH, window: int = 20,
+                 max_cached_users: int = 1000, busy_timeout: float = 5.0):
+        """
+        Persistent per-user chat history with a bounded in-memory window.
+
+        Messages are appended to a SQLite table in WAL mode, so several app
+        processes can write to the same file (writers wait up to
+        `busy_timeout` for each other). Each recently active user's last
+        `window` messages are kept in memory; on every read only messages
+        newer than the cached ones are fetched, which also picks up messages
+        written by other processes. Older turns are paged from disk.
+        Clearing a history bumps the user's generation in the file, so the
+        other processes drop their cached window on their next read.
+
+        Args:
+            path (str): SQLite file holding the history (None = in memory, lost on restart).
+            window (int): Most recent messages per user kept in memory and returned by recent().
+            max_cached_users (int): Users whose windows are cached; least recently active ones are evicted.
+            busy_timeout (float): Seconds a write waits for another process's write to finish.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1.")
+        self.path = path
+        self.window = window
+        self.max_cached_users = max_cached_users
+
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection shared across threads, serialized by a lock
+        self._conn = sqlite3.connect(path or ":memory:", timeout=busy_timeout, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS messages_user ON messages (user_id, id)")
+        # Per-user conversation state kept next to the messages, e.g. the running summary
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_state (user_id TEXT PRIMARY KEY, state TEXT NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        # Bumped by every clear(), so cached windows of a cleared history are noticed in every process
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations (user_id TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._windows: "OrderedDict[str, _Window]" = OrderedDict()  # LRU order, least recently used first
+
+    def append(self, user_id: str, role: str, content: str) -> int:
+        """
+        Store a message.
+
+        Returns:
+            int: The message ID (increasing per store file).
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO messages (user_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (user_id, role, content, time.time()),
+            )
+            return cursor.lastrowid
+
+    def recent(self, user_id: str) -> List[Dict[str, str]]:
+        """Return the user's last `window` messages, oldest first, as {"role", "content"} dicts."""
+        with self._lock:
+            generation = self._generation(user_id)
+            window = self._windows.get(user_id)
+            if window is None or window.generation != generation:
+                # New user, or the history was cleared (maybe by another process) since it was cached
+                window = _Window(self.window, generation)
+                self._windows[user_id] = window
+                while len(self._windows) > self.max_cached_users:
+                    self._windows.popitem(last=False)
+            self._windows.move_to_end(user_id)
+
+            rows = self._conn.execute(
+                "SELECT id, role, content FROM messages WHERE user_id = ? AND id > ? ORDER BY id DESC LIMIT ?",
+                (user_id, window.last_id, self.window),
+            ).fetchall()
+            for message_id, role, content in reversed(rows):
+                window.messages.append({"role": role, "content": content})
+                window.last_id = message_id
+            return [dict(message) for message in window.messages]
+
+    def page(self, user_id: str, before_id: Optional[int] = None, limit: int = 20) -> List[Dict]:
+        """
+        Return up to `limit` messages older than `before_id` (default: the newest ones), oldest first.
+
+        Pass the "id" of the first message returned to get the page before it.
+
+        Returns:
+            List of {"id", "role", "content", "created_at"} dicts.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, role, content, created_at FROM messages WHERE user_id = ? AND id < ? "
+                "ORDER BY id DESC LIMIT ?",
+                (user_id, before_id if before_id is not None else 2 ** 63 - 1, limit),
+            ).fetchall()
+        return [{"id": message_id, "role": role, "content": content, "created_at": created_at}
+                for message_id, role, content, created_at in reversed(rows)]
+
+    def count(self, user_id: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def get_state(self, user_id: str) -> Optional[Dict]:
+        """Return the user's saved conversation state, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM conversation_state WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_state(self, user_id: str, state: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversation_state (user_id, state, updated_at) VALUES (?, ?, ?)",
+                (user_id, json.dumps(state), time.time()),
+            )
+
+    def replace_state(self, user_id: str, expected: Dict, state: Dict) -> bool:
+        """
+        Save the user's conversation state only if the saved one is still `expected`.
+
+        Returns:
+            bool: Whether the state was replaced.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE conversation_state SET state = ?, updated_at = ? WHERE user_id = ? AND state = ?",
+                (json.dumps(state), time.time(), user_id, json.dumps(expected)),
+            )
+            return cursor.rowcount == 1
+
+    def clear(self, user_id: str):
+        """Delete a user's whole history and conversation state."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM messages WHERE user_id = ?", (user_id,))
+            self._conn.execute("DELETE FROM conversation_state WHERE user_id = ?", (user_id,))
+            self._conn.execute(
+                "INSERT INTO generations (user_id, generation) VALUES (?, 1) "
+                "ON CONFLICT (user_id) DO UPDATE SET generation = generation + 1",
+                (user_id,),
+            )
+            self._conn.execute("COMMIT")
+            self._windows.pop(user_id, None)
+
+    def _generation(self, user_id: str) -> int:
+        row = self._conn.execute("SELECT generation FROM generations WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[ChatHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_chat_history_store() -> ChatHistoryStore:
+    """Return the process-wide ChatHistoryStore configured by configs/settings.yaml (created on first use)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ChatHistoryStore(
+                path=get_setting("chat_history", "path", DEFAULT_CHAT_HISTORY_PATH) or None,
+                window=get_setting("limits", "max_chat_history", 20),
+                max_cached_users=get_setting("chat_history", "max_cached_users", 1000),
+                busy_timeout=get_setting("chat_history", "busy_timeout", 5.0),
+            )
+        return _store
@@ -1,32 +1,43 @@
 # auth/session_manager.py
 
-import streamlit as st
 from auth.auth import get_user_id
+from chat_history import get_chat_history_store
+from conversation_memory import ConversationMemory
 from typing import List, Dict
 
-def _get_session_key(user_id: str) -> str:
-    """Internal helper to create a per-user session key for chat history."""
-    return f"chat_history_{user_id}"
-
 def get_chat_history(user_id: str) -> List[Dict[str, str]]:
     """
-    Retrieve the current chat history for the user.
+    Retrieve the recent chat history for the user.
+
+    Only the last `limits.max_chat_history` messages are returned (and kept
+    in memory); use get_older_chat_messages to page further back.
 
     Args:
         user_id (str): The user ID or username.
 
     Returns:
-        List[Dict]: A list of messages with 'role' and 'content'.
+        List[Dict]: A list of messages with 'role' and 'content', oldest first.
     """
     if not user_id:
         return []
+    return get_chat_history_store().recent(user_id)
 
-    session_key = _get_session_key(user_id)
+def get_older_chat_messages(user_id: str, before_id: int = None, limit: int = 20) -> List[Dict]:
+    """
+    Page through the user's stored history, newest page first.
 
-    if session_key not in st.session_state:
-        st.session_state[session_key] = []
+    Args:
+        user_id (str): The user ID.
+        before_id (int): Return messages older than this message ID (None = the newest messages).
+        limit (int): Maximum messages to return.
 
-    return st.session_state[session_key]
+    Returns:
+        List[Dict]: Messages with 'id', 'role', 'content' and 'created_at', oldest first;
+            pass the first message's 'id' as `before_id` for the previous page.
+    """
+    if not user_id:
+        return []
+    return get_chat_history_store().page(user_id, before_id, limit)
 
 def append_chat_message(user_id: str, role: str, message: str):
     """
@@ -39,16 +50,51 @@ def append_chat_message(user_id: str, role: str, message: str):
     """
     if role not in ["user", "bot"]:
         raise ValueError("Role must be either 'user' or 'bot'.")
+    if not user_id:
+        return
+    get_chat_history_store().append(user_id, role, message)
+
+def get_conversation_memory(user_id: str) -> ConversationMemory:
+    """
+    Load the user's conversation memory (running summary + recent turns) to pass to Chatbot.ask.
+
+    Args:
+        user_id (str): The user ID.
+
+    Returns:
+        ConversationMemory: Empty for new users; save it with save_conversation_memory after the turn.
+    """
+    state = get_chat_history_store().get_state(user_id) if user_id else None
+    return ConversationMemory.from_settings(state)
+
+def save_conversation_memory(user_id: str, memory: ConversationMemory):
+    """
+    Persist the user's conversation memory after a turn.
+
+    An LLM summary still being computed is saved when it is done, unless
+    a later turn has been saved meanwhile.
+
+    Args:
+        user_id (str): The user ID.
+        memory (ConversationMemory): Memory updated by Chatbot.ask.
+    """
+    if not user_id:
+        return
+    store = get_chat_history_store()
+    saved = memory.to_dict()
+    store.set_state(user_id, saved)
+
+    def save_summary(future):
+        if future.exception() is None and future.result():
+            store.replace_state(user_id, saved, memory.to_dict())
 
-    history = get_chat_history(user_id)
-    history.append({"role": role, "content": message})
+    if memory.pending_summary is not None:
+        memory.pending_summary.add_done_callback(save_summary)
 
 def clear_chat_history():
     """
-    Clears all chat history for the current user (from session).
+    Clears all chat history and conversation memory for the current user.
     """
     user_id = get_user_id()
     if user_id:
-        session_key = _get_session_key(user_id)
-        if session_key in st.session_state:
-            del st.session_state[session_key]
+        get_chat_history_store().clear(user_id)
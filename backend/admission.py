@@ -0,0 +1,391 @@
+# backend/admission.py
+
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional, Tuple
+from config import get_setting
+
+DEFAULT_ADMISSION_PATH = "data/admission.sqlite"
+
+# Per-tier quotas; a rate of 0 disables that limit
+DEFAULT_TIERS = {
+    "free": {"rate_per_minute": 5, "burst": 5, "max_in_flight": 1,
+             "tier_rate_per_minute": 120, "tier_burst": 20},
+    "subscriber": {"rate_per_minute": 30, "burst": 10, "max_in_flight": 3,
+                   "tier_rate_per_minute": 1200, "tier_burst": 200},
+}
+
+RATE_LIMITED_MESSAGE = "You've reached your question limit for now. Please try again in {seconds} seconds."
+BUSY_MESSAGE = "ChatVet is busy right now. Please try again in a few seconds."
+
+# Upper bounds (seconds) of the queue-wait histogram
+WAIT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        """
+        Raised when an LLM call is not admitted.
+
+        Args:
+            reason (str): "rate_limited" (the user or their tier is over quota)
+                or "busy" (the queue is full or no LLM slot freed up in time).
+            retry_after (float): Seconds after which a retry may be admitted.
+        """
+        self.reason = reason
+        self.retry_after = retry_after
+        if reason == "rate_limited":
+            self.message = RATE_LIMITED_MESSAGE.format(seconds=max(1, math.ceil(retry_after)))
+        else:
+            self.message = BUSY_MESSAGE
+        super().__init__(self.message)
+
+
+class Ticket:
+    __slots__ = ("id", "user_id", "tier", "waited")
+
+    def __init__(self, ticket_id: int, user_id: Optional[str], tier: Optional[str], waited: float):
+        self.id = ticket_id
+        self.user_id = user_id
+        self.tier = tier
+        self.waited = waited
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_ADMISSION_PATH,
+        max_concurrency: int = 16,
+        max_queue: int = 64,
+        max_wait: float = 10.0,
+        tiers: Optional[Dict[str, Dict[str, float]]] = None,
+        lease_seconds: float = 120.0,
+        poll_interval: float = 0.01,
+        busy_timeout: float = 5.0,
+    ):
+        """
+        Admission control for LLM calls: per-user and per-tier quotas, a
+        global concurrency cap and a fair wait queue.
+
+        A call first takes a token from the user's bucket and from their
+        tier's shared bucket (token buckets refilled at the tier's rate per
+        minute), and is refused if the user already has `max_in_flight`
+        calls admitted or queued. It then waits for one of `max_concurrency`
+        LLM slots. Free slots go to the waiting call whose user has the
+        fewest calls running (oldest first among equals), so one busy user
+        cannot starve the others. Calls that cannot queue, or that wait
+        longer than `max_wait`, are refused with reason "busy" and their
+        tokens are given back.
+
+        Buckets, slots and the queue live in a SQLite file in WAL mode, so
+        all app processes sharing the file share the limits. Slots held by
+        a crashed process are reclaimed after `lease_seconds`.
+
+        Args:
+            path (str): SQLite file shared by the app processes (None = this process only).
+            max_concurrency (int): LLM calls in flight at once, across all processes.
+            max_queue (int): Calls waiting for a slot; more are refused.
+            max_wait (float): Seconds a call waits for a slot before it is refused.
+            tiers: Quotas per tier name, see DEFAULT_TIERS.
+            lease_seconds (float): Seconds after which an unreleased slot is reclaimed
+                (should exceed the longest LLM call).
+            poll_interval (float): Seconds between checks of the queue by a waiting call.
+            busy_timeout (float): Seconds a store update waits for another process's update.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.tiers = {name: {**DEFAULT_TIERS.get(name, {}), **(limits or {})}
+                      for name, limits in (tiers or DEFAULT_TIERS).items()}
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection shared across threads, serialized by a lock
+        self._conn = sqlite3.connect(path or ":memory:", timeout=busy_timeout, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS calls (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, tier TEXT, "
+            "state TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS calls_state ON calls (state, user_id)")
+        self._lock = threading.Lock()
+        # Wakes this process's waiters when one of its calls releases a slot
+        self._released = threading.Condition(self._lock)
+
+        self.stats = {"admitted": 0, "rate_limited": 0, "busy": 0, "wait_seconds": 0.0}
+        self.admitted_by_tier: Dict[str, int] = {}
+        self.wait_counts = [0] * len(WAIT_BUCKETS)
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        """Build the controller configured by the `admission` section of configs/settings.yaml."""
+        return cls(
+            path=get_setting("admission", "path", DEFAULT_ADMISSION_PATH) or None,
+            max_concurrency=get_setting("admission", "max_concurrency", 16),
+            max_queue=get_setting("admission", "max_queue", 64),
+            max_wait=get_setting("admission", "max_wait", 10.0),
+            tiers=get_setting("admission", "tiers", None),
+            lease_seconds=get_setting("admission", "lease_seconds", 120.0),
+            poll_interval=get_setting("admission", "poll_interval", 0.01),
+            busy_timeout=get_setting("admission", "busy_timeout", 5.0),
+        )
+
+    def acquire(self, user_id: Optional[str], tier: Optional[str] = "free") -> Ticket:
+        """
+        Wait for an LLM slot, blocking.
+
+        Args:
+            user_id (str): The user making the call (None = no per-user or per-tier quota).
+            tier (str): The user's tier, a key of `tiers`.
+
+        Returns:
+            Ticket: Pass to release() when the call is done.
+
+        Raises:
+            AdmissionRejected: Over quota, or no slot within max_wait.
+        """
+        started = time.monotonic()
+        with self._lock:
+            ticket_id = self._enqueue(user_id, tier)
+            while True:
+                if self._poll(ticket_id, user_id, tier, expired=time.monotonic() - started >= self.max_wait):
+                    return self._admitted(ticket_id, user_id, tier, started)
+                self._released.wait(min(self.poll_interval, max(0.0, started + self.max_wait - time.monotonic())))
+
+    async def aacquire(self, user_id: Optional[str], tier: Optional[str] = "free") -> Ticket:
+        """Async version of acquire; store updates run in worker threads so the event loop never blocks on them."""
+        started = time.monotonic()
+        ticket_id = await asyncio.to_thread(self._locked, self._enqueue, user_id, tier)
+        try:
+            while True:
+                expired = time.monotonic() - started >= self.max_wait
+                if await asyncio.to_thread(self._locked, self._poll, ticket_id, user_id, tier, expired):
+                    return self._locked(self._admitted, ticket_id, user_id, tier, started)
+                await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            # e.g. the request timed out while queued: leave the queue (or the slot just granted)
+            self._locked(self._withdraw, ticket_id, user_id, tier)
+            raise
+
+    def release(self, ticket: Ticket):
+        """Free the ticket's slot and hand it to the next waiting call."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM calls WHERE id = ?", (ticket.id,))
+                self._schedule(time.time())
+            finally:
+                self._conn.execute("COMMIT")
+            self._released.notify_all()
+
+    @contextmanager
+    def slot(self, user_id: Optional[str], tier: Optional[str] = "free"):
+        """Hold an LLM slot for the duration of a with block (see acquire)."""
+        ticket = self.acquire(user_id, tier)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, user_id: Optional[str], tier: Optional[str] = "free"):
+        """Hold an LLM slot for the duration of an async with block (see aacquire)."""
+        ticket = await self.aacquire(user_id, tier)
+        try:
+            yield ticket
+        finally:
+            await asyncio.to_thread(self.release, ticket)
+
+    def load(self) -> Tuple[int, int]:
+        """Return (running, waiting) calls across all processes sharing the store."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM calls GROUP BY state").fetchall())
+        return counts.get("running", 0), counts.get("waiting", 0)
+
+    def metrics(self) -> Dict[str, float]:
+        """Return this process's admission counters and the shared load."""
+        running, waiting = self.load()
+        with self._lock:
+            stats = dict(self.stats)
+            stats["admitted_by_tier"] = dict(self.admitted_by_tier)
+            stats["wait_counts"] = list(self.wait_counts)
+        stats["running"], stats["waiting"] = running, waiting
+        stats["mean_wait"] = stats["wait_seconds"] / stats["admitted"] if stats["admitted"] else 0.0
+        return stats
+
+    def render_prometheus(self) -> str:
+        """Admission metrics in the Prometheus text exposition format."""
+        stats = self.metrics()
+        lines = ["# TYPE chatvet_admission_admitted_total counter"]
+        for tier, count in sorted(stats["admitted_by_tier"].items()):
+            lines.append(f'chatvet_admission_admitted_total{{tier="{tier}"}} {count}')
+        lines.append("# TYPE chatvet_admission_rejected_total counter")
+        for reason in ("rate_limited", "busy"):
+            lines.append(f'chatvet_admission_rejected_total{{reason="{reason}"}} {stats[reason]}')
+        lines.append("# TYPE chatvet_admission_wait_seconds histogram")
+        cumulative = 0
+        for bound, count in zip(WAIT_BUCKETS, stats["wait_counts"]):
+            cumulative += count
+            lines.append(f'chatvet_admission_wait_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'chatvet_admission_wait_seconds_bucket{{le="+Inf"}} {stats["admitted"]}')
+        lines.append(f"chatvet_admission_wait_seconds_sum {stats['wait_seconds']}")
+        lines.append(f"chatvet_admission_wait_seconds_count {stats['admitted']}")
+        lines.append("# TYPE chatvet_admission_calls gauge")
+        lines.append(f'chatvet_admission_calls{{state="running"}} {stats["running"]}')
+        lines.append(f'chatvet_admission_calls{{state="waiting"}} {stats["waiting"]}')
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _locked(self, function, *args):
+        with self._lock:
+            return function(*args)
+
+    def _limits(self, tier: Optional[str]) -> Optional[Dict[str, float]]:
+        if tier is None:
+            return None
+        if tier not in self.tiers:
+            raise ValueError(f"Unknown tier '{tier}'; expected one of {sorted(self.tiers)}.")
+        return self.tiers[tier]
+
+    def _buckets(self, user_id: Optional[str], tier: Optional[str]):
+        """(key, refill per second, capacity) of the token buckets a call is charged to."""
+        limits = self._limits(tier)
+        if user_id is None or limits is None:
+            return []
+        buckets = [(f"user:{user_id}", limits.get("rate_per_minute", 0) / 60.0, limits.get("burst", 1)),
+                   (f"tier:{tier}", limits.get("tier_rate_per_minute", 0) / 60.0, limits.get("tier_burst", 1))]
+        return [(key, rate, capacity) for key, rate, capacity in buckets if rate > 0]
+
+    def _tokens(self, key: str, rate: float, capacity: float, now: float) -> float:
+        row = self._conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return capacity
+        return min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+
+    def _enqueue(self, user_id: Optional[str], tier: Optional[str]) -> int:
+        """Check the quotas, take the tokens and join the queue. Caller holds self._lock."""
+        limits = self._limits(tier)
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("DELETE FROM calls WHERE expires_at < ?", (now,))
+            if user_id is not None and limits is not None:
+                active = self._conn.execute("SELECT COUNT(*) FROM calls WHERE user_id = ?", (user_id,)).fetchone()[0]
+                if active >= limits.get("max_in_flight", 1):
+                    self._reject("rate_limited", 1.0)
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM calls GROUP BY state").fetchall())
+            # Only calls that would have to wait are refused for a full queue
+            if counts.get("running", 0) >= self.max_concurrency and counts.get("waiting", 0) >= self.max_queue:
+                self._reject("busy", 1.0)
+
+            buckets = [(key, rate, self._tokens(key, rate, capacity, now))
+                       for key, rate, capacity in self._buckets(user_id, tier)]
+            shortfall = max([(1 - tokens) / rate for key, rate, tokens in buckets if tokens < 1], default=0.0)
+            if shortfall:
+                self._reject("rate_limited", shortfall)
+            self._conn.executemany("INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                                   [(key, tokens - 1, now) for key, rate, tokens in buckets])
+            cursor = self._conn.execute(
+                "INSERT INTO calls (user_id, tier, state, expires_at) VALUES (?, ?, 'waiting', ?)",
+                (user_id, tier, now + self.max_wait + self.lease_seconds),
+            )
+            self._schedule(now)
+            return cursor.lastrowid
+        finally:
+            self._conn.execute("COMMIT")
+
+    def _poll(self, ticket_id: int, user_id: Optional[str], tier: Optional[str], expired: bool) -> bool:
+        """
+        Hand out free slots and report whether the ticket got one.
+
+        If it did not and `expired` is set, the ticket leaves the queue,
+        its tokens are given back and AdmissionRejected("busy") is raised.
+        A ticket reclaimed as expired is treated the same way.
+        Caller holds self._lock.
+        """
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._schedule(now)
+            row = self._conn.execute("SELECT state FROM calls WHERE id = ?", (ticket_id,)).fetchone()
+            if row is not None and row[0] == "running":
+                return True
+            if row is not None and not expired:
+                return False
+        finally:
+            self._conn.execute("COMMIT")
+        self._withdraw(ticket_id, user_id, tier)
+        self._reject("busy", 1.0)
+
+    def _withdraw(self, ticket_id: int, user_id: Optional[str], tier: Optional[str]):
+        """Remove a call that will not run and give its tokens back. Caller holds self._lock."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._conn.execute("DELETE FROM calls WHERE id = ?", (ticket_id,)).rowcount:
+                for key, rate, capacity in self._buckets(user_id, tier):
+                    self._conn.execute("UPDATE buckets SET tokens = MIN(?, tokens + 1) WHERE key = ?",
+                                       (capacity, key))
+            self._schedule(time.time())
+        finally:
+            self._conn.execute("COMMIT")
+
+    def _schedule(self, now: float):
+        """Reclaim expired calls and promote waiting calls into free slots, fairly across users."""
+        self._conn.execute("DELETE FROM calls WHERE expires_at < ?", (now,))
+        running = self._conn.execute("SELECT COUNT(*) FROM calls WHERE state = 'running'").fetchone()[0]
+        for _ in range(self.max_concurrency - running):
+            row = self._conn.execute(
+                "SELECT id FROM calls AS waiting WHERE state = 'waiting' ORDER BY "
+                "(SELECT COUNT(*) FROM calls AS running WHERE running.state = 'running' "
+                "AND running.user_id IS waiting.user_id), id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("UPDATE calls SET state = 'running', expires_at = ? WHERE id = ?",
+                               (now + self.lease_seconds, row[0]))
+
+    def _reject(self, reason: str, retry_after: float):
+        self.stats[reason] += 1
+        raise AdmissionRejected(reason, retry_after)
+
+    def _admitted(self, ticket_id: int, user_id: Optional[str], tier: Optional[str], started: float) -> Ticket:
+        waited = time.monotonic() - started
+        self.stats["admitted"] += 1
+        self.stats["wait_seconds"] += waited
+        tier_name = tier or "none"
+        self.admitted_by_tier[tier_name] = self.admitted_by_tier.get(tier_name, 0) + 1
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if waited <= bound:
+                self.wait_counts[i] += 1
+                break
+        return Ticket(ticket_id, user_id, tier, waited)
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """
+    Build the AdmissionController configured in the `admission` section of configs/settings.yaml.
+
+    Returns:
+        AdmissionController, or None if admission control is disabled.
+    """
+    if not get_setting("admission", "enabled", True):
+        return None
+    return AdmissionController.from_settings()
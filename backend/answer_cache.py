@@ -0,0 +1,335 @@
+# backend/answer_cache.py
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from config import get_setting
+
+DEFAULT_ANSWER_CACHE_PATH = "data/answer_cache.sqlite"
+# Written by the ingest pipeline whenever the indexed knowledge base changes
+KB_VERSION_PATH = "data/kb_version"
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase a question and strip punctuation and extra whitespace, so trivial variants share a cache key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+def knowledge_base_version(path: str = KB_VERSION_PATH) -> str:
+    """Return the current knowledge-base version token ("" if the knowledge base was never marked)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def mark_knowledge_base_updated(path: str = KB_VERSION_PATH) -> str:
+    """
+    Record that the knowledge base changed, invalidating cached answers.
+
+    Returns:
+        str: The new version token.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    version = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+    return version
+
+
+class _Entry:
+    __slots__ = ("question", "answer", "created_at", "latency", "slot")
+
+    def __init__(self, question: str, answer: str, created_at: float, latency: float, slot: Optional[int]):
+        self.question = question
+        self.answer = answer
+        self.created_at = created_at
+        self.latency = latency
+        self.slot = slot
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 86400,
+        similarity_threshold: float = 0.95,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+        path: Optional[str] = None,
+        version_path: str = KB_VERSION_PATH,
+        version_check_interval: float = 5.0,
+    ):
+        """
+        Two-level cache of generated answers.
+
+        Level 1 matches questions exactly after normalize_question. Level 2
+        embeds the question and returns the answer of the most similar cached
+        question if its cosine similarity reaches `similarity_threshold`.
+        Entries are evicted least-recently-used beyond `max_entries` and
+        expire after `ttl_seconds`. The whole cache is dropped when the
+        knowledge-base version changes.
+
+        Args:
+            max_entries (int): Maximum number of cached answers.
+            ttl_seconds (float): Lifetime of an answer (0 = no expiry).
+            similarity_threshold (float): Minimum cosine similarity for a near-duplicate hit.
+            embed_query: Function embedding a question; None disables level 2.
+            path (str): SQLite file persisting the cache across restarts (None = memory only).
+            version_path (str): Knowledge-base version file (see mark_knowledge_base_updated).
+            version_check_interval (float): Seconds between checks of the version file.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embed_query = embed_query
+        self.version_path = version_path
+        self.version_check_interval = version_check_interval
+
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # LRU order, oldest first
+        # Level 2: normalized question vectors in fixed slots, allocated once the dimension is known
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        # Vectors of recently looked-up questions, so put() after a miss does not embed again
+        self._recent_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        self.stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "misses": 0, "seconds_saved": 0.0,
+                      "evictions": 0, "expirations": 0, "invalidations": 0}
+
+        self._conn = None
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, question TEXT NOT NULL, "
+                "answer TEXT NOT NULL, vector BLOB, created_at REAL NOT NULL, latency REAL NOT NULL, "
+                "kb_version TEXT NOT NULL)"
+            )
+
+        self._kb_version = knowledge_base_version(version_path)
+        self._version_checked_at = time.monotonic()
+        if self._conn is not None:
+            self._load()
+
+    def get(self, question: str) -> Optional[str]:
+        """
+        Return a cached answer for the question or a near-duplicate of it, or None.
+        """
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version()
+            self.stats["lookups"] += 1
+
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._remove(key)
+                self.stats["expirations"] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                self.stats["seconds_saved"] += entry.latency
+                return entry.answer
+
+        vector = self._embed(key)
+        with self._lock:
+            entry = self._nearest(vector) if vector is not None else None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["semantic_hits"] += 1
+            self.stats["seconds_saved"] += entry.latency
+            return entry.answer
+
+    def put(self, question: str, answer: str, latency: float = 0.0):
+        """
+        Cache the answer to a question.
+
+        Args:
+            question (str): The user's question.
+            answer (str): The generated answer.
+            latency (float): Seconds it took to generate, credited as saved on every hit.
+        """
+        key = normalize_question(question)
+        if not key:
+            return
+        vector = self._embed(key)
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                self._remove(key)
+            entry = _Entry(question, answer, time.time(), latency, None)
+            self._insert(key, entry, vector)
+            self._persist(key, entry, vector)
+
+    def invalidate(self):
+        """Drop every cached answer (in memory and on disk)."""
+        with self._lock:
+            self._entries.clear()
+            self._vectors = None
+            self._slot_keys = []
+            self._free_slots = []
+            self.stats["invalidations"] += 1
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM answers")
+
+    def metrics(self) -> Dict[str, float]:
+        """Return hit counters, hit rate and generation time saved."""
+        with self._lock:
+            stats = dict(self.stats)
+            hits = stats["exact_hits"] + stats["semantic_hits"]
+            stats["hit_rate"] = hits / stats["lookups"] if stats["lookups"] else 0.0
+            stats["entries"] = len(self._entries)
+            return stats
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+    def _expired(self, entry: _Entry) -> bool:
+        return bool(self.ttl_seconds) and time.time() - entry.created_at > self.ttl_seconds
+
+    def _check_version(self):
+        """Drop the cache if the knowledge base was re-indexed since the last check."""
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        version = knowledge_base_version(self.version_path)
+        if version != self._kb_version:
+            print(f"[AnswerCache] Knowledge base changed, dropping {len(self._entries)} cached answers.")
+            self._kb_version = version
+            self.invalidate()
+
+    def _embed(self, key: str) -> Optional[np.ndarray]:
+        """Normalized embedding of a normalized question, or None if level 2 is off or embedding fails."""
+        if self.embed_query is None or not key:
+            return None
+        with self._lock:
+            vector = self._recent_vectors.get(key)
+            if vector is not None:
+                self._recent_vectors.move_to_end(key)
+                return vector
+        try:
+            vector = np.asarray(self.embed_query(key), dtype=np.float32)
+        except Exception as e:
+            # The cache must never break answering; treat as a level-2 miss
+            print(f"[AnswerCache] Could not embed question: {e}")
+            return None
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            self._recent_vectors[key] = vector
+            if len(self._recent_vectors) > 64:
+                self._recent_vectors.popitem(last=False)
+        return vector
+
+    def _nearest(self, vector: np.ndarray) -> Optional[_Entry]:
+        """Most similar unexpired entry at or above the threshold, or None."""
+        if self._vectors is None or len(vector) != self._vectors.shape[1]:
+            return None
+        scores = self._vectors @ vector
+        for slot in np.argsort(-scores):
+            if scores[slot] < self.similarity_threshold:
+                return None
+            key = self._slot_keys[slot]
+            if key is None:
+                continue
+            entry = self._entries[key]
+            if self._expired(entry):
+                self._remove(key)
+                self.stats["expirations"] += 1
+                continue
+            self._entries.move_to_end(key)
+            return entry
+        return None
+
+    def _insert(self, key: str, entry: _Entry, vector: Optional[np.ndarray]):
+        while len(self._entries) >= self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+        if vector is not None:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._slot_keys = [None] * self.max_entries
+                self._free_slots = list(range(self.max_entries - 1, -1, -1))
+            if len(vector) == self._vectors.shape[1]:
+                entry.slot = self._free_slots.pop()
+                self._vectors[entry.slot] = vector
+                self._slot_keys[entry.slot] = key
+        self._entries[key] = entry
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        if entry.slot is not None:
+            self._vectors[entry.slot] = 0.0
+            self._slot_keys[entry.slot] = None
+            self._free_slots.append(entry.slot)
+        if self._conn is not None:
+            self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+
+    def _persist(self, key: str, entry: _Entry, vector: Optional[np.ndarray]):
+        if self._conn is None:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO answers (key, question, answer, vector, created_at, latency, kb_version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, entry.question, entry.answer, vector.tobytes() if vector is not None else None,
+             entry.created_at, entry.latency, self._kb_version),
+        )
+
+    def _load(self):
+        """Load persisted answers of the current knowledge-base version, newest max_entries of them."""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers WHERE kb_version != ?", (self._kb_version,))
+            if self.ttl_seconds:
+                self._conn.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            rows = self._conn.execute(
+                "SELECT key, question, answer, vector, created_at, latency FROM answers "
+                "ORDER BY created_at DESC LIMIT ?", (self.max_entries,)
+            ).fetchall()
+            for key, question, answer, blob, created_at, latency in reversed(rows):
+                vector = np.frombuffer(blob, dtype=np.float32) if blob is not None else None
+                self._insert(key, _Entry(question, answer, created_at, latency, None), vector)
+            if rows:
+                print(f"[AnswerCache] Loaded {len(rows)} cached answers.")
+
+
+def get_answer_cache(embed_query: Optional[Callable[[str], List[float]]] = None) -> Optional[AnswerCache]:
+    """
+    Build the AnswerCache configured in the `answer_cache` section of configs/settings.yaml.
+
+    Args:
+        embed_query: Function embedding a question, enabling near-duplicate matching.
+
+    Returns:
+        AnswerCache, or None if the cache is disabled.
+    """
+    if not get_setting("answer_cache", "enabled", True):
+        return None
+    return AnswerCache(
+        max_entries=get_setting("answer_cache", "max_entries", 1000),
+        ttl_seconds=get_setting("answer_cache", "ttl_seconds", 86400),
+        similarity_threshold=get_setting("answer_cache", "similarity_threshold", 0.95),
+        embed_query=embed_query if get_setting("answer_cache", "semantic", True) else None,
+        path=get_setting("answer_cache", "path", DEFAULT_ANSWER_CACHE_PATH) or None,
+    )
@@ -1,75 +1,693 @@
 # backend/chatbot.py
 
+import asyncio
+import logging
 import os
-from langchain.chat_models import ChatOpenAI
-from langchain.chains import RetrievalQA
-from prompt_templates import symptom_triage_prompt
-from retriever import get_pinecone_retriever
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from retriever import get_retriever, get_query_embeddings
+from answer_cache import get_answer_cache, normalize_question
 from symptom_checker import SymptomChecker
+from hybrid_retriever import HybridRetriever, LexicalMatch
+from knowledge_base import KnowledgeBase
+from context_packer import ContextPacker
+from conversation_memory import ConversationMemory
+from admission import AdmissionController, AdmissionRejected
+from single_flight import FailedPiece, LeaderFailed, SingleFlight
+from model_router import ModelRouter, RouteDecision
+from tracing import NOOP_TRACE, get_tracer
+from config import get_setting
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# langchain, openai and aiohttp take seconds to import; they are loaded when
+# the chatbot is built or first answers asynchronously, not on import
+if TYPE_CHECKING:
+    import aiohttp
+    from langchain.chat_models import ChatOpenAI
+    from langchain.schema import Document
+
+# Default for Chatbot(answer_cache=...): build the cache from configs/settings.yaml
+FROM_SETTINGS = object()
+
+INVALID_QUESTION_MESSAGE = "Please ask a valid question about your pet's symptoms or health."
+ERROR_MESSAGE = "Sorry, I encountered an error while trying to answer. Please try again later."
+
+def make_llm(model: Optional[str] = None, max_tokens: Optional[int] = None) -> "ChatOpenAI":
+    """
+    Create the streaming OpenAI chat model used to generate answers.
+
+    Args:
+        model (str): OpenAI chat model (default: openai.model in configs/settings.yaml).
+        max_tokens (int): Answer length limit (default: openai.max_tokens).
+    """
+    from langchain.chat_models import ChatOpenAI
+
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise ValueError("OPENAI_API_KEY is not set in environment variables")
+
+    return ChatOpenAI(
+        model=model or get_setting("openai", "model", "gpt-4"),
+        temperature=get_setting("openai", "temperature", 0.2),
+        openai_api_key=openai_api_key,
+        max_tokens=max_tokens or get_setting("openai", "max_tokens", 1024),
+        streaming=True,  # tokens are yielded by ask_stream as they arrive
+    )
+
 class Chatbot:
-    def __init__(self):
+    def __init__(self, llm=None, retriever=None, symptom_checker=None, answer_cache=FROM_SETTINGS, tracer=None,
+                 admission: Optional[AdmissionController] = None, router: Optional[ModelRouter] = None):
+        """
+        Args:
+            llm: LangChain chat model (defaults to a streaming ChatOpenAI).
+            retriever: LangChain retriever (defaults to get_retriever()).
+            symptom_checker: SymptomChecker (defaults to one over data/vet_guides.csv).
+            answer_cache: AnswerCache, or None to disable caching (defaults to get_answer_cache()).
+            tracer: Tracer recording per-stage timings (defaults to get_tracer()).
+            admission: AdmissionController every LLM answer must pass (None = no quotas or cap).
+            router: ModelRouter picking the model of each LLM answer (None = always `llm`).
+        """
         # Initialize OpenAI Chat model
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        if not openai_api_key:
-            raise ValueError("OPENAI_API_KEY is not set in environment variables")
-
-        self.llm = ChatOpenAI(
-            model="gpt-4",  # or "gpt-3.5-turbo"
-            temperature=0.2,
-            openai_api_key=openai_api_key,
-            max_tokens=1024,
-            streaming=False,
-        )
+        self.llm = llm or make_llm()
 
-        # Initialize Retriever for Pinecone vector DB
-        self.retriever = get_pinecone_retriever()
+        # Initialize Retriever (Pinecone or local vector store, see configs/settings.yaml)
+        retriever = retriever or get_retriever()
 
         # Use the centralized prompt template from prompt_templates.py
+        from prompt_templates import symptom_triage_prompt
         self.prompt_template = symptom_triage_prompt
 
-        # Setup RetrievalQA chain combining retriever + LLM + prompt template
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.retriever,
-            return_source_documents=False,
-            chain_type_kwargs={"prompt": self.prompt_template},
+        # Deduplicates retrieved chunks and fits them into the prompt's token budget
+        self.context_packer = ContextPacker.from_settings(
+            self.prompt_template, max_output_tokens=getattr(self.llm, "max_tokens", None)
         )
 
         # Initialize symptom checker with your symptom-suggestion CSV
-        self.symptom_checker = SymptomChecker("data/vet_guides.csv")
+        symptom_checker = symptom_checker or SymptomChecker("data/vet_guides.csv")
+
+        # Lexical + vector retrieval with rank fusion; confident lexical matches skip the LLM.
+        # Swapped as a whole when the knowledge base is reloaded (see swap_knowledge_base)
+        self.knowledge_base = KnowledgeBase(1, symptom_checker, retriever)
+        self._swap_lock = threading.Lock()
+        self.symptom_match_threshold = get_setting("chatbot", "symptom_match_threshold", 0.5)
+
+        # Summarize turns leaving a conversation's recent window with the LLM (extractively if False).
+        # The turn is folded extractively at once; the LLM summary replaces it in the background
+        self.llm_summary = get_setting("memory", "llm_summary", True)
+        self._summaries = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+
+        # Cache of generated answers, matched exactly or by question embedding (see configs/settings.yaml)
+        if answer_cache is FROM_SETTINGS:
+            # Reuse the retriever's query embeddings (and their cache) when it exposes them
+            embeddings = getattr(getattr(self.retriever, "vectorstore", None), "embeddings", None)
+            answer_cache = get_answer_cache(embed_query=(embeddings or get_query_embeddings()).embed_query)
+        self.answer_cache = answer_cache
 
-    def ask(self, user_question: str) -> str:
+        # Per-request timings of recent answers: {"source", "ttft", "total"} in seconds
+        self.timings = deque(maxlen=1000)
+
+        # Per-stage spans, token counts and cache hits (only recorded when tracing is enabled)
+        self.tracer = tracer or get_tracer()
+
+        # Per-user quotas and the global cap on LLM calls; quick answers are not charged
+        self.admission = admission
+
+        # Easy questions go to a faster model, hard ones to the strong one (see configs/settings.yaml)
+        self.router = router
+
+        # Concurrent identical questions share one retrieval and generation
+        self.single_flight = SingleFlight.from_settings() if get_setting("chatbot", "coalesce", True) else None
+
+        # Pooled HTTP session for async LLM calls, created on first use by aask
+        self._aiohttp_session = None
+        self._aiohttp_loop = None
+
+    @property
+    def retriever(self):
+        return self.knowledge_base.retriever
+
+    @property
+    def symptom_checker(self) -> SymptomChecker:
+        return self.knowledge_base.symptom_checker
+
+    @property
+    def hybrid_retriever(self) -> HybridRetriever:
+        return self.knowledge_base.hybrid_retriever
+
+    def swap_knowledge_base(self, symptom_checker: Optional[SymptomChecker] = None,
+                            retriever=None) -> KnowledgeBase:
         """
-        Answer the user's question by trying quick symptom matching first,
-        then fallback to Retrieval-Augmented Generation (RAG) with LLM.
+        Atomically replace the knowledge-base indexes answers are retrieved from.
+
+        Requests already in progress finish on the previous version, which
+        is closed after the last of them. Cached answers are dropped, since
+        they may rest on outdated documents.
+
+        Args:
+            symptom_checker: New SymptomChecker (None keeps the current one).
+            retriever: New vector retriever (None keeps the current one).
+
+        Returns:
+            KnowledgeBase: The new version.
+        """
+        with self._swap_lock:
+            previous = self.knowledge_base
+            current = KnowledgeBase(
+                previous.version + 1,
+                symptom_checker or previous.symptom_checker,
+                retriever or previous.retriever,
+            )
+            self.knowledge_base = current
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate()
+        previous.retire(current)
+        logger.info("Knowledge base version %d is live", current.version, extra={"kb_version": current.version})
+        return current
+
+    def _acquire_knowledge_base(self) -> KnowledgeBase:
+        # Under the swap lock, so a version is never acquired after it was retired and closed
+        with self._swap_lock:
+            return self.knowledge_base.acquire()
+
+    def ask(self, user_question: str, memory: Optional[ConversationMemory] = None, user_id: Optional[str] = None,
+            tier: Optional[str] = None, latency_budget: Optional[float] = None) -> str:
+        """
+        Answer the user's question. Symptom matching and vector retrieval run
+        concurrently; a confident symptom match or a cached answer is returned
+        directly, otherwise Retrieval-Augmented Generation (RAG) with the LLM
+        answers from the fused lexical and vector context.
 
         Args:
             user_question (str): The user's input question about pet health
+            memory (ConversationMemory): Earlier turns of the conversation. Its
+                summary and recent turns are added to the retrieval query and
+                the prompt, and the new turn is recorded in it.
+            user_id (str): The asking user, charged for LLM answers when
+                admission control is on (None = only the global cap applies).
+            tier (str): The user's subscription tier, e.g. "free" or "subscriber".
+            latency_budget (float): Seconds the answer should take; slower models
+                are skipped or given up on (None = routing.latency_budget, 0 = none).
 
         Returns:
             str: Chatbot's answer string
+
+        Raises:
+            AdmissionRejected: The answer needs the LLM and the user is over
+                quota, or no LLM slot freed up in time.
         """
-        if not user_question.strip():
-            return "Please ask a valid question about your pet's symptoms or health."
+        return "".join(self.ask_stream(user_question, memory, user_id, tier, latency_budget)).strip()
 
-        # 1. Try symptom checker with a similarity threshold
-        suggestions = self.symptom_checker.get_suggestions(user_question, threshold=0.5)
+    def ask_stream(self, user_question: str, memory: Optional[ConversationMemory] = None,
+                   user_id: Optional[str] = None, tier: Optional[str] = None,
+                   latency_budget: Optional[float] = None) -> Iterator[str]:
+        """
+        Same as ask, but yields the answer in pieces as it is generated.
+
+        Symptom-checker and cached answers are yielded in one piece; LLM
+        answers are yielded token by token. Time to first token and total time
+        are recorded in self.timings.
 
-        # If confident suggestions found, return them directly
-        fallback_msg = "No close matches found. Please consult a veterinarian for specific advice."
-        if suggestions and suggestions[0] != fallback_msg:
-            reply = "Based on your symptoms, here is some advice:\n- " + "\n- ".join(suggestions)
-            return reply
+        Concurrent calls with the same (normalized) opening question share
+        one answer: the first runs retrieval and generation, the others
+        stream its pieces as they arrive (source "coalesced"). If that call
+        fails before showing anything, the others answer on their own.
 
-        # 2. Fallback to RAG + LLM for more complex or unmatched queries
+        Args:
+            user_question (str): The user's input question about pet health
+            memory (ConversationMemory): Earlier turns of the conversation (see ask).
+            user_id (str): The asking user (see ask).
+            tier (str): The user's subscription tier (see ask).
+            latency_budget (float): Seconds the answer should take (see ask).
+
+        Yields:
+            str: Consecutive pieces of the answer
+
+        Raises:
+            AdmissionRejected: Before any piece is yielded (see ask).
+        """
+        key = self._coalescing_key(user_question, memory)
+        if key is None:
+            yield from self._answer_stream(user_question, memory, user_id, tier, latency_budget)
+            return
+        flight, leading = self.single_flight.join(key)
+        if leading:
+            pieces = self._answer_stream(user_question, memory, user_id, tier, latency_budget)
+            yield from self.single_flight.lead(key, flight, pieces)
+            return
+
+        # Another call is answering the same question: stream its answer
+        started = time.perf_counter()
+        timing = {"source": "coalesced", "first_token_at": None}
+        trace = self.tracer.start_trace("ask")
+        tokens = []
         try:
-            response = self.qa_chain.run(user_question)
-            return response.strip()
+            for piece in self.single_flight.follow(key, flight):
+                timing["first_token_at"] = timing["first_token_at"] or time.perf_counter()
+                tokens.append(piece)
+                yield piece
+        except LeaderFailed as e:
+            timing["source"] = "coalesced_failed"
+            trace.set(error=f"{type(e).__name__}: {e}")
+        finally:
+            self._record_timing(timing, started, trace, tokens)
+        if timing["source"] == "coalesced":
+            self._remember(memory, user_question, "".join(tokens).strip())
+        elif tokens:
+            yield self._error_reply(LeaderFailed("The answer was cut off."), tokens)
+        else:
+            # Nothing was shown yet: answer on our own
+            yield from self._answer_stream(user_question, memory, user_id, tier, latency_budget)
+
+    def _answer_stream(self, user_question: str, memory: Optional[ConversationMemory], user_id: Optional[str],
+                       tier: Optional[str], latency_budget: Optional[float]) -> Iterator[str]:
+        """ask_stream without coalescing."""
+        started = time.perf_counter()
+        timing = {"source": "llm", "first_token_at": None}
+        trace = self.tracer.start_trace("ask")
+        tokens = []
+        # The whole answer uses the knowledge-base version current at its start
+        knowledge_base = self._acquire_knowledge_base()
+        trace.set(kb_version=knowledge_base.version)
+        try:
+            if not user_question.strip():
+                timing["source"] = "invalid"
+                yield INVALID_QUESTION_MESSAGE
+                return
+
+            # Follow-up questions are searched and cached together with the conversation so far
+            query = memory.retrieval_query(user_question) if memory is not None else user_question
+
+            # 1. Lexical and vector retrieval run concurrently; the vector search
+            #    continues in the background while the quick answers are checked.
+            #    Symptoms are matched on the question alone: an earlier turn's
+            #    symptom must not answer a follow-up with the same canned advice
+            vector_search = knowledge_base.hybrid_retriever.submit_vector(query, trace)
+            with trace.span("symptom_matching"):
+                lexical = knowledge_base.hybrid_retriever.search_lexical(user_question)
+
+            # 2. Confident symptom match or cached answer
+            quick = self._quick_answer(query, lexical, trace)
+            if quick is not None:
+                # Only stops a search still queued behind others. One already running finishes
+                # unused: quick answers pay for a query embedding so LLM answers never wait for it
+                vector_search.cancel()
+                timing["source"], answer = quick
+                yield answer
+                self._remember(memory, user_question, answer, trace)
+                return
+
+            # 3. RAG + LLM over the fused lexical and vector context
+            try:
+                if query != user_question:
+                    lexical = knowledge_base.hybrid_retriever.search_lexical(query)
+                vector = vector_search.result()
+                docs = knowledge_base.hybrid_retriever.fuse(lexical, vector)
+                with trace.span("prompt_assembly"):
+                    prompt = self._build_prompt(user_question, docs, trace, memory)
+                decision = self._route(user_question, lexical, vector, latency_budget, trace, timing)
+                with self._admitted(user_id, tier, trace), trace.span("llm_generation"):
+                    pieces = self.router.stream(decision, prompt) if decision is not None else self._stream(prompt)
+                    for piece in pieces:
+                        timing["first_token_at"] = timing["first_token_at"] or time.perf_counter()
+                        tokens.append(piece)
+                        yield piece
+            except AdmissionRejected as e:
+                timing["source"] = "rejected"
+                trace.set(admission=e.reason)
+                raise
+            except Exception as e:
+                timing["source"] = "error"
+                trace.set(error=f"{type(e).__name__}: {e}")
+                yield self._error_reply(e, tokens)
+                return
+
+            self._cache_answer(query, tokens, started, knowledge_base)
+            self._remember(memory, user_question, "".join(tokens).strip(), trace)
+        finally:
+            knowledge_base.release()
+            self._record_timing(timing, started, trace, tokens)
+
+    async def aask(self, user_question: str, memory: Optional[ConversationMemory] = None,
+                   user_id: Optional[str] = None, tier: Optional[str] = None,
+                   latency_budget: Optional[float] = None) -> str:
+        """
+        Async version of ask, for serving many conversations on one event loop.
+
+        Args:
+            user_question (str): The user's input question about pet health
+            memory (ConversationMemory): Earlier turns of the conversation (see ask).
+            user_id (str): The asking user (see ask).
+            tier (str): The user's subscription tier (see ask).
+            latency_budget (float): Seconds the answer should take (see ask).
+
+        Returns:
+            str: Chatbot's answer string
+
+        Raises:
+            AdmissionRejected: See ask.
+        """
+        pieces = self.aask_stream(user_question, memory, user_id, tier, latency_budget)
+        return "".join([piece async for piece in pieces]).strip()
+
+    async def aask_stream(self, user_question: str, memory: Optional[ConversationMemory] = None,
+                          user_id: Optional[str] = None, tier: Optional[str] = None,
+                          latency_budget: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Async version of ask_stream.
+
+        The LLM is streamed over a pooled aiohttp session shared by all
+        requests on the event loop. Symptom matching, the answer cache and
+        retrieval use blocking clients and run in worker threads.
+
+        Args:
+            user_question (str): The user's input question about pet health
+            memory (ConversationMemory): Earlier turns of the conversation (see ask).
+            user_id (str): The asking user (see ask).
+            tier (str): The user's subscription tier (see ask).
+            latency_budget (float): Seconds the answer should take (see ask).
+
+        Yields:
+            str: Consecutive pieces of the answer
+
+        Raises:
+            AdmissionRejected: Before any piece is yielded (see ask).
+        """
+        key = self._coalescing_key(user_question, memory)
+        if key is None:
+            async for piece in self._aanswer_stream(user_question, memory, user_id, tier, latency_budget):
+                yield piece
+            return
+        flight, leading = self.single_flight.join(key)
+        if leading:
+            pieces = self._aanswer_stream(user_question, memory, user_id, tier, latency_budget)
+            async for piece in self.single_flight.alead(key, flight, pieces):
+                yield piece
+            return
+
+        started = time.perf_counter()
+        timing = {"source": "coalesced", "first_token_at": None}
+        trace = self.tracer.start_trace("ask")
+        tokens = []
+        try:
+            async for piece in self.single_flight.afollow(key, flight):
+                timing["first_token_at"] = timing["first_token_at"] or time.perf_counter()
+                tokens.append(piece)
+                yield piece
+        except LeaderFailed as e:
+            timing["source"] = "coalesced_failed"
+            trace.set(error=f"{type(e).__name__}: {e}")
+        finally:
+            self._record_timing(timing, started, trace, tokens)
+        if timing["source"] == "coalesced":
+            await asyncio.to_thread(self._remember, memory, user_question, "".join(tokens).strip())
+        elif tokens:
+            yield self._error_reply(LeaderFailed("The answer was cut off."), tokens)
+        else:
+            async for piece in self._aanswer_stream(user_question, memory, user_id, tier, latency_budget):
+                yield piece
+
+    async def _aanswer_stream(self, user_question: str, memory: Optional[ConversationMemory], user_id: Optional[str],
+                              tier: Optional[str], latency_budget: Optional[float]) -> AsyncIterator[str]:
+        """aask_stream without coalescing."""
+        started = time.perf_counter()
+        timing = {"source": "llm", "first_token_at": None}
+        trace = self.tracer.start_trace("ask")
+        tokens = []
+        knowledge_base = self._acquire_knowledge_base()
+        trace.set(kb_version=knowledge_base.version)
+        try:
+            if not user_question.strip():
+                timing["source"] = "invalid"
+                yield INVALID_QUESTION_MESSAGE
+                return
+
+            query = memory.retrieval_query(user_question) if memory is not None else user_question
+            vector_search = asyncio.wrap_future(knowledge_base.hybrid_retriever.submit_vector(query, trace))
+            with trace.span("symptom_matching"):
+                lexical = await asyncio.to_thread(knowledge_base.hybrid_retriever.search_lexical, user_question)
+            quick = await asyncio.to_thread(self._quick_answer, query, lexical, trace)
+            if quick is not None:
+                vector_search.cancel()
+                timing["source"], answer = quick
+                yield answer
+                await asyncio.to_thread(self._remember, memory, user_question, answer, trace)
+                return
+
+            try:
+                # Reuse pooled connections instead of a new session per OpenAI request
+                import openai
+                openai.aiosession.set(self._http_session())
+                if query != user_question:
+                    lexical = await asyncio.to_thread(knowledge_base.hybrid_retriever.search_lexical, query)
+                vector = await vector_search
+                docs = knowledge_base.hybrid_retriever.fuse(lexical, vector)
+                with trace.span("prompt_assembly"):
+                    prompt = self._build_prompt(user_question, docs, trace, memory)
+                decision = self._route(user_question, lexical, vector, latency_budget, trace, timing)
+                async with self._aadmitted(user_id, tier, trace):
+                    with trace.span("llm_generation"):
+                        if decision is not None:
+                            pieces = self.router.astream(decision, prompt)
+                        else:
+                            pieces = self._astream(prompt)
+                        async for piece in pieces:
+                            timing["first_token_at"] = timing["first_token_at"] or time.perf_counter()
+                            tokens.append(piece)
+                            yield piece
+            except AdmissionRejected as e:
+                timing["source"] = "rejected"
+                trace.set(admission=e.reason)
+                raise
+            except Exception as e:
+                timing["source"] = "error"
+                trace.set(error=f"{type(e).__name__}: {e}")
+                yield self._error_reply(e, tokens)
+                return
+
+            await asyncio.to_thread(self._cache_answer, query, tokens, started, knowledge_base)
+            await asyncio.to_thread(self._remember, memory, user_question, "".join(tokens).strip(), trace)
+        finally:
+            knowledge_base.release()
+            self._record_timing(timing, started, trace, tokens)
+
+    async def aclose(self):
+        """Close the pooled HTTP session used by aask."""
+        if self._aiohttp_session is not None and not self._aiohttp_session.closed:
+            await self._aiohttp_session.close()
+        self._aiohttp_session = None
+
+    def _http_session(self) -> "aiohttp.ClientSession":
+        """Pooled aiohttp session bound to the running event loop."""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._aiohttp_session is None or self._aiohttp_session.closed or self._aiohttp_loop is not loop:
+            self._aiohttp_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=get_setting("server", "http_pool_size", 100))
+            )
+            self._aiohttp_loop = loop
+        return self._aiohttp_session
+
+    def _quick_answer(self, user_question: str, lexical: List[Tuple[str, float, str]],
+                      trace=NOOP_TRACE) -> Optional[Tuple[str, str]]:
+        """
+        Answer without the LLM when possible.
+
+        Args:
+            user_question (str): The cache key: the question, with the conversation for follow-ups.
+            lexical: Symptom-checker matches for the user's own question, best first.
+            trace: Trace receiving the answer cache lookup.
+
+        Returns:
+            (source, answer) for a confident symptom match or a cached answer;
+            None if the LLM is needed.
+        """
+        # Short-circuit on confident symptom-checker matches
+        suggestions = [suggestion for symptom, score, suggestion in lexical if score >= self.symptom_match_threshold]
+        if suggestions:
+            return "symptom_checker", "Based on your symptoms, here is some advice:\n- " + "\n- ".join(suggestions)
+
+        # Reuse the answer to the same (or a near-identical) question
+        if self.answer_cache is not None:
+            with trace.span("answer_cache"):
+                cached = self.answer_cache.get(user_question)
+            trace.set(cache_hit=cached is not None)
+            if cached is not None:
+                return "cache", cached
+        return None
+
+    def _route(self, user_question: str, lexical: List[LexicalMatch], vector: List[Tuple["Document", Optional[float]]],
+               latency_budget: Optional[float], trace=NOOP_TRACE,
+               timing: Optional[dict] = None) -> Optional[RouteDecision]:
+        """Pick the model of an LLM answer; None without a router (self.llm answers)."""
+        if self.router is None:
+            return None
+        decision = self.router.route(user_question, lexical, vector, latency_budget)
+        trace.set(route=decision.route, route_reason=decision.reason)
+        if timing is not None:
+            timing["route"] = decision
+        return decision
+
+    def _stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+    async def _astream(self, prompt: str) -> AsyncIterator[str]:
+        async for chunk in self.llm.astream(prompt):
+            if chunk.content:
+                yield chunk.content
+
+    def _coalescing_key(self, user_question: str, memory: Optional[ConversationMemory]) -> Optional[str]:
+        """Key under which concurrent asks of a question are coalesced, or None to answer it alone."""
+        # Follow-ups depend on their own conversation; only opening questions are shared
+        if self.single_flight is None or (memory is not None and not memory.is_empty()):
+            return None
+        return normalize_question(user_question) or None
+
+    @contextmanager
+    def _admitted(self, user_id: Optional[str], tier: Optional[str], trace=NOOP_TRACE):
+        """Hold an LLM slot from the admission controller, if any, for the duration of the block."""
+        if self.admission is None:
+            yield
+            return
+        with trace.span("admission"):
+            ticket = self.admission.acquire(user_id, tier)
+        try:
+            yield
+        finally:
+            self.admission.release(ticket)
+
+    @asynccontextmanager
+    async def _aadmitted(self, user_id: Optional[str], tier: Optional[str], trace=NOOP_TRACE):
+        """Async version of _admitted."""
+        if self.admission is None:
+            yield
+            return
+        with trace.span("admission"):
+            ticket = await self.admission.aacquire(user_id, tier)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.admission.release, ticket)
+
+    def summarize_conversation(self, summary: str, turns: List[Tuple[str, str]]) -> str:
+        """
+        Fold conversation turns into a running summary with the LLM (the summarizer of ConversationMemory).
+
+        Uses the router's fast route when there is one.
+
+        Args:
+            summary (str): Summary of the turns before these.
+            turns: (question, answer) pairs to add.
+
+        Returns:
+            str: The updated summary.
+        """
+        from prompt_templates import conversation_summary_prompt
+
+        prompt = conversation_summary_prompt.format(
+            summary=summary or "(none yet)",
+            turns="\n".join(f"Pet owner: {question}\nAssistant: {answer}" for question, answer in turns),
+            # ~0.75 words per token
+            max_words=int(get_setting("memory", "max_summary_tokens", 250) * 0.75),
+        )
+        llm = self.router.llm(self.router.easy_route) if self.router is not None else self.llm
+        return llm.predict(prompt)
+
+    def _remember(self, memory: Optional[ConversationMemory], user_question: str, answer: str, trace=NOOP_TRACE):
+        """
+        Record a finished turn in the conversation memory.
+
+        A turn leaving the recent window is folded into the summary
+        extractively; with llm_summary, the LLM summary is computed in the
+        background (memory.pending_summary) and replaces it when done, so the
+        answer never waits for a second LLM call.
+        """
+        if memory is None:
+            return
+        with trace.span("memory_update"):
+            previous = memory.summary
+            folded = memory.add_turn(user_question, answer)
+        if folded is not None and self.llm_summary:
+            memory.pending_summary = self._summaries.submit(
+                self._summarize_in_background, memory, previous, memory.summary, folded
+            )
+
+    def _summarize_in_background(self, memory: ConversationMemory, previous: str, extractive: str,
+                                 turn: Tuple[str, str]) -> bool:
+        """Replace the extractive summary of `turn` with an LLM one; returns whether it was replaced."""
+        try:
+            # Holds a slot under the global cap, but is not charged to the user's answer quota
+            with self._admitted(None, None):
+                summary = self.summarize_conversation(previous, [turn])
         except Exception as e:
-            print(f"[Chatbot] Error during response generation: {e}")
-            return "Sorry, I encountered an error while trying to answer. Please try again later."
+            logger.warning("Conversation summary failed, keeping the extractive one", exc_info=e)
+            return False
+        return memory.apply_summary(extractive, summary)
+
+    def _build_prompt(self, user_question: str, docs: List["Document"], trace=NOOP_TRACE,
+                      memory: Optional[ConversationMemory] = None) -> str:
+        """Fill the prompt template with the retrieved documents, deduplicated and packed into the token budget."""
+        # Earlier turns go with the question, so their (bounded) tokens count against the context budget
+        user_question = memory.render(user_question) if memory is not None else user_question
+        packed = self.context_packer.pack(docs, user_question)
+        logger.debug("Context: %d tokens from %d chunks (saved %d of %d; merged %d, dropped %d, truncated %d)",
+                     packed.tokens, len(docs), packed.tokens_saved, packed.original_tokens, packed.merged,
+                     packed.dropped, packed.truncated)
+        prompt = self.prompt_template.format(context=packed.text, question=user_question)
+        if trace.enabled:
+            trace.set(prompt_tokens=self.context_packer.count(prompt), context_tokens_saved=packed.tokens_saved,
+                      context_chunks=len(packed.documents))
+        return prompt
+
+    def _error_reply(self, error: Exception, tokens: List[str]) -> str:
+        logger.error("Error during response generation", exc_info=error)
+        # Only apologize outright if nothing was shown yet; coalesced followers answer on their own
+        return FailedPiece(ERROR_MESSAGE if not tokens else "\n\n" + ERROR_MESSAGE)
+
+    def _cache_answer(self, user_question: str, tokens: List[str], started: float,
+                      knowledge_base: Optional[KnowledgeBase] = None):
+        # An answer from a replaced knowledge base would outlive the invalidation at the swap
+        if knowledge_base is not None and knowledge_base.retired:
+            return
+        if self.answer_cache is not None:
+            self.answer_cache.put(user_question, "".join(tokens).strip(), latency=time.perf_counter() - started)
+
+    def _record_timing(self, timing: dict, started: float, trace=NOOP_TRACE, tokens: List[str] = ()):
+        total = time.perf_counter() - started
+        first_token_at = timing["first_token_at"]
+        ttft = (first_token_at - started) if first_token_at is not None else total
+        self.timings.append({"source": timing["source"], "ttft": ttft, "total": total})
+        # Streamed OpenAI chunks carry one token each
+        trace.finish(source=timing["source"], ttft_ms=round(ttft * 1000, 3), completion_tokens=len(tokens))
+        if timing["source"] == "llm":
+            decision = timing.get("route")
+            via = f" via {decision.describe()}" if decision is not None else ""
+            logger.info("LLM answer%s: first token %.0f ms, total %.0f ms", via, ttft * 1000, total * 1000,
+                        extra={"source": timing["source"], "ttft_ms": round(ttft * 1000, 3),
+                               "total_ms": round(total * 1000, 3),
+                               "route": decision.route if decision is not None else None})
+
+    def timing_summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return p50/p95 time to first token and total time of recent requests, per answer source.
+        """
+        summary = {}
+        for source in sorted({timing["source"] for timing in self.timings}):
+            timings = [timing for timing in self.timings if timing["source"] == source]
+            summary[source] = {"count": len(timings)}
+            for key in ("ttft", "total"):
+                values = [timing[key] for timing in timings]
+                summary[source][f"{key}_p50"] = float(np.percentile(values, 50))
+                summary[source][f"{key}_p95"] = float(np.percentile(values, 95))
+        return summary
@@ -0,0 +1,34 @@
+# backend/config.py
+
+import yaml
+from functools import lru_cache
+
+SETTINGS_PATH = "configs/settings.yaml"
+
+
+@lru_cache(maxsize=None)
+def load_settings(path: str = SETTINGS_PATH) -> dict:
+    """
+    Load application settings from the YAML config file.
+
+    Args:
+        path (str): Path to the settings file.
+
+    Returns:
+        dict: Parsed settings (cached per path; treat as read-only).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_setting(section: str, key: str, default=None, path: str = SETTINGS_PATH):
+    """
+    Read a single `section.key` value from the settings file.
+
+    Args:
+        section (str): Top-level section name, e.g. "embedding".
+        key (str): Key within the section, e.g. "max_batch_size".
+        default: Value returned when the section or key is missing.
+        path (str): Path to the settings file.
+    """
+    return (load_settings(path).get(section) or {}).get(key, default)
@@ -0,0 +1,279 @@
+# backend/context_packer.py
+
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+from config import get_setting
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+CONTEXT_SEPARATOR = "\n\n"
+
+
+def _shingles(words: List[str], size: int) -> Set[Tuple[str, ...]]:
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _overlap(first: List[str], second: List[str], min_words: int, max_words: int) -> int:
+    """
+    Length of the longest run of words that ends `first` and starts `second`.
+
+    Returns 0 if that run is shorter than min_words.
+    """
+    longest = min(len(first), len(second), max_words)
+    if longest < min_words or not second:
+        return 0
+    head = second[0]
+    tail_start = len(first) - longest
+    # Candidate starts are the positions in first's tail holding second's first word
+    for start in range(tail_start, len(first) - min_words + 1):
+        if first[start] == head and first[start:] == second[:len(first) - start]:
+            return len(first) - start
+    return 0
+
+
+def _contains(longer: List[str], shorter: List[str]) -> bool:
+    if len(shorter) > len(longer):
+        return False
+    return f" {' '.join(shorter)} " in f" {' '.join(longer)} "
+
+
+class PackedContext:
+    def __init__(self, text: str, documents: List["Document"], tokens: int, original_tokens: int,
+                 merged: int, dropped: int, truncated: int):
+        """
+        Context assembled for one prompt.
+
+        Args:
+            text (str): Context text to put into the prompt.
+            documents: Documents the text was built from, best first.
+            tokens (int): Tokens in `text`.
+            original_tokens (int): Tokens the retrieved documents would have taken unpacked.
+            merged (int): Overlapping chunks joined into a neighbor.
+            dropped (int): Duplicate chunks and chunks that did not fit the budget.
+            truncated (int): Chunks cut short to fit the budget.
+        """
+        self.text = text
+        self.documents = documents
+        self.tokens = tokens
+        self.original_tokens = original_tokens
+        self.merged = merged
+        self.dropped = dropped
+        self.truncated = truncated
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        prompt_template=None,
+        max_context_tokens: int = 3000,
+        context_window: int = 8192,
+        max_output_tokens: int = 1024,
+        model: Optional[str] = None,
+        near_duplicate_threshold: float = 0.8,
+        shingle_words: int = 3,
+        min_overlap_words: int = 8,
+        max_overlap_words: int = 200,
+        min_chunk_tokens: int = 32,
+    ):
+        """
+        Builds the RAG context from retrieved chunks within a token budget.
+
+        Chunks whose ends overlap (as chunk_text produces them) are joined
+        into one passage, chunks contained in or nearly identical to a
+        better-ranked chunk are removed, and what remains is added best
+        first until the budget is used up. The budget is the smaller of
+        `max_context_tokens` and what the model's context window leaves after
+        the prompt template, the question and the answer (`max_output_tokens`).
+
+        Args:
+            prompt_template: LangChain PromptTemplate with "context" and "question" variables.
+            max_context_tokens (int): Upper bound on context tokens (0 = only the context window limits it).
+            context_window (int): Model context window in tokens.
+            max_output_tokens (int): Tokens reserved for the answer.
+            model (str): OpenAI model name used to count tokens.
+            near_duplicate_threshold (float): Word-shingle Jaccard similarity at which a chunk counts as a duplicate.
+            shingle_words (int): Words per shingle for the near-duplicate check.
+            min_overlap_words (int): Shortest shared run of words treated as chunk overlap.
+            max_overlap_words (int): Longest overlap looked for.
+            min_chunk_tokens (int): Chunks are truncated to fit the budget only if this many tokens remain.
+        """
+        self.prompt_template = prompt_template
+        self.max_context_tokens = max_context_tokens
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+        self.model = model
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.shingle_words = shingle_words
+        self.min_overlap_words = min_overlap_words
+        self.max_overlap_words = max_overlap_words
+        self.min_chunk_tokens = min_chunk_tokens
+        self._template_tokens: Optional[int] = None
+
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "original_tokens": 0, "packed_tokens": 0, "merged": 0, "dropped": 0,
+                      "truncated": 0}
+
+    @classmethod
+    def from_settings(cls, prompt_template, max_output_tokens: Optional[int] = None) -> "ContextPacker":
+        """
+        Build a ContextPacker configured by the `context` section of configs/settings.yaml.
+
+        Args:
+            prompt_template: Prompt the context is inserted into.
+            max_output_tokens (int): Tokens reserved for the answer (defaults to openai.max_tokens).
+        """
+        return cls(
+            prompt_template=prompt_template,
+            max_context_tokens=get_setting("context", "max_tokens", 3000),
+            context_window=get_setting("context", "context_window", 8192),
+            max_output_tokens=max_output_tokens or get_setting("openai", "max_tokens", 1024),
+            model=get_setting("openai", "model", "gpt-4"),
+            near_duplicate_threshold=get_setting("context", "near_duplicate_threshold", 0.8),
+            min_chunk_tokens=get_setting("context", "min_chunk_tokens", 32),
+        )
+
+    def count(self, text: str) -> int:
+        from token_utils import count_tokens
+
+        return count_tokens(text, self.model)
+
+    def budget(self, question: str) -> int:
+        """Context tokens available for a question."""
+        if self._template_tokens is None:
+            empty_prompt = self.prompt_template.format(context="", question="") if self.prompt_template else ""
+            self._template_tokens = self.count(empty_prompt)
+        available = self.context_window - self.max_output_tokens - self._template_tokens - self.count(question)
+        if self.max_context_tokens:
+            available = min(available, self.max_context_tokens)
+        return max(0, available)
+
+    def pack(self, docs: List["Document"], question: str) -> PackedContext:
+        """
+        Deduplicate and pack retrieved documents into the context budget.
+
+        Args:
+            docs: Retrieved documents, best first.
+            question (str): The user's question (its tokens count against the budget).
+
+        Returns:
+            PackedContext
+        """
+        original_tokens = self.count(CONTEXT_SEPARATOR.join(doc.page_content for doc in docs))
+        passages, merged, duplicates = self._deduplicate(docs)
+
+        from langchain.schema import Document
+
+        budget = self.budget(question)
+        separator_tokens = self.count(CONTEXT_SEPARATOR)
+        used = 0
+        packed: List["Document"] = []
+        truncated = 0
+        for doc, words in passages:
+            cost = self.count(" ".join(words)) + (separator_tokens if packed else 0)
+            if used + cost <= budget:
+                packed.append(doc if len(words) == len(doc.page_content.split())
+                              else Document(page_content=" ".join(words), metadata=doc.metadata))
+                used += cost
+                continue
+            # Best-ranked passages come first; cut the first one that overflows and stop
+            remaining = budget - used - (separator_tokens if packed else 0)
+            if remaining >= self.min_chunk_tokens:
+                text = self._truncate(words, remaining)
+                if text:
+                    packed.append(Document(page_content=text, metadata=dict(doc.metadata, truncated=True)))
+                    truncated += 1
+            break
+
+        text = CONTEXT_SEPARATOR.join(doc.page_content for doc in packed)
+        result = PackedContext(
+            text=text,
+            documents=packed,
+            tokens=self.count(text),
+            original_tokens=original_tokens,
+            merged=merged,
+            dropped=duplicates + len(passages) - len(packed),
+            truncated=truncated,
+        )
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["original_tokens"] += result.original_tokens
+            self.stats["packed_tokens"] += result.tokens
+            self.stats["merged"] += result.merged
+            self.stats["dropped"] += result.dropped
+            self.stats["truncated"] += result.truncated
+        return result
+
+    def metrics(self) -> Dict[str, float]:
+        """Return packing counters and the share of context tokens saved."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["tokens_saved"] = stats["original_tokens"] - stats["packed_tokens"]
+        stats["saved_ratio"] = stats["tokens_saved"] / stats["original_tokens"] if stats["original_tokens"] else 0.0
+        return stats
+
+    def _deduplicate(self, docs: List["Document"]) -> Tuple[List[Tuple["Document", List[str]]], int, int]:
+        """
+        Join overlapping chunks and remove duplicates, keeping the best rank of each passage.
+
+        Returns:
+            ([(document, words)], chunks merged, chunks removed as duplicates)
+        """
+        passages: List[Tuple["Document", List[str]]] = []
+        shingles: List[Set[Tuple[str, ...]]] = []
+        merged = duplicates = 0
+        for doc in docs:
+            words = doc.page_content.split()
+            if not words:
+                duplicates += 1
+                continue
+            doc_shingles = _shingles(words, self.shingle_words)
+            for i, (kept_doc, kept_words) in enumerate(passages):
+                if _contains(kept_words, words) or _jaccard(shingles[i], doc_shingles) >= self.near_duplicate_threshold:
+                    duplicates += 1
+                    break
+                joined = self._join(kept_words, words)
+                if joined is not None:
+                    passages[i] = (kept_doc, joined)
+                    shingles[i] = _shingles(joined, self.shingle_words)
+                    merged += 1
+                    break
+            else:
+                passages.append((doc, words))
+                shingles.append(doc_shingles)
+        return passages, merged, duplicates
+
+    def _join(self, kept: List[str], new: List[str]) -> Optional[List[str]]:
+        """Words of the two chunks joined into one passage, or None if they do not overlap."""
+        if _contains(new, kept):
+            return new
+        shared = _overlap(kept, new, self.min_overlap_words, self.max_overlap_words)
+        if shared:
+            return kept + new[shared:]
+        shared = _overlap(new, kept, self.min_overlap_words, self.max_overlap_words)
+        if shared:
+            return new + kept[shared:]
+        return None
+
+    def _truncate(self, words: List[str], max_tokens: int) -> str:
+        """Longest word prefix of the passage within max_tokens."""
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count(" ".join(words[:middle])) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low])
@@ -0,0 +1,190 @@
+# backend/conversation_memory.py
+
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from config import get_setting
+
+# summarize(previous summary, turns leaving the recent window) -> new summary
+Summarizer = Callable[[str, List[Tuple[str, str]]], str]
+
+
+def _count(text: str, model: Optional[str]) -> int:
+    # tiktoken is loaded on first use (see token_utils)
+    from token_utils import count_tokens
+
+    return count_tokens(text, model)
+
+
+def _truncate(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Cut text to at most max_tokens at a word boundary."""
+    tokens = _count(text, model)
+    if tokens <= max_tokens:
+        return text
+    words = text.split()
+    while words and tokens > max_tokens:
+        keep_words = max(0, min(len(words) - 1, int(len(words) * max_tokens / tokens)))
+        words = words[:keep_words]
+        tokens = _count(" ".join(words), model)
+    return " ".join(words) + " ..." if words else ""
+
+
+class ConversationMemory:
+    def __init__(
+        self,
+        recent_turns: int = 3,
+        max_turn_tokens: int = 200,
+        max_summary_tokens: int = 250,
+        max_query_tokens: int = 120,
+        model: Optional[str] = None,
+        summary: str = "",
+        turns: Optional[List[Tuple[str, str]]] = None,
+    ):
+        """
+        Bounded memory of one conversation: a running summary plus the last few turns.
+
+        When a turn falls out of the recent window it is folded into the
+        summary (by an LLM summarizer if one is given to add_turn, otherwise
+        extractively), so what a follow-up question carries into retrieval
+        and the prompt is capped by a fixed token budget however long the
+        conversation gets:
+        max_summary_tokens + recent_turns * max_turn_tokens.
+
+        Args:
+            recent_turns (int): Question/answer pairs kept verbatim.
+            max_turn_tokens (int): Tokens of one recent turn in the prompt (longer answers are cut).
+            max_summary_tokens (int): Tokens of the running summary.
+            max_query_tokens (int): Tokens of conversation context added to the retrieval query.
+            model (str): OpenAI model name used to count tokens.
+            summary (str): Summary restored from a saved state.
+            turns: Recent (question, answer) turns restored from a saved state.
+        """
+        if recent_turns < 1:
+            raise ValueError("recent_turns must be at least 1.")
+        self.recent_turns = recent_turns
+        self.max_turn_tokens = max_turn_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.max_query_tokens = max_query_tokens
+        self.model = model
+        self.summary = summary
+        self.turns = deque(turns or [], maxlen=recent_turns)
+        self.summarized_turns = 0
+        # Future of an LLM summary being computed in the background (see Chatbot), not saved
+        self.pending_summary = None
+
+    @classmethod
+    def from_settings(cls, state: Optional[Dict] = None) -> "ConversationMemory":
+        """
+        Build a ConversationMemory configured by the `memory` section of configs/settings.yaml.
+
+        Args:
+            state: Saved state from to_dict() to restore.
+        """
+        state = state or {}
+        memory = cls(
+            recent_turns=get_setting("memory", "recent_turns", 3),
+            max_turn_tokens=get_setting("memory", "max_turn_tokens", 200),
+            max_summary_tokens=get_setting("memory", "max_summary_tokens", 250),
+            max_query_tokens=get_setting("memory", "max_query_tokens", 120),
+            model=get_setting("openai", "model", "gpt-4"),
+            summary=state.get("summary", ""),
+            turns=[tuple(turn) for turn in state.get("turns", [])],
+        )
+        memory.summarized_turns = state.get("summarized_turns", 0)
+        return memory
+
+    def to_dict(self) -> Dict:
+        return {"summary": self.summary, "turns": [list(turn) for turn in self.turns],
+                "summarized_turns": self.summarized_turns}
+
+    def is_empty(self) -> bool:
+        return not self.summary and not self.turns
+
+    def add_turn(self, question: str, answer: str,
+                 summarize: Optional[Summarizer] = None) -> Optional[Tuple[str, str]]:
+        """
+        Record a finished turn, folding the oldest recent turn into the summary when the window is full.
+
+        Args:
+            question (str): The user's question.
+            answer (str): The answer given.
+            summarize: Function(previous summary, turns) returning an updated
+                summary. The extractive summary is used if it is None or fails.
+
+        Returns:
+            The turn folded into the summary, or None.
+        """
+        folded = None
+        if len(self.turns) == self.recent_turns:
+            folded = self.turns.popleft()
+            summary = None
+            if summarize is not None:
+                try:
+                    summary = summarize(self.summary, [folded])
+                except Exception as e:
+                    print(f"[ConversationMemory] Summarizer failed, using extractive summary: {e}")
+            if summary is None:
+                summary = self._extractive_summary(self.summary, folded)
+            self.summary = _truncate(summary.strip(), self.max_summary_tokens, self.model)
+            self.summarized_turns += 1
+        self.turns.append((question, answer))
+        return folded
+
+    def apply_summary(self, expected: str, summary: str) -> bool:
+        """
+        Replace the summary with one computed in the background, unless it changed meanwhile.
+
+        Args:
+            expected (str): The summary the new one replaces.
+            summary (str): The new summary (cut to max_summary_tokens).
+
+        Returns:
+            bool: Whether the summary was replaced.
+        """
+        if self.summary != expected:
+            return False
+        self.summary = _truncate(summary.strip(), self.max_summary_tokens, self.model)
+        return True
+
+    def retrieval_query(self, question: str) -> str:
+        """
+        Search query for a question: the question followed by the recent questions and the summary.
+
+        Follow-ups like "what if she's also lethargic?" then still find
+        documents about the symptoms discussed earlier.
+        """
+        if self.is_empty():
+            return question
+        earlier = " ".join([q for q, _ in reversed(self.turns)] + ([self.summary] if self.summary else []))
+        return f"{question} {_truncate(earlier, self.max_query_tokens, self.model)}"
+
+    def render(self, question: str) -> str:
+        """The question with the conversation so far, as put into the prompt."""
+        if self.is_empty():
+            return question
+        lines = ["Conversation so far:"]
+        if self.summary:
+            lines.append(f"Summary of earlier turns: {self.summary}")
+        for turn_question, turn_answer in self.turns:
+            # Questions are short; answers get whatever the question leaves of the turn budget
+            turn_question = _truncate(turn_question, self.max_turn_tokens // 2, self.model)
+            turn_answer = _truncate(turn_answer, self.max_turn_tokens - _count(turn_question, self.model), self.model)
+            lines.append(f"Pet owner: {turn_question}")
+            lines.append(f"Assistant: {turn_answer}")
+        lines.append("")
+        lines.append(f"Current question: {question}")
+        return "\n".join(lines)
+
+    def _extractive_summary(self, summary: str, turn: Tuple[str, str]) -> str:
+        """
+        Append the turn's question and the first sentence of its answer.
+
+        When over budget, the oldest lines after the first one go first: the
+        opening question usually introduces the pet.
+        """
+        question, answer = turn
+        first_sentence = answer.strip().split(". ")[0].rstrip(".")
+        lines = [line for line in summary.split("\n") if line]
+        lines.append(f"Asked: {question.strip()} Answered: {first_sentence}.")
+        while len(lines) > 2 and _count("\n".join(lines), self.model) > self.max_summary_tokens:
+            del lines[1]
+        return "\n".join(lines)
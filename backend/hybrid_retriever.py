@@ -0,0 +1,184 @@
+# backend/hybrid_retriever.py
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from config import get_setting
+from tracing import NOOP_TRACE
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+# (symptom_text, similarity_score, suggestion) as returned by SymptomChecker
+LexicalMatch = Tuple[str, float, str]
+
+FUSION_METHODS = ("rrf", "weighted")
+
+
+class HybridResult:
+    def __init__(self, lexical: List[LexicalMatch], documents: List["Document"]):
+        """
+        Outcome of one hybrid retrieval.
+
+        Args:
+            lexical: Symptom-checker matches, best first.
+            documents: Fused context documents, best first.
+        """
+        self.lexical = lexical
+        self.documents = documents
+
+    @property
+    def best_lexical_score(self) -> float:
+        return self.lexical[0][1] if self.lexical else 0.0
+
+
+class HybridRetriever:
+    def __init__(
+        self,
+        symptom_checker=None,
+        retriever=None,
+        fusion: str = "rrf",
+        rrf_k: int = 60,
+        lexical_weight: float = 0.5,
+        vector_weight: float = 0.5,
+        lexical_top_k: int = 3,
+        top_k: int = 5,
+        max_workers: int = 8,
+    ):
+        """
+        Lexical (TF-IDF symptom checker) plus vector retrieval, merged into one ranking.
+
+        Both searches run concurrently. Their results are merged with
+        reciprocal rank fusion (each list contributes weight / (rrf_k + rank))
+        or with a weighted sum of their cosine scores.
+
+        Args:
+            symptom_checker: SymptomChecker for lexical matches (None disables them).
+            retriever: LangChain vector store retriever (None disables vector search).
+            fusion (str): "rrf" or "weighted".
+            rrf_k (int): RRF rank offset; larger values flatten the rank contributions.
+            lexical_weight (float): Weight of the lexical list in the fusion.
+            vector_weight (float): Weight of the vector list in the fusion.
+            lexical_top_k (int): Symptom matches taken from the lexical index.
+            top_k (int): Documents in the fused context.
+            max_workers (int): Threads running vector searches.
+        """
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}' (expected one of {FUSION_METHODS}).")
+        self.symptom_checker = symptom_checker
+        self.retriever = retriever
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.lexical_weight = lexical_weight
+        self.vector_weight = vector_weight
+        self.lexical_top_k = lexical_top_k
+        self.top_k = top_k
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vector-search")
+
+    @classmethod
+    def from_settings(cls, symptom_checker, retriever) -> "HybridRetriever":
+        """Build a HybridRetriever configured by the `retriever` and `chatbot` sections of configs/settings.yaml."""
+        use_lexical = get_setting("chatbot", "use_symptom_checker", True)
+        return cls(
+            symptom_checker=symptom_checker if use_lexical else None,
+            retriever=retriever,
+            fusion=get_setting("retriever", "fusion", "rrf"),
+            rrf_k=get_setting("retriever", "rrf_k", 60),
+            lexical_weight=get_setting("retriever", "lexical_weight", 0.5),
+            vector_weight=get_setting("retriever", "vector_weight", 0.5),
+            lexical_top_k=get_setting("retriever", "lexical_top_k", 3),
+            top_k=get_setting("retriever", "top_k", 5),
+        )
+
+    def search_lexical(self, question: str) -> List[LexicalMatch]:
+        """Closest symptom-checker rows with a non-zero score, best first."""
+        if self.symptom_checker is None:
+            return []
+        matches = self.symptom_checker.find_closest_symptoms_batch([question], self.lexical_top_k)[0]
+        return [match for match in matches if match[1] > 0]
+
+    def search_vector(self, question: str, trace=NOOP_TRACE) -> List[Tuple["Document", Optional[float]]]:
+        """
+        Vector search results as (document, cosine score), best first.
+
+        Scores are None when the retriever does not expose its vector store.
+
+        Args:
+            question (str): The user's question.
+            trace: Trace receiving "query_embedding" and "vector_search" spans.
+        """
+        if self.retriever is None:
+            return []
+        vectorstore = getattr(self.retriever, "vectorstore", None)
+        if vectorstore is None:
+            with trace.span("vector_search"):
+                return [(doc, None) for doc in self.retriever.get_relevant_documents(question)]
+
+        k = self.retriever.search_kwargs.get("k", self.top_k)
+        embeddings = getattr(vectorstore, "embeddings", None)
+        if embeddings is None or not hasattr(vectorstore, "similarity_search_by_vector_with_score"):
+            with trace.span("vector_search"):
+                results = vectorstore.similarity_search_with_score(question, k=k)
+        else:
+            # Embed and search separately so each step is timed on its own
+            with trace.span("query_embedding"):
+                vector = embeddings.embed_query(question)
+            with trace.span("vector_search"):
+                results = vectorstore.similarity_search_by_vector_with_score(vector, k=k)
+        return [(doc, float(score)) for doc, score in results]
+
+    def submit_vector(self, question: str, trace=NOOP_TRACE) -> Future:
+        """Start a vector search in the background and return its future."""
+        return self._executor.submit(self.search_vector, question, trace)
+
+    def retrieve(self, question: str) -> HybridResult:
+        """Run both searches concurrently and fuse them."""
+        vector_future = self.submit_vector(question)
+        lexical = self.search_lexical(question)
+        return HybridResult(lexical, self.fuse(lexical, vector_future.result()))
+
+    def fuse(self, lexical: List[LexicalMatch], vector: List[Tuple["Document", Optional[float]]]) -> List["Document"]:
+        """
+        Merge lexical matches and vector results into one ranked, de-duplicated document list.
+
+        Args:
+            lexical: Symptom-checker matches, best first.
+            vector: (document, score or None) vector results, best first.
+
+        Returns:
+            Up to top_k documents, best first. Each carries its fused score in
+            metadata["fusion_score"].
+        """
+        from langchain.schema import Document
+
+        ranked = [
+            [(Document(page_content=f"Symptom: {symptom}\nSuggestion: {suggestion}",
+                       metadata={"source": "symptom_checker"}), score)
+             for symptom, score, suggestion in lexical],
+            vector,
+        ]
+        weights = [self.lexical_weight, self.vector_weight]
+
+        scores: Dict[str, float] = {}
+        documents: Dict[str, "Document"] = {}
+        for results, weight in zip(ranked, weights):
+            for rank, (doc, score) in enumerate(results):
+                # The same text found by both searches accumulates both contributions
+                documents.setdefault(doc.page_content, doc)
+                if self.fusion == "rrf":
+                    contribution = weight / (self.rrf_k + rank + 1)
+                else:
+                    # Without scores, fall back to a linear rank score in (0, 1]
+                    similarity = score if score is not None else 1.0 - rank / len(results)
+                    contribution = weight * similarity
+                scores[doc.page_content] = scores.get(doc.page_content, 0.0) + contribution
+
+        order = sorted(scores, key=lambda key: -scores[key])[:self.top_k]
+        fused = []
+        for key in order:
+            doc = documents[key]
+            fused.append(Document(page_content=doc.page_content,
+                                  metadata=dict(doc.metadata, fusion_score=round(scores[key], 6))))
+        return fused
+
+    def close(self):
+        self._executor.shutdown(wait=False)
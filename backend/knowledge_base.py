@@ -0,0 +1,305 @@
+# backend/knowledge_base.py
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from config import get_setting
+from hybrid_retriever import HybridRetriever
+from symptom_checker import DEFAULT_INDEX_DIR, SymptomChecker
+
+DEFAULT_CSV_PATH = "data/vet_guides.csv"
+DEFAULT_PDF_FOLDER = "data/pdf_guides"
+
+# (mtime_ns, size) of a file, or None if it does not exist
+FileSignature = Optional[Tuple[int, int]]
+
+
+class KnowledgeBase:
+    def __init__(self, version: int, symptom_checker, retriever):
+        """
+        One read-only version of the knowledge-base indexes.
+
+        A request acquires the current version when it starts and uses it
+        until it finishes, so swapping in a new version never changes the
+        indexes under a request in progress. A retired version is closed
+        once its last request has released it.
+
+        Args:
+            version (int): Version number, increasing with every swap.
+            symptom_checker: SymptomChecker for lexical matches.
+            retriever: LangChain vector store retriever.
+        """
+        self.version = version
+        self.symptom_checker = symptom_checker
+        self.retriever = retriever
+        self.hybrid_retriever = HybridRetriever.from_settings(symptom_checker, retriever)
+        self.created_at = time.time()
+        self.readers = 0
+        self.retired = False
+        self.closed = False
+        self._successor: Optional["KnowledgeBase"] = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> "KnowledgeBase":
+        with self._lock:
+            self.readers += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self.readers -= 1
+            close = self.retired and self.readers == 0 and not self.closed
+            self.closed = self.closed or close
+        if close:
+            self._close()
+
+    def retire(self, successor: "KnowledgeBase"):
+        """Mark this version as replaced by `successor`; it is closed when its last reader releases it."""
+        with self._lock:
+            self.retired = True
+            self._successor = successor
+            close = self.readers == 0 and not self.closed
+            self.closed = self.closed or close
+        if close:
+            self._close()
+
+    def _close(self):
+        self.hybrid_retriever.close()
+        # Indexes the successor still uses stay open
+        vectorstore = getattr(self.retriever, "vectorstore", None)
+        if self.retriever is not self._successor.retriever and hasattr(vectorstore, "close"):
+            vectorstore.close()
+        self._successor = None
+        print(f"[KnowledgeBase] Closed version {self.version}")
+
+
+def build_symptom_checker(csv_path: str, index_dir: Optional[str] = DEFAULT_INDEX_DIR) -> SymptomChecker:
+    """
+    Build a SymptomChecker for a changed CSV without stalling the requests being served.
+
+    Fitting TF-IDF holds the GIL for seconds on large CSVs, so the index is
+    fitted and saved by a separate process; this process then only
+    memory-maps it (see SymptomChecker).
+
+    Args:
+        csv_path (str): Symptom-suggestion CSV.
+        index_dir (str or None): Directory for cached indexes. None fits in this process.
+    """
+    if index_dir is not None:
+        # Spawned, not forked: the serving process runs many threads
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pool.submit(_fit_symptom_index, csv_path, index_dir).result()
+    return SymptomChecker(csv_path, index_dir=index_dir)
+
+
+def _fit_symptom_index(csv_path: str, index_dir: str):
+    SymptomChecker(csv_path, index_dir=index_dir)
+
+
+class KnowledgeBaseWatcher:
+    def __init__(
+        self,
+        chatbot,
+        build_retriever: Callable[[], object],
+        build_symptom_checker: Callable[[str], object] = build_symptom_checker,
+        csv_path: str = DEFAULT_CSV_PATH,
+        pdf_folder: str = DEFAULT_PDF_FOLDER,
+        local_index_path: Optional[str] = None,
+        reindex: Optional[Callable[[], None]] = None,
+        interval: float = 5.0,
+    ):
+        """
+        Rebuilds the chatbot's knowledge base in the background when its sources change.
+
+        The watcher polls the file signatures of the symptom CSV, the PDF
+        guides and, with the local vector store, its published version. A
+        change is acted on once the files have stayed the same for one
+        poll, so files still being written are not read. Then the affected
+        indexes are rebuilt on the watcher's thread and swapped into the
+        chatbot (see Chatbot.swap_knowledge_base); requests in progress
+        finish on the version they started with.
+
+        - CSV changed: a new SymptomChecker is built (see build_symptom_checker).
+        - PDFs changed: `reindex` (the embedding pipeline) is run, if given.
+          Pinecone serves the new vectors as soon as they are upserted; the
+          local vector store publishes a new version, picked up below.
+        - Local index version changed: the retriever is reopened.
+
+        A failed rebuild is logged and the current version keeps serving;
+        it is retried when the sources change again.
+
+        Args:
+            chatbot: Chatbot whose knowledge base is swapped.
+            build_retriever: Function building the vector retriever.
+            build_symptom_checker: Function(csv_path) building a SymptomChecker.
+            csv_path (str): Symptom-suggestion CSV.
+            pdf_folder (str): Folder of PDF guides.
+            local_index_path (str): Local vector store directory (None = not watched).
+            reindex: Function re-embedding changed sources (None = PDF changes are only logged).
+            interval (float): Seconds between polls.
+        """
+        self.chatbot = chatbot
+        self.build_symptom_checker = build_symptom_checker
+        self.build_retriever = build_retriever
+        self.csv_path = csv_path
+        self.pdf_folder = pdf_folder
+        self.local_index_path = local_index_path
+        self.reindex = reindex
+        self.interval = interval
+        self.stats = {"checks": 0, "reloads": 0, "failures": 0, "reindexes": 0, "last_reload_seconds": 0.0}
+        self._applied = self._signatures()
+        self._pending: Optional[Dict[str, object]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # stats only: metrics() must never wait for a rebuild
+        self._reload_lock = threading.Lock()  # one check (and rebuild) at a time
+
+    @classmethod
+    def from_settings(cls, chatbot, build_retriever: Callable[[], object],
+                      reindex: Optional[Callable[[], None]] = None) -> "KnowledgeBaseWatcher":
+        """Build a watcher configured by the `reload` section of configs/settings.yaml."""
+        local_index_path = None
+        if get_setting("retriever", "backend", "pinecone") == "local":
+            local_index_path = get_setting("retriever", "local_path", "data/local_index")
+        return cls(
+            chatbot,
+            build_retriever,
+            csv_path=get_setting("reload", "csv_path", DEFAULT_CSV_PATH),
+            pdf_folder=get_setting("reload", "pdf_folder", DEFAULT_PDF_FOLDER),
+            local_index_path=local_index_path,
+            reindex=reindex if get_setting("reload", "reindex_pdfs", False) else None,
+            interval=get_setting("reload", "interval", 5.0),
+        )
+
+    def start(self) -> "KnowledgeBaseWatcher":
+        """Start polling on a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="kb-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def check(self) -> bool:
+        """
+        Poll the sources once, rebuilding and swapping if they changed.
+
+        Returns:
+            bool: Whether a new knowledge-base version was swapped in.
+        """
+        with self._reload_lock:
+            self._count("checks")
+            current = self._signatures()
+            if current == self._applied:
+                self._pending = None
+                return False
+            if current != self._pending:
+                # Wait for the files to settle before reading them
+                self._pending = current
+                return False
+            self._pending = None
+            started = time.perf_counter()
+            try:
+                swapped = self._reload(current)
+            except Exception as e:
+                self._count("failures")
+                # Marked as seen, so a broken file is not rebuilt on every poll; the next edit retries
+                self._applied = current
+                print(f"[KnowledgeBase] Reload failed, still serving version "
+                      f"{self.chatbot.knowledge_base.version}: {type(e).__name__}: {e}")
+                return False
+            if swapped:
+                with self._lock:
+                    self.stats["reloads"] += 1
+                    self.stats["last_reload_seconds"] = time.perf_counter() - started
+            return swapped
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["version"] = self.chatbot.knowledge_base.version
+        return stats
+
+    def render_prometheus(self) -> str:
+        """Reload counters in the Prometheus text exposition format."""
+        stats = self.metrics()
+        lines = ["# TYPE chatvet_kb_version gauge", f"chatvet_kb_version {stats['version']}"]
+        for metric in ("reloads", "failures", "reindexes"):
+            lines.append(f"# TYPE chatvet_kb_{metric}_total counter")
+            lines.append(f"chatvet_kb_{metric}_total {stats[metric]}")
+        lines.append("# TYPE chatvet_kb_last_reload_seconds gauge")
+        lines.append(f"chatvet_kb_last_reload_seconds {stats['last_reload_seconds']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def _reload(self, current: Dict[str, object]) -> bool:
+        symptom_checker = retriever = None
+        if current["csv"] != self._applied["csv"]:
+            print(f"[KnowledgeBase] {self.csv_path} changed, rebuilding the symptom checker")
+            symptom_checker = self.build_symptom_checker(self.csv_path)
+        if current["pdfs"] != self._applied["pdfs"]:
+            if self.reindex is None:
+                print(f"[KnowledgeBase] {self.pdf_folder} changed; run embeddings/embed.py to re-index it")
+            else:
+                print(f"[KnowledgeBase] {self.pdf_folder} changed, re-indexing")
+                self.reindex()
+                self._count("reindexes")
+                # The local vector store published a new version meanwhile
+                current = self._signatures()
+        if current["local_index"] != self._applied["local_index"]:
+            print("[KnowledgeBase] New local index version, reopening the retriever")
+            retriever = self.build_retriever()
+        self._applied = current
+        if symptom_checker is None and retriever is None:
+            return False
+        self.chatbot.swap_knowledge_base(symptom_checker=symptom_checker, retriever=retriever)
+        return True
+
+    def _signatures(self) -> Dict[str, object]:
+        pdfs = {}
+        if os.path.isdir(self.pdf_folder):
+            for filename in sorted(os.listdir(self.pdf_folder)):
+                if filename.lower().endswith(".pdf"):
+                    pdfs[filename] = _file_signature(os.path.join(self.pdf_folder, filename))
+        local_index = None
+        if self.local_index_path is not None:
+            local_index = _file_signature(os.path.join(self.local_index_path, "CURRENT"))
+        return {"csv": _file_signature(self.csv_path), "pdfs": pdfs, "local_index": local_index}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[KnowledgeBase] Watcher error: {e}")
+
+
+def _file_signature(path: str) -> FileSignature:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_knowledge_base_watcher(chatbot, build_retriever: Callable[[], object],
+                               reindex: Optional[Callable[[], None]] = None) -> Optional[KnowledgeBaseWatcher]:
+    """
+    Build and start the KnowledgeBaseWatcher configured in the `reload` section of configs/settings.yaml.
+
+    Returns:
+        KnowledgeBaseWatcher, or None if hot reload is disabled.
+    """
+    if not get_setting("reload", "enabled", True):
+        return None
+    return KnowledgeBaseWatcher.from_settings(chatbot, build_retriever, reindex).start()
@@ -0,0 +1,339 @@
+# backend/local_vectorstore.py
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+import numpy as np
+
+DEFAULT_LOCAL_INDEX_PATH = "data/local_index"
+# Number of query x vector scores computed at once by the exact batch search
+MAX_SCORES_PER_BLOCK = 2 ** 24
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions and values of the k highest scores of a 1-D array, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=scores.dtype)
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top, scores[top]
+
+
+def train_ivf(vectors: np.ndarray, n_lists: int, iterations: int = 20, sample_size: int = 100_000,
+              seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Partition unit-length vectors into `n_lists` clusters with spherical k-means.
+
+    Returns:
+        (centroids, order, offsets): vector rows sorted by cluster, and the
+        start offset of each cluster's posting list in `order`.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    n_lists = max(1, min(n_lists, n))
+    sample = np.asarray(vectors[np.sort(rng.choice(n, size=min(n, sample_size), replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=n_lists)
+        empty = counts == 0
+        # Re-seed empty clusters with random sample points
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize(sums).astype(np.float32)
+
+    assignments = np.empty(n, dtype=np.int32)
+    block = max(1, MAX_SCORES_PER_BLOCK // n_lists)
+    for start in range(0, n, block):
+        assignments[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    order = np.argsort(assignments, kind="stable").astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]).astype(np.int64)
+    return centroids, order, offsets
+
+
+class LocalIndexWriter:
+    def __init__(self, path: str = DEFAULT_LOCAL_INDEX_PATH):
+        """
+        Writable side of the local vector store, with a pinecone.Index-like API.
+
+        upsert/delete go to a SQLite staging table under `path`, so the
+        ingest pipeline can write here instead of Pinecone. publish() then
+        materializes a new read-only, memory-mappable version of the index.
+
+        Args:
+            path (str): Directory of the local index.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(os.path.join(path, "staging.sqlite"), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (id TEXT PRIMARY KEY, vector BLOB NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: Iterable[Tuple[str, List[float], dict]], **kwargs):
+        rows = [
+            (item_id, np.asarray(values, dtype=np.float32).tobytes(), json.dumps(metadata or {}))
+            for item_id, values, metadata in vectors
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO vectors (id, vector, metadata) VALUES (?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+        return {"upserted_count": len(rows)}
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM vectors WHERE id = ?", [(i,) for i in ids or []])
+            self._conn.execute("COMMIT")
+        return {}
+
+    def describe_index_stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        return {"total_vector_count": count}
+
+    def publish(self, ivf_lists: int = 0, keep_versions: int = 2) -> str:
+        """
+        Write the staged vectors as a new index version and make it current.
+
+        Vectors are streamed from SQLite into a float32 .npy file, so memory
+        stays flat. The CURRENT pointer is swapped atomically; readers that
+        already opened an older version keep using it.
+
+        Args:
+            ivf_lists (int): Clusters of the approximate IVF index (0 = exact search only).
+            keep_versions (int): Number of most recent versions kept on disk.
+
+        Returns:
+            str: Directory of the new version.
+        """
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            first = self._conn.execute("SELECT vector FROM vectors LIMIT 1").fetchone()
+            dim = len(first[0]) // 4 if first else 0
+
+            version_dir = tempfile.mkdtemp(dir=self.path, prefix=".tmp-")
+            vectors = np.lib.format.open_memmap(os.path.join(version_dir, "vectors.npy"), mode="w+",
+                                                dtype=np.float32, shape=(count, dim))
+            record_offsets = np.zeros(count + 1, dtype=np.int64)
+            with open(os.path.join(version_dir, "records.jsonl"), "wb") as records:
+                cursor = self._conn.execute("SELECT id, vector, metadata FROM vectors ORDER BY id")
+                for row, (item_id, blob, metadata) in enumerate(cursor):
+                    vectors[row] = _normalize(np.frombuffer(blob, dtype=np.float32))
+                    line = json.dumps({"id": item_id, "metadata": json.loads(metadata)}).encode("utf-8") + b"\n"
+                    records.write(line)
+                    record_offsets[row + 1] = record_offsets[row] + len(line)
+            np.save(os.path.join(version_dir, "record_offsets.npy"), record_offsets)
+
+        if ivf_lists and count:
+            centroids, order, offsets = train_ivf(vectors, ivf_lists)
+            np.save(os.path.join(version_dir, "ivf_centroids.npy"), centroids)
+            np.save(os.path.join(version_dir, "ivf_order.npy"), order)
+            np.save(os.path.join(version_dir, "ivf_offsets.npy"), offsets)
+        vectors.flush()
+        del vectors
+
+        version = f"v-{time.time_ns()}"
+        final_dir = os.path.join(self.path, version)
+        os.rename(version_dir, final_dir)
+        pointer = os.path.join(self.path, ".CURRENT.tmp")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.path, "CURRENT"))
+
+        for old in sorted(d for d in os.listdir(self.path) if d.startswith("v-"))[:-keep_versions]:
+            shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+        return final_dir
+
+
+def current_version_dir(path: str) -> str:
+    """Return the directory of the published version of a local index."""
+    with open(os.path.join(path, "CURRENT")) as f:
+        return os.path.join(path, f.read().strip())
+
+
+def _define_local_vector_store():
+    """
+    Define LocalVectorStore on first use.
+
+    It subclasses langchain's VectorStore, and importing langchain takes
+    seconds; index writers and other callers that never search should not
+    pay for it.
+    """
+    from langchain.docstore.document import Document
+    from langchain.embeddings.base import Embeddings
+    from langchain.vectorstores.base import VectorStore
+
+    class LocalVectorStore(VectorStore):
+        def __init__(self, path: str, embedding: Embeddings, nprobe: int = 8, text_key: str = "text"):
+            """
+            Read-only, memory-mapped vector store for running without Pinecone.
+
+            Vectors live in a float32 .npy file that is memory-mapped, so several
+            processes share the pages. Search is exact (one vectorized dot
+            product) unless the index was published with IVF clusters, in which
+            case only the `nprobe` closest clusters are scanned.
+
+            Args:
+                path (str): Directory of the local index (see LocalIndexWriter.publish).
+                embedding (Embeddings): Embeddings used to embed queries.
+                nprobe (int): Clusters scanned per query by the IVF search.
+                text_key (str): Metadata key holding the chunk text.
+            """
+            self.path = path
+            self.embedding = embedding
+            self.nprobe = nprobe
+            self.text_key = text_key
+
+            self.version_dir = current_version_dir(path)
+            self.vectors = np.load(os.path.join(self.version_dir, "vectors.npy"), mmap_mode="r")
+            self.record_offsets = np.load(os.path.join(self.version_dir, "record_offsets.npy"), mmap_mode="r")
+            self._records_file = open(os.path.join(self.version_dir, "records.jsonl"), "rb")
+            self._records = (
+                mmap.mmap(self._records_file.fileno(), 0, access=mmap.ACCESS_READ) if len(self.vectors) else b""
+            )
+
+            self.centroids = None
+            if os.path.exists(os.path.join(self.version_dir, "ivf_centroids.npy")):
+                self.centroids = np.load(os.path.join(self.version_dir, "ivf_centroids.npy"))
+                self.ivf_order = np.load(os.path.join(self.version_dir, "ivf_order.npy"), mmap_mode="r")
+                self.ivf_offsets = np.load(os.path.join(self.version_dir, "ivf_offsets.npy"))
+
+        @property
+        def embeddings(self) -> Embeddings:
+            return self.embedding
+
+        def __len__(self) -> int:
+            return len(self.vectors)
+
+        def close(self):
+            """Release the memory-mapped records file."""
+            if isinstance(self._records, mmap.mmap):
+                self._records.close()
+            self._records_file.close()
+
+        def record(self, row: int) -> dict:
+            """Return the {"id", "metadata"} record stored for a vector row."""
+            start, end = int(self.record_offsets[row]), int(self.record_offsets[row + 1])
+            return json.loads(self._records[start:end])
+
+        def search(self, query_vector: List[float], k: int = 5, exact: Optional[bool] = None) -> Tuple[np.ndarray, np.ndarray]:
+            """
+            Find the k vectors with the highest cosine similarity to a query vector.
+
+            Args:
+                query_vector: Query embedding.
+                k: Number of results.
+                exact: Force exact (True) or IVF (False) search; None uses IVF when available.
+
+            Returns:
+                (row indices, cosine scores), best first.
+            """
+            if len(self.vectors) == 0:
+                # An empty index is saved without a vector dimension, so there is nothing to multiply
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            query = _normalize(np.asarray(query_vector, dtype=np.float32))
+            if exact or self.centroids is None:
+                return _top_k(self.vectors @ query, k)
+
+            probes, _ = _top_k(self.centroids @ query, self.nprobe)
+            candidates = np.concatenate([self.ivf_order[self.ivf_offsets[c]:self.ivf_offsets[c + 1]] for c in probes])
+            candidates.sort()  # sequential reads of the memory-mapped rows
+            positions, scores = _top_k(self.vectors[candidates] @ query, k)
+            return candidates[positions], scores
+
+        def search_batch(self, query_vectors: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+            """
+            Exact top-k for many queries at once, scoring blocks of queries with one matrix product.
+
+            Returns:
+                (row indices, cosine scores) arrays of shape (num_queries, k).
+            """
+            queries = _normalize(np.asarray(query_vectors, dtype=np.float32))
+            k = min(k, len(self.vectors))
+            rows = np.empty((len(queries), k), dtype=np.int64)
+            scores = np.empty((len(queries), k), dtype=np.float32)
+            if k <= 0:
+                return rows, scores
+            block = max(1, MAX_SCORES_PER_BLOCK // max(1, len(self.vectors)))
+            for start in range(0, len(queries), block):
+                block_scores = queries[start:start + block] @ self.vectors.T
+                for i, row_scores in enumerate(block_scores):
+                    rows[start + i], scores[start + i] = _top_k(row_scores, k)
+            return rows, scores
+
+        def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                                    **kwargs: Any) -> List[Tuple[Document, float]]:
+            rows, scores = self.search(embedding, k, exact=kwargs.get("exact"))
+            results = []
+            for row, score in zip(rows, scores):
+                metadata = dict(self.record(int(row))["metadata"])
+                text = metadata.pop(self.text_key, "")
+                results.append((Document(page_content=text, metadata=metadata), float(score)))
+            return results
+
+        def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+            return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, **kwargs)
+
+        def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+            return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)]
+
+        def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+            return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+        def _select_relevance_score_fn(self):
+            # Scores are cosine similarities; map [-1, 1] to [0, 1]
+            return lambda score: (score + 1.0) / 2.0
+
+        def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+            raise NotImplementedError(
+                "LocalVectorStore is read-only; write through LocalIndexWriter and publish a new version."
+            )
+
+        @classmethod
+        def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                       path: str = DEFAULT_LOCAL_INDEX_PATH, ivf_lists: int = 0, **kwargs: Any) -> "LocalVectorStore":
+            """Embed texts, publish them as a local index at `path` and open it."""
+            texts = list(texts)
+            vectors = embedding.embed_documents(texts)
+            writer = LocalIndexWriter(path)
+            writer.upsert([
+                (hashlib.sha256(text.encode("utf-8")).hexdigest()[:32], vector, dict((metadatas or [{}] * len(texts))[i], text=text))
+                for i, (text, vector) in enumerate(zip(texts, vectors))
+            ])
+            writer.publish(ivf_lists=ivf_lists)
+            return cls(path, embedding, **kwargs)
+
+    return LocalVectorStore
+
+
+_define_lock = threading.Lock()
+
+
+def __getattr__(name: str):
+    if name == "LocalVectorStore":
+        with _define_lock:
+            if name not in globals():
+                globals()[name] = _define_local_vector_store()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
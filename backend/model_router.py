@@ -0,0 +1,416 @@
+# backend/model_router.py
+
+import asyncio
+import functools
+import logging
+import queue
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from config import get_setting
+from hybrid_retriever import LexicalMatch
+
+DEFAULT_ROUTES = {
+    "fast": {"model": "gpt-3.5-turbo", "max_tokens": 512, "expected_latency": 3.0, "first_token_timeout": 5.0},
+    "strong": {"model": "gpt-4", "max_tokens": 1024, "expected_latency": 12.0, "first_token_timeout": 10.0,
+               "fallback": "fast"},
+}
+
+# Weight of the newest answer in a route's moving average latency
+LATENCY_SMOOTHING = 0.2
+
+logger = logging.getLogger(__name__)
+
+
+class FirstTokenTimeout(Exception):
+    """Raised when a model sends no token within its first-token timeout."""
+
+
+class Route:
+    def __init__(self, name: str, model: str, max_tokens: Optional[int] = None, expected_latency: float = 5.0,
+                 first_token_timeout: float = 0.0, fallback: Optional[str] = None, llm=None):
+        """
+        One model answers can be routed to.
+
+        Args:
+            name (str): Route name, e.g. "fast".
+            model (str): OpenAI chat model.
+            max_tokens (int): Answer length limit (None = openai.max_tokens).
+            expected_latency (float): Seconds an answer is assumed to take until some are measured.
+            first_token_timeout (float): Seconds to wait for the first token before falling back (0 = no limit).
+            fallback (str): Route tried when this one times out.
+            llm: Chat model to use (default: built by the router on first use).
+        """
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.expected_latency = expected_latency
+        self.first_token_timeout = first_token_timeout
+        self.fallback = fallback
+        self.llm = llm
+
+
+class RouteDecision:
+    def __init__(self, route: str, reason: str, vector_score: Optional[float], lexical_score: float, words: int,
+                 latency_budget: float):
+        """
+        Which route answers a question, and why.
+
+        `route` changes to the fallback when the chosen model times out;
+        `fell_back_from` then names the route that timed out.
+        """
+        self.route = route
+        self.reason = reason
+        self.vector_score = vector_score
+        self.lexical_score = lexical_score
+        self.words = words
+        self.latency_budget = latency_budget
+        self.fell_back_from: Optional[str] = None
+        self.started = time.monotonic()
+
+    def describe(self) -> str:
+        vector = f"{self.vector_score:.2f}" if self.vector_score is not None else "n/a"
+        fallback = f", after {self.fell_back_from} timed out" if self.fell_back_from else ""
+        return (f"{self.route} ({self.reason}: vector {vector}, lexical {self.lexical_score:.2f}, "
+                f"{self.words} words{fallback})")
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        routes: Dict[str, Route],
+        default_route: str = "strong",
+        easy_route: str = "fast",
+        min_vector_score: float = 0.85,
+        min_lexical_score: float = 0.3,
+        max_question_words: int = 30,
+        latency_budget: float = 0.0,
+        llm_factory: Optional[Callable[..., object]] = None,
+    ):
+        """
+        Picks the model for each answer from how confident retrieval is.
+
+        A question is easy, and goes to `easy_route`, when it is at most
+        `max_question_words` long and either a retrieved chunk is at least
+        `min_vector_score` similar or the best symptom-checker match scores
+        at least `min_lexical_score`. Everything else goes to `default_route`.
+
+        With a latency budget, a route whose measured (or, before any
+        measurement, expected) latency exceeds the budget is skipped for
+        the easy route, and a route with a fallback gets no longer than the
+        remaining budget to send its first token. A route that sends no
+        token within its first-token timeout falls back to its `fallback`.
+        With blocking streams the timed-out call is only closed once it sends
+        a chunk, so it still costs its time (and tokens) in the background;
+        metrics() counts these calls as "abandoned".
+
+        Args:
+            routes: Routes by name.
+            default_route (str): Route of hard questions.
+            easy_route (str): Route of easy questions and tight budgets.
+            min_vector_score (float): Cosine similarity of the best chunk that makes a question easy.
+            min_lexical_score (float): Symptom-checker score that makes a question easy.
+            max_question_words (int): Longer questions go to default_route.
+            latency_budget (float): Default seconds per answer (0 = none).
+            llm_factory: Function(model=..., max_tokens=...) building a route's chat model.
+        """
+        for name in (default_route, easy_route):
+            if name not in routes:
+                raise ValueError(f"Unknown route '{name}'; expected one of {sorted(routes)}.")
+        for route in routes.values():
+            if route.fallback is not None and route.fallback not in routes:
+                raise ValueError(f"Route '{route.name}' falls back to unknown route '{route.fallback}'.")
+        self.routes = routes
+        self.default_route = default_route
+        self.easy_route = easy_route
+        self.min_vector_score = min_vector_score
+        self.min_lexical_score = min_lexical_score
+        self.max_question_words = max_question_words
+        self.latency_budget = latency_budget
+        self.llm_factory = llm_factory
+        self._lock = threading.Lock()
+        self.stats = {name: {"decisions": 0, "answers": 0, "timeouts": 0, "fallbacks": 0, "abandoned": 0,
+                             "abandoned_seconds": 0.0, "ttft_seconds": 0.0, "total_seconds": 0.0,
+                             "mean_latency": route.expected_latency}
+                      for name, route in routes.items()}
+        self.reasons: Dict[Tuple[str, str], int] = {}
+
+    @classmethod
+    def from_settings(cls, llm_factory: Optional[Callable[..., object]] = None) -> "ModelRouter":
+        """Build the router configured by the `routing` section of configs/settings.yaml."""
+        routes = {}
+        for name, options in (get_setting("routing", "routes", None) or DEFAULT_ROUTES).items():
+            options = {**DEFAULT_ROUTES.get(name, {}), **(options or {})}
+            if "model" not in options:
+                raise ValueError(f"Route '{name}' needs a model.")
+            routes[name] = Route(name, **options)
+        return cls(
+            routes,
+            default_route=get_setting("routing", "default_route", "strong"),
+            easy_route=get_setting("routing", "easy_route", "fast"),
+            min_vector_score=get_setting("routing", "min_vector_score", 0.85),
+            min_lexical_score=get_setting("routing", "min_lexical_score", 0.3),
+            max_question_words=get_setting("routing", "max_question_words", 30),
+            latency_budget=get_setting("routing", "latency_budget", 0.0),
+            llm_factory=llm_factory,
+        )
+
+    def llm(self, name: str):
+        """The route's chat model, built on first use."""
+        route = self.routes[name]
+        if route.llm is None:
+            with self._lock:
+                if route.llm is None:
+                    if self.llm_factory is None:
+                        raise ValueError(f"Route '{name}' has no chat model and the router no llm_factory.")
+                    route.llm = self.llm_factory(model=route.model, max_tokens=route.max_tokens)
+        return route.llm
+
+    def route(self, question: str, lexical: List[LexicalMatch], vector: List[Tuple[object, Optional[float]]],
+              latency_budget: Optional[float] = None) -> RouteDecision:
+        """
+        Decide which route answers a question.
+
+        Args:
+            question (str): The user's question (without conversation context).
+            lexical: Symptom-checker matches, best first.
+            vector: (document, cosine score or None) vector results.
+            latency_budget (float): Seconds the answer may take (None = the router's default, 0 = none).
+
+        Returns:
+            RouteDecision
+        """
+        scores = [score for _, score in vector if score is not None]
+        vector_score = max(scores) if scores else None
+        lexical_score = lexical[0][1] if lexical else 0.0
+        words = len(question.split())
+        budget = self.latency_budget if latency_budget is None else latency_budget
+
+        confident = ((vector_score is not None and vector_score >= self.min_vector_score)
+                     or lexical_score >= self.min_lexical_score)
+        if words > self.max_question_words:
+            route, reason = self.default_route, "long_question"
+        elif confident:
+            route, reason = self.easy_route, "confident"
+        else:
+            route, reason = self.default_route, "low_confidence"
+        if route != self.easy_route and budget and self.stats[route]["mean_latency"] > budget:
+            route, reason = self.easy_route, "latency_budget"
+
+        with self._lock:
+            self.stats[route]["decisions"] += 1
+            self.reasons[(route, reason)] = self.reasons.get((route, reason), 0) + 1
+        return RouteDecision(route, reason, vector_score, lexical_score, words, budget)
+
+    def stream(self, decision: RouteDecision, prompt: str) -> Iterator[str]:
+        """
+        Stream the answer's text from the decided route, falling back on first-token timeouts.
+
+        Raises:
+            FirstTokenTimeout: The last route in the fallback chain timed out too.
+        """
+        while True:
+            route = self.routes[decision.route]
+            timeout = self._first_token_timeout(route, decision)
+            started = time.perf_counter()
+            first_token_at = None
+            try:
+                on_abandoned = functools.partial(self._record_abandoned, route.name)
+                for piece in _stream_with_timeout(self.llm(route.name), prompt, timeout, on_abandoned):
+                    first_token_at = first_token_at or time.perf_counter()
+                    yield piece
+            except FirstTokenTimeout:
+                if not self._fall_back(decision, route, timeout):
+                    raise
+                continue
+            self._record(route.name, started, first_token_at)
+            return
+
+    async def astream(self, decision: RouteDecision, prompt: str) -> AsyncIterator[str]:
+        """Async version of stream."""
+        while True:
+            route = self.routes[decision.route]
+            timeout = self._first_token_timeout(route, decision)
+            started = time.perf_counter()
+            first_token_at = None
+            try:
+                async for piece in _astream_with_timeout(self.llm(route.name), prompt, timeout):
+                    first_token_at = first_token_at or time.perf_counter()
+                    yield piece
+            except FirstTokenTimeout:
+                if not self._fall_back(decision, route, timeout):
+                    raise
+                continue
+            self._record(route.name, started, first_token_at)
+            return
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per-route decisions, answers, timeouts, fallbacks, abandoned calls and latencies."""
+        with self._lock:
+            stats = {name: dict(route_stats) for name, route_stats in self.stats.items()}
+            for (route, reason), count in self.reasons.items():
+                stats[route].setdefault("reasons", {})[reason] = count
+        for route_stats in stats.values():
+            answers = route_stats["answers"]
+            route_stats["mean_ttft"] = route_stats["ttft_seconds"] / answers if answers else 0.0
+            route_stats["mean_total"] = route_stats["total_seconds"] / answers if answers else 0.0
+        return stats
+
+    def render_prometheus(self) -> str:
+        """Routing metrics in the Prometheus text exposition format."""
+        stats = self.metrics()
+        lines = ["# TYPE chatvet_route_decisions_total counter"]
+        for name, route_stats in sorted(stats.items()):
+            for reason, count in sorted(route_stats.get("reasons", {}).items()):
+                lines.append(f'chatvet_route_decisions_total{{route="{name}",reason="{reason}"}} {count}')
+        for metric, key in (("first_token_timeouts", "timeouts"), ("fallbacks", "fallbacks"),
+                            ("abandoned_calls", "abandoned"), ("abandoned_seconds", "abandoned_seconds")):
+            lines.append(f"# TYPE chatvet_route_{metric}_total counter")
+            for name, route_stats in sorted(stats.items()):
+                lines.append(f'chatvet_route_{metric}_total{{route="{name}"}} {route_stats[key]}')
+        for metric, key in (("first_token_seconds", "ttft_seconds"), ("answer_seconds", "total_seconds")):
+            lines.append(f"# TYPE chatvet_route_{metric} summary")
+            for name, route_stats in sorted(stats.items()):
+                lines.append(f'chatvet_route_{metric}_sum{{route="{name}"}} {route_stats[key]:.6f}')
+                lines.append(f'chatvet_route_{metric}_count{{route="{name}"}} {route_stats["answers"]}')
+        return "\n".join(lines) + "\n"
+
+    def _first_token_timeout(self, route: Route, decision: RouteDecision) -> float:
+        timeout = route.first_token_timeout
+        if decision.latency_budget and route.fallback is not None:
+            # Leave the fallback a chance within the budget; the last route always gets its own timeout
+            remaining = decision.latency_budget - (time.monotonic() - decision.started)
+            timeout = min(timeout, remaining) if timeout else remaining
+            timeout = max(timeout, 0.001)
+        return timeout
+
+    def _fall_back(self, decision: RouteDecision, route: Route, timeout: float) -> bool:
+        """Switch the decision to the route's fallback; False if it has none."""
+        with self._lock:
+            self.stats[route.name]["timeouts"] += 1
+            if route.fallback is not None:
+                self.stats[route.name]["fallbacks"] += 1
+        if route.fallback is None:
+            return False
+        logger.warning("%s sent no token within %.1fs, falling back to %s", route.name, timeout, route.fallback,
+                       extra={"route": route.name, "fallback": route.fallback, "timeout": timeout})
+        decision.fell_back_from = route.name
+        decision.route = route.fallback
+        return True
+
+    def _record_abandoned(self, name: str, seconds: float):
+        """Count a blocking call that kept running for `seconds` after its answer gave up on it."""
+        with self._lock:
+            self.stats[name]["abandoned"] += 1
+            self.stats[name]["abandoned_seconds"] += seconds
+
+    def _record(self, name: str, started: float, first_token_at: Optional[float]):
+        finished = time.perf_counter()
+        with self._lock:
+            route_stats = self.stats[name]
+            route_stats["answers"] += 1
+            route_stats["ttft_seconds"] += (first_token_at or finished) - started
+            route_stats["total_seconds"] += finished - started
+            route_stats["mean_latency"] += LATENCY_SMOOTHING * (finished - started - route_stats["mean_latency"])
+
+
+def _stream_with_timeout(llm, prompt: str, timeout: float,
+                         on_abandoned: Optional[Callable[[float], None]] = None) -> Iterator[str]:
+    """
+    Stream the model's text, raising FirstTokenTimeout if no text arrives within `timeout` seconds.
+
+    Blocking streams cannot be interrupted, so with a timeout the model is
+    read by a background thread. A stream given up on is closed as soon as
+    that thread gets control back, which is not before its next chunk
+    arrives: until then the call keeps running, and is billed, outside any
+    admission slot. on_abandoned(seconds) is then called with how long it
+    ran after being given up.
+    """
+    if not timeout:
+        for chunk in llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
+        return
+
+    chunks: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+    abandoned = threading.Event()
+    given_up_at: List[float] = []
+
+    def read():
+        finished = False
+        stream = llm.stream(prompt)
+        try:
+            for chunk in stream:
+                if abandoned.is_set():
+                    return
+                chunks.put(("chunk", chunk.content))
+            finished = True
+            chunks.put(("done", None))
+        except Exception as e:
+            finished = True
+            chunks.put(("error", e))
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+            if abandoned.is_set() and not finished and on_abandoned is not None:
+                on_abandoned(time.monotonic() - given_up_at[0])
+
+    threading.Thread(target=read, name="llm-stream", daemon=True).start()
+    deadline = time.monotonic() + timeout
+    received = False
+    try:
+        while True:
+            try:
+                kind, value = chunks.get(timeout=None if received else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise FirstTokenTimeout(f"No token within {timeout:.1f}s.")
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            if value:
+                received = True
+                yield value
+    finally:
+        given_up_at.append(time.monotonic())
+        abandoned.set()
+
+
+async def _astream_with_timeout(llm, prompt: str, timeout: float) -> AsyncIterator[str]:
+    """
+    Async version of _stream_with_timeout.
+
+    The read is cancelled at the timeout, which closes the model's request,
+    so a slow call does not outlive its fallback here.
+    """
+    chunks = llm.astream(prompt).__aiter__()
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        while True:
+            try:
+                if deadline is not None:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.monotonic()))
+                else:
+                    chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise FirstTokenTimeout(f"No token within {timeout:.1f}s.")
+            if chunk.content:
+                deadline = None
+                yield chunk.content
+    finally:
+        if hasattr(chunks, "aclose"):
+            await chunks.aclose()
+
+
+def get_model_router(llm_factory: Optional[Callable[..., object]] = None) -> Optional[ModelRouter]:
+    """
+    Build the ModelRouter configured in the `routing` section of configs/settings.yaml.
+
+    Returns:
+        ModelRouter, or None if routing is disabled.
+    """
+    if not get_setting("routing", "enabled", True):
+        return None
+    return ModelRouter.from_settings(llm_factory)
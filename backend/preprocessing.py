@@ -1,10 +1,13 @@
 import os
-import fitz  # PyMuPDF
-import pandas as pd
-from typing import List
-from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Tuple
 import re
 
+# PyMuPDF (fitz) and pandas are imported inside the functions that use them,
+# so text-only helpers like chunk_text load instantly
+
 def clean_text(text: str) -> str:
     """
     Basic text cleaning: remove extra spaces, newlines, special chars.
@@ -18,13 +21,28 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     """
     Extract all text from a PDF file using PyMuPDF.
     """
-    text = ""
+    import fitz  # PyMuPDF
+
     with fitz.open(pdf_path) as doc:
-        for page in doc:
-            page_text = page.get_text()
-            text += page_text + "\n"
+        text = "\n".join(page.get_text() for page in doc)
     return clean_text(text)
 
+def extract_pages_from_pdf(pdf_path: str, first_page: int = 0, last_page: int = None) -> Tuple[str, int, List[str]]:
+    """
+    Extract cleaned text of a page range [first_page, last_page) of a PDF.
+
+    Module-level so it can run in a worker process.
+
+    Returns:
+        (pdf_path, first_page, list of cleaned page texts)
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(pdf_path) as doc:
+        last_page = doc.page_count if last_page is None else min(last_page, doc.page_count)
+        pages = [clean_text(doc.load_page(i).get_text()) for i in range(first_page, last_page)]
+    return pdf_path, first_page, pages
+
 def load_csv_symptom_data(csv_path: str, text_columns: List[str] = None) -> List[str]:
     """
     Load and concatenate relevant text columns from CSV.
@@ -34,18 +52,90 @@ def load_csv_symptom_data(csv_path: str, text_columns: List[str] = None) -> List
     Returns:
         List of cleaned text entries (rows combined).
     """
-    df = pd.read_csv(csv_path)
-    if text_columns is None:
-        # Use all string/object dtype columns
-        text_columns = df.select_dtypes(include=["object"]).columns.tolist()
+    return list(iter_csv_texts(csv_path, text_columns))
+
+def iter_csv_texts(csv_path: str, text_columns: List[str] = None, chunk_rows: int = 50_000,
+                   engine: str = "auto") -> Iterator[str]:
+    """
+    Streaming, vectorized version of load_csv_symptom_data.
+
+    The CSV is read `chunk_rows` rows at a time, and each block is combined
+    and cleaned with column-wise string operations instead of row by row, so
+    memory stays flat and large exports load quickly. Yields the same texts
+    as the row-by-row implementation.
+
+    Args:
+        csv_path: Path to CSV file.
+        text_columns: Columns with text to extract. If None, uses all string columns.
+            Their type is taken from the first block where they have values; pass
+            text_columns for exports whose columns start numeric and turn to text.
+        chunk_rows: Rows parsed per block.
+        engine: "pandas" (C parser), "pyarrow" (multithreaded Arrow parser) or
+            "auto" (pyarrow when it can be imported, else pandas). The Arrow parser
+            reads text_columns as strings, so numbers in them keep their spelling
+            in the file ("1.50" rather than "1.5").
+
+    Yields:
+        Cleaned text entries (rows combined), in file order.
+    """
+    import pandas as pd
 
-    texts = []
-    for _, row in df.iterrows():
-        combined = " ".join(str(row[col]) for col in text_columns if pd.notna(row[col]))
-        cleaned = clean_text(combined)
-        if cleaned:
-            texts.append(cleaned)
-    return texts
+    columns = text_columns
+    untyped = None  # columns without a value so far, whose type is still unknown
+    for frame in _read_csv_blocks(csv_path, text_columns, chunk_rows, engine):
+        if text_columns is None:
+            # Use all string/object dtype columns. A column is typed by the first block where
+            # it has values; before that it is empty and contributes nothing either way.
+            if untyped is None:
+                columns, untyped = [], list(frame.columns)
+            for col in [col for col in untyped if frame[col].notna().any()]:
+                untyped.remove(col)
+                if pd.api.types.is_string_dtype(frame[col].dtype):
+                    columns.append(col)
+            columns.sort(key=frame.columns.get_loc)
+        yield from _combine_text_columns(frame, columns)
+
+def _read_csv_blocks(csv_path: str, text_columns: List[str], chunk_rows: int, engine: str):
+    """DataFrames of consecutive CSV blocks."""
+    import pandas as pd
+
+    if engine not in ("auto", "pandas", "pyarrow"):
+        raise ValueError(f"Unknown CSV engine '{engine}' (expected 'auto', 'pandas' or 'pyarrow').")
+    if engine != "pandas":
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+        except ImportError as e:
+            if engine == "pyarrow":
+                raise
+            print(f"[preprocessing] pyarrow unavailable, parsing CSV with pandas: {e}")
+        else:
+            reader = pa_csv.open_csv(
+                csv_path,
+                # Roughly chunk_rows rows of short text per block
+                read_options=pa_csv.ReadOptions(block_size=max(1 << 20, chunk_rows * 256)),
+                # Same missing-value handling as pandas; text columns stay strings in every block
+                convert_options=pa_csv.ConvertOptions(
+                    strings_can_be_null=True,
+                    column_types={col: pa.string() for col in text_columns or []},
+                ),
+            )
+            for batch in reader:
+                yield batch.to_pandas()
+            return
+
+    yield from pd.read_csv(csv_path, chunksize=chunk_rows)
+
+def _combine_text_columns(frame, text_columns: List[str]) -> List[str]:
+    """Join the text columns of each row with spaces and clean them, like clean_text."""
+    if frame.empty:
+        return []
+    # Column-wise conversion; missing values become empty strings
+    columns = [frame[col].astype(str).where(frame[col].notna(), "").tolist() for col in text_columns]
+    # str.split() splits on the same whitespace as clean_text's regex and drops it at both ends,
+    # so this collapses and strips in one C-level pass per row
+    texts = [" ".join(" ".join(parts).split()) for parts in zip(*columns)]
+    return [text for text in texts if text]
 
 def chunk_text(text: str, max_chunk_size: int = 500, overlap: int = 50) -> List[str]:
     """
@@ -72,32 +162,182 @@ def chunk_text(text: str, max_chunk_size: int = 500, overlap: int = 50) -> List[
             start = 0
     return chunks
 
-def preprocess_pdf_folder(pdf_folder_path: str, max_chunk_size=500, overlap=50) -> List[str]:
+def chunk_pages(pages: Iterable[Tuple[int, str]], source: str, max_chunk_size: int = 500,
+                overlap: int = 50) -> Iterator[Dict]:
+    """
+    Streaming version of chunk_text over a document's pages.
+
+    Produces the same chunks as chunk_text on the joined page texts, but only
+    keeps one chunk's worth of words in memory and tracks which pages each
+    chunk spans.
+
+    Args:
+        pages: (page_number, page_text) pairs in document order (1-based pages).
+        source: Source file name stored on each chunk.
+        max_chunk_size: Maximum words per chunk.
+        overlap: Words shared between consecutive chunks.
+
+    Yields:
+        {"text", "source", "page_start", "page_end"} dicts.
+    """
+    if overlap >= max_chunk_size:
+        raise ValueError("overlap must be smaller than max_chunk_size.")
+    step = max_chunk_size - overlap
+    buffer = deque()  # (word, page_number) starting at the current chunk start
+
+    def make_chunk(size):
+        words = [buffer[i] for i in range(size)]
+        return {
+            "text": " ".join(word for word, _ in words),
+            "source": source,
+            "page_start": words[0][1],
+            "page_end": words[-1][1],
+        }
+
+    for page_number, text in pages:
+        for word in text.split():
+            buffer.append((word, page_number))
+            if len(buffer) == max_chunk_size:
+                yield make_chunk(max_chunk_size)
+                for _ in range(step):
+                    buffer.popleft()
+
+    while buffer:
+        yield make_chunk(min(len(buffer), max_chunk_size))
+        for _ in range(min(step, len(buffer))):
+            buffer.popleft()
+
+def _page_tasks(pdf_paths: Iterable[str], pages_per_task: int) -> Iterator[Tuple[str, int, int]]:
+    """Split PDFs into (path, first_page, last_page) extraction tasks."""
+    import fitz  # PyMuPDF
+
+    for path in pdf_paths:
+        with fitz.open(path) as doc:
+            page_count = doc.page_count
+        for first in range(0, max(page_count, 1), pages_per_task):
+            yield path, first, first + pages_per_task
+
+def _run_tasks(tasks: Iterator[Tuple[str, int, int]], workers: int) -> Iterator[Tuple[str, int, List[str]]]:
+    """
+    Run extraction tasks in order, in-process or on a process pool.
+
+    At most 2 * workers tasks are in flight, so results never pile up in memory.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield extract_pages_from_pdf(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(pool.submit(extract_pages_from_pdf, *task))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+def iter_pdf_chunks(pdf_paths: Iterable[str], max_chunk_size=500, overlap=50, workers: int = None,
+                    pages_per_task: int = 32) -> Iterator[Dict]:
+    """
+    Extract and chunk PDFs in parallel, yielding chunks as they are ready.
+
+    Files are split into page ranges that are extracted on a process pool;
+    results are consumed in document order, so chunks come out exactly as
+    chunk_text would produce them, with source and page metadata.
+
+    Args:
+        pdf_paths: PDF files to process.
+        max_chunk_size: Chunk size in words.
+        overlap: Overlap in words.
+        workers: Extraction processes (None = all CPUs, 1 = in-process).
+        pages_per_task: Pages extracted per task; smaller values spread large files better.
+
+    Yields:
+        {"text", "source", "page_start", "page_end"} dicts.
+    """
+    workers = workers or os.cpu_count() or 1
+    results = _run_tasks(_page_tasks(pdf_paths, pages_per_task), workers)
+    for path, file_results in groupby(results, key=lambda result: result[0]):
+        print(f"Processing PDF: {os.path.basename(path)}")
+        pages = (
+            (first + offset + 1, text)
+            for _, first, page_texts in file_results
+            for offset, text in enumerate(page_texts)
+        )
+        yield from chunk_pages(pages, path, max_chunk_size, overlap)
+
+def list_pdf_files(pdf_folder_path: str) -> List[str]:
+    """Return the PDF files in a folder, sorted by name."""
+    return [
+        os.path.join(pdf_folder_path, filename)
+        for filename in sorted(os.listdir(pdf_folder_path))
+        if filename.lower().endswith(".pdf")
+    ]
+
+def preprocess_pdf_file(pdf_path: str, max_chunk_size=500, overlap=50, workers: int = 1) -> List[str]:
+    """
+    Process a single PDF into cleaned, chunked text.
+
+    Args:
+        pdf_path: Path to the PDF file.
+        max_chunk_size: Chunk size in words.
+        overlap: Overlap in words.
+        workers: Processes used to extract page ranges (None = all CPUs).
+
+    Returns:
+        List of text chunks from the PDF.
+    """
+    return [chunk["text"] for chunk in iter_pdf_chunks([pdf_path], max_chunk_size, overlap, workers)]
+
+def preprocess_pdf_folder(pdf_folder_path: str, max_chunk_size=500, overlap=50, workers: int = 1) -> List[str]:
     """
     Process all PDFs in a folder into cleaned, chunked text.
 
+    Use iter_pdf_chunks directly to stream chunks instead of collecting them.
+
     Args:
         pdf_folder_path: Path to folder with PDFs.
         max_chunk_size: Chunk size in words.
         overlap: Overlap in words.
+        workers: Extraction processes (None = all CPUs).
 
     Returns:
         List of text chunks from all PDFs.
     """
-    all_chunks = []
-    for filename in os.listdir(pdf_folder_path):
-        if filename.lower().endswith(".pdf"):
-            path = os.path.join(pdf_folder_path, filename)
-            print(f"Processing PDF: {filename}")
-            full_text = extract_text_from_pdf(path)
-            chunks = chunk_text(full_text, max_chunk_size, overlap)
-            all_chunks.extend(chunks)
-    return all_chunks
+    chunks = iter_pdf_chunks(list_pdf_files(pdf_folder_path), max_chunk_size, overlap, workers)
+    return [chunk["text"] for chunk in chunks]
+
+def iter_csv_chunks(csv_path: str, max_chunk_size=500, overlap=50, text_columns=None,
+                    chunk_rows: int = 50_000, engine: str = "auto") -> Iterator[str]:
+    """
+    Stream cleaned, chunked text from CSV symptom data.
+
+    Args:
+        csv_path: Path to CSV file.
+        max_chunk_size: Chunk size in words.
+        overlap: Overlap in words.
+        text_columns: List of columns with text to extract.
+        chunk_rows: CSV rows parsed at a time.
+        engine: CSV parser, see iter_csv_texts.
+
+    Yields:
+        Text chunks in file order.
+    """
+    for text in iter_csv_texts(csv_path, text_columns, chunk_rows, engine):
+        # Most rows are far shorter than a chunk; skip the word split for them. Cleaned text has
+        # single spaces, and chunk_text returns one chunk only up to max_chunk_size - overlap words
+        if text and text.count(" ") + 1 <= max_chunk_size - overlap:
+            yield text
+        else:
+            yield from chunk_text(text, max_chunk_size, overlap)
 
 def preprocess_csv_file(csv_path: str, max_chunk_size=500, overlap=50, text_columns=None) -> List[str]:
     """
     Process CSV symptom data into cleaned, chunked text.
 
+    Use iter_csv_chunks directly to stream chunks instead of collecting them.
+
     Args:
         csv_path: Path to CSV file.
         max_chunk_size: Chunk size in words.
@@ -107,12 +347,7 @@ def preprocess_csv_file(csv_path: str, max_chunk_size=500, overlap=50, text_colu
     Returns:
         List of text chunks from CSV.
     """
-    texts = load_csv_symptom_data(csv_path, text_columns)
-    all_chunks = []
-    for text in texts:
-        chunks = chunk_text(text, max_chunk_size, overlap)
-        all_chunks.extend(chunks)
-    return all_chunks
+    return list(iter_csv_chunks(csv_path, max_chunk_size, overlap, text_columns))
 
 if __name__ == "__main__":
     # Example usage
@@ -48,3 +48,23 @@ preventative_care_prompt = PromptTemplate(
     input_variables=["question", "context"],
     template=preventative_care_template.strip(),
 )
+
+# Running summary of a conversation, updated as turns leave the recent window (see conversation_memory.py)
+conversation_summary_template = """
+Update the summary of a conversation between a pet owner and a veterinary assistant.
+Keep the facts needed to answer follow-up questions: the pet's species, age, name and sex, its symptoms and how long they have lasted, and the advice already given.
+Write at most {max_words} words. Reply with the summary only.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Updated summary:
+"""
+
+conversation_summary_prompt = PromptTemplate(
+    input_variables=["summary", "turns", "max_words"],
+    template=conversation_summary_template.strip(),
+)
@@ -0,0 +1,161 @@
+# backend/query_embeddings.py
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+from langchain.embeddings.base import Embeddings
+from answer_cache import normalize_question
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class CachedQueryEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, max_entries: int = 10_000, batch_window: float = 0.005,
+                 max_batch_size: int = 64):
+        """
+        Query embeddings behind an LRU cache and a micro-batcher.
+
+        Questions are cached by their normalized text (see normalize_question),
+        so repeated questions and their trivial variants cost no request.
+        Misses arriving within `batch_window` seconds of each other are
+        embedded together in one embed_documents call; identical questions
+        waiting for or inside a request share its result.
+
+        Args:
+            embeddings: Embeddings client doing the actual requests.
+            max_entries (int): Cached query vectors; least recently used ones are evicted.
+            batch_window (float): Seconds the first miss waits for others to join its batch.
+            max_batch_size (int): Batch size that closes the window early.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        # Misses waiting for the open batch: key -> (text to embed, future of its vector)
+        self._pending: Dict[str, Tuple[str, Future]] = {}
+        # Misses whose batch request is running: key -> future of its vector
+        self._in_flight: Dict[str, Future] = {}
+        self._batch_open = False
+        self._batch_full = threading.Event()
+
+        self.stats = {"lookups": 0, "hits": 0, "coalesced": 0, "misses": 0, "batches": 0, "errors": 0,
+                      "embed_seconds": 0.0}
+        self.batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_question(text) or text
+        leader = False
+        with self._lock:
+            self.stats["lookups"] += 1
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return list(vector)
+
+            pending = self._pending.get(key)
+            future = pending[1] if pending is not None else self._in_flight.get(key)
+            if future is not None:
+                # The same question is already waiting for (or in) a batch request
+                self.stats["coalesced"] += 1
+            else:
+                self.stats["misses"] += 1
+                future = Future()
+                self._pending[key] = (text, future)
+                if not self._batch_open:
+                    self._batch_open = True
+                    leader = True
+                elif len(self._pending) >= self.max_batch_size:
+                    self._batch_full.set()
+
+        if leader:
+            self._run_batch()
+        return list(future.result())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Documents are embedded directly; they are not cached."""
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def metrics(self) -> Dict[str, float]:
+        """Return cache counters, hit rate and mean batch size."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._cache)
+            stats["batch_sizes"] = list(self.batch_sizes)
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / stats["lookups"] if stats["lookups"] else 0.0
+        stats["mean_batch_size"] = stats["misses"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def render_prometheus(self) -> str:
+        """Cache and batching metrics in the Prometheus text exposition format."""
+        stats = self.metrics()
+        lines = ["# TYPE chatvet_query_embedding_lookups_total counter"]
+        for result, key in (("hit", "hits"), ("coalesced", "coalesced"), ("miss", "misses")):
+            lines.append(f'chatvet_query_embedding_lookups_total{{result="{result}"}} {stats[key]}')
+        lines.append("# TYPE chatvet_query_embedding_batch_size histogram")
+        cumulative = 0
+        for bound, count in zip(BATCH_SIZE_BUCKETS, stats["batch_sizes"]):
+            cumulative += count
+            lines.append(f'chatvet_query_embedding_batch_size_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'chatvet_query_embedding_batch_size_bucket{{le="+Inf"}} {stats["batches"]}')
+        lines.append(f"chatvet_query_embedding_batch_size_sum {stats['misses']}")
+        lines.append(f"chatvet_query_embedding_batch_size_count {stats['batches']}")
+        lines.append("# TYPE chatvet_query_embedding_cache_entries gauge")
+        lines.append(f"chatvet_query_embedding_cache_entries {stats['entries']}")
+        return "\n".join(lines) + "\n"
+
+    def _run_batch(self):
+        """Collect the misses of the batch window, embed them in one request and resolve their futures."""
+        self._batch_full.wait(self.batch_window)
+        with self._lock:
+            batch = list(self._pending.items())
+            self._pending = {}
+            for key, (_, future) in batch:
+                self._in_flight[key] = future
+            self._batch_open = False
+            self._batch_full.clear()
+            self.stats["batches"] += 1
+            self.batch_sizes[self._bucket(len(batch))] += 1
+
+        texts = [text for _, (text, _) in batch]
+        started = time.perf_counter()
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                for key, _ in batch:
+                    self._in_flight.pop(key, None)
+            for _, (_, future) in batch:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.stats["embed_seconds"] += time.perf_counter() - started
+            for (key, _), vector in zip(batch, vectors):
+                self._cache[key] = vector
+                self._cache.move_to_end(key)
+                self._in_flight.pop(key, None)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        for (_, (_, future)), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+    @staticmethod
+    def _bucket(size: int) -> int:
+        for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+            if size <= bound:
+                return i
+        return len(BATCH_SIZE_BUCKETS)
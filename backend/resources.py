@@ -0,0 +1,227 @@
+# backend/resources.py
+
+import atexit
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class ResourceRegistry:
+    def __init__(self):
+        """
+        Process-wide registry of expensive objects, built once and shared.
+
+        Each resource is created by its factory on first use. Creation is
+        serialized per resource, so concurrent sessions asking for the same
+        resource wait for one build instead of each running their own.
+        Factories may get() other resources; different resources build in
+        parallel.
+        """
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Optional[Callable[[Any], None]]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._build_order: List[str] = []
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self._warmup_threads: List[threading.Thread] = []
+        self.build_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], None]] = None):
+        """
+        Register how to build (and optionally tear down) a resource.
+
+        Args:
+            name (str): Resource name.
+            factory: Zero-argument function building the resource.
+            close: Function releasing the resource at teardown.
+        """
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._closers[name] = close
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        """Return the resource, building it on first use."""
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource '{name}'.")
+
+        with self._locks[name]:
+            # Another thread may have built it while we waited
+            if name in self._instances:
+                return self._instances[name]
+            started = time.perf_counter()
+            instance = self._factories[name]()
+            self.build_seconds[name] = time.perf_counter() - started
+            print(f"[Resources] Built {name} in {self.build_seconds[name]:.2f}s")
+            with self._registry_lock:
+                self._instances[name] = instance
+                self._build_order.append(name)
+            return instance
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def warmup(self, names: Optional[Iterable[str]] = None, background: bool = True) -> List[threading.Thread]:
+        """
+        Build resources ahead of the first request, one thread per resource.
+
+        Only the first call starts threads; later calls return the same ones.
+
+        Args:
+            names: Resources to build (default: all registered).
+            background (bool): Return immediately instead of waiting for the builds.
+
+        Returns:
+            The warmup threads.
+        """
+        with self._registry_lock:
+            if not self._warmup_threads:
+                for name in list(names or self._factories):
+                    thread = threading.Thread(target=self._warm, args=(name,), name=f"warmup-{name}", daemon=True)
+                    thread.start()
+                    self._warmup_threads.append(thread)
+            threads = list(self._warmup_threads)
+        if not background:
+            for thread in threads:
+                thread.join()
+        return threads
+
+    def close(self):
+        """Tear down built resources in reverse build order."""
+        with self._registry_lock:
+            names = list(reversed(self._build_order))
+            self._build_order = []
+        for name in names:
+            instance = self._instances.pop(name, None)
+            close = self._closers.get(name)
+            if close is not None and instance is not None:
+                try:
+                    close(instance)
+                except Exception as e:
+                    print(f"[Resources] Error closing {name}: {e}")
+        with self._registry_lock:
+            self._warmup_threads = []
+
+    def _warm(self, name: str):
+        try:
+            self.get(name)
+        except Exception as e:
+            # The request that needs it will retry and surface the error
+            print(f"[Resources] Warmup of {name} failed: {e}")
+
+
+def register_chatbot_resources(registry: ResourceRegistry):
+    """Register the Chatbot and the heavy objects it is built from."""
+    from admission import get_admission_controller
+    from answer_cache import get_answer_cache
+    from chatbot import Chatbot, make_llm
+    from knowledge_base import get_knowledge_base_watcher
+    from model_router import get_model_router
+    from retriever import get_retriever, get_query_embeddings
+    from symptom_checker import SymptomChecker
+    from tracing import get_tracer
+
+    def close_retriever(retriever):
+        if hasattr(retriever.vectorstore, "close"):
+            retriever.vectorstore.close()
+
+    def close_answer_cache(answer_cache):
+        if answer_cache is not None:
+            answer_cache.close()
+
+    def build_query_embeddings():
+        embeddings = get_query_embeddings()
+        if hasattr(embeddings, "render_prometheus"):
+            registry.get("tracer").add_collector(embeddings.render_prometheus)
+        return embeddings
+
+    def build_admission():
+        admission = get_admission_controller()
+        if admission is not None:
+            registry.get("tracer").add_collector(admission.render_prometheus)
+        return admission
+
+    def close_admission(admission):
+        if admission is not None:
+            admission.close()
+
+    def build_router():
+        router = get_model_router(llm_factory=make_llm)
+        if router is not None:
+            registry.get("tracer").add_collector(router.render_prometheus)
+        return router
+
+    def build_chatbot():
+        chatbot = Chatbot(
+            llm=registry.get("llm"),
+            retriever=registry.get("retriever"),
+            symptom_checker=registry.get("symptom_checker"),
+            answer_cache=registry.get("answer_cache"),
+            tracer=registry.get("tracer"),
+            admission=registry.get("admission"),
+            router=registry.get("router"),
+        )
+        if chatbot.single_flight is not None:
+            chatbot.tracer.add_collector(chatbot.single_flight.render_prometheus)
+        return chatbot
+
+    def reindex():
+        # Needs embeddings/ on the path (reload.reindex_pdfs)
+        from embed import run_embedding_pipeline
+        run_embedding_pipeline()
+
+    def build_kb_watcher():
+        watcher = get_knowledge_base_watcher(
+            registry.get("chatbot"),
+            build_retriever=lambda: get_retriever(embeddings=registry.get("query_embeddings")),
+            reindex=reindex,
+        )
+        if watcher is not None:
+            registry.get("tracer").add_collector(watcher.render_prometheus)
+        return watcher
+
+    def close_kb_watcher(watcher):
+        if watcher is not None:
+            watcher.stop()
+
+    registry.register("tracer", get_tracer, close=lambda tracer: tracer.close())
+    registry.register("llm", make_llm)
+    registry.register("query_embeddings", build_query_embeddings)
+    # Shares the cached query embeddings with the answer cache
+    registry.register("retriever", lambda: get_retriever(embeddings=registry.get("query_embeddings")),
+                      close=close_retriever)
+    registry.register("symptom_checker", lambda: SymptomChecker("data/vet_guides.csv"))
+    registry.register(
+        "answer_cache",
+        lambda: get_answer_cache(embed_query=registry.get("query_embeddings").embed_query),
+        close=close_answer_cache,
+    )
+    registry.register("admission", build_admission, close=close_admission)
+    registry.register("router", build_router)
+    registry.register("chatbot", build_chatbot)
+    # Rebuilds and swaps the chatbot's indexes when the knowledge-base sources change
+    registry.register("kb_watcher", build_kb_watcher, close=close_kb_watcher)
+
+
+_registry: Optional[ResourceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ResourceRegistry:
+    """Return the process-wide registry (created on first use, closed at interpreter exit)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ResourceRegistry()
+            register_chatbot_resources(_registry)
+            atexit.register(_registry.close)
+        return _registry
+
+
+def get_chatbot():
+    """Return the shared Chatbot, building it on first use."""
+    return get_registry().get("chatbot")
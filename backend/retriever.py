@@ -1,21 +1,96 @@
 import os
-import pinecone
-from langchain.vectorstores import Pinecone
-from langchain.embeddings.openai import OpenAIEmbeddings
 from dotenv import load_dotenv
+from config import get_setting
 
 load_dotenv()
 
-def get_pinecone_retriever(top_k: int = 5):
+def get_retriever(top_k: int = None, embeddings=None):
+    """
+    Return the LangChain retriever selected by `retriever.backend` in configs/settings.yaml.
+
+    Args:
+        top_k (int): Number of top documents to retrieve per query (defaults to `retriever.top_k`)
+        embeddings: Query embeddings to share with other components (defaults to get_query_embeddings())
+
+    Returns:
+        langchain.vectorstores.base.VectorStoreRetriever: Retriever for LangChain
+    """
+    top_k = top_k or get_setting("retriever", "top_k", 5)
+    backend = get_setting("retriever", "backend", "pinecone")
+    if backend == "pinecone":
+        return get_pinecone_retriever(top_k, embeddings=embeddings)
+    if backend == "local":
+        return get_local_retriever(top_k, embeddings=embeddings)
+    raise ValueError(f"Unknown retriever backend '{backend}' (expected 'pinecone' or 'local').")
+
+def get_query_embeddings():
+    """
+    Create the OpenAI embeddings client used to embed user questions.
+
+    Unless `embedding.query_cache_size` is 0, the client is wrapped in a
+    CachedQueryEmbeddings: an LRU cache keyed by normalized question text,
+    with concurrent misses grouped into one batched embedding request.
+    """
+    # langchain takes seconds to import; only pay for it when a client is built
+    from langchain.embeddings.openai import OpenAIEmbeddings
+
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise ValueError("OPENAI_API_KEY is not set in environment variables")
+
+    kwargs = {"openai_api_key": openai_api_key, "model": get_setting("embedding", "model", "text-embedding-ada-002")}
+    # Lets the local backend run against an OpenAI-compatible embedding server in air-gapped setups
+    api_base = os.getenv("OPENAI_API_BASE") or get_setting("embedding", "api_base")
+    if api_base:
+        kwargs["openai_api_base"] = api_base
+    embeddings = OpenAIEmbeddings(**kwargs)
+
+    cache_size = get_setting("embedding", "query_cache_size", 10000)
+    if not cache_size:
+        return embeddings
+    from query_embeddings import CachedQueryEmbeddings
+
+    return CachedQueryEmbeddings(
+        embeddings,
+        max_entries=cache_size,
+        batch_window=get_setting("embedding", "query_batch_window_ms", 5) / 1000,
+        max_batch_size=get_setting("embedding", "query_max_batch_size", 64),
+    )
+
+def get_local_retriever(top_k: int = 5, path: str = None, embeddings=None):
+    """
+    Open the local memory-mapped vector store and return a LangChain retriever object.
+
+    Args:
+        top_k (int): Number of top documents to retrieve per query
+        path (str): Local index directory (defaults to `retriever.local_path`)
+        embeddings: Query embeddings (defaults to get_query_embeddings())
+
+    Returns:
+        langchain.vectorstores.base.VectorStoreRetriever: Retriever for LangChain
+    """
+    from local_vectorstore import LocalVectorStore, DEFAULT_LOCAL_INDEX_PATH
+
+    vectorstore = LocalVectorStore(
+        path or get_setting("retriever", "local_path", DEFAULT_LOCAL_INDEX_PATH),
+        embedding=embeddings or get_query_embeddings(),
+        nprobe=get_setting("retriever", "nprobe", 8),
+    )
+    return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": top_k})
+
+def get_pinecone_retriever(top_k: int = 5, embeddings=None):
     """
     Initialize Pinecone and return a LangChain retriever object.
 
     Args:
         top_k (int): Number of top documents to retrieve per query
+        embeddings: Query embeddings (defaults to get_query_embeddings())
 
     Returns:
         langchain.vectorstores.base.VectorStoreRetriever: Retriever for LangChain
     """
+    import pinecone
+    from langchain.vectorstores import Pinecone
 
     # Load environment variables
     pinecone_api_key = os.getenv("PINECONE_API_KEY")
@@ -32,13 +107,13 @@ def get_pinecone_retriever(top_k: int = 5):
     # Connect to Pinecone index
     index = pinecone.Index(pinecone_index_name)
 
-    # Create OpenAI embeddings instance
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
+    # Cached, micro-batched OpenAI query embeddings
+    embeddings = embeddings or get_query_embeddings()
 
     # Create LangChain Pinecone vector store wrapper
     vectorstore = Pinecone(
         index=index,
-        embedding_function=embeddings.embed_query,
+        embedding=embeddings,
         text_key="text",  # The metadata key where the original text is stored in Pinecone
     )
 
@@ -0,0 +1,295 @@
+# backend/server.py
+#
+# Headless HTTP/JSON API around Chatbot, for clients other than the Streamlit UI.
+# Run from the repo root:
+#   PYTHONPATH=backend:auth python backend/server.py --port 8080
+#
+# Callers identify themselves with "Authorization: Bearer <key>" (keys in `server.api_keys`) or,
+# without configured keys, an X-User-Id header set by an authenticating proxy; their LLM answers
+# count against the quota of their subscription tier. Requests without either are anonymous.
+#
+#   POST /ask         {"question": "..."}  ->  {"answer": "..."}
+#   POST /ask/stream  {"question": "..."}  ->  NDJSON lines {"token": "..."}, then {"done": true}
+#   GET  /health
+#   GET  /metrics     Prometheus text format (per-stage latency, tokens, cache hits; needs dev.enable_logs)
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import time
+from typing import Callable, Dict, Optional, Tuple
+from aiohttp import web
+from admission import AdmissionRejected
+from config import get_setting
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot even be queued for an answer slot."""
+
+
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrency: int, max_pending: int):
+        """
+        Cap on answers generated at once, with a bounded wait queue.
+
+        Args:
+            max_concurrency (int): Requests answered concurrently.
+            max_pending (int): Requests allowed to wait for a slot; more are rejected.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.pending = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        if self._semaphore.locked() and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+        self.pending += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.pending -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class ApiState:
+    def __init__(self, chatbot, limiter: ConcurrencyLimiter, request_timeout: float, max_question_length: int,
+                 authenticate: Callable[[web.Request], Optional[str]], user_tier: Callable[[str], str]):
+        """Chatbot, limits, caller identification and counters shared by the request handlers."""
+        self.chatbot = chatbot
+        self.limiter = limiter
+        self.request_timeout = request_timeout
+        self.max_question_length = max_question_length
+        self.authenticate = authenticate
+        self.user_tier = user_tier
+        self.timeouts = 0
+
+
+# Typed application keys need aiohttp >= 3.9
+STATE = web.AppKey("state", ApiState) if hasattr(web, "AppKey") else "state"
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+
+def _rejected(error: AdmissionRejected) -> web.Response:
+    """429 for a caller over quota, 503 when the LLM calls are saturated; both with Retry-After."""
+    response = _error(429 if error.reason == "rate_limited" else 503, error.message)
+    response.headers["Retry-After"] = str(max(1, round(error.retry_after)))
+    return response
+
+
+def authenticate_request(request: web.Request, api_keys: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    The user making a request, or None for an anonymous one.
+
+    Args:
+        request: The request.
+        api_keys: {API key: user ID}. If given, the key of the Authorization
+            header identifies the user; otherwise the X-User-Id header does.
+
+    Raises:
+        HTTPUnauthorized: An API key that is not in api_keys.
+    """
+    if not api_keys:
+        return request.headers.get("X-User-Id") or None
+    authorization = request.headers.get("Authorization", "")
+    if not authorization:
+        return None
+    scheme, _, key = authorization.partition(" ")
+    if scheme.lower() != "bearer" or key.strip() not in api_keys:
+        raise web.HTTPUnauthorized(text=json.dumps({"error": "Unknown API key."}), content_type="application/json")
+    return api_keys[key.strip()]
+
+
+def subscription_tier(user_id: str) -> str:
+    """The user's admission tier, from their subscription status (see auth/billing.py)."""
+    from billing import get_user_tier
+
+    return get_user_tier(user_id)
+
+
+def _caller(request: web.Request) -> Tuple[Optional[str], Optional[str]]:
+    """(user ID, tier) of a request; both None for anonymous callers."""
+    state = request.app[STATE]
+    user_id = state.authenticate(request)
+    return user_id, state.user_tier(user_id) if user_id is not None else None
+
+
+async def _read_question(request: web.Request) -> str:
+    """Parse and validate the question of a request, raising an HTTP 400 on bad input."""
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be JSON."}), content_type="application/json")
+    question = body.get("question") if isinstance(body, dict) else None
+    if not isinstance(question, str):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'question' must be a string."}),
+                                 content_type="application/json")
+    if len(question) > request.app[STATE].max_question_length:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Question is too long."}),
+                                 content_type="application/json")
+    return question
+
+
+async def handle_ask(request: web.Request) -> web.Response:
+    state = request.app[STATE]
+    user_id, tier = _caller(request)
+    question = await _read_question(request)
+    try:
+        async with state.limiter:
+            started = time.perf_counter()
+            answer = await asyncio.wait_for(
+                state.chatbot.aask(question, user_id=user_id, tier=tier, latency_budget=state.request_timeout),
+                state.request_timeout,
+            )
+    except Overloaded:
+        return _error(503, "Server is busy, please retry.")
+    except AdmissionRejected as e:
+        return _rejected(e)
+    except asyncio.TimeoutError:
+        state.timeouts += 1
+        return _error(504, "Answer took too long.")
+    return web.json_response({"answer": answer, "seconds": round(time.perf_counter() - started, 3)})
+
+
+async def handle_ask_stream(request: web.Request) -> web.StreamResponse:
+    state = request.app[STATE]
+    user_id, tier = _caller(request)
+    question = await _read_question(request)
+    try:
+        async with state.limiter:
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            deadline = time.monotonic() + state.request_timeout
+            pieces = state.chatbot.aask_stream(question, user_id=user_id, tier=tier,
+                                               latency_budget=state.request_timeout)
+            try:
+                while True:
+                    try:
+                        piece = await asyncio.wait_for(pieces.__anext__(), deadline - time.monotonic())
+                    except StopAsyncIteration:
+                        break
+                    await response.write((json.dumps({"token": piece}) + "\n").encode("utf-8"))
+            except asyncio.TimeoutError:
+                state.timeouts += 1
+                await response.write((json.dumps({"error": "Answer took too long."}) + "\n").encode("utf-8"))
+            except AdmissionRejected as e:
+                # Headers are already sent, so the refusal goes in the stream
+                line = {"error": e.message, "reason": e.reason, "retry_after": e.retry_after}
+                await response.write((json.dumps(line) + "\n").encode("utf-8"))
+            finally:
+                await pieces.aclose()
+            await response.write((json.dumps({"done": True}) + "\n").encode("utf-8"))
+            await response.write_eof()
+            return response
+    except Overloaded:
+        return _error(503, "Server is busy, please retry.")
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    state = request.app[STATE]
+    limiter = state.limiter
+    tracer = getattr(state.chatbot, "tracer", None)
+    # Collectors take their components' locks; keep a slow one from blocking the event loop
+    text = await asyncio.to_thread(tracer.render_prometheus) if tracer is not None else ""
+    text += (
+        "# TYPE chatvet_server_in_flight gauge\n"
+        f"chatvet_server_in_flight {limiter.in_flight}\n"
+        "# TYPE chatvet_server_pending gauge\n"
+        f"chatvet_server_pending {limiter.pending}\n"
+        "# TYPE chatvet_server_rejected_total counter\n"
+        f"chatvet_server_rejected_total {limiter.rejected}\n"
+        "# TYPE chatvet_server_timeouts_total counter\n"
+        f"chatvet_server_timeouts_total {state.timeouts}\n"
+    )
+    return web.Response(text=text, content_type="text/plain", headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    state = request.app[STATE]
+    limiter = state.limiter
+    return web.json_response({
+        "status": "ok",
+        "in_flight": limiter.in_flight,
+        "pending": limiter.pending,
+        "rejected": limiter.rejected,
+        "timeouts": state.timeouts,
+    })
+
+
+def make_app(chatbot, max_concurrency: int = None, max_pending: int = None, request_timeout: float = None,
+             max_question_length: int = None, authenticate: Callable[[web.Request], Optional[str]] = None,
+             user_tier: Callable[[str], str] = subscription_tier) -> web.Application:
+    """
+    Build the aiohttp application serving a Chatbot.
+
+    Limits default to the `server` and `limits` sections of configs/settings.yaml.
+
+    Args:
+        chatbot: Chatbot (or anything with aask/aask_stream) answering the questions.
+        max_concurrency (int): Answers generated at once.
+        max_pending (int): Requests waiting for a slot before new ones get 503.
+        request_timeout (float): Seconds before an answer is abandoned with 504.
+        max_question_length (int): Longest accepted question, in characters.
+        authenticate: Function(request) returning the caller's user ID or None
+            (defaults to authenticate_request with the keys in `server.api_keys`).
+        user_tier: Function(user ID) returning the caller's admission tier.
+
+    Returns:
+        web.Application
+    """
+    if authenticate is None:
+        authenticate = functools.partial(authenticate_request, api_keys=get_setting("server", "api_keys", None))
+    app = web.Application()
+    app[STATE] = ApiState(
+        chatbot,
+        ConcurrencyLimiter(
+            max_concurrency or get_setting("server", "max_concurrency", 64),
+            max_pending if max_pending is not None else get_setting("server", "max_pending", 256),
+        ),
+        request_timeout=request_timeout or get_setting("server", "request_timeout", 60),
+        max_question_length=max_question_length or get_setting("limits", "max_question_length", 512),
+        authenticate=authenticate,
+        user_tier=user_tier,
+    )
+    app.router.add_post("/ask", handle_ask)
+    app.router.add_post("/ask/stream", handle_ask_stream)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+
+    async def close_chatbot(app):
+        if hasattr(app[STATE].chatbot, "aclose"):
+            await app[STATE].chatbot.aclose()
+
+    app.on_cleanup.append(close_chatbot)
+    return app
+
+
+if __name__ == "__main__":
+    from resources import get_registry
+
+    parser = argparse.ArgumentParser(description="ChatVet HTTP API")
+    parser.add_argument("--host", default=get_setting("server", "host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=get_setting("server", "port", 8080))
+    args = parser.parse_args()
+    # Errors, fallbacks and per-answer timings are logged whether or not request tracing is enabled
+    logging.basicConfig(level=get_setting("server", "log_level", "INFO"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    resources = get_registry()
+    resources.warmup(background=False)
+    web.run_app(make_app(resources.get("chatbot")), host=args.host, port=args.port)
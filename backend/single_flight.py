@@ -0,0 +1,244 @@
+# backend/single_flight.py
+
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
+from config import get_setting
+
+
+class LeaderFailed(Exception):
+    """Raised to a follower when the call it follows fails, is abandoned or stalls."""
+
+
+class FailedPiece(str):
+    """
+    Closing piece of an answer that failed, e.g. an apology for an LLM error.
+
+    The leader's own caller receives it, but it is not published: the
+    flight is marked failed, so followers answer on their own instead of
+    sharing the apology.
+    """
+
+
+class Flight:
+    def __init__(self):
+        """
+        One in-flight answer, streamed to every caller asking the same question.
+
+        The leading call publishes the pieces of its answer; followers
+        replay the pieces published so far, then receive new ones as they
+        arrive, from threads (follow) or event loops (afollow).
+        """
+        self.pieces: List[str] = []
+        self.done = False
+        self.failed = False
+        self._changed = threading.Condition()
+        self._events: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []  # of async followers
+
+    def publish(self, piece: str):
+        with self._changed:
+            self.pieces.append(piece)
+            self._notify()
+
+    def finish(self, failed: bool = False):
+        with self._changed:
+            self.done = True
+            self.failed = failed
+            self._notify()
+
+    def follow(self, timeout: float) -> Iterator[str]:
+        """
+        Yield the answer's pieces, blocking for new ones.
+
+        Raises:
+            LeaderFailed: The leader failed, or published nothing for `timeout` seconds.
+        """
+        seen = 0
+        while True:
+            with self._changed:
+                if not self._changed.wait_for(lambda: seen < len(self.pieces) or self.done, timeout):
+                    raise LeaderFailed(f"No answer for {timeout:.0f}s.")
+                new, done, failed = self.pieces[seen:], self.done, self.failed
+            for piece in new:
+                seen += 1
+                yield piece
+            if done:
+                if failed:
+                    raise LeaderFailed("The leading call failed.")
+                return
+
+    async def afollow(self, timeout: float) -> AsyncIterator[str]:
+        """Async version of follow."""
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._changed:
+            self._events.append(entry)
+        try:
+            seen = 0
+            while True:
+                with self._changed:
+                    new, done, failed = self.pieces[seen:], self.done, self.failed
+                    if not new and not done:
+                        # Cleared under the lock, so a piece published from now on sets it again
+                        entry[1].clear()
+                if not new and not done:
+                    try:
+                        await asyncio.wait_for(entry[1].wait(), timeout)
+                    except asyncio.TimeoutError:
+                        raise LeaderFailed(f"No answer for {timeout:.0f}s.")
+                    continue
+                for piece in new:
+                    seen += 1
+                    yield piece
+                if done:
+                    if failed:
+                        raise LeaderFailed("The leading call failed.")
+                    return
+        finally:
+            with self._changed:
+                self._events.remove(entry)
+
+    def _notify(self):
+        self._changed.notify_all()
+        for loop, event in self._events:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # that follower's loop is closed
+
+
+class SingleFlight:
+    def __init__(self, wait_timeout: float = 30.0):
+        """
+        Coalesces concurrent calls for the same key into one.
+
+        The first caller of a key leads: its answer runs as usual and is
+        published to the callers that join while it is in flight, who
+        receive the same stream instead of running their own. The key is
+        forgotten as soon as the leader finishes (finished answers are the
+        answer cache's job).
+
+        If the leader fails, is abandoned by its consumer, or publishes
+        nothing for `wait_timeout` seconds, followers get LeaderFailed and
+        answer on their own; a stalled flight is dropped, so later callers
+        start a new one.
+
+        Args:
+            wait_timeout (float): Seconds a follower waits for the next piece.
+        """
+        self.wait_timeout = wait_timeout
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "followers": 0, "saved": 0, "leader_failures": 0, "follower_timeouts": 0}
+
+    @classmethod
+    def from_settings(cls) -> "SingleFlight":
+        """Build a SingleFlight configured by the `chatbot` section of configs/settings.yaml."""
+        return cls(wait_timeout=get_setting("chatbot", "coalesce_wait_timeout", 30.0))
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """
+        Return the key's flight and whether the caller leads it (a new flight) or follows it.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.stats["followers"] += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            self.stats["leaders"] += 1
+            return flight, True
+
+    def lead(self, key: str, flight: Flight, pieces: Iterator[str]) -> Iterator[str]:
+        """Yield the leader's pieces, publishing each to the flight's followers (see FailedPiece)."""
+        completed = failed = False
+        try:
+            for piece in pieces:
+                if isinstance(piece, FailedPiece):
+                    failed = True
+                else:
+                    flight.publish(piece)
+                yield piece
+            completed = not failed
+        finally:
+            pieces.close()
+            self._finish(key, flight, completed)
+
+    async def alead(self, key: str, flight: Flight, pieces: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Async version of lead."""
+        completed = failed = False
+        try:
+            async for piece in pieces:
+                if isinstance(piece, FailedPiece):
+                    failed = True
+                else:
+                    flight.publish(piece)
+                yield piece
+            completed = not failed
+        finally:
+            await pieces.aclose()
+            self._finish(key, flight, completed)
+
+    def follow(self, key: str, flight: Flight) -> Iterator[str]:
+        """
+        Yield the flight's answer (see Flight.follow).
+
+        Raises:
+            LeaderFailed: See Flight.follow.
+        """
+        try:
+            yield from flight.follow(self.wait_timeout)
+        except LeaderFailed:
+            self._failed(key, flight)
+            raise
+        self._count("saved")
+
+    async def afollow(self, key: str, flight: Flight) -> AsyncIterator[str]:
+        """Async version of follow."""
+        try:
+            async for piece in flight.afollow(self.wait_timeout):
+                yield piece
+        except LeaderFailed:
+            self._failed(key, flight)
+            raise
+        self._count("saved")
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._flights)
+        return stats
+
+    def render_prometheus(self) -> str:
+        """Coalescing counters in the Prometheus text exposition format."""
+        stats = self.metrics()
+        lines = ["# TYPE chatvet_coalesced_calls_total counter"]
+        for role in ("leaders", "followers"):
+            lines.append(f'chatvet_coalesced_calls_total{{role="{role[:-1]}"}} {stats[role]}')
+        lines.append("# TYPE chatvet_coalesced_saved_total counter")
+        lines.append(f"chatvet_coalesced_saved_total {stats['saved']}")
+        lines.append("# TYPE chatvet_coalesced_failures_total counter")
+        lines.append(f'chatvet_coalesced_failures_total{{cause="leader"}} {stats["leader_failures"]}')
+        lines.append(f'chatvet_coalesced_failures_total{{cause="timeout"}} {stats["follower_timeouts"]}')
+        lines.append("# TYPE chatvet_coalesced_in_flight gauge")
+        lines.append(f"chatvet_coalesced_in_flight {stats['in_flight']}")
+        return "\n".join(lines) + "\n"
+
+    def _finish(self, key: str, flight: Flight, completed: bool):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not completed:
+                self.stats["leader_failures"] += 1
+        flight.finish(failed=not completed)
+
+    def _failed(self, key: str, flight: Flight):
+        if flight.done:
+            return  # counted by _finish
+        with self._lock:
+            self.stats["follower_timeouts"] += 1
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
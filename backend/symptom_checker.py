@@ -1,26 +1,82 @@
 import os
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Tuple
+import json
+import shutil
+import hashlib
+import importlib.metadata
+import tempfile
+import numpy as np
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+# pandas, scipy and scikit-learn take seconds to import; they are loaded on first use
+if TYPE_CHECKING:
+    import scipy.sparse as sp
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Fitted TF-IDF indexes are cached here, one subdirectory per CSV fingerprint.
+DEFAULT_INDEX_DIR = "data/index_cache"
+# Bump when the on-disk layout or the vectorizer settings change.
+INDEX_FORMAT_VERSION = "1"
+
+NO_MATCH_MESSAGE = "No close matches found. Please consult a veterinarian for specific advice."
+
+# Upper bound on the number of similarity scores (queries x rows) computed in
+# one sparse product, to keep memory flat on large CSVs.
+MAX_SCORES_PER_BLOCK = 2 ** 22
+
 
 class SymptomChecker:
-    def __init__(self, csv_path: str, symptom_col: str = "symptom", suggestion_col: str = "suggestion"):
+    def __init__(self, csv_path: str, symptom_col: str = "symptom", suggestion_col: str = "suggestion",
+                 index_dir: Optional[str] = DEFAULT_INDEX_DIR):
         """
         Initialize the symptom checker with symptom-suggestion dataset.
 
+        The fitted TF-IDF index is saved under `index_dir`, keyed by a
+        fingerprint of the CSV content and column names. Later instances for
+        the same CSV memory-map that index instead of refitting, so worker
+        processes share its read-only pages.
+
         Args:
             csv_path (str): Path to CSV containing symptoms and corresponding suggestions.
             symptom_col (str): Name of the column with symptom descriptions.
             suggestion_col (str): Name of the column with suggested advice.
+            index_dir (str or None): Directory for cached indexes. None always refits.
         """
+        import pandas as pd
+
         self.df = pd.read_csv(csv_path)
         self.symptom_col = symptom_col
         self.suggestion_col = suggestion_col
 
-        # Prepare TF-IDF vectorizer on symptom descriptions
-        self.vectorizer = TfidfVectorizer(stop_words='english')
-        self.symptom_tfidf = self.vectorizer.fit_transform(self.df[self.symptom_col].fillna(""))
+        # Plain object arrays so results can be gathered with fancy indexing
+        # instead of one pandas row lookup per hit
+        self.symptoms = self.df[self.symptom_col].to_numpy(dtype=object)
+        self.suggestions = self.df[self.suggestion_col].to_numpy(dtype=object)
+
+        self.index_path = None
+        if index_dir is not None:
+            fingerprint = index_fingerprint(csv_path, symptom_col, suggestion_col)
+            self.index_path = os.path.join(index_dir, fingerprint)
+
+        loaded = None
+        if self.index_path is not None and os.path.isdir(self.index_path):
+            try:
+                loaded = load_index(self.index_path)
+            except (OSError, ValueError) as e:
+                print(f"[SymptomChecker] Ignoring unreadable index at {self.index_path}: {e}")
+
+        if loaded is not None:
+            self.vectorizer, self.symptom_tfidf = loaded
+        else:
+            # Prepare TF-IDF vectorizer on symptom descriptions
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            self.vectorizer = TfidfVectorizer(stop_words='english')
+            self.symptom_tfidf = self.vectorizer.fit_transform(self.df[self.symptom_col].fillna(""))
+            if self.index_path is not None:
+                try:
+                    save_index(self.index_path, self.vectorizer, self.symptom_tfidf)
+                except OSError as e:
+                    print(f"[SymptomChecker] Could not save index to {self.index_path}: {e}")
 
     def find_closest_symptoms(self, user_input: str, top_k: int = 3) -> List[Tuple[str, float, str]]:
         """
@@ -33,18 +89,50 @@ class SymptomChecker:
         Returns:
             List of tuples: [(symptom_text, similarity_score, suggestion), ...]
         """
-        user_vec = self.vectorizer.transform([user_input])
-        similarities = cosine_similarity(user_vec, self.symptom_tfidf).flatten()
-        top_indices = similarities.argsort()[::-1][:top_k]
+        return self.find_closest_symptoms_batch([user_input], top_k)[0]
 
-        matches = []
-        for idx in top_indices:
-            symptom = self.df.iloc[idx][self.symptom_col]
-            suggestion = self.df.iloc[idx][self.suggestion_col]
-            score = similarities[idx]
-            matches.append((symptom, score, suggestion))
+    def find_closest_symptoms_batch(self, queries: List[str], top_k: int = 3) -> List[List[Tuple[str, float, str]]]:
+        """
+        Find the closest matching symptoms for many inputs at once.
+
+        All queries are vectorized together and scored against the symptom
+        matrix with one sparse product per block of queries. TF-IDF rows are
+        L2-normalized, so the dot product is the cosine similarity.
+
+        Args:
+            queries (List[str]): User symptom descriptions.
+            top_k (int): Number of top matches to return per query.
 
-        return matches
+        Returns:
+            List (one entry per query) of lists of tuples:
+            [(symptom_text, similarity_score, suggestion), ...], best match first.
+        """
+        if len(queries) == 0:
+            return []
+
+        num_rows = self.symptom_tfidf.shape[0]
+        top_k = min(top_k, num_rows)
+        if top_k <= 0:
+            return [[] for _ in queries]
+
+        query_tfidf = self.vectorizer.transform(queries)
+
+        # Score a block of queries at a time so the sparse product stays bounded
+        # even when a query shares common terms with most rows
+        block_size = max(1, MAX_SCORES_PER_BLOCK // num_rows)
+        results = []
+        for start in range(0, len(queries), block_size):
+            scores = (query_tfidf[start:start + block_size] @ self.symptom_tfidf.T).tocsr()
+            for row in range(scores.shape[0]):
+                lo, hi = scores.indptr[row], scores.indptr[row + 1]
+                top_indices, top_scores = _top_k(scores.indices[lo:hi], scores.data[lo:hi], top_k, num_rows)
+                results.append(list(zip(
+                    self.symptoms[top_indices],
+                    top_scores.tolist(),
+                    self.suggestions[top_indices],
+                )))
+
+        return results
 
     def get_suggestions(self, user_input: str, threshold: float = 0.3) -> List[str]:
         """
@@ -57,16 +145,126 @@ class SymptomChecker:
         Returns:
             List of suggestion strings.
         """
-        matches = self.find_closest_symptoms(user_input)
+        return self.get_suggestions_batch([user_input], threshold)[0]
+
+    def get_suggestions_batch(self, user_inputs: List[str], threshold: float = 0.3) -> List[List[str]]:
+        """
+        Return suggestions for many user inputs at once.
+
+        Args:
+            user_inputs (List[str]): User symptom description inputs.
+            threshold (float): Minimum similarity score to consider a match.
+
+        Returns:
+            List (one entry per input) of suggestion string lists.
+        """
+        all_suggestions = []
+        for matches in self.find_closest_symptoms_batch(user_inputs):
+            filtered_suggestions = [
+                suggestion for symptom, score, suggestion in matches if score >= threshold
+            ]
+            all_suggestions.append(filtered_suggestions or [NO_MATCH_MESSAGE])
+        return all_suggestions
+
+
+def index_fingerprint(csv_path: str, symptom_col: str, suggestion_col: str) -> str:
+    """
+    Hash the CSV content, the column names and the index format into a cache key.
+    """
+    # Read the version from package metadata rather than importing scikit-learn
+    sklearn_version = importlib.metadata.version("scikit-learn")
+    digest = hashlib.sha256()
+    digest.update(f"{INDEX_FORMAT_VERSION}|{sklearn_version}|{symptom_col}|{suggestion_col}|".encode("utf-8"))
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_index(index_path: str, vectorizer: "TfidfVectorizer", symptom_tfidf: "sp.csr_matrix",
+               keep_indexes: int = 2):
+    """
+    Save a fitted vectorizer and its CSR matrix as plain .npy/.json files.
+
+    Files are written to a temporary directory and renamed into place, so
+    concurrent workers never see a half-written index. Once saved, all but
+    the `keep_indexes` most recent indexes in the same directory (those of
+    earlier CSV versions) are removed.
+    """
+    parent = os.path.dirname(index_path) or "."
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        terms = vectorizer.get_feature_names_out().tolist()
+        with open(os.path.join(tmp_path, "vocabulary.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f)
+        np.save(os.path.join(tmp_path, "idf.npy"), vectorizer.idf_)
+        np.save(os.path.join(tmp_path, "data.npy"), symptom_tfidf.data)
+        np.save(os.path.join(tmp_path, "indices.npy"), symptom_tfidf.indices)
+        np.save(os.path.join(tmp_path, "indptr.npy"), symptom_tfidf.indptr)
+        np.save(os.path.join(tmp_path, "shape.npy"), np.array(symptom_tfidf.shape, dtype=np.int64))
+        os.rename(tmp_path, index_path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        # Another process may have published the same index first
+        if not os.path.isdir(index_path):
+            raise
+        return
+
+    fingerprints = [os.path.join(parent, d) for d in os.listdir(parent) if _is_fingerprint(d)]
+    for old in sorted(fingerprints, key=os.path.getmtime)[:-keep_indexes]:
+        if old != index_path:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _is_fingerprint(name: str) -> bool:
+    """True for directory names made by index_fingerprint (SHA-256 hex digests)."""
+    return len(name) == 64 and all(c in "0123456789abcdef" for c in name)
+
+
+def load_index(index_path: str) -> Tuple["TfidfVectorizer", "sp.csr_matrix"]:
+    """
+    Load an index saved by save_index, memory-mapping the matrix arrays.
+
+    Returns:
+        Tuple of (fitted vectorizer, read-only CSR symptom matrix).
+    """
+    import scipy.sparse as sp
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    with open(os.path.join(index_path, "vocabulary.json"), encoding="utf-8") as f:
+        terms = json.load(f)
+    vectorizer = TfidfVectorizer(stop_words='english', vocabulary={term: i for i, term in enumerate(terms)})
+    vectorizer.idf_ = np.load(os.path.join(index_path, "idf.npy"))
+
+    data = np.load(os.path.join(index_path, "data.npy"), mmap_mode="r")
+    indices = np.load(os.path.join(index_path, "indices.npy"), mmap_mode="r")
+    indptr = np.load(os.path.join(index_path, "indptr.npy"), mmap_mode="r")
+    shape = tuple(np.load(os.path.join(index_path, "shape.npy")).tolist())
+    symptom_tfidf = sp.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+    return vectorizer, symptom_tfidf
+
 
-        filtered_suggestions = [
-            suggestion for symptom, score, suggestion in matches if score >= threshold
-        ]
+def _top_k(indices: np.ndarray, scores: np.ndarray, top_k: int, num_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the top_k highest scores of one sparse result row, best first.
 
-        if not filtered_suggestions:
-            return ["No close matches found. Please consult a veterinarian for specific advice."]
+    Uses argpartition so only the k candidates are fully sorted. Rows with
+    fewer than top_k non-zero scores are padded with zero-score rows.
+    """
+    if len(scores) > top_k:
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        indices, scores = indices[candidates], scores[candidates]
+    order = np.argsort(-scores, kind="stable")
+    indices, scores = indices[order], scores[order]
 
-        return filtered_suggestions
+    missing = top_k - len(indices)
+    if missing > 0:
+        # Same as ranking zero scores: take the first rows that did not match
+        unmatched = np.setdiff1d(np.arange(min(num_rows, top_k + len(indices))), indices)[:missing]
+        indices = np.concatenate([indices, unmatched])
+        scores = np.concatenate([scores, np.zeros(missing)])
+    return indices, scores
 
 
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+# backend/token_utils.py
+
+from functools import lru_cache
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str = None):
+    # Imported on first use: tiktoken adds ~0.1 s to the import of every module counting tokens
+    try:
+        import tiktoken
+    except ImportError:  # tiktoken is optional; fall back to a character heuristic
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        # Encoding files are downloaded on first use and may be unavailable offline
+        print(f"[token_utils] tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """
+    Count tokens in a text for the given OpenAI model.
+
+    Uses tiktoken when it is installed, otherwise estimates ~4 characters per token.
+
+    Args:
+        text (str): Text to measure.
+        model (str): OpenAI model name (e.g. "gpt-4"). None uses the default encoding.
+
+    Returns:
+        int: Number of tokens.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,271 @@
+# backend/tracing.py
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+from config import get_setting
+
+DEFAULT_TRACE_LOG_PATH = "logs/traces.jsonl"
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Span:
+    __slots__ = ("trace", "name", "attributes", "started", "duration")
+
+    def __init__(self, trace: "Trace", name: str, attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.started = 0.0
+        self.duration = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.started
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        # list.append is atomic, so spans may finish on worker threads
+        self.trace.spans.append(self)
+        return False
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "start_ms": round((self.started - self.trace.started) * 1000, 3),
+                "duration_ms": round(self.duration * 1000, 3), **self.attributes}
+
+
+class Trace:
+    enabled = True
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        """
+        Timeline of one request: its spans (stages) and request-level attributes.
+
+        Args:
+            tracer (Tracer): Tracer the finished trace is reported to.
+            name (str): Request kind, e.g. "ask".
+            attributes (dict): Initial attributes.
+        """
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self.attributes = dict(attributes)
+
+    def span(self, name: str, **attributes) -> Span:
+        """Context manager timing one stage of the request."""
+        return Span(self, name, attributes)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, **attributes):
+        self.attributes.update(attributes)
+        self.duration = time.perf_counter() - self.started
+        self.tracer.record(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "duration_ms": round(self.duration * 1000, 3),
+            **self.attributes,
+            "spans": [span.to_dict() for span in sorted(self.spans, key=lambda span: span.started)],
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _NoopTrace:
+    __slots__ = ()
+    enabled = False
+
+    def span(self, name: str, **attributes) -> _NoopSpan:
+        return NOOP_SPAN
+
+    def set(self, **attributes):
+        pass
+
+    def finish(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+NOOP_TRACE = _NoopTrace()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False, log_path: Optional[str] = None, max_recent: int = 50):
+        """
+        Per-stage timing of requests, exported as JSONL logs and Prometheus metrics.
+
+        When disabled, start_trace returns a shared no-op trace whose spans do
+        nothing, so instrumented code costs a few attribute lookups per stage.
+
+        Args:
+            enabled (bool): Record traces.
+            log_path (str): JSONL file receiving one line per finished trace (None = no log file).
+            max_recent (int): Finished traces kept in memory for the debug panel.
+        """
+        self.enabled = enabled
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=max_recent)
+        self._log_file = None
+        self._stage_seconds: Dict[str, _Histogram] = defaultdict(_Histogram)
+        self._request_seconds: Dict[str, _Histogram] = defaultdict(_Histogram)
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._collectors: List[Callable[[], str]] = []
+
+    @classmethod
+    def from_settings(cls) -> "Tracer":
+        """Build a Tracer configured by the `dev` section of configs/settings.yaml."""
+        return cls(
+            enabled=get_setting("dev", "enable_logs", False),
+            log_path=get_setting("dev", "trace_log_path", DEFAULT_TRACE_LOG_PATH) or None,
+        )
+
+    def start_trace(self, name: str, **attributes):
+        """Start timing a request; returns a Trace, or a no-op trace when tracing is disabled."""
+        if not self.enabled:
+            return NOOP_TRACE
+        return Trace(self, name, attributes)
+
+    def record(self, trace: Trace):
+        """Fold a finished trace into the metrics, the recent list and the JSONL log."""
+        record = trace.to_dict()
+        attributes = trace.attributes
+        source = str(attributes.get("source", "unknown"))
+        with self._lock:
+            self._recent.append(record)
+            self._request_seconds[source].observe(trace.duration)
+            self._count("chatvet_requests_total", source=source)
+            for span in trace.spans:
+                self._stage_seconds[span.name].observe(span.duration)
+                if "error" in span.attributes:
+                    self._count("chatvet_errors_total", stage=span.name)
+            if "cache_hit" in attributes:
+                self._count("chatvet_answer_cache_lookups_total", result="hit" if attributes["cache_hit"] else "miss")
+            for key in ("prompt_tokens", "completion_tokens", "context_tokens_saved"):
+                if attributes.get(key):
+                    self._count(f"chatvet_{key}_total", value=attributes[key])
+            self._write(record)
+
+    def recent(self, limit: int = 20) -> List[dict]:
+        """Most recent finished traces, newest first."""
+        with self._lock:
+            return list(self._recent)[::-1][:limit]
+
+    def add_collector(self, collector: Callable[[], str]):
+        """Append the Prometheus text returned by `collector` to render_prometheus (for other components' metrics)."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric, histograms, label in (
+                ("chatvet_stage_seconds", self._stage_seconds, "stage"),
+                ("chatvet_request_seconds", self._request_seconds, "source"),
+            ):
+                lines.append(f"# TYPE {metric} histogram")
+                for name, histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+            typed = set()
+            for (metric, labels), value in sorted(self._counters.items()):
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{metric}{{{label_text}}} {value:g}" if label_text else f"{metric} {value:g}")
+            collectors = list(self._collectors)
+        text = "\n".join(lines) + "\n"
+        for collector in collectors:
+            text += collector()
+        return text
+
+    def close(self):
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+    def _count(self, metric: str, value: float = 1, **labels):
+        self._counters[(metric, tuple(sorted(labels.items())))] += value
+
+    def _write(self, record: dict):
+        if not self.log_path:
+            return
+        try:
+            if self._log_file is None:
+                if os.path.dirname(self.log_path):
+                    os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                self._log_file = open(self.log_path, "a", encoding="utf-8", buffering=1)
+            self._log_file.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            # Logging must never break answering
+            print(f"[Tracer] Could not write trace log: {e}")
+            self.log_path = None
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide Tracer (created from configs/settings.yaml on first use)."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer.from_settings()
+        return _tracer
@@ -0,0 +1,143 @@
+# benchmarks/bench_admission.py
+#
+# Load test of LLM admission control (backend/admission.py): one heavy user floods the chatbot from
+# many threads while light users ask now and then, from several processes sharing one admission store.
+# The LLM is a stub that slows down when more calls are in flight than the (simulated) organization
+# rate limit allows. Compares no admission control with per-user quotas + a global cap + fair queuing.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_admission.py --processes 4 --duration 10
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from langchain.schema import Document
+from langchain.schema.messages import AIMessageChunk
+from admission import AdmissionController, AdmissionRejected
+from chatbot import Chatbot
+from symptom_checker import SymptomChecker
+from tracing import Tracer
+
+
+class StubLLM:
+    def __init__(self, latency: float, capacity: int, in_flight, peak):
+        """Chat model stub: each call takes `latency`, stretched by how far in-flight calls exceed `capacity`."""
+        self.latency = latency
+        self.capacity = capacity
+        self.in_flight = in_flight
+        self.peak = peak
+        self.max_tokens = 256
+
+    def stream(self, prompt):
+        with self.in_flight.get_lock():
+            self.in_flight.value += 1
+            self.peak.value = max(self.peak.value, self.in_flight.value)
+            overload = max(1.0, self.in_flight.value / self.capacity)
+        try:
+            time.sleep(self.latency * overload)
+            yield AIMessageChunk(content="Offer small amounts of water and call your vet if it continues.")
+        finally:
+            with self.in_flight.get_lock():
+                self.in_flight.value -= 1
+
+
+class StubRetriever:
+    def get_relevant_documents(self, query):
+        return [Document(page_content="Vomiting cats should be offered water in small amounts.")]
+
+
+def worker(process: int, args, store_path, in_flight, peak, results):
+    csv_path = os.path.join(os.path.dirname(store_path), "guides.csv")
+    admission = None
+    if store_path.endswith(".sqlite"):
+        # Default per-user quotas; the free tier's shared bucket is sized for all the simulated light users
+        tiers = {"free": {"tier_rate_per_minute": 1200, "tier_burst": 100}, "subscriber": {}}
+        admission = AdmissionController(store_path, max_concurrency=args.capacity, max_queue=args.capacity * 4,
+                                        max_wait=args.max_wait, tiers=tiers)
+    chatbot = Chatbot(
+        llm=StubLLM(args.latency, args.capacity, in_flight, peak),
+        retriever=StubRetriever(),
+        symptom_checker=SymptomChecker(csv_path, index_dir=None),
+        answer_cache=None,
+        tracer=Tracer(enabled=False),
+        admission=admission,
+    )
+    deadline = time.monotonic() + args.duration
+    records = []
+
+    def ask(kind: str, user_id: str, tier: str, think_time: float):
+        n = 0
+        while time.monotonic() < deadline:
+            n += 1
+            started = time.perf_counter()
+            try:
+                chatbot.ask(f"Question {n} from {user_id}: my cat keeps vomiting", user_id=user_id, tier=tier)
+                outcome = "answered"
+            except AdmissionRejected as e:
+                outcome = e.reason
+            records.append((kind, outcome, time.perf_counter() - started))
+            time.sleep(think_time)
+
+    threads = [threading.Thread(target=ask, args=("heavy", "heavy", "subscriber", 0.0))
+               for _ in range(args.heavy_threads)]
+    threads += [threading.Thread(target=ask, args=("light", f"light{process}-{u}", "free", args.think_time))
+                for u in range(args.light_users)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    results.put(records)
+
+
+def run(args, store_path: str):
+    context = multiprocessing.get_context("fork")
+    in_flight, peak = context.Value("i", 0), context.Value("i", 0)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(p, args, store_path, in_flight, peak, results))
+                 for p in range(args.processes)]
+    for process in processes:
+        process.start()
+    records = [record for _ in processes for record in results.get()]
+    for process in processes:
+        process.join()
+    return records, peak.value
+
+
+def report(label: str, records, peak: int):
+    print(f"{label}: peak LLM calls in flight {peak}")
+    for kind in ("light", "heavy"):
+        mine = [(outcome, latency) for k, outcome, latency in records if k == kind]
+        outcomes = {outcome: sum(1 for o, _ in mine if o == outcome)
+                    for outcome in ("answered", "rate_limited", "busy")}
+        latencies = [latency for outcome, latency in mine if outcome == "answered"]
+        p50, p95 = (np.percentile(latencies, [50, 95]) * 1000) if latencies else (0.0, 0.0)
+        print(f"  {kind:5s} answered {outcomes['answered']:5d}  rate_limited {outcomes['rate_limited']:5d}  "
+              f"busy {outcomes['busy']:4d}  latency p50 {p50:6.0f} ms  p95 {p95:6.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load")
+    parser.add_argument("--heavy-threads", type=int, default=16,
+                        help="Concurrent requests of the heavy user per process")
+    parser.add_argument("--light-users", type=int, default=5, help="Light users per process")
+    parser.add_argument("--think-time", type=float, default=3.0, help="Seconds between a light user's questions")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per stub LLM call below capacity")
+    parser.add_argument("--capacity", type=int, default=8, help="LLM calls in flight before the stub slows down")
+    parser.add_argument("--max-wait", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "guides.csv"), "w") as f:
+            f.write("symptom,suggestion\nworms in stool,Start a deworming treatment\n")
+        print(f"{args.processes} processes x ({args.heavy_threads} heavy threads + {args.light_users} light users), "
+              f"{args.duration:.0f} s, stub LLM {args.latency * 1000:.0f} ms up to {args.capacity} in flight")
+        report("no admission control", *run(args, os.path.join(tmp, "none")))
+        report("admission control", *run(args, os.path.join(tmp, "admission.sqlite")))
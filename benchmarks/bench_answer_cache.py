@@ -0,0 +1,62 @@
+# benchmarks/bench_answer_cache.py
+#
+# Hit rate, lookup overhead and LLM time saved by the answer cache on a Zipf-distributed question stream.
+# Each topic has several phrasings: case/punctuation variants (exact hits) and rewordings whose
+# embeddings are close to the topic's (near-duplicate hits). LLM latency is simulated, not slept.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_answer_cache.py --questions 20000
+
+import argparse
+import time
+import numpy as np
+from answer_cache import AnswerCache
+from fake_services import fake_embedding_array
+
+
+def make_workload(rng: np.random.Generator, topics: int, questions: int):
+    variants = {}
+    for topic in range(topics):
+        base = f"my pet has symptom number {topic}"
+        for phrasing in (base, base.upper() + "?", f"{base}!!", f"pet showing symptom {topic} again",
+                         f"what to do about symptom {topic}"):
+            variants.setdefault(topic, []).append(phrasing)
+    ranks = np.minimum(rng.zipf(1.3, questions), topics) - 1
+    stream = [variants[topic][rng.integers(len(variants[topic]))] for topic in ranks]
+    topic_of = {phrasing: topic for topic, phrasings in variants.items() for phrasing in phrasings}
+    return stream, topic_of
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=20_000)
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--max-entries", type=int, default=1000)
+    parser.add_argument("--llm-seconds", type=float, default=3.0, help="Simulated RAG + LLM latency per miss")
+    args = parser.parse_args()
+
+    stream, topic_of = make_workload(np.random.default_rng(0), args.topics, args.questions)
+    by_normalized = {" ".join(q.lower().strip("?!").split()): topic for q, topic in topic_of.items()}
+
+    def embed_query(text):
+        topic = by_normalized[text]
+        return fake_embedding_array(str(topic), 1536) + 0.15 * fake_embedding_array(text, 1536)
+
+    for label, embed in (("exact only", None), ("exact + semantic", embed_query)):
+        cache = AnswerCache(max_entries=args.max_entries, embed_query=embed, version_check_interval=60)
+        lookup_ms = []
+        llm_seconds = 0.0
+        for question in stream:
+            started = time.perf_counter()
+            answer = cache.get(question)
+            lookup_ms.append((time.perf_counter() - started) * 1000)
+            if answer is None:
+                llm_seconds += args.llm_seconds
+                cache.put(question, f"answer {topic_of[question]}", latency=args.llm_seconds)
+
+        metrics = cache.metrics()
+        print(
+            f"{label:<17} hit_rate={metrics['hit_rate']:.3f} (exact {metrics['exact_hits']}, "
+            f"semantic {metrics['semantic_hits']})  lookup p50={np.percentile(lookup_ms, 50):.3f} ms "
+            f"p99={np.percentile(lookup_ms, 99):.3f} ms  LLM time {llm_seconds / 3600:.1f} h "
+            f"(saved {metrics['seconds_saved'] / 3600:.1f} h)"
+        )
@@ -0,0 +1,97 @@
+# benchmarks/bench_chat_history.py
+#
+# Chat-history store with many active users: append latency, recent-window reads (cached and cold),
+# paging older turns, in-memory size of the cached windows (tracemalloc), and append + read throughput
+# with several processes sharing one SQLite file.
+# Run from the repo root:
+#   PYTHONPATH=backend:auth:benchmarks python benchmarks/bench_chat_history.py --users 10000
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from chat_history import ChatHistoryStore
+
+MESSAGE = "My dog has been vomiting since this morning and does not want to eat, what should I do? " * 3
+
+
+def populate(path: str, users: int, messages_per_user: int):
+    store = ChatHistoryStore(path)
+    rows = [(f"user{u}", "user" if m % 2 == 0 else "bot", f"{MESSAGE} {m}", time.time())
+            for m in range(messages_per_user) for u in range(users)]
+    with store._lock:
+        store._conn.execute("BEGIN")
+        store._conn.executemany("INSERT INTO messages (user_id, role, content, created_at) VALUES (?, ?, ?, ?)", rows)
+        store._conn.execute("COMMIT")
+    store.close()
+
+
+def percentiles(samples) -> str:
+    values = np.asarray(samples) * 1e6
+    return f"p50={np.percentile(values, 50):7.1f} us  p99={np.percentile(values, 99):7.1f} us"
+
+
+def timed(operation, arguments):
+    samples = []
+    for argument in arguments:
+        started = time.perf_counter()
+        operation(argument)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def worker(path: str, users: int, operations: int, seed: int):
+    rng = random.Random(seed)
+    store = ChatHistoryStore(path)
+    for _ in range(operations):
+        user = f"user{rng.randrange(users)}"
+        store.append(user, "user", MESSAGE)
+        store.recent(user)
+    store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=20, help="Stored messages per user before the run")
+    parser.add_argument("--operations", type=int, default=5_000)
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.sqlite")
+        populate(path, args.users, args.messages)
+        print(f"{args.users} users x {args.messages} stored messages, window {args.window}")
+
+        store = ChatHistoryStore(path, window=args.window, max_cached_users=args.users)
+        users = [f"user{rng.randrange(args.users)}" for _ in range(args.operations)]
+        print(f"append            {percentiles(timed(lambda u: store.append(u, 'user', MESSAGE), users))}")
+        print(f"recent, cold      {percentiles(timed(store.recent, users))}")
+        print(f"recent, cached    {percentiles(timed(store.recent, users))}")
+        print(f"page of 20        {percentiles(timed(lambda u: store.page(u, limit=20), users))}")
+
+        tracemalloc.start()
+        windows = ChatHistoryStore(path, window=args.window, max_cached_users=args.users)
+        for u in range(args.users):
+            windows.recent(f"user{u}")
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"cached windows of all {args.users} users: {current / 1e6:.1f} MB")
+
+        for processes in args.processes:
+            context = multiprocessing.get_context("fork")
+            started = time.perf_counter()
+            workers = [context.Process(target=worker, args=(path, args.users, args.operations, seed))
+                       for seed in range(processes)]
+            for process in workers:
+                process.start()
+            for process in workers:
+                process.join()
+            elapsed = time.perf_counter() - started
+            print(f"{processes} process(es): {processes * args.operations / elapsed:8.0f} append+read/s")
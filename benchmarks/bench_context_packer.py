@@ -0,0 +1,76 @@
+# benchmarks/bench_context_packer.py
+#
+# Prompt tokens saved by ContextPacker on retrieval results that look like production ones:
+# top_k chunks produced by chunk_text (500 words, 50-word overlap), where a share of the hits are
+# neighboring chunks of the same guide and a share are copies of a chunk ingested twice.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_context_packer.py --requests 500
+
+import argparse
+import random
+import time
+import numpy as np
+from langchain.schema import Document
+from context_packer import ContextPacker
+from preprocessing import chunk_text
+from prompt_templates import symptom_triage_prompt
+from synthetic_data import ADVICE, BODY_PARTS, QUALIFIERS, SIGNS, SPECIES
+
+
+def make_guide(rng: random.Random, words: int) -> str:
+    sentences = []
+    while sum(len(s.split()) for s in sentences) < words:
+        sentences.append(f"A {rng.choice(SPECIES)} with {rng.choice(SIGNS)} of the {rng.choice(BODY_PARTS)} "
+                         f"{rng.choice(QUALIFIERS)}: {rng.choice(ADVICE)}")
+    return " ".join(sentences)
+
+
+def make_hits(rng: random.Random, guides, top_k: int, neighbor_share: float, duplicate_share: float):
+    """top_k retrieved chunks: neighbors of an earlier hit, re-ingested copies, or unrelated chunks."""
+    hits = []
+    while len(hits) < top_k:
+        roll = rng.random()
+        if hits and roll < neighbor_share:
+            guide, index = rng.choice(hits)
+            index = min(max(index + rng.choice((-1, 1)), 0), len(guides[guide]) - 1)
+        elif hits and roll < neighbor_share + duplicate_share:
+            guide, index = rng.choice(hits)
+        else:
+            guide = rng.randrange(len(guides))
+            index = rng.randrange(len(guides[guide]))
+        hits.append((guide, index))
+    return [Document(page_content=guides[guide][index]) for guide, index in hits]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--guides", type=int, default=200)
+    parser.add_argument("--guide-words", type=int, default=3000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--neighbor-share", type=float, default=0.3)
+    parser.add_argument("--duplicate-share", type=float, default=0.1)
+    parser.add_argument("--max-tokens", type=int, default=3000, help="Context token budget")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    guides = [chunk_text(make_guide(rng, args.guide_words), 500, 50) for _ in range(args.guides)]
+    requests = [make_hits(rng, guides, args.top_k, args.neighbor_share, args.duplicate_share)
+                for _ in range(args.requests)]
+
+    for label, max_tokens, threshold in (("dedup only", 0, 0.8), ("dedup + budget", args.max_tokens, 0.8)):
+        packer = ContextPacker(symptom_triage_prompt, max_context_tokens=max_tokens, context_window=100_000,
+                               near_duplicate_threshold=threshold)
+        packer.budget("warm up")  # token encoding and template tokens
+        latencies = []
+        for docs in requests:
+            started = time.perf_counter()
+            packer.pack(docs, "My dog is vomiting after meals, what should I do?")
+            latencies.append((time.perf_counter() - started) * 1000)
+        metrics = packer.metrics()
+        print(
+            f"{label:<15} context tokens {metrics['original_tokens'] / args.requests:.0f} -> "
+            f"{metrics['packed_tokens'] / args.requests:.0f} per request (saved {metrics['saved_ratio']:.1%}; "
+            f"merged {metrics['merged']}, dropped {metrics['dropped']}, truncated {metrics['truncated']})  "
+            f"pack p50={np.percentile(latencies, 50):.2f} ms p99={np.percentile(latencies, 99):.2f} ms"
+        )
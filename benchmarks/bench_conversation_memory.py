@@ -0,0 +1,39 @@
+# benchmarks/bench_conversation_memory.py
+#
+# Prompt size per turn of a long conversation: the whole history pasted into the prompt vs
+# ConversationMemory (running summary + last few turns), and the time spent updating the memory.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_conversation_memory.py --turns 50
+
+import argparse
+import time
+from conversation_memory import ConversationMemory
+from synthetic_data import make_queries
+from token_utils import count_tokens
+
+ANSWER = ("Offer small amounts of water every hour and keep an eye on her energy. "
+          "If the vomiting lasts more than a day, or there is blood, see a veterinarian. ") * 4
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--recent-turns", type=int, default=3)
+    args = parser.parse_args()
+
+    questions = make_queries(args.turns, seed=0)
+    memory = ConversationMemory(recent_turns=args.recent_turns)
+    history = []
+    update_seconds = 0.0
+    print(f"{'turn':>5} {'full history':>13} {'memory':>8}")
+    for turn, question in enumerate(questions, 1):
+        full = "\n".join(history + [f"Current question: {question}"])
+        bounded = memory.render(question)
+        if turn in (1, 2, 5, 10, 20, 30, 40, 50) or turn == args.turns:
+            print(f"{turn:5d} {count_tokens(full):13d} {count_tokens(bounded):8d}")
+
+        history += [f"Pet owner: {question}", f"Assistant: {ANSWER}"]
+        started = time.perf_counter()
+        memory.add_turn(question, ANSWER)
+        update_seconds += time.perf_counter() - started
+
+    print(f"memory update (extractive summary): {update_seconds / args.turns * 1e3:.2f} ms per turn")
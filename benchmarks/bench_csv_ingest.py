@@ -0,0 +1,88 @@
+# benchmarks/bench_csv_ingest.py
+#
+# Rows per second of CSV loading: the original row-by-row load_csv_symptom_data (df.iterrows + clean_text
+# per row) against the streaming, column-wise iter_csv_texts with the pandas and (if installed) Arrow
+# parsers, on synthetic symptom CSVs. With --trace-memory, each loader runs again under tracemalloc
+# to report its peak Python memory (traced runs are several times slower and are not timed).
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_csv_ingest.py --rows 10000 100000 1000000
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from preprocessing import clean_text, iter_csv_texts
+from synthetic_data import write_symptom_csv
+
+
+def legacy_load_csv_symptom_data(csv_path: str, text_columns=None):
+    """The original implementation: whole file in memory, one iterrows() row and regex at a time."""
+    df = pd.read_csv(csv_path)
+    if text_columns is None:
+        text_columns = df.select_dtypes(include=["object"]).columns.tolist()
+    texts = []
+    for _, row in df.iterrows():
+        combined = " ".join(str(row[col]) for col in text_columns if pd.notna(row[col]))
+        cleaned = clean_text(combined)
+        if cleaned:
+            texts.append(cleaned)
+    return texts
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        print(f"pyarrow unavailable, skipping the Arrow parser: {e}")
+        return False
+    return True
+
+
+def run(load, csv_path: str):
+    """(seconds, texts) of consuming a loader; streams are consumed without keeping the texts."""
+    started = time.perf_counter()
+    count = sum(1 for _ in load(csv_path))
+    return time.perf_counter() - started, count
+
+
+def peak_memory_mb(load, csv_path: str) -> float:
+    tracemalloc.start()
+    for _ in load(csv_path):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--legacy-max-rows", type=int, default=1_000_000,
+                        help="Skip the row-by-row baseline above this size")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report peak Python memory")
+    args = parser.parse_args()
+
+    loaders = {
+        "legacy iterrows": legacy_load_csv_symptom_data,
+        "streaming pandas": lambda path: iter_csv_texts(path, chunk_rows=args.chunk_rows, engine="pandas"),
+    }
+    if arrow_available():
+        loaders["streaming pyarrow"] = lambda path: iter_csv_texts(path, chunk_rows=args.chunk_rows,
+                                                                   engine="pyarrow")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            csv_path = write_symptom_csv(os.path.join(tmp, f"symptoms_{rows}.csv"), rows)
+            print(f"{rows} rows ({os.path.getsize(csv_path) / 2 ** 20:.0f} MB)")
+            baseline = None
+            for label, load in loaders.items():
+                if label.startswith("legacy") and rows > args.legacy_max_rows:
+                    continue
+                seconds, count = run(load, csv_path)
+                baseline = baseline or seconds
+                memory = f"  peak {peak_memory_mb(load, csv_path):6.1f} MB" if args.trace_memory else ""
+                print(f"  {label:<18} {seconds:7.2f} s  {count / seconds:>10,.0f} rows/s  "
+                      f"x{baseline / seconds:5.1f}{memory}")
@@ -0,0 +1,61 @@
+# benchmarks/bench_embedder.py
+#
+# Embedding throughput against a local fake OpenAI embeddings server
+# (run in a separate process, see fake_services.py).
+# Run from the repo root:
+#   PYTHONPATH=backend:embeddings:benchmarks python benchmarks/bench_embedder.py --chunks 20000
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from async_embedder import AsyncEmbedder
+
+FAKE_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_services.py")
+
+
+@contextmanager
+def fake_server_process(*server_args):
+    proc = subprocess.Popen([sys.executable, FAKE_SERVER, *server_args], stdout=subprocess.PIPE, text=True)
+    try:
+        yield proc.stdout.readline().strip()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def bench(label: str, server_args: list, num_chunks: int, **embedder_kwargs) -> float:
+    texts = [f"synthetic vet guide chunk {i} " + "word " * 300 for i in range(num_chunks)]
+    with fake_server_process(*server_args) as url:
+        embedder = AsyncEmbedder(api_key="bench", api_base=url, **embedder_kwargs)
+        start = time.perf_counter()
+        asyncio.run(embedder.embed(texts))
+        elapsed = time.perf_counter() - start
+    print(
+        f"{label:<34} chunks={num_chunks:>7,} {num_chunks / elapsed:9.1f} chunks/s  "
+        f"requests={embedder.requests_sent:>6,} retries={embedder.retries}"
+    )
+    return num_chunks / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake server latency per request (s)")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--tpm", type=float, default=10_000_000, help="tokens-per-minute limit")
+    args = parser.parse_args()
+
+    server_args = ["--latency", str(args.latency), "--per-input-latency", "0.0005", "--dim", str(args.dim)]
+    limits = {"tokens_per_minute": args.tpm, "backoff_base": 0.1}
+
+    legacy = bench("1 per request, sequential", server_args, min(args.chunks, 50),
+                   max_batch_size=1, max_concurrency=1, **limits)
+    print(f"{'  + legacy 0.5s sleep (estimated)':<34} {' ' * 14}{1 / (1 / legacy + 0.5):9.1f} chunks/s")
+    bench("batch=100, concurrency=1", server_args, args.chunks, max_batch_size=100, max_concurrency=1, **limits)
+    bench("batch=100, concurrency=8", server_args, args.chunks, max_batch_size=100, max_concurrency=8, **limits)
+    bench("batch=100, concurrency=8, 10x 429", server_args + ["--fail-first", "10"], args.chunks,
+          max_batch_size=100, max_concurrency=8, **limits)
@@ -0,0 +1,141 @@
+# benchmarks/bench_hybrid_retrieval.py
+#
+# Retrieval quality and latency of lexical-only, vector-only and fused (RRF / weighted) retrieval.
+# Half of the questions name a symptom with the exact term used in the symptom CSV (easy for TF-IDF),
+# half with a synonym the CSV never uses (only the vector search can find those). Question and guide
+# embeddings are a shared per-topic direction plus noise, so the vector search is good but not perfect.
+# Latency compares running the two searches one after the other with running them concurrently;
+# the vector search latency is simulated.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_hybrid_retrieval.py --rows 100000
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from langchain.schema import Document
+from fake_services import fake_embedding_array
+from hybrid_retriever import HybridRetriever
+from symptom_checker import SymptomChecker
+
+ANIMALS = ["dog", "cat", "rabbit", "parrot", "hamster"]
+
+
+class NumpyVectorStore:
+    def __init__(self, texts, vectors: np.ndarray, embed_query, latency: float = 0.0):
+        """In-memory cosine search over precomputed vectors, with a simulated network latency."""
+        self.texts = texts
+        self.vectors = vectors
+        self.embed_query = embed_query
+        self.latency = latency
+
+    def similarity_search_with_score(self, query: str, k: int = 5):
+        time.sleep(self.latency)
+        scores = self.vectors @ self.embed_query(query)
+        top = np.argsort(-scores)[:k]
+        return [(Document(page_content=self.texts[i]), float(scores[i])) for i in top]
+
+
+class VectorRetriever:
+    def __init__(self, vectorstore, k: int):
+        self.vectorstore = vectorstore
+        self.search_kwargs = {"k": k}
+
+
+def unit(vector: np.ndarray) -> np.ndarray:
+    return vector / np.linalg.norm(vector)
+
+
+def make_corpus(rows: int, topics: int, dim: int, noise: float, seed: int = 0):
+    """Symptom CSV rows, vector guides and questions; every question has one relevant topic."""
+    rng = np.random.default_rng(seed)
+    concept = {topic: fake_embedding_array(f"topic {topic}", dim) for topic in range(topics)}
+
+    # Topics own the first rows; the rest are unrelated filler that still shares the animal words
+    symptoms = [f"{ANIMALS[topic % len(ANIMALS)]} showing term{topic}" for topic in range(topics)]
+    symptoms += [f"{ANIMALS[row % len(ANIMALS)]} showing filler{row}" for row in range(topics, rows)]
+    suggestions = [f"advice {row}" for row in range(rows)]
+    topic_of = {f"Symptom: {s}\nSuggestion: {a}": row for row, (s, a) in enumerate(zip(symptoms, suggestions))
+                if row < topics}
+
+    guides = [f"Guide {topic}: caring for a pet with term{topic}" for topic in range(topics)]
+    guide_vectors = np.stack([unit(concept[t] + noise * rng.standard_normal(dim)) for t in range(topics)])
+    topic_of.update({guide: topic for topic, guide in enumerate(guides)})
+
+    questions, query_vectors = [], {}
+    for topic in range(topics):
+        animal = ANIMALS[topic % len(ANIMALS)]
+        for word in (f"term{topic}", f"alias{topic}"):
+            question = f"my {animal} has {word} since yesterday"
+            questions.append((question, topic, word.startswith("term")))
+            query_vectors[question] = unit(concept[topic] + noise * rng.standard_normal(dim)).astype(np.float32)
+    return symptoms, suggestions, guides, guide_vectors.astype(np.float32), questions, query_vectors, topic_of
+
+
+def quality(hybrid: HybridRetriever, questions, topic_of, mode: str, k: int):
+    """recall@k and MRR of one retrieval mode, overall and for exact-term / synonym questions."""
+    found = {True: [], False: []}
+    for question, topic, exact_term in questions:
+        lexical = hybrid.search_lexical(question) if mode != "vector" else []
+        vector = hybrid.search_vector(question) if mode != "lexical" else []
+        docs = hybrid.fuse(lexical, vector)[:k]
+        ranks = [rank for rank, doc in enumerate(docs) if topic_of.get(doc.page_content) == topic]
+        found[exact_term].append(1.0 / (ranks[0] + 1) if ranks else 0.0)
+    everything = found[True] + found[False]
+    return {
+        "recall": np.mean([rr > 0 for rr in everything]),
+        "mrr": np.mean(everything),
+        "recall_term": np.mean([rr > 0 for rr in found[True]]),
+        "recall_synonym": np.mean([rr > 0 for rr in found[False]]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in the symptom CSV")
+    parser.add_argument("--topics", type=int, default=500, help="Symptoms with a guide and questions")
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--noise", type=float, default=0.17, help="Embedding noise (higher = weaker vector search)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--vector-latency-ms", type=float, default=30.0)
+    parser.add_argument("--latency-queries", type=int, default=50)
+    args = parser.parse_args()
+
+    symptoms, suggestions, guides, guide_vectors, questions, query_vectors, topic_of = make_corpus(
+        args.rows, args.topics, args.dim, args.noise)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "symptoms.csv")
+        pd.DataFrame({"symptom": symptoms, "suggestion": suggestions}).to_csv(csv_path, index=False)
+        checker = SymptomChecker(csv_path, index_dir=None)
+
+    store = NumpyVectorStore(guides, guide_vectors, query_vectors.__getitem__)
+    retriever = VectorRetriever(store, args.k)
+
+    print(f"{len(questions)} questions, {args.rows} symptom rows, {args.topics} guides, k={args.k}")
+    for fusion in ("rrf", "weighted"):
+        hybrid = HybridRetriever(checker, retriever, fusion=fusion, top_k=args.k, lexical_top_k=args.k)
+        modes = ("lexical", "vector", "hybrid") if fusion == "rrf" else ("hybrid",)
+        for mode in modes:
+            result = quality(hybrid, questions, topic_of, mode, args.k)
+            label = mode if mode != "hybrid" else f"hybrid ({fusion})"
+            print(f"{label:<17} recall@{args.k}={result['recall']:.3f} MRR={result['mrr']:.3f}  "
+                  f"(exact term {result['recall_term']:.3f}, synonym {result['recall_synonym']:.3f})")
+        hybrid.close()
+
+    store.latency = args.vector_latency_ms / 1000
+    hybrid = HybridRetriever(checker, retriever, top_k=args.k)
+    sample = [question for question, _, _ in questions[:args.latency_queries]]
+    for label in ("sequential", "concurrent"):
+        latencies = []
+        for question in sample:
+            started = time.perf_counter()
+            if label == "sequential":
+                hybrid.fuse(hybrid.search_lexical(question), hybrid.search_vector(question))
+            else:
+                hybrid.retrieve(question)
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(f"{label:<11} p50={np.percentile(latencies, 50):.1f} ms p95={np.percentile(latencies, 95):.1f} ms")
+    hybrid.close()
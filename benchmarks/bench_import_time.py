@@ -0,0 +1,90 @@
+# benchmarks/bench_import_time.py
+#
+# Cold import time of the app's entry modules, measured like `python -X importtime`, with the
+# heaviest third-party packages each one pulls in. tests/test_import_time.py enforces IMPORT_BUDGETS.
+# Run from the repo root:
+#   PYTHONPATH=backend:embeddings:auth:app python benchmarks/bench_import_time.py
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict
+
+# Folders the modules import each other from (as in PYTHONPATH), relative to the repo root
+SOURCE_DIRS = ["backend", "embeddings", "auth", "app", "benchmarks"]
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that must only be imported when first used
+HEAVY_PACKAGES = ["langchain", "openai", "pinecone", "sklearn", "scipy", "pandas", "fitz", "tiktoken"]
+
+# Cumulative import-time budget in seconds per module, generous enough for slow CI machines
+IMPORT_BUDGETS = {
+    "chatbot": 1.5,
+    "resources": 0.5,
+    "retriever": 0.5,
+    "symptom_checker": 1.0,
+    "preprocessing": 0.5,
+    "local_vectorstore": 1.0,
+    "answer_cache": 1.0,
+    "context_packer": 0.5,
+    "tracing": 0.5,
+    "server": 2.0,
+    "ingest_pipeline": 1.0,
+    "incremental_index": 1.0,
+    # embeddings/embed.py reads OPENAI_API_KEY on import; measure_import provides a placeholder
+    "embed": 1.0,
+    "async_embedder": 0.5,
+    # What the Streamlit pages (app/main.py, app/sidebar.py) import besides streamlit itself;
+    # the pages are scripts run by `streamlit run` and are not importable as modules
+    "chat_history": 0.5,
+    "admission": 0.5,
+    "conversation_memory": 0.5,
+    "knowledge_base": 1.0,
+}
+
+
+def measure_import(module: str) -> Dict:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        {"seconds": cumulative import time, "packages": {top-level package: seconds spent in it}}
+    """
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "import-time-benchmark"))
+    # Importable however the parent was started (e.g. by pytest.ini's pythonpath, which is not inherited)
+    path = [os.path.join(REPO_ROOT, folder) for folder in SOURCE_DIRS]
+    env["PYTHONPATH"] = os.pathsep.join(path + [env["PYTHONPATH"]] if env.get("PYTHONPATH") else path)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    seconds = 0.0
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1e6
+        if name.strip() == module:
+            seconds = int(cumulative_us) / 1e6
+    return {"seconds": seconds, "packages": dict(packages)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS))
+    parser.add_argument("--top", type=int, default=4, help="Heaviest packages listed per module")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        measured = measure_import(module)
+        budget = IMPORT_BUDGETS.get(module)
+        status = "" if budget is None else ("ok" if measured["seconds"] <= budget else "OVER BUDGET")
+        heaviest = sorted(measured["packages"].items(), key=lambda item: -item[1])[:args.top]
+        heavy = sorted(set(measured["packages"]) & set(HEAVY_PACKAGES))
+        print(f"{module:<18} {measured['seconds'] * 1000:8.1f} ms  budget={budget}s {status}")
+        print(f"{'':<18} top: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in heaviest))
+        if heavy:
+            print(f"{'':<18} heavy packages imported eagerly: {', '.join(heavy)}")
@@ -0,0 +1,74 @@
+# benchmarks/bench_incremental_index.py
+#
+# Full build vs. incremental re-index after editing 1% of the chunks.
+# Embedding and upsert calls go to local fakes with simulated latency.
+# Run from the repo root:
+#   PYTHONPATH=backend:embeddings:benchmarks python benchmarks/bench_incremental_index.py
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from embedding_cache import EmbeddingCache, IndexManifest
+from incremental_index import sync_sources
+from fake_services import FakePineconeIndex, fake_embedding
+
+
+def make_embedder(per_text_latency: float):
+    def embed(texts):
+        time.sleep(per_text_latency * len(texts))
+        return [fake_embedding(text, 256) for text in texts]
+    return embed
+
+
+def load_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def timed_sync(files, db_path, index, embed):
+    start = time.perf_counter()
+    stats = sync_sources(files, load_lines, embed, EmbeddingCache(db_path), IndexManifest(db_path),
+                         "bench-model", index=index)
+    return time.perf_counter() - start, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sources", type=int, default=200)
+    parser.add_argument("--chunks-per-source", type=int, default=100)
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of chunks to edit")
+    parser.add_argument("--embed-latency", type=float, default=0.002, help="simulated seconds per embedded chunk")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    embed = make_embedder(args.embed_latency)
+    index = FakePineconeIndex(latency=0.005)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for s in range(args.sources):
+            path = os.path.join(tmp, f"guide_{s}.txt")
+            with open(path, "w") as f:
+                f.write("\n".join(f"guide {s} chunk {c} " + "text " * 80 for c in range(args.chunks_per_source)))
+            files[f"guide_{s}"] = path
+        db_path = os.path.join(tmp, "cache.sqlite")
+
+        full_time, full_stats = timed_sync(files, db_path, index, embed)
+        print(f"full build:     {full_time:7.2f}s  {full_stats}")
+
+        noop_time, noop_stats = timed_sync(files, db_path, index, embed)
+        print(f"no changes:     {noop_time:7.2f}s  {noop_stats}")
+
+        total = args.sources * args.chunks_per_source
+        for _ in range(int(total * args.changed)):
+            path = files[f"guide_{rng.randrange(args.sources)}"]
+            lines = load_lines(path)
+            lines[rng.randrange(len(lines))] = f"edited {rng.random()} " + "text " * 80
+            with open(path, "w") as f:
+                f.write("\n".join(lines))
+
+        inc_time, inc_stats = timed_sync(files, db_path, index, embed)
+        print(f"{args.changed:.0%} changed:    {inc_time:7.2f}s  {inc_stats}")
+        print(f"incremental / full = {inc_time / full_time:.1%}")
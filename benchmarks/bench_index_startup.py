@@ -0,0 +1,69 @@
+# benchmarks/bench_index_startup.py
+#
+# SymptomChecker startup time and memory with and without the cached index.
+# Each measurement runs in a fresh interpreter so RSS is not polluted by earlier runs.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_index_startup.py --rows 10000 1000000
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from synthetic_data import write_symptom_csv
+
+CHILD = r"""
+import json, resource, sys, time
+from symptom_checker import SymptomChecker
+
+csv_path, index_dir = sys.argv[1], sys.argv[2] or None
+start = time.perf_counter()
+checker = SymptomChecker(csv_path, index_dir=index_dir)
+checker.find_closest_symptoms("dog vomiting at night")
+elapsed = time.perf_counter() - start
+
+mem = {}
+try:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean"):
+                mem[key] = int(value.split()[0])
+except OSError:
+    mem["Rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "mem_kb": mem}))
+"""
+
+
+def run_child(csv_path: str, index_dir: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, csv_path, index_dir],
+        check=True, capture_output=True, text=True, env=os.environ,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(label: str, result: dict):
+    mem = result["mem_kb"]
+    private = mem.get("Private_Clean", 0) + mem.get("Private_Dirty", 0)
+    print(
+        f"  {label:<14} startup={result['seconds']:7.2f}s  "
+        f"rss={mem.get('Rss', 0) / 1024:8.1f} MiB  private={private / 1024:8.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = write_symptom_csv(os.path.join(tmp, "symptoms.csv"), rows)
+            index_dir = os.path.join(tmp, "index_cache")
+
+            print(f"rows={rows:,}")
+            report("no cache", run_child(csv_path, ""))
+            report("cold (build)", run_child(csv_path, index_dir))
+            report("warm (mmap)", run_child(csv_path, index_dir))
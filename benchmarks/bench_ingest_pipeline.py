@@ -0,0 +1,103 @@
+# benchmarks/bench_ingest_pipeline.py
+#
+# Three blocking phases vs. the streaming IngestPipeline: wall time and peak
+# Python memory (tracemalloc) as the corpus grows. Extraction, embedding and
+# upserts have simulated latencies; the index is an in-memory fake.
+# Run from the repo root:
+#   PYTHONPATH=backend:embeddings:benchmarks python benchmarks/bench_ingest_pipeline.py
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from embedding_cache import EmbeddingCache, IndexManifest
+from ingest_pipeline import IngestPipeline
+from fake_services import fake_embedding
+
+DIM = 256
+
+
+class DiscardingIndex:
+    """Fake index that drops vectors, so its own storage does not count towards peak memory."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def upsert(self, vectors, **kwargs):
+        time.sleep(self.latency)
+
+    def delete(self, ids=None, **kwargs):
+        time.sleep(self.latency)
+
+
+def make_corpus(tmp, num_sources, chunks_per_source):
+    sources = {}
+    for s in range(num_sources):
+        path = os.path.join(tmp, f"guide_{s}.txt")
+        with open(path, "w") as f:
+            f.write("\n".join(f"guide {s} chunk {c} " + "text " * 100 for c in range(chunks_per_source)))
+        sources[f"guide_{s}"] = path
+    return sources
+
+
+def load_chunks(path, extract_latency):
+    with open(path) as f:
+        for line in f:
+            time.sleep(extract_latency)
+            yield line.rstrip("\n")
+
+
+def embed(texts, latency):
+    time.sleep(latency * len(texts))
+    return [fake_embedding(text, DIM) for text in texts]
+
+
+def sequential(sources, args, index):
+    """The old run_embedding_pipeline shape: collect everything, embed everything, then upsert."""
+    chunks = [chunk for path in sources.values() for chunk in load_chunks(path, args.extract_latency)]
+    vectors = embed(chunks, args.embed_latency)
+    for i in range(0, len(chunks), 100):
+        index.upsert(vectors=list(zip(range(i, i + 100), vectors[i:i + 100])))
+
+
+def pipelined(sources, args, index, db_path):
+    pipeline = IngestPipeline(
+        lambda path: load_chunks(path, args.extract_latency),
+        lambda texts: embed(texts, args.embed_latency),
+        EmbeddingCache(db_path), IndexManifest(db_path), "bench-model",
+        index=index, batch_size=100, queue_size=args.queue_size, report_every=0,
+    )
+    pipeline.run(sources)
+    return pipeline
+
+
+def measure(fn, *fn_args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*fn_args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[5_000, 20_000])
+    parser.add_argument("--sources", type=int, default=50)
+    parser.add_argument("--queue-size", type=int, default=500)
+    parser.add_argument("--extract-latency", type=float, default=0.0002)
+    parser.add_argument("--embed-latency", type=float, default=0.0005)
+    parser.add_argument("--upsert-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    for total in args.chunks:
+        with tempfile.TemporaryDirectory() as tmp:
+            sources = make_corpus(tmp, args.sources, total // args.sources)
+            index = DiscardingIndex(args.upsert_latency)
+
+            seq_time, seq_peak, _ = measure(sequential, sources, args, index)
+            pipe_time, pipe_peak, pipeline = measure(pipelined, sources, args, index, os.path.join(tmp, "c.sqlite"))
+            print(f"chunks={total:>7,}  sequential {seq_time:6.2f}s peak {seq_peak:7.1f} MiB  |  "
+                  f"pipelined {pipe_time:6.2f}s peak {pipe_peak:7.1f} MiB  max queue depths {pipeline.max_queue_depth}")
@@ -0,0 +1,117 @@
+# benchmarks/bench_kb_reload.py
+#
+# Steady traffic while the symptom CSV is replaced halfway through.
+# Compares picking up the new CSV by restarting (requests wait while the chatbot is rebuilt)
+# with hot reload (the watcher rebuilds in the background and swaps the new version in).
+# The LLM and the retriever are stubs with fixed latency; the symptom checker is real.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_kb_reload.py --rows 200000
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+from langchain.schema import Document
+from langchain.schema.messages import AIMessageChunk
+from chatbot import Chatbot
+from knowledge_base import KnowledgeBaseWatcher, build_symptom_checker
+from symptom_checker import SymptomChecker
+from synthetic_data import make_queries, write_symptom_csv
+from tracing import Tracer
+
+
+class StubLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def stream(self, prompt):
+        time.sleep(self.latency)
+        yield AIMessageChunk(content="Offer water.")
+
+
+class StubRetriever:
+    def get_relevant_documents(self, query):
+        return [Document(page_content="Offer water in small amounts.")]
+
+
+def make_chatbot(args, csv_path: str) -> Chatbot:
+    return Chatbot(
+        llm=StubLLM(args.llm_latency),
+        retriever=StubRetriever(),
+        # A restarted app refits the changed CSV
+        symptom_checker=SymptomChecker(csv_path, index_dir=None),
+        answer_cache=None,
+        tracer=Tracer(enabled=False),
+    )
+
+
+def run(args, hot: bool, csv_path: str):
+    write_symptom_csv(csv_path, args.rows, seed=0)
+    chatbot = make_chatbot(args, csv_path)
+    queries = make_queries(1000)
+    serving = threading.Lock()  # held while a restarting app cannot answer
+    latencies = []
+    stop = threading.Event()
+
+    def user(worker: int):
+        i = worker
+        while not stop.is_set():
+            asked = time.perf_counter()
+            with serving:
+                bot = state["chatbot"]
+            bot.ask(queries[i % len(queries)])
+            latencies.append(time.perf_counter() - asked)
+            i += args.users
+
+    def change():
+        time.sleep(args.seconds / 2)
+        write_symptom_csv(csv_path, args.rows, seed=1)
+        started = time.perf_counter()
+        if hot:
+            # Two checks: the first sees the change, the second applies it once the file has settled
+            watcher.check()
+            watcher.check()
+        else:
+            with serving:
+                state["chatbot"] = make_chatbot(args, csv_path)
+        state["switch_seconds"] = time.perf_counter() - started
+
+    state = {"chatbot": chatbot}
+    # The watcher fits the new index in a separate process, then memory-maps it
+    index_dir = os.path.join(os.path.dirname(csv_path), "index_cache")
+    watcher = KnowledgeBaseWatcher(chatbot, StubRetriever, lambda path: build_symptom_checker(path, index_dir),
+                                   csv_path=csv_path, pdf_folder=os.path.join(os.path.dirname(csv_path), "pdfs"))
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(args.users)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        change()
+        time.sleep(args.seconds / 2)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    rate = len(latencies) / (time.perf_counter() - started)
+    p50, p99, worst = np.percentile(latencies, [50, 99, 100]) * 1000
+    print(f"{'hot reload' if hot else 'restart':10s}  {rate:5.1f} answers/s  latency p50 {p50:5.0f} ms  "
+          f"p99 {p99:6.0f} ms  max {worst:6.0f} ms  new version live after {state['switch_seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000, help="Rows of the symptom CSV")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "vet_guides.csv")
+        print(f"{args.users} users for {args.seconds:.0f} s, {args.rows} CSV rows replaced halfway, "
+              f"stub LLM {args.llm_latency * 1000:.0f} ms")
+        for hot in (False, True):
+            run(args, hot, csv_path)
@@ -0,0 +1,78 @@
+# benchmarks/bench_local_vectorstore.py
+#
+# Query latency and recall@k of the local vector store: exact scan vs IVF at several nprobe values.
+# Vectors are drawn from a Gaussian mixture so they cluster like real embeddings.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_local_vectorstore.py --vectors 100000 --dim 384
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from fake_services import FakeEmbeddings
+from local_vectorstore import LocalIndexWriter, LocalVectorStore
+
+
+def clustered_vectors(rng: np.random.Generator, n: int, dim: int, clusters: int) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centers[labels] + 0.8 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def build_index(path: str, vectors: np.ndarray, ivf_lists: int, batch_size: int = 5000) -> float:
+    writer = LocalIndexWriter(path)
+    for start in range(0, len(vectors), batch_size):
+        writer.upsert(
+            (f"v{i}", vectors[i].tolist(), {"text": f"chunk {i}"})
+            for i in range(start, min(start + batch_size, len(vectors)))
+        )
+    started = time.perf_counter()
+    writer.publish(ivf_lists=ivf_lists)
+    return time.perf_counter() - started
+
+
+def measure(store: LocalVectorStore, queries: np.ndarray, k: int, exact: bool):
+    rows, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        found, _ = store.search(query, k=k, exact=exact)
+        latencies.append(time.perf_counter() - started)
+        rows.append(set(found.tolist()))
+    return rows, np.array(latencies) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ivf-lists", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(rng, args.vectors, args.dim, clusters=4 * args.ivf_lists)
+    queries = vectors[rng.integers(0, args.vectors, args.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "local_index")
+        publish_seconds = build_index(path, vectors, args.ivf_lists)
+        print(f"vectors={args.vectors:,} dim={args.dim} ivf_lists={args.ivf_lists} publish={publish_seconds:.1f}s")
+
+        started = time.perf_counter()
+        store = LocalVectorStore(path, FakeEmbeddings(args.dim))
+        print(f"  open (mmap)    {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+        truth, latencies = measure(store, queries, args.k, exact=True)
+        print(f"  exact          p50={np.percentile(latencies, 50):7.2f} ms  "
+              f"p95={np.percentile(latencies, 95):7.2f} ms  recall@{args.k}=1.000")
+
+        for nprobe in args.nprobe:
+            store.nprobe = nprobe
+            found, latencies = measure(store, queries, args.k, exact=False)
+            recall = np.mean([len(f & t) / args.k for f, t in zip(found, truth)])
+            print(f"  ivf nprobe={nprobe:<3} p50={np.percentile(latencies, 50):7.2f} ms  "
+                  f"p95={np.percentile(latencies, 95):7.2f} ms  recall@{args.k}={recall:.3f}")
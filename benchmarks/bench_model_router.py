@@ -0,0 +1,94 @@
+# benchmarks/bench_model_router.py
+#
+# A mix of easy questions (short, with a confident retrieval match) and hard ones.
+# Compares answer latency and model cost when every answer goes to the strong model
+# and when easy questions are routed to the fast one; a fraction of strong calls stall
+# before their first token, to show the first-token fallback. A stalled call is not
+# cancelled by the fallback: it runs on in the background until its first chunk.
+# The models are stubs with fixed latencies; cost is counted in per-model token prices.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_model_router.py --questions 200
+
+import argparse
+import logging
+import random
+import time
+import numpy as np
+from langchain.schema import Document
+from langchain.schema.messages import AIMessageChunk
+from model_router import ModelRouter, Route
+
+# USD per 1K completion tokens
+PRICES = {"fast": 0.002, "strong": 0.06}
+
+
+class StubLLM:
+    def __init__(self, name: str, latency: float, stall_rate: float = 0.0, stall: float = 0.0, seed: int = 0):
+        self.name = name
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.tokens = 0
+        self.rng = random.Random(seed)
+
+    def stream(self, prompt):
+        if self.rng.random() < self.stall_rate:
+            time.sleep(self.stall)
+        for _ in range(20):
+            time.sleep(self.latency / 20)
+            self.tokens += 1
+            yield AIMessageChunk(content="token ")
+
+
+def questions(count: int, easy_share: float, rng: random.Random):
+    for _ in range(count):
+        if rng.random() < easy_share:
+            yield "How much water should my puppy drink?", rng.uniform(0.86, 0.97)
+        else:
+            yield ("My older cat has been drinking more, losing weight and sometimes vomiting after meals, "
+                   "what could be going on?"), rng.uniform(0.6, 0.84)
+
+
+def run(args, routed: bool):
+    fast = StubLLM("fast", args.fast_latency)
+    strong = StubLLM("strong", args.strong_latency, args.stall_rate, args.stall, seed=1)
+    router = ModelRouter({
+        "fast": Route("fast", "gpt-3.5-turbo", expected_latency=args.fast_latency, llm=fast),
+        "strong": Route("strong", "gpt-4", expected_latency=args.strong_latency,
+                        first_token_timeout=args.first_token_timeout, fallback="fast", llm=strong),
+    })
+    if not routed:
+        router.easy_route = "strong"
+    latencies = []
+    for question, score in questions(args.questions, args.easy_share, random.Random(0)):
+        started = time.perf_counter()
+        decision = router.route(question, [], [(Document(page_content="..."), score)])
+        for _ in router.stream(decision, "prompt"):
+            pass
+        latencies.append(time.perf_counter() - started)
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    cost = (fast.tokens * PRICES["fast"] + strong.tokens * PRICES["strong"]) / 1000
+    stats = router.metrics()
+    strong_stats = stats["strong"]
+    print(f"routed={str(routed):5s}  answers fast {stats['fast']['answers']:4d} "
+          f"strong {strong_stats['answers']:4d}  fallbacks {strong_stats['fallbacks']:3d} "
+          f"(abandoned calls ran on {strong_stats['abandoned_seconds']:.1f}s)  "
+          f"latency p50 {p50:5.0f} ms  p95 {p95:5.0f} ms  cost ${cost:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--easy-share", type=float, default=0.6, help="Share of easy questions")
+    parser.add_argument("--fast-latency", type=float, default=0.03)
+    parser.add_argument("--strong-latency", type=float, default=0.12)
+    parser.add_argument("--stall-rate", type=float, default=0.05, help="Share of strong calls that stall")
+    parser.add_argument("--stall", type=float, default=1.0, help="Seconds a stalled call sends nothing")
+    parser.add_argument("--first-token-timeout", type=float, default=0.3)
+    args = parser.parse_args()
+    logging.getLogger("model_router").setLevel(logging.ERROR)  # one fallback warning per stall
+
+    print(f"{args.questions} questions, {args.easy_share:.0%} easy, stub models fast {args.fast_latency * 1000:.0f} ms "
+          f"/ strong {args.strong_latency * 1000:.0f} ms, {args.stall_rate:.0%} strong stalls")
+    for routed in (False, True):
+        run(args, routed)
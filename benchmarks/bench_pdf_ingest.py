@@ -0,0 +1,59 @@
+# benchmarks/bench_pdf_ingest.py
+#
+# PDF extraction + chunking throughput with 1, 4 and N worker processes.
+# Run from the repo root:
+#   PYTHONPATH=backend python benchmarks/bench_pdf_ingest.py --files 8 --pages 300
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import fitz
+from preprocessing import chunk_text, extract_text_from_pdf, iter_pdf_chunks
+
+WORDS = ("dog cat puppy kitten vomiting diarrhea hydration vet fever appetite lethargy "
+         "vaccine deworming flea tick ear infection skin allergy diet weight exercise").split()
+
+
+def make_pdf(path: str, num_pages: int, seed: int) -> str:
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(num_pages):
+        page = doc.new_page()
+        lines = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(60)]
+        page.insert_text((36, 36), "\n".join(lines), fontsize=7)
+    doc.save(path)
+    return path
+
+
+def legacy_ingest(paths):
+    """Original approach: one file after another, whole text then all chunks in a list."""
+    all_chunks = []
+    for path in paths:
+        all_chunks.extend(chunk_text(extract_text_from_pdf(path)))
+    return len(all_chunks)
+
+
+def streaming_ingest(paths, workers):
+    return sum(1 for _ in iter_pdf_chunks(paths, workers=workers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [make_pdf(os.path.join(tmp, f"guide_{i}.pdf"), args.pages, i) for i in range(args.files)]
+        print(f"{args.files} PDFs x {args.pages} pages")
+
+        start = time.perf_counter()
+        count = legacy_ingest(paths)
+        print(f"  legacy sequential   {time.perf_counter() - start:7.2f}s  chunks={count}")
+
+        for workers in sorted({1, 4, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            count = streaming_ingest(paths, workers)
+            print(f"  workers={workers:<3}         {time.perf_counter() - start:7.2f}s  chunks={count}")
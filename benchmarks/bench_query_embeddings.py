@@ -0,0 +1,61 @@
+# benchmarks/bench_query_embeddings.py
+#
+# Query embedding under concurrent load: plain OpenAIEmbeddings-style calls (one request per question) vs
+# CachedQueryEmbeddings with the LRU cache only and with cache + micro-batching. The embedding API is a
+# FakeEmbeddings with a fixed per-request latency; questions are drawn with repeats from a pool of
+# distinct questions, like users asking about the same common symptoms.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_query_embeddings.py --questions 2000 --threads 32
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from fake_services import FakeEmbeddings
+from query_embeddings import CachedQueryEmbeddings
+from synthetic_data import make_queries
+
+
+def run(embeddings, questions, threads: int):
+    def embed(question):
+        started = time.perf_counter()
+        embeddings.embed_query(question)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = np.asarray(list(pool.map(embed, questions))) * 1000
+    return time.perf_counter() - started, latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=500, help="Size of the pool questions are drawn from")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent askers")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake embedding request latency (s)")
+    parser.add_argument("--window-ms", type=float, default=5.0, help="Micro-batching window")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = make_queries(args.distinct, seed=3)
+    # Skewed popularity: a few questions are asked far more often than the rest
+    questions = [pool[min(int(rng.expovariate(8 / args.distinct)), args.distinct - 1)] for _ in range(args.questions)]
+    print(f"{args.questions} questions ({len(set(questions))} distinct), {args.threads} threads, "
+          f"{args.latency * 1000:.0f} ms per embedding request")
+
+    for label, make in (
+        ("no cache", lambda base: base),
+        ("LRU cache", lambda base: CachedQueryEmbeddings(base, batch_window=0)),
+        ("cache + batching", lambda base: CachedQueryEmbeddings(base, batch_window=args.window_ms / 1000)),
+    ):
+        base = FakeEmbeddings(dim=64, latency=args.latency)
+        embeddings = make(base)
+        elapsed, latencies = run(embeddings, questions, args.threads)
+        extra = ""
+        if isinstance(embeddings, CachedQueryEmbeddings):
+            metrics = embeddings.metrics()
+            extra = f"  hit rate {metrics['hit_rate']:.0%}, mean batch {metrics['mean_batch_size']:.1f}"
+        print(f"{label:<17} {base.calls:5d} requests  p50={np.percentile(latencies, 50):6.1f} ms  "
+              f"p95={np.percentile(latencies, 95):6.1f} ms  {len(questions) / elapsed:8.0f} q/s{extra}")
@@ -0,0 +1,90 @@
+# benchmarks/bench_resources.py
+#
+# Per-rerun cost of getting a Chatbot in the Streamlit script: rebuilding it on every rerun (the old
+# top-level `chatbot = Chatbot()`) vs the shared ResourceRegistry. Uses real component constructors
+# over a synthetic symptom CSV and local vector index, so no network access is needed.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_resources.py --rows 100000 --reruns 10
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from answer_cache import AnswerCache
+from chatbot import Chatbot, make_llm
+from fake_services import FakeEmbeddings, fake_embedding
+from local_vectorstore import LocalIndexWriter, LocalVectorStore
+from resources import ResourceRegistry
+from symptom_checker import SymptomChecker
+from synthetic_data import write_symptom_csv
+
+
+def build_components(csv_path: str, index_path: str, dim: int) -> Chatbot:
+    return Chatbot(
+        llm=make_llm(),
+        retriever=LocalVectorStore(index_path, FakeEmbeddings(dim)).as_retriever(search_kwargs={"k": 5}),
+        symptom_checker=SymptomChecker(csv_path, index_dir=None),
+        answer_cache=AnswerCache(embed_query=None),
+    )
+
+
+def make_registry(csv_path: str, index_path: str, dim: int) -> ResourceRegistry:
+    registry = ResourceRegistry()
+    registry.register("llm", make_llm)
+    registry.register("retriever",
+                      lambda: LocalVectorStore(index_path, FakeEmbeddings(dim)).as_retriever(search_kwargs={"k": 5}),
+                      close=lambda retriever: retriever.vectorstore.close())
+    registry.register("symptom_checker", lambda: SymptomChecker(csv_path, index_dir=None))
+    registry.register("answer_cache", lambda: AnswerCache(embed_query=None), close=lambda cache: cache.close())
+    registry.register("chatbot", lambda: Chatbot(
+        llm=registry.get("llm"),
+        retriever=registry.get("retriever"),
+        symptom_checker=registry.get("symptom_checker"),
+        answer_cache=registry.get("answer_cache"),
+    ))
+    return registry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000, help="Symptom CSV rows")
+    parser.add_argument("--vectors", type=int, default=20_000, help="Local index size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--reruns", type=int, default=10)
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_symptom_csv(os.path.join(tmp, "symptoms.csv"), args.rows)
+        index_path = os.path.join(tmp, "local_index")
+        writer = LocalIndexWriter(index_path)
+        writer.upsert((f"v{i}", fake_embedding(f"chunk {i}", args.dim), {"text": f"chunk {i}"})
+                      for i in range(args.vectors))
+        writer.publish()
+
+        rebuild = []
+        for _ in range(args.reruns):
+            started = time.perf_counter()
+            build_components(csv_path, index_path, args.dim)
+            rebuild.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        registry = make_registry(csv_path, index_path, args.dim)
+        registry.warmup()
+        startup = time.perf_counter() - started
+        registry.warmup(background=False)
+        ready = time.perf_counter() - started
+
+        shared = []
+        for _ in range(args.reruns):
+            started = time.perf_counter()
+            registry.warmup()  # what main.py does on every rerun
+            registry.get("chatbot")
+            shared.append(time.perf_counter() - started)
+        registry.close()
+
+    print(f"rows={args.rows:,} vectors={args.vectors:,} reruns={args.reruns}")
+    print(f"  rebuild per rerun   p50={np.median(rebuild) * 1000:9.1f} ms")
+    print(f"  shared registry     p50={np.median(shared) * 1000:9.3f} ms  "
+          f"(script start {startup * 1000:.1f} ms, warm after {ready:.2f} s in background)")
@@ -0,0 +1,103 @@
+# benchmarks/bench_server.py
+#
+# Load test of the HTTP API (backend/server.py): throughput and latency as client concurrency grows.
+# The LLM is a fake OpenAI chat server in its own process; retrieval is a stub with fixed latency.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_server.py --concurrency 1 8 32 128
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+import aiohttp
+import numpy as np
+from aiohttp import web
+from langchain.chat_models import ChatOpenAI
+from langchain.schema import Document
+from answer_cache import AnswerCache
+from chatbot import Chatbot
+from server import make_app
+from symptom_checker import SymptomChecker
+
+
+class StubRetriever:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get_relevant_documents(self, query):
+        time.sleep(self.latency)
+        return [Document(page_content="Hairballs are common in long-haired cats.")]
+
+    async def aget_relevant_documents(self, query):
+        await asyncio.sleep(self.latency)
+        return [Document(page_content="Hairballs are common in long-haired cats.")]
+
+
+async def run_clients(url: str, concurrency: int, requests_per_client: int):
+    latencies, statuses = [], []
+
+    async def client(client_id: int, session: aiohttp.ClientSession):
+        for i in range(requests_per_client):
+            started = time.perf_counter()
+            async with session.post(f"{url}/ask", json={"question": f"Parrot {client_id} question {i}?"}) as response:
+                await response.read()
+                statuses.append(response.status)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        await asyncio.gather(*(client(i, session) for i in range(concurrency)))
+    return time.perf_counter() - started, np.array(latencies), statuses
+
+
+async def main(args, llm_url: str):
+    chatbot = Chatbot(
+        llm=ChatOpenAI(model="gpt-4", openai_api_key="test", openai_api_base=llm_url, streaming=True),
+        retriever=StubRetriever(args.retrieval_latency),
+        symptom_checker=SymptomChecker("data/vet_guides.csv", index_dir=None),
+        answer_cache=AnswerCache(embed_query=None),
+    )
+    runner = web.AppRunner(make_app(chatbot, max_concurrency=args.max_concurrency,
+                                    max_pending=args.max_pending, request_timeout=60))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    try:
+        for concurrency in args.concurrency:
+            elapsed, latencies, statuses = await run_clients(url, concurrency, args.requests_per_client)
+            ok = statuses.count(200)
+            print(f"  clients={concurrency:<4} {ok / elapsed:7.1f} answers/s  "
+                  f"p50={np.percentile(latencies, 50):5.2f}s  p95={np.percentile(latencies, 95):5.2f}s  "
+                  f"errors={len(statuses) - ok}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM time to first token")
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--retrieval-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    # Fake LLM in its own process so it does not compete with the API for the event loop
+    fake_llm = subprocess.Popen(
+        [sys.executable, "benchmarks/fake_services.py", "--chat", "--latency", str(args.llm_latency),
+         "--tokens", str(args.tokens), "--token-delay", str(args.token_delay)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        llm_url = fake_llm.stdout.readline().strip() + "/v1"
+        print(f"LLM: {args.llm_latency}s to first token + {args.tokens} tokens x {args.token_delay}s; "
+              f"server max_concurrency={args.max_concurrency}")
+        asyncio.run(main(args, llm_url))
+    finally:
+        fake_llm.terminate()
@@ -0,0 +1,109 @@
+# benchmarks/bench_single_flight.py
+#
+# Campaign burst: many users ask a handful of questions (with trivial variations) within a few seconds.
+# Compares LLM and retrieval calls and answer latency with and without coalescing of identical questions.
+# The LLM and the retriever are stubs with fixed latency; the answer cache is off to isolate coalescing.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_single_flight.py --users 200
+
+import argparse
+import contextlib
+import io
+import random
+import tempfile
+import threading
+import time
+import numpy as np
+from langchain.schema import Document
+from langchain.schema.messages import AIMessageChunk
+from chatbot import Chatbot
+from single_flight import SingleFlight
+from symptom_checker import SymptomChecker
+from tracing import Tracer
+
+QUESTIONS = [
+    "Is the new flea treatment safe for puppies?",
+    "How often should I give my cat the new flea treatment?",
+    "Can I use the flea treatment on a pregnant dog?",
+]
+
+
+class StubLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def stream(self, prompt):
+        with self._lock:
+            self.calls += 1
+        for _ in range(20):
+            time.sleep(self.latency / 20)
+            yield AIMessageChunk(content="token ")
+
+
+class StubRetriever:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def get_relevant_documents(self, query):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [Document(page_content="Most flea treatments are safe for puppies older than 8 weeks.")]
+
+
+def variant(question: str, rng: random.Random) -> str:
+    """The same question as users type it: case and punctuation vary."""
+    question = question.lower() if rng.random() < 0.5 else question
+    return question.rstrip("?") if rng.random() < 0.5 else question
+
+
+def run(args, coalesce: bool, csv_path: str):
+    chatbot = Chatbot(
+        llm=StubLLM(args.llm_latency),
+        retriever=StubRetriever(args.retrieval_latency),
+        symptom_checker=SymptomChecker(csv_path, index_dir=None),
+        answer_cache=None,
+        tracer=Tracer(enabled=False),
+    )
+    chatbot.single_flight = SingleFlight() if coalesce else None
+    rng = random.Random(0)
+    arrivals = sorted((rng.uniform(0, args.burst_seconds), variant(rng.choice(QUESTIONS), rng))
+                      for _ in range(args.users))
+    latencies = []
+    started = time.perf_counter()
+
+    def user(at: float, question: str):
+        time.sleep(max(0.0, started + at - time.perf_counter()))
+        asked = time.perf_counter()
+        chatbot.ask(question)
+        latencies.append(time.perf_counter() - asked)
+
+    threads = [threading.Thread(target=user, args=arrival) for arrival in arrivals]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    saved = chatbot.single_flight.metrics()["saved"] if coalesce else 0
+    print(f"coalesce={str(coalesce):5s}  LLM calls {chatbot.llm.calls:4d}  retrievals {chatbot.retriever.calls:4d}  "
+          f"saved {saved:4d}  latency p50 {p50:5.0f} ms  p95 {p95:5.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--burst-seconds", type=float, default=5.0, help="Users arrive within this window")
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--retrieval-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+        f.write("symptom,suggestion\nworms in stool,Start a deworming treatment\n")
+        f.flush()
+        print(f"{args.users} users over {args.burst_seconds:.0f} s, {len(QUESTIONS)} distinct questions, "
+              f"stub LLM {args.llm_latency:.1f} s")
+        for coalesce in (False, True):
+            run(args, coalesce, f.name)
@@ -0,0 +1,244 @@
+# benchmarks/bench_suite.py
+#
+# Offline benchmark suite: symptom matching, chunking, CSV/PDF preprocessing, Pinecone upserts and
+# Chatbot.ask end to end, with the OpenAI chat and embedding APIs and the Pinecone index replaced by the
+# deterministic stand-ins in fake_services.py (latency configurable). Reports p50/p95/p99 latency and
+# throughput per case, saves them as a baseline and flags regressions against a saved baseline
+# (exit code 1), so performance can be tracked in CI without API keys.
+# Run from the repo root:
+#   PYTHONPATH=backend:embeddings:benchmarks python benchmarks/bench_suite.py --save-baseline baseline.json
+#   PYTHONPATH=backend:embeddings:benchmarks python benchmarks/bench_suite.py --baseline baseline.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+import numpy as np
+
+# Workload sizes per scale; "quick" finishes in well under a minute for CI
+SCALES = {
+    "quick": {"symptom_rows": 10_000, "queries": 200, "chunk_words": 20_000, "chunk_repeats": 50,
+              "csv_rows": 20_000, "pdf_pages": 20, "upsert_vectors": 5_000, "index_chunks": 500, "asks": 20},
+    "full": {"symptom_rows": 100_000, "queries": 1_000, "chunk_words": 100_000, "chunk_repeats": 100,
+             "csv_rows": 200_000, "pdf_pages": 100, "upsert_vectors": 50_000, "index_chunks": 5_000, "asks": 100},
+}
+
+# Tail percentiles of a few samples are mostly timer noise; they are only compared with enough samples
+MIN_SAMPLES = {"p50_ms": 1, "p95_ms": 20, "p99_ms": 100}
+
+# name -> function(sizes, args, tmp_dir) returning (per-operation seconds, items processed, item unit)
+CASES: Dict[str, Callable] = {}
+
+
+def case(name: str):
+    def register(function):
+        CASES[name] = function
+        return function
+    return register
+
+
+def timed(operation, repeats: int) -> List[float]:
+    samples = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+@case("symptom_checker")
+def bench_symptom_checker(sizes, args, tmp):
+    from symptom_checker import SymptomChecker
+    from synthetic_data import make_queries, write_symptom_csv
+
+    checker = SymptomChecker(write_symptom_csv(os.path.join(tmp, "symptoms.csv"), sizes["symptom_rows"]),
+                             index_dir=None)
+    queries = make_queries(sizes["queries"])
+    return timed(lambda i: checker.find_closest_symptoms(queries[i]), len(queries)), len(queries), "queries"
+
+
+@case("chunk_text")
+def bench_chunk_text(sizes, args, tmp):
+    from preprocessing import chunk_text
+
+    text = " ".join(f"word{i % 997}" for i in range(sizes["chunk_words"]))
+    samples = timed(lambda i: chunk_text(text, 500, 50), sizes["chunk_repeats"])
+    return samples, sizes["chunk_words"] * sizes["chunk_repeats"], "words"
+
+
+@case("preprocess_csv")
+def bench_preprocess_csv(sizes, args, tmp):
+    from preprocessing import preprocess_csv_file
+    from synthetic_data import write_symptom_csv
+
+    path = write_symptom_csv(os.path.join(tmp, "guides.csv"), sizes["csv_rows"])
+    return timed(lambda i: preprocess_csv_file(path), 3), 3 * sizes["csv_rows"], "rows"
+
+
+@case("preprocess_pdf")
+def bench_preprocess_pdf(sizes, args, tmp):
+    from bench_pdf_ingest import make_pdf
+    from preprocessing import preprocess_pdf_file
+
+    path = make_pdf(os.path.join(tmp, "guide.pdf"), sizes["pdf_pages"], seed=0)
+    return timed(lambda i: preprocess_pdf_file(path, workers=1), 3), 3 * sizes["pdf_pages"], "pages"
+
+
+@case("upsert_embeddings")
+def bench_upsert_embeddings(sizes, args, tmp):
+    from fake_services import FakePineconeIndex, fake_embedding
+    from pinecone_utils import upsert_embeddings
+
+    count = sizes["upsert_vectors"]
+    texts = [f"chunk {i}" for i in range(count)]
+    embeddings = [fake_embedding(text, args.dim) for text in texts]
+    ids = [f"id-{i}" for i in range(count)]
+    index = FakePineconeIndex(latency=args.index_latency)
+    batch = 100
+    # One sample per upsert request, so percentiles describe request latency
+    samples = timed(lambda i: upsert_embeddings(embeddings[i * batch:(i + 1) * batch], texts[i * batch:(i + 1) * batch],
+                                                ids=ids[i * batch:(i + 1) * batch], index=index),
+                    count // batch)
+    assert len(index.vectors) == count // batch * batch
+    return samples, count // batch * batch, "vectors"
+
+
+@case("chatbot_ask")
+def bench_chatbot_ask(sizes, args, tmp):
+    from langchain.chat_models import ChatOpenAI
+    from langchain.vectorstores import Pinecone
+    from bench_pdf_ingest import WORDS
+    from chatbot import Chatbot
+    from fake_services import FakeChatServer, FakeEmbeddings, FakePineconeIndex
+    from symptom_checker import SymptomChecker
+    from synthetic_data import make_queries
+
+    rng = np.random.default_rng(0)
+    embeddings = FakeEmbeddings(dim=args.dim, latency=args.embedding_latency)
+    chunks = [" ".join(rng.choice(WORDS, 120)) for _ in range(sizes["index_chunks"])]
+    index = FakePineconeIndex()
+    index.upsert(vectors=[(f"chunk-{i}", vector, {"text": text})
+                          for i, (text, vector) in enumerate(zip(chunks, embeddings.embed_documents(chunks)))])
+    index.latency = args.index_latency
+
+    chat_server = FakeChatServer(latency=args.llm_latency, tokens=args.tokens, token_delay=args.token_delay)
+    url = chat_server.start_in_thread()
+    try:
+        chatbot = Chatbot(
+            llm=ChatOpenAI(model="gpt-4", openai_api_key="offline", openai_api_base=f"{url}/v1", streaming=True),
+            retriever=Pinecone(index, embeddings, "text").as_retriever(search_kwargs={"k": 5}),
+            symptom_checker=SymptomChecker("data/vet_guides.csv", index_dir=None),
+            answer_cache=None,  # every question takes the full retrieval + LLM path
+        )
+        # Questions no symptom-checker row answers confidently
+        chatbot.symptom_match_threshold = 1.01
+        questions = make_queries(sizes["asks"], seed=2)
+        samples = timed(lambda i: chatbot.ask(questions[i]), len(questions))
+        chatbot.hybrid_retriever.close()
+    finally:
+        chat_server.stop_thread()
+    return samples, len(questions), "answers"
+
+
+def summarize(samples: List[float], items: int, unit: str) -> Dict[str, float]:
+    """p50/p95/p99 per-operation latency in ms and throughput in items/s."""
+    values = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "throughput": items / float(np.sum(samples)),
+        "unit": unit,
+        "samples": len(samples),
+    }
+
+
+def find_regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float,
+                     min_delta_ms: float) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    A case regresses when a latency percentile grows by more than `tolerance`
+    (relative) and `min_delta_ms` (absolute, to ignore timer noise on tiny
+    operations), or when its throughput drops by more than `tolerance`.
+    Percentiles are skipped for cases with fewer than MIN_SAMPLES samples.
+
+    Returns:
+        One message per regressed metric.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, min_samples in MIN_SAMPLES.items():
+            if result["samples"] < min_samples:
+                continue
+            if result[metric] > before[metric] * (1 + tolerance) and result[metric] - before[metric] > min_delta_ms:
+                regressions.append(f"{name}: {metric} {before[metric]:.2f} -> {result[metric]:.2f} "
+                                   f"(+{result[metric] / before[metric] - 1:.0%})")
+        if result["throughput"] < before["throughput"] / (1 + tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']:,.0f} -> {result['throughput']:,.0f} "
+                               f"{result['unit']}/s ({result['throughput'] / before['throughput'] - 1:.0%})")
+    return regressions
+
+
+def run_suite(names: List[str], args) -> Dict[str, Dict]:
+    sizes = SCALES[args.scale]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            # Per-request log lines of the code under test would drown the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                samples, items, unit = CASES[name](sizes, args, tmp)
+            results[name] = summarize(samples, items, unit)
+            result = results[name]
+            print(f"{name:<18} p50={result['p50_ms']:9.2f} ms  p95={result['p95_ms']:9.2f} ms  "
+                  f"p99={result['p99_ms']:9.2f} ms  {result['throughput']:>12,.1f} {unit}/s", flush=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--scale", choices=sorted(SCALES), default="quick")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM time to first token (s)")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens per fake LLM answer")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Fake LLM delay between tokens (s)")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="Fake embedding call latency (s)")
+    parser.add_argument("--index-latency", type=float, default=0.005, help="Fake Pinecone request latency (s)")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension")
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with a baseline JSON file and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Ignore latency changes below this")
+    args = parser.parse_args()
+
+    print(f"scale={args.scale}; fake LLM {args.llm_latency}s + {args.tokens} x {args.token_delay}s, "
+          f"embeddings {args.embedding_latency}s, index {args.index_latency}s")
+    results = run_suite(args.cases, args)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"scale": args.scale, "python": platform.python_version(), "machine": platform.machine(),
+                       "results": results}, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"Baseline was recorded at scale '{baseline.get('scale')}', not '{args.scale}'.")
+            sys.exit(2)
+        regressions = find_regressions(results, baseline["results"], args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
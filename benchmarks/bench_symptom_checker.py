@@ -0,0 +1,67 @@
+# benchmarks/bench_symptom_checker.py
+#
+# Queries-per-second of SymptomChecker matching on synthetic CSVs.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_symptom_checker.py --rows 10000 1000000
+
+import argparse
+import os
+import tempfile
+import time
+from sklearn.metrics.pairwise import cosine_similarity
+from symptom_checker import SymptomChecker
+from synthetic_data import write_symptom_csv, make_queries
+
+
+def legacy_find_closest_symptoms(checker: SymptomChecker, user_input: str, top_k: int = 3):
+    """The original one-query-at-a-time implementation (full argsort + df.iloc per hit)."""
+    user_vec = checker.vectorizer.transform([user_input])
+    similarities = cosine_similarity(user_vec, checker.symptom_tfidf).flatten()
+    top_indices = similarities.argsort()[::-1][:top_k]
+    return [
+        (checker.df.iloc[idx][checker.symptom_col], similarities[idx], checker.df.iloc[idx][checker.suggestion_col])
+        for idx in top_indices
+    ]
+
+
+def bench(rows: int, num_queries: int, top_k: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_symptom_csv(os.path.join(tmp, "symptoms.csv"), rows)
+
+        start = time.perf_counter()
+        checker = SymptomChecker(csv_path)
+        fit_time = time.perf_counter() - start
+
+    queries = make_queries(num_queries)
+
+    # The legacy path is slow on large CSVs, so only time a sample of queries
+    legacy_queries = queries[:max(1, min(num_queries, 2_000_000 // rows))]
+    start = time.perf_counter()
+    for q in legacy_queries:
+        legacy_find_closest_symptoms(checker, q, top_k)
+    legacy_qps = len(legacy_queries) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for q in queries:
+        checker.find_closest_symptoms(q, top_k)
+    single_qps = num_queries / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    checker.find_closest_symptoms_batch(queries, top_k)
+    batch_qps = num_queries / (time.perf_counter() - start)
+
+    print(
+        f"rows={rows:>9,} fit={fit_time:6.2f}s  "
+        f"legacy={legacy_qps:9.1f} q/s  single={single_qps:9.1f} q/s  batch={batch_qps:9.1f} q/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        bench(rows, args.queries, args.top_k)
@@ -0,0 +1,71 @@
+# benchmarks/bench_tracing.py
+#
+# Cost of request tracing: a bare span with tracing disabled vs enabled, and Chatbot.ask on an instant
+# fake LLM and retriever (so instrumentation is the only variable) with tracing off, on in memory, and
+# on with the JSONL log.
+# Run from the repo root:
+#   PYTHONPATH=backend:benchmarks python benchmarks/bench_tracing.py --asks 2000
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from langchain.chat_models.fake import FakeListChatModel
+from langchain.schema import Document
+from chatbot import Chatbot
+from symptom_checker import SymptomChecker
+from tracing import Tracer
+
+
+class InstantRetriever:
+    def get_relevant_documents(self, query):
+        return [Document(page_content="Hairballs are common in long-haired cats.")]
+
+
+def span_cost_ns(tracer: Tracer, repeats: int) -> float:
+    trace = tracer.start_trace("bench")
+    started = time.perf_counter()
+    for _ in range(repeats):
+        with trace.span("stage"):
+            pass
+    return (time.perf_counter() - started) / repeats * 1e9
+
+
+def ask_cost_us(tracer: Tracer, asks: int) -> float:
+    chatbot = Chatbot(
+        llm=FakeListChatModel(responses=["Brush your cat daily to prevent hairballs."]),
+        retriever=InstantRetriever(),
+        symptom_checker=SymptomChecker("data/vet_guides.csv", index_dir=None),
+        answer_cache=None,
+        tracer=tracer,
+    )
+    chatbot.symptom_match_threshold = 1.01  # every question goes through retrieval + LLM
+    with contextlib.redirect_stdout(io.StringIO()):
+        chatbot.ask("warm up")
+        started = time.perf_counter()
+        for i in range(asks):
+            chatbot.ask(f"Why does my cat cough up hairballs? {i}")
+        elapsed = time.perf_counter() - started
+    chatbot.hybrid_retriever.close()
+    return elapsed / asks * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spans", type=int, default=200_000)
+    parser.add_argument("--asks", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"span, tracing disabled: {span_cost_ns(Tracer(enabled=False), args.spans):7.0f} ns")
+    print(f"span, tracing enabled:  {span_cost_ns(Tracer(enabled=True), args.spans):7.0f} ns")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tracer in (
+            ("tracing off", Tracer(enabled=False)),
+            ("in memory", Tracer(enabled=True)),
+            ("JSONL log", Tracer(enabled=True, log_path=os.path.join(tmp, "traces.jsonl"))),
+        ):
+            print(f"ask, {label:<12} {ask_cost_us(tracer, args.asks):8.0f} us per answer")
+            tracer.close()
@@ -0,0 +1,84 @@
+# benchmarks/bench_upsert.py
+#
+# Bulk Pinecone upserts: the old shape (build the full item list, then one request after another, no
+# retries) vs UpsertEngine at several concurrencies, against an in-memory fake index with a per-request
+# latency and optional transient failures. Also reports peak Python memory (tracemalloc) of feeding the
+# engine a lazy iterator vs a prebuilt list.
+# Run from the repo root:
+#   PYTHONPATH=backend:embeddings:benchmarks python benchmarks/bench_upsert.py --vectors 20000
+
+import argparse
+import random
+import threading
+import time
+import tracemalloc
+from pinecone_utils import UpsertEngine
+from fake_services import FakePineconeIndex, fake_embedding_array
+
+
+class FlakyIndex(FakePineconeIndex):
+    """Fake index that drops vectors and fails a fraction of requests with a transient error."""
+
+    def __init__(self, latency, failure_rate):
+        super().__init__(latency=latency)
+        self.failure_rate = failure_rate
+        self.random = random.Random(0)
+        self._random_lock = threading.Lock()
+
+    def upsert(self, vectors, **kwargs):
+        time.sleep(self.latency)
+        with self._random_lock:
+            failed = self.random.random() < self.failure_rate
+        if failed:
+            raise ConnectionError("connection reset by peer")
+        with self._lock:
+            self.upsert_requests += 1
+        return {"upserted_count": len(vectors)}
+
+
+def iter_vectors(count, dim):
+    for i in range(count):
+        yield f"chunk-{i}", fake_embedding_array(f"chunk {i}", dim).tolist(), {"text": f"chunk {i} " + "text " * 80}
+
+
+def sequential(index, count, dim, batch_size):
+    """The old upsert_embeddings: materialize every item, then send batches one by one."""
+    items = list(iter_vectors(count, dim))
+    for i in range(0, len(items), batch_size):
+        index.upsert(vectors=items[i:i + batch_size])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake index latency per request (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.02, help="Fraction of requests failing transiently")
+    args = parser.parse_args()
+
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.latency * 1000:.0f} ms per request, "
+          f"{args.failure_rate:.0%} transient failures")
+
+    started = time.perf_counter()
+    try:
+        sequential(FlakyIndex(args.latency, args.failure_rate), args.vectors, args.dim, args.batch_size)
+        print(f"sequential       {args.vectors / (time.perf_counter() - started):8.0f} vectors/s")
+    except ConnectionError as e:
+        print(f"sequential       failed after {time.perf_counter() - started:.1f}s: {e}")
+
+    for concurrency in (1, 4, 8, 16):
+        engine = UpsertEngine(FlakyIndex(args.latency, args.failure_rate), max_batch_size=args.batch_size,
+                              max_concurrency=concurrency, backoff_base=0.05)
+        stats = engine.upsert(iter_vectors(args.vectors, args.dim))
+        print(f"engine x{concurrency:<2}       {stats['vectors_per_second']:8.0f} vectors/s  "
+              f"({stats['requests']} requests, {stats['retries']} retries)")
+
+    count = min(args.vectors, 5_000)
+    for label, make_items in (("a list", lambda: list(iter_vectors(count, args.dim))),
+                              ("an iterator", lambda: iter_vectors(count, args.dim))):
+        tracemalloc.start()
+        UpsertEngine(FlakyIndex(0.0, 0.0), max_batch_size=args.batch_size, max_concurrency=8).upsert(make_items())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"peak memory, {count} vectors given as {label:<11}: {peak / 1e6:7.1f} MB")
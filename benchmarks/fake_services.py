@@ -0,0 +1,316 @@
+# benchmarks/fake_services.py
+#
+# Local stand-ins for external services so throughput can be measured offline.
+
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+from typing import List
+import numpy as np
+from aiohttp import web
+from langchain.embeddings.base import Embeddings
+from pinecone.index import Index as PineconeIndex
+
+EMBEDDING_DIM = 1536
+
+
+def fake_embedding_array(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Deterministic unit-length float32 pseudo-embedding derived from the text hash."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim, dtype=np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Deterministic unit-length pseudo-embedding derived from the text hash."""
+    return fake_embedding_array(text, dim).tolist()
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dim: int = EMBEDDING_DIM, latency: float = 0.0):
+        """
+        Deterministic stand-in for langchain's OpenAIEmbeddings.
+
+        Args:
+            dim (int): Embedding dimension.
+            latency (float): Delay per call in seconds.
+        """
+        self.dim = dim
+        self.latency = latency
+        self.calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return [fake_embedding(text, self.dim) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class _FakeHTTPServer:
+    """Start/stop helpers shared by the fake aiohttp services."""
+
+    _runner = None
+    _thread = None
+    _loop = None
+    url = None
+
+    def make_app(self) -> web.Application:
+        raise NotImplementedError
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving on the running event loop and return the base URL."""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self) -> str:
+        """Serve from a background event loop thread (for synchronous callers)."""
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.url
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+
+
+class FakeEmbeddingServer(_FakeHTTPServer):
+    def __init__(self, latency: float = 0.05, per_input_latency: float = 0.0,
+                 requests_per_minute: float = None, dim: int = EMBEDDING_DIM, fail_first: int = 0):
+        """
+        OpenAI-compatible POST /embeddings endpoint served by aiohttp.
+
+        Args:
+            latency (float): Fixed delay per request in seconds.
+            per_input_latency (float): Extra delay per input in the request.
+            requests_per_minute (float): Answer 429 when requests arrive faster than this.
+            dim (int): Embedding dimension.
+            fail_first (int): Answer the first N requests with 429 (to exercise retries).
+        """
+        self.latency = latency
+        self.per_input_latency = per_input_latency
+        self.min_interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.dim = dim
+        self.fail_first = fail_first
+
+        self.requests = 0
+        self.inputs = 0
+        self.rate_limited = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._last_request_at = 0.0
+
+    async def handle_embeddings(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        now = time.monotonic()
+        too_fast = self.min_interval and now - self._last_request_at < self.min_interval
+        if self.requests <= self.fail_first or too_fast:
+            self.rate_limited += 1
+            return web.json_response({"error": {"message": "Rate limit reached"}}, status=429)
+        self._last_request_at = now
+
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.latency + self.per_input_latency * len(inputs))
+        finally:
+            self._in_flight -= 1
+        self.inputs += len(inputs)
+        if body.get("encoding_format") == "base64":
+            encode = lambda text: base64.b64encode(fake_embedding_array(text, self.dim).tobytes()).decode("ascii")
+        else:
+            encode = lambda text: fake_embedding(text, self.dim)
+        data = [{"object": "embedding", "index": i, "embedding": encode(text)} for i, text in enumerate(inputs)]
+        return web.json_response({"object": "list", "data": data, "model": body.get("model")})
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/embeddings", self.handle_embeddings)
+        app.router.add_post("/v1/embeddings", self.handle_embeddings)
+        return app
+
+
+class FakeChatServer(_FakeHTTPServer):
+    def __init__(self, latency: float = 0.5, tokens: int = 50, token_delay: float = 0.01):
+        """
+        OpenAI-compatible POST /chat/completions endpoint, streaming and non-streaming.
+
+        Args:
+            latency (float): Delay before the first token in seconds.
+            tokens (int): Tokens per answer.
+            token_delay (float): Delay between tokens in seconds.
+        """
+        self.latency = latency
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+
+    async def handle_chat(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        body = await request.json()
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            tokens = ["Keep"] + [" calm"] * (self.tokens - 1)
+            model = body.get("model", "gpt-4")
+            if not body.get("stream"):
+                await asyncio.sleep(self.token_delay * len(tokens))
+                return web.json_response({
+                    "id": "chatcmpl-fake", "object": "chat.completion", "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                })
+
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for i, token in enumerate(tokens):
+                delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                await asyncio.sleep(self.token_delay)
+            final = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            await response.write_eof()
+            return response
+        finally:
+            self._in_flight -= 1
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/chat/completions", self.handle_chat)
+        app.router.add_post("/v1/chat/completions", self.handle_chat)
+        return app
+
+
+class FakePineconeIndex(PineconeIndex):
+    def __init__(self, latency: float = 0.0):
+        """
+        In-memory stand-in for pinecone.Index with the same upsert/delete/query call shapes.
+
+        It subclasses pinecone.Index so LangChain's Pinecone vector store accepts
+        it; the Pinecone client itself is never initialized.
+
+        Args:
+            latency (float): Delay per request in seconds.
+        """
+        self.latency = latency
+        self.vectors = {}
+        self.upsert_requests = 0
+        self.delete_requests = 0
+        self.query_requests = 0
+        self._lock = threading.Lock()
+        self._matrix = None  # (ids, normalized vectors) for queries, rebuilt after writes
+
+    def upsert(self, vectors, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.upsert_requests += 1
+            for item_id, values, metadata in vectors:
+                self.vectors[item_id] = (values, metadata)
+            self._matrix = None
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids=None, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.delete_requests += 1
+            for item_id in ids or []:
+                self.vectors.pop(item_id, None)
+            self._matrix = None
+        return {}
+
+    def query(self, queries=None, top_k: int = 10, include_metadata: bool = False, vector=None, **kwargs):
+        """Exact cosine search; accepts a single `vector` or a list of `queries` (first one is used)."""
+        time.sleep(self.latency)
+        query = np.asarray(vector if vector is not None else queries[0], dtype=np.float32)
+        with self._lock:
+            self.query_requests += 1
+            if self._matrix is None:
+                ids = list(self.vectors)
+                matrix = np.asarray([self.vectors[item_id][0] for item_id in ids], dtype=np.float32)
+                if ids:
+                    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+                self._matrix = (ids, matrix)
+            ids, matrix = self._matrix
+            if not ids:
+                return {"matches": []}
+            scores = matrix @ (query / (np.linalg.norm(query) or 1.0))
+            top = np.argsort(-scores)[:top_k]
+            matches = []
+            for i in top:
+                match = {"id": ids[i], "score": float(scores[i])}
+                if include_metadata:
+                    # Callers (LangChain) pop keys from the metadata they get
+                    match["metadata"] = dict(self.vectors[ids[i]][1])
+                matches.append(match)
+        return {"matches": matches}
+
+    def describe_index_stats(self):
+        return {"total_vector_count": len(self.vectors)}
+
+
+if __name__ == "__main__":
+    # Serve a fake embeddings (or, with --chat, chat completions) endpoint in its own process so benchmarks
+    # do not share a CPU/GIL with it:  python benchmarks/fake_services.py --latency 0.1
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI embeddings / chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-input-latency", type=float, default=0.0)
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--chat", action="store_true", help="Serve chat completions instead of embeddings")
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    async def serve():
+        if args.chat:
+            server = FakeChatServer(latency=args.latency, tokens=args.tokens, token_delay=args.token_delay)
+        else:
+            server = FakeEmbeddingServer(latency=args.latency, per_input_latency=args.per_input_latency,
+                                         dim=args.dim, fail_first=args.fail_first)
+        print(await server.start(args.host, args.port), flush=True)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
@@ -0,0 +1,51 @@
+# benchmarks/synthetic_data.py
+
+import random
+import pandas as pd
+
+SPECIES = ["dog", "cat", "puppy", "kitten", "rabbit", "ferret", "parrot", "hamster"]
+SIGNS = [
+    "vomiting", "diarrhea", "coughing", "sneezing", "limping", "scratching", "itching",
+    "lethargy", "bleeding", "swelling", "shaking", "drooling", "panting", "wheezing",
+    "hair loss", "weight loss", "not eating", "excessive thirst", "red eyes", "discharge",
+]
+BODY_PARTS = ["ears", "eyes", "paw", "rear leg", "front leg", "tail", "skin", "stomach", "mouth", "nose"]
+QUALIFIERS = ["at night", "after meals", "for 24 hours", "for two days", "frequently", "suddenly", "mildly", "severely"]
+ADVICE = [
+    "Monitor hydration and offer small sips of water.",
+    "Limit activity and check for swelling or injury.",
+    "Check for odor, redness or discharge.",
+    "Withhold food for 12 hours, then offer a bland diet.",
+    "If it persists beyond 24 hours, consult a vet.",
+    "Vet visit recommended.",
+    "Ensure a calm environment and watch for other signs.",
+]
+
+
+def make_symptom_rows(rows: int, seed: int = 0):
+    """Generate synthetic (symptom, suggestion) pairs shaped like data/vet_guides.csv."""
+    rng = random.Random(seed)
+    symptoms = []
+    suggestions = []
+    for _ in range(rows):
+        symptoms.append(
+            f"{rng.choice(SPECIES)} {rng.choice(SIGNS)} {rng.choice(BODY_PARTS)} {rng.choice(QUALIFIERS)} case {rng.randrange(rows)}"
+        )
+        suggestions.append(" ".join(rng.sample(ADVICE, 2)))
+    return symptoms, suggestions
+
+
+def write_symptom_csv(path: str, rows: int, seed: int = 0) -> str:
+    """Write a synthetic symptom CSV with `rows` rows to `path` and return the path."""
+    symptoms, suggestions = make_symptom_rows(rows, seed)
+    pd.DataFrame({"symptom": symptoms, "suggestion": suggestions}).to_csv(path, index=False)
+    return path
+
+
+def make_queries(count: int, seed: int = 1):
+    """Generate pet-owner style symptom questions."""
+    rng = random.Random(seed)
+    return [
+        f"My {rng.choice(SPECIES)} has been {rng.choice(SIGNS)} {rng.choice(QUALIFIERS)}, her {rng.choice(BODY_PARTS)} looks off"
+        for _ in range(count)
+    ]
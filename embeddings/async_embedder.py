@@ -0,0 +1,288 @@
+# embeddings/async_embedder.py
+
+import asyncio
+import base64
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional
+import numpy as np
+from token_utils import count_tokens
+
+# aiohttp takes ~0.1 s to import; it is loaded on the first embed() call
+if TYPE_CHECKING:
+    import aiohttp
+
+OPENAI_API_BASE = "https://api.openai.com/v1"
+
+# Status codes worth retrying: rate limited, or transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class EmbeddingError(Exception):
+    """Raised when a batch cannot be embedded after all retries."""
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        """
+        Asyncio token bucket.
+
+        Args:
+            capacity (float): Maximum burst size.
+            refill_per_second (float): Tokens added back per second.
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        """
+        Wait until `amount` tokens are available and take them.
+
+        Requests larger than the capacity are clamped to it so they can still proceed.
+        """
+        amount = min(amount, self.capacity)
+        # The lock keeps waiters first-come first-served
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.refill_per_second)
+                self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        """
+        Combined requests-per-minute and tokens-per-minute limit, as enforced by OpenAI.
+        """
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    async def acquire(self, num_tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(num_tokens)
+
+
+class AsyncEmbedder:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "text-embedding-ada-002",
+        api_base: str = OPENAI_API_BASE,
+        max_batch_size: int = 100,
+        max_batch_tokens: int = 100_000,
+        max_concurrency: int = 8,
+        requests_per_minute: float = 3000,
+        tokens_per_minute: float = 1_000_000,
+        max_retries: int = 6,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 60.0,
+    ):
+        """
+        Batched, concurrent client for the OpenAI embeddings endpoint.
+
+        Texts are grouped into requests of up to `max_batch_size` inputs,
+        at most `max_concurrency` requests are in flight, and every request
+        waits on a requests/tokens-per-minute limiter. Rate-limited (429) and
+        transient 5xx responses are retried with exponential backoff and full jitter.
+
+        Args:
+            api_key (str): OpenAI API key.
+            model (str): Embedding model name.
+            api_base (str): Base URL of the API (point at a local fake server for offline tests).
+            max_batch_size (int): Maximum inputs per request.
+            max_batch_tokens (int): Maximum estimated tokens per request.
+            max_concurrency (int): Maximum requests in flight.
+            requests_per_minute (float): Request rate limit.
+            tokens_per_minute (float): Token rate limit.
+            max_retries (int): Retries per batch before giving up.
+            backoff_base (float): First backoff delay in seconds.
+            backoff_max (float): Upper bound on a single backoff delay.
+            timeout (float): Per-request timeout in seconds.
+        """
+        self.api_key = api_key
+        self.model = model
+        self.api_base = api_base.rstrip("/")
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.requests_sent = 0
+        self.retries = 0
+
+    def make_batches(self, texts: List[str]) -> List[tuple]:
+        """
+        Split texts into (start_offset, texts, estimated_tokens) request batches.
+        """
+        batches = []
+        start = 0
+        batch, batch_tokens = [], 0
+        for i, text in enumerate(texts):
+            tokens = count_tokens(text, self.model)
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                batches.append((start, batch, batch_tokens))
+                start, batch, batch_tokens = i, [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append((start, batch, batch_tokens))
+        return batches
+
+    async def embed(self, texts: List[str], session: Optional["aiohttp.ClientSession"] = None) -> List[List[float]]:
+        """
+        Embed all texts, returning vectors in the same order as the input.
+
+        Args:
+            texts: List of strings to embed.
+            session: Optional shared aiohttp session; one is created if omitted.
+
+        Returns:
+            List of embeddings.
+        """
+        import aiohttp
+
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        queue: asyncio.Queue = asyncio.Queue()
+        for batch in self.make_batches(texts):
+            queue.put_nowait(batch)
+
+        async def worker(http: "aiohttp.ClientSession"):
+            while True:
+                try:
+                    start, batch, batch_tokens = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                vectors = await self._embed_batch(http, batch, batch_tokens)
+                results[start:start + len(batch)] = vectors
+
+        own_session = session is None
+        if own_session:
+            session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        try:
+            workers = [asyncio.create_task(worker(session)) for _ in range(min(self.max_concurrency, queue.qsize()))]
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                for task in workers:
+                    task.cancel()
+                raise
+        finally:
+            if own_session:
+                await session.close()
+        return results
+
+    async def _embed_batch(self, session: "aiohttp.ClientSession", batch: List[str],
+                           batch_tokens: int) -> List[List[float]]:
+        """Send one embeddings request, retrying on rate limits and transient errors."""
+        import aiohttp
+
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        # base64 float32 payloads are ~4x smaller than JSON floats and much cheaper to decode
+        payload = {"model": self.model, "input": batch, "encoding_format": "base64"}
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(batch_tokens)
+            retry_after = None
+            try:
+                self.requests_sent += 1
+                async with session.post(f"{self.api_base}/embeddings", json=payload, headers=headers) as resp:
+                    if resp.status == 200:
+                        body = await resp.json()
+                        data = sorted(body["data"], key=lambda item: item["index"])
+                        return [_decode_embedding(item["embedding"]) for item in data]
+                    last_error = f"HTTP {resp.status}: {await resp.text()}"
+                    if resp.status not in RETRYABLE_STATUSES:
+                        raise EmbeddingError(last_error)
+                    retry_after = resp.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = repr(e)
+
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            print(f"[Retry {attempt + 1}] Embedding batch of {len(batch)} failed: {last_error}")
+            await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+
+        raise EmbeddingError(f"Failed to embed batch after {self.max_retries} retries: {last_error}")
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff with full jitter, never shorter than a server-provided Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+
+class BlockingEmbedder:
+    def __init__(self, embedder: AsyncEmbedder):
+        """
+        Synchronous front end running one AsyncEmbedder on a long-lived event loop thread.
+
+        Every embed() call goes through the same rate limiter and pooled
+        aiohttp session, so the requests/tokens-per-minute limits hold across
+        calls (a new embedder per call would start each with a full budget)
+        and connections are reused. Safe to call from several threads.
+        Close it (or use it as a context manager) when done.
+
+        Args:
+            embedder (AsyncEmbedder): The embedder to run.
+        """
+        self.embedder = embedder
+        self._session = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="embedder-loop", daemon=True)
+        self._thread.start()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, returning vectors in the same order (see AsyncEmbedder.embed)."""
+        if not texts:
+            return []
+        return asyncio.run_coroutine_threadsafe(self._embed(list(texts)), self._loop).result()
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.embedder.timeout))
+        return await self.embedder.embed(texts, self._session)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+            self._session = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "BlockingEmbedder":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _decode_embedding(embedding) -> List[float]:
+    """Decode an embedding returned either as a float list or as base64 float32 bytes."""
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype=np.float32).tolist()
+    return embedding
@@ -1,70 +1,173 @@
 # embeddings/embed.py
 
+import atexit
 import os
+import threading
 from dotenv import load_dotenv
-from openai import OpenAIError
-from openai.embeddings_utils import get_embedding
-from preprocessing import preprocess_pdf_folder, preprocess_csv_file
-from pinecone_utils import upsert_embeddings
-import time
+from preprocessing import iter_csv_chunks, iter_pdf_chunks
+from async_embedder import AsyncEmbedder, BlockingEmbedder, OPENAI_API_BASE
+from embedding_cache import EmbeddingCache, IndexManifest, DEFAULT_CACHE_PATH
+from ingest_pipeline import IngestPipeline
+from pinecone_utils import UpsertEngine
+from local_vectorstore import LocalIndexWriter, DEFAULT_LOCAL_INDEX_PATH
+from answer_cache import mark_knowledge_base_updated
+from config import get_setting
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_MODEL = get_setting("embedding", "model", "text-embedding-ada-002")
+
+PDF_FOLDER = "data/pdf_guides"
+CSV_FILE = "data/vet_guides.csv"
 
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY not found in environment variables.")
 
-def generate_embeddings_from_texts(texts, model=EMBEDDING_MODEL, max_retries=3):
+def make_embedder(model=EMBEDDING_MODEL, max_retries=None) -> AsyncEmbedder:
+    """
+    Build an AsyncEmbedder configured from the `embedding` section of configs/settings.yaml.
+    """
+    return AsyncEmbedder(
+        api_key=OPENAI_API_KEY,
+        model=model,
+        api_base=os.getenv("OPENAI_API_BASE") or get_setting("embedding", "api_base", OPENAI_API_BASE),
+        max_batch_size=get_setting("embedding", "max_batch_size", 100),
+        max_batch_tokens=get_setting("embedding", "max_batch_tokens", 100_000),
+        max_concurrency=get_setting("embedding", "max_concurrency", 8),
+        requests_per_minute=get_setting("embedding", "requests_per_minute", 3000),
+        tokens_per_minute=get_setting("embedding", "tokens_per_minute", 1_000_000),
+        max_retries=max_retries if max_retries is not None else get_setting("embedding", "max_retries", 6),
+    )
+
+
+# Process-wide embedders by (model, max_retries), shared so rate limits hold across calls
+_embedders = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(model=EMBEDDING_MODEL, max_retries=None) -> BlockingEmbedder:
+    """Return the process-wide BlockingEmbedder for a model (created on first use, closed at exit)."""
+    with _embedders_lock:
+        key = (model, max_retries)
+        if key not in _embedders:
+            _embedders[key] = BlockingEmbedder(make_embedder(model, max_retries))
+        return _embedders[key]
+
+
+@atexit.register
+def _close_embedders():
+    with _embedders_lock:
+        for embedder in _embedders.values():
+            embedder.close()
+        _embedders.clear()
+
+
+def generate_embeddings_from_texts(texts, model=EMBEDDING_MODEL, max_retries=None):
     """
     Generate OpenAI embeddings for a list of texts.
 
+    Texts are sent in batches of `embedding.max_batch_size` with bounded
+    concurrency and rate limiting (see AsyncEmbedder). All calls share one
+    embedder per model, so the rate limits apply across calls and its
+    connections are reused.
+
     Args:
         texts: List of strings to embed.
         model: Embedding model name.
-        max_retries: How many times to retry on failure.
+        max_retries: How many times to retry a batch on failure (defaults to settings).
 
     Returns:
-        List of embeddings.
+        List of embeddings, in the same order as texts.
+    """
+    return get_embedder(model, max_retries).embed(texts)
+
+def list_sources(pdf_folder=PDF_FOLDER, csv_file=CSV_FILE):
+    """
+    Return {source name: path} for every knowledge-base file.
     """
-    embeddings = []
-    for i, text in enumerate(texts):
-        attempt = 0
-        success = False
-        while attempt < max_retries and not success:
-            try:
-                embedding = get_embedding(text, engine=model)
-                embeddings.append(embedding)
-                success = True
-                time.sleep(0.5)  # Rate limit safety
-            except OpenAIError as e:
-                attempt += 1
-                print(f"[Retry {attempt}] Failed to embed text {i}: {e}")
-                time.sleep(1)
-        if not success:
-            raise Exception(f"Failed to embed text after {max_retries} attempts.")
-    return embeddings
-
-def run_embedding_pipeline():
+    sources = {}
+    if os.path.isdir(pdf_folder):
+        for filename in sorted(os.listdir(pdf_folder)):
+            if filename.lower().endswith(".pdf"):
+                path = os.path.join(pdf_folder, filename)
+                sources[path] = path
+    if os.path.exists(csv_file):
+        sources[csv_file] = csv_file
+    return sources
+
+def load_source_chunks(path):
+    """Chunk a knowledge-base file according to its type (PDF chunks are streamed with page metadata)."""
+    if path.lower().endswith(".pdf"):
+        chunks = iter_pdf_chunks(
+            [path],
+            workers=get_setting("ingest", "pdf_workers", 0) or None,
+            pages_per_task=get_setting("ingest", "pages_per_task", 32),
+        )
+        return chunks
+    return iter_csv_chunks(
+        path,
+        chunk_rows=get_setting("ingest", "csv_chunk_rows", 50_000),
+        engine=get_setting("ingest", "csv_engine", "auto"),
+    )
+
+def run_embedding_pipeline(cache_path=DEFAULT_CACHE_PATH):
     """
-    Full pipeline:
-    1. Preprocess PDFs + CSVs
-    2. Generate embeddings
-    3. Upload to Pinecone
+    Incremental, streaming pipeline:
+    1. Find PDF + CSV sources and skip the ones unchanged since the last run
+    2. Stream chunks of changed sources; embed only chunks missing from the embedding cache
+    3. Upsert new chunks to Pinecone under deterministic IDs and delete
+       vectors of edited or deleted sources
+
+    The steps run concurrently with bounded queues between them. Progress is
+    checkpointed in the manifest, so rerunning after a crash resumes.
+
+    With `retriever.backend: local` the vectors go to the local index
+    instead of Pinecone, and a new version of it is published at the end.
     """
-    print("Step 1: Preprocessing data...")
-    pdf_chunks = preprocess_pdf_folder("data/pdf_guides")
-    csv_chunks = preprocess_csv_file("data/vet_guides.csv")
+    local_writer = None
+    manifest_path = cache_path
+    if get_setting("retriever", "backend", "pinecone") == "local":
+        local_path = get_setting("retriever", "local_path", DEFAULT_LOCAL_INDEX_PATH)
+        local_writer = LocalIndexWriter(local_path)
+        # Each index target tracks its own contents; embeddings are shared
+        manifest_path = os.path.join(local_path, "manifest.sqlite")
+
+    max_batch_size = get_setting("embedding", "max_batch_size", 100)
+    # One embedder for the whole run: every flush shares its rate limiter and connections
+    embedder = BlockingEmbedder(make_embedder())
+    pipeline = IngestPipeline(
+        load_chunks=load_source_chunks,
+        embed_texts=embedder.embed,
+        cache=EmbeddingCache(cache_path),
+        manifest=IndexManifest(manifest_path),
+        model=EMBEDDING_MODEL,
+        index=local_writer,
+        batch_size=max_batch_size,
+        # One embed call spans enough batches to keep every concurrent request slot busy
+        embed_batch_size=max_batch_size * get_setting("embedding", "max_concurrency", 8),
+        queue_size=get_setting("ingest", "queue_size", 2000),
+        report_every=get_setting("ingest", "report_every", 10),
+        # Concurrent upsert requests with retries; the pipeline reports progress itself
+        upsert_engine=UpsertEngine.from_settings(local_writer, report_every=0),
+    )
 
-    all_chunks = pdf_chunks + csv_chunks
-    print(f"Total chunks: {len(all_chunks)}")
+    sources = list_sources()
+    print(f"Found {len(sources)} sources.")
+    try:
+        stats = pipeline.run(sources)
+    finally:
+        embedder.close()
+    for name, value in stats.items():
+        print(f"  {name}: {value}")
 
-    print("Step 2: Generating OpenAI embeddings...")
-    embeddings = generate_embeddings_from_texts(all_chunks)
+    if local_writer is not None:
+        version_dir = local_writer.publish(ivf_lists=get_setting("retriever", "ivf_lists", 0))
+        print(f"Published local index: {version_dir}")
 
-    print("Step 3: Uploading embeddings to Pinecone...")
-    upsert_embeddings(embeddings, all_chunks)
+    if stats["vectors_upserted"] or stats["vectors_deleted"]:
+        # Cached chatbot answers may be based on outdated documents
+        mark_knowledge_base_updated()
 
     print("✅ Embedding pipeline completed.")
 
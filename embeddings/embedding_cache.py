@@ -0,0 +1,234 @@
+# embeddings/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import numpy as np
+
+DEFAULT_CACHE_PATH = "data/embedding_cache.sqlite"
+
+
+def content_key(model: str, text: str) -> str:
+    """Cache key for an embedding: hash of the model name plus the chunk text."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def vector_id(source: str, text: str) -> str:
+    """
+    Deterministic vector ID for a chunk of a source.
+
+    The same chunk text in the same source always maps to the same ID, so
+    re-indexing overwrites vectors instead of adding duplicates.
+    """
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def file_fingerprint(path: str) -> str:
+    """Hash a source file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _SQLiteStore:
+    def __init__(self, db_path: str):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        # One connection shared across threads, serialized by a lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+
+class EmbeddingCache(_SQLiteStore):
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH):
+        """
+        Persistent content-addressed embedding cache.
+
+        Vectors are stored as float32 blobs keyed by content_key(model, text),
+        so unchanged chunks are never sent to the embedding API twice.
+
+        Args:
+            db_path (str): SQLite file holding the cache.
+        """
+        super().__init__(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up cached embeddings.
+
+        Returns:
+            List aligned with texts; None where the text is not cached.
+        """
+        keys = [content_key(model, text) for text in texts]
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update(rows)
+
+        results = []
+        for key in keys:
+            blob = found.get(key)
+            results.append(np.frombuffer(blob, dtype=np.float32).tolist() if blob is not None else None)
+        hits = sum(r is not None for r in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """Store embeddings for texts (same order)."""
+        rows = [
+            (content_key(model, text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def get_or_embed(self, model: str, texts: List[str],
+                     embed_texts: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """
+        Return embeddings for texts, only calling `embed_texts` for texts missing from the cache.
+
+        Args:
+            model: Embedding model name (part of the cache key).
+            texts: Texts to embed.
+            embed_texts: Function embedding a list of texts (e.g. generate_embeddings_from_texts).
+
+        Returns:
+            List of embeddings in the same order as texts.
+        """
+        vectors = self.get_many(model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            new_vectors = embed_texts([texts[i] for i in missing])
+            self.put_many(model, [texts[i] for i in missing], new_vectors)
+            for i, vector in zip(missing, new_vectors):
+                vectors[i] = vector
+        return vectors
+
+
+class IndexManifest(_SQLiteStore):
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH):
+        """
+        Record of what is currently in the vector index.
+
+        Tracks each source's content fingerprint at its last successful sync
+        and the vector IDs upserted for it, so a re-index only touches
+        sources that changed and can delete vectors of removed chunks.
+
+        Args:
+            db_path (str): SQLite file holding the manifest.
+        """
+        super().__init__(db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, fingerprint TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors (vector_id TEXT PRIMARY KEY, source TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS vectors_source ON vectors (source)")
+
+    def sources(self) -> Dict[str, str]:
+        """Return {source: fingerprint} for all synced sources."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT source, fingerprint FROM sources").fetchall())
+
+    def indexed_sources(self) -> Set[str]:
+        """Return every source with vectors in the index, including partially synced ones."""
+        with self._lock:
+            rows = self._conn.execute("SELECT source FROM sources UNION SELECT source FROM vectors").fetchall()
+        return {row[0] for row in rows}
+
+    def vector_ids(self, source: str) -> Set[str]:
+        """Return the vector IDs currently indexed for a source."""
+        with self._lock:
+            rows = self._conn.execute("SELECT vector_id FROM vectors WHERE source = ?", (source,)).fetchall()
+        return {row[0] for row in rows}
+
+    def add_vectors(self, source: str, ids: Iterable[str]):
+        """Record vector IDs as indexed for a source."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (vector_id, source) VALUES (?, ?)", [(i, source) for i in ids]
+            )
+            self._conn.execute("COMMIT")
+
+    def remove_vectors(self, ids: Iterable[str]):
+        """Forget vector IDs that were deleted from the index."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM vectors WHERE vector_id = ?", [(i,) for i in ids])
+            self._conn.execute("COMMIT")
+
+    def set_source(self, source: str, fingerprint: str):
+        """Mark a source as fully synced at the given content fingerprint."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (source, fingerprint) VALUES (?, ?)", (source, fingerprint)
+            )
+
+    def remove_source(self, source: str):
+        """Forget a source and all of its vectors."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM vectors WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+            self._conn.execute("COMMIT")
+
+
+class UpsertCheckpoint(_SQLiteStore):
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH, job: str = "default"):
+        """
+        IDs of vectors a bulk upsert job has already sent.
+
+        UpsertEngine skips them when the job is restarted and clears the
+        checkpoint once the job completes.
+
+        Args:
+            db_path (str): SQLite file holding the checkpoint.
+            job (str): Job name, so several jobs can share one file.
+        """
+        super().__init__(db_path)
+        self.job = job
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS upserted (job TEXT NOT NULL, vector_id TEXT NOT NULL, "
+            "PRIMARY KEY (job, vector_id))"
+        )
+
+    def done_ids(self) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT vector_id FROM upserted WHERE job = ?", (self.job,)).fetchall()
+        return {row[0] for row in rows}
+
+    def add(self, ids: Iterable[str]):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR IGNORE INTO upserted (job, vector_id) VALUES (?, ?)",
+                                   [(self.job, i) for i in ids])
+            self._conn.execute("COMMIT")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM upserted WHERE job = ?", (self.job,))
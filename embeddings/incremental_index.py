@@ -0,0 +1,45 @@
+# embeddings/incremental_index.py
+
+from typing import Callable, Dict, Iterable, List
+from embedding_cache import EmbeddingCache, IndexManifest
+from ingest_pipeline import IngestPipeline
+
+
+def sync_sources(
+    sources: Dict[str, str],
+    load_chunks: Callable[[str], Iterable],
+    embed_texts: Callable[[List[str]], List[List[float]]],
+    cache: EmbeddingCache,
+    manifest: IndexManifest,
+    model: str,
+    index=None,
+    batch_size: int = 100,
+) -> Dict[str, int]:
+    """
+    Bring the vector index in line with the current knowledge-base sources.
+
+    Sources whose content fingerprint matches the manifest are skipped
+    without re-extracting them. For changed sources, only chunks whose
+    deterministic ID is not yet indexed are embedded (through the cache) and
+    upserted, and vectors of chunks that disappeared are deleted. Sources
+    that no longer exist have all their vectors deleted.
+
+    Runs an IngestPipeline without progress reports; use IngestPipeline
+    directly to tune queue sizes and embedding batch sizes.
+
+    Args:
+        sources: {source name: file path} of all current sources.
+        load_chunks: Function returning the text chunks of a source file.
+        embed_texts: Function embedding a list of texts.
+        cache: Persistent embedding cache.
+        manifest: Record of what is in the index.
+        model: Embedding model name.
+        index: Vector index (defaults to the Pinecone index).
+        batch_size: Upsert batch size.
+
+    Returns:
+        Counters describing the work done.
+    """
+    pipeline = IngestPipeline(load_chunks, embed_texts, cache, manifest, model, index=index,
+                              batch_size=batch_size, report_every=0)
+    return pipeline.run(sources)
@@ -0,0 +1,283 @@
+# embeddings/ingest_pipeline.py
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from embedding_cache import EmbeddingCache, IndexManifest, file_fingerprint, vector_id
+from pinecone_utils import UpsertEngine, delete_embeddings, iter_items
+
+# Queue item tag marking that every chunk of a source has been sent downstream
+_SOURCE_DONE = "source_done"
+# Queue item marking the end of the stream
+_END = None
+
+
+class StageStats:
+    def __init__(self, name: str):
+        """Throughput counters of one pipeline stage."""
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+
+class IngestPipeline:
+    def __init__(
+        self,
+        load_chunks: Callable[[str], Iterable],
+        embed_texts: Callable[[List[str]], List[List[float]]],
+        cache: EmbeddingCache,
+        manifest: IndexManifest,
+        model: str,
+        index=None,
+        batch_size: int = 100,
+        embed_batch_size: Optional[int] = None,
+        queue_size: int = 1000,
+        report_every: float = 10.0,
+        upsert_engine: Optional[UpsertEngine] = None,
+    ):
+        """
+        Streaming extract -> embed -> upsert ingest with checkpoints.
+
+        The three stages run in their own threads connected by bounded
+        queues, so extraction, embedding and upserts overlap and peak memory
+        depends on `queue_size`, not on the corpus size. Every upserted batch
+        is recorded in the manifest and embeddings are kept in the cache, so
+        an interrupted run resumes without re-embedding or re-upserting the
+        chunks it already finished.
+
+        Args:
+            load_chunks: Function yielding the chunks of a source file, either
+                strings or {"text", "page_start", "page_end"} dicts.
+            embed_texts: Function embedding a list of texts.
+            cache: Persistent embedding cache.
+            manifest: Record of what is in the index (the checkpoint).
+            model: Embedding model name.
+            index: Vector index (defaults to the Pinecone index).
+            batch_size: Vectors per upsert request.
+            embed_batch_size: Texts per embed_texts call (defaults to batch_size).
+            queue_size: Capacity of each inter-stage queue, in chunks.
+            report_every: Seconds between progress reports (0 disables them).
+            upsert_engine: Engine sending upserts concurrently with retries
+                (defaults to one writing to `index` in requests of `batch_size`).
+        """
+        self.load_chunks = load_chunks
+        self.embed_texts = embed_texts
+        self.cache = cache
+        self.manifest = manifest
+        self.model = model
+        self.index = index
+        self.batch_size = batch_size
+        self.embed_batch_size = embed_batch_size or batch_size
+        self.queue_size = queue_size
+        self.report_every = report_every
+        self.upsert_engine = upsert_engine or UpsertEngine(index, max_batch_size=batch_size)
+        if self.upsert_engine.index is None:
+            self.upsert_engine.index = index
+
+        self.stats = {
+            "sources_skipped": 0, "sources_synced": 0, "sources_removed": 0, "chunks_extracted": 0,
+            "chunks_embedded": 0, "vectors_upserted": 0, "vectors_deleted": 0,
+        }
+        self.stage_stats = {name: StageStats(name) for name in ("extract", "embed", "upsert")}
+        self.max_queue_depth = {"extract->embed": 0, "embed->upsert": 0}
+
+    def run(self, sources: Dict[str, str]) -> Dict[str, int]:
+        """
+        Sync the index with `sources` ({source name: file path}).
+
+        Returns:
+            Counters describing the work done.
+        """
+        self._stop = threading.Event()
+        self._errors = []
+        self._queues = {
+            "extract->embed": queue.Queue(maxsize=self.queue_size),
+            "embed->upsert": queue.Queue(maxsize=max(1, self.queue_size // self.embed_batch_size)),
+        }
+        stages = [
+            threading.Thread(target=self._guard, args=(self._extract_stage, sources), name="ingest-extract"),
+            threading.Thread(target=self._guard, args=(self._embed_stage,), name="ingest-embed"),
+            threading.Thread(target=self._guard, args=(self._upsert_stage,), name="ingest-upsert"),
+        ]
+        for stage in stages:
+            stage.start()
+
+        last_report = time.monotonic()
+        while any(stage.is_alive() for stage in stages):
+            for stage in stages:
+                stage.join(timeout=0.1)
+            for name, q in self._queues.items():
+                self.max_queue_depth[name] = max(self.max_queue_depth[name], q.qsize())
+            if self.report_every and time.monotonic() - last_report >= self.report_every:
+                self.report()
+                last_report = time.monotonic()
+
+        if self._errors:
+            raise self._errors[0]
+
+        self._remove_deleted_sources(sources)
+        if self.report_every:
+            self.report()
+        return self.stats
+
+    def report(self):
+        """Print per-stage throughput and current queue depths."""
+        stages = "  ".join(
+            f"{s.name}: {s.items} ({s.rate():.1f}/s, busy {s.busy_seconds:.1f}s)" for s in self.stage_stats.values()
+        )
+        depths = "  ".join(
+            f"{name}: {q.qsize()}/{q.maxsize} (max {self.max_queue_depth[name]})" for name, q in self._queues.items()
+        )
+        print(f"[ingest] {stages} | queues {depths}")
+
+    def _guard(self, stage, *args):
+        """Run a stage; on failure record the error and stop the other stages."""
+        try:
+            stage(*args)
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def _put(self, name: str, item):
+        q = self._queues[name]
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise InterruptedError("ingest pipeline stopped")
+
+    def _get(self, name: str):
+        q = self._queues[name]
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        raise InterruptedError("ingest pipeline stopped")
+
+    def _extract_stage(self, sources: Dict[str, str]):
+        stats = self.stage_stats["extract"]
+        synced = self.manifest.sources()
+        for source, path in sources.items():
+            fingerprint = file_fingerprint(path)
+            if synced.get(source) == fingerprint:
+                self.stats["sources_skipped"] += 1
+                continue
+
+            print(f"Syncing source: {source}")
+            # Chunks already upserted for this source (by an earlier or interrupted run)
+            indexed = self.manifest.vector_ids(source)
+            seen = set()
+            started = time.monotonic()
+            for chunk in self.load_chunks(path):
+                if isinstance(chunk, str):
+                    chunk = {"text": chunk}
+                chunk_id = vector_id(source, chunk["text"])
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                self.stats["chunks_extracted"] += 1
+                stats.items += 1
+                if chunk_id not in indexed:
+                    stats.busy_seconds += time.monotonic() - started
+                    self._put("extract->embed", dict(chunk, id=chunk_id, source=source))
+                    started = time.monotonic()
+            stats.busy_seconds += time.monotonic() - started
+
+            stale = sorted(indexed - seen)
+            self._put("extract->embed", (_SOURCE_DONE, source, fingerprint, stale))
+        self._put("extract->embed", _END)
+
+    def _embed_stage(self):
+        stats = self.stage_stats["embed"]
+        batch = []
+        # Source-done markers ride along with the batch that follows their last chunk,
+        # so many small sources share upsert/delete requests
+        markers = []
+
+        def flush():
+            started = time.monotonic()
+            vectors = []
+            if batch:
+                misses_before = self.cache.misses
+                vectors = self.cache.get_or_embed(self.model, [chunk["text"] for chunk in batch], self.embed_texts)
+                self.stats["chunks_embedded"] += self.cache.misses - misses_before
+                stats.items += len(batch)
+            stats.busy_seconds += time.monotonic() - started
+            self._put("embed->upsert", (list(batch), vectors, list(markers)))
+            batch.clear()
+            markers.clear()
+
+        while True:
+            item = self._get("extract->embed")
+            if item is _END:
+                if batch or markers:
+                    flush()
+                self._put("embed->upsert", _END)
+                return
+            if isinstance(item, tuple):
+                markers.append(item)
+                pending_stale = sum(len(marker[3]) for marker in markers)
+                if pending_stale >= self.batch_size:
+                    flush()
+                continue
+            batch.append(item)
+            if len(batch) >= self.embed_batch_size:
+                flush()
+
+    def _upsert_stage(self):
+        stats = self.stage_stats["upsert"]
+        while True:
+            item = self._get("embed->upsert")
+            if item is _END:
+                return
+
+            started = time.monotonic()
+            chunks, vectors, markers = item
+            if chunks:
+                metadatas = [
+                    {key: chunk[key] for key in ("source", "page_start", "page_end") if key in chunk}
+                    for chunk in chunks
+                ]
+                ids = [chunk["id"] for chunk in chunks]
+                sources = {chunk["id"]: chunk["source"] for chunk in chunks}
+
+                def checkpoint(ids):
+                    # These chunks are done even if the run dies later
+                    for source in {sources[i] for i in ids}:
+                        self.manifest.add_vectors(source, [i for i in ids if sources[i] == source])
+
+                self.upsert_engine.upsert(
+                    iter_items(vectors, [chunk["text"] for chunk in chunks], ids, metadatas), on_batch=checkpoint,
+                )
+                self.stats["vectors_upserted"] += len(chunks)
+                stats.items += len(chunks)
+
+            # All chunks of these sources are upserted: drop vanished chunks and mark them synced
+            stale = [vector for marker in markers for vector in marker[3]]
+            if stale:
+                delete_embeddings(stale, index=self.index)
+                self.manifest.remove_vectors(stale)
+                self.stats["vectors_deleted"] += len(stale)
+            for _, source, fingerprint, _ in markers:
+                self.manifest.set_source(source, fingerprint)
+                self.stats["sources_synced"] += 1
+            stats.busy_seconds += time.monotonic() - started
+
+    def _remove_deleted_sources(self, sources: Dict[str, str]):
+        for source in sorted(self.manifest.indexed_sources()):
+            if source not in sources:
+                print(f"Removing deleted source: {source}")
+                stale = sorted(self.manifest.vector_ids(source))
+                delete_embeddings(stale, index=self.index)
+                self.manifest.remove_source(source)
+                self.stats["vectors_deleted"] += len(stale)
+                self.stats["sources_removed"] += 1
@@ -1,10 +1,15 @@
 # embeddings/pinecone_utils.py
 
+import json
 import os
-import pinecone
-from typing import List, Dict
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from uuid import uuid4
 from dotenv import load_dotenv
+from config import get_setting
 
 load_dotenv()
 
@@ -13,41 +18,307 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
 
-# Ensure values exist
-if not all([PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME]):
-    raise ValueError("Missing one or more Pinecone environment variables.")
+_initialized = False
 
-# Initialize Pinecone
-pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
+# Pinecone rejects upsert requests above 2 MB and 1000 vectors
+MAX_REQUEST_BYTES = 2_000_000
+MAX_REQUEST_VECTORS = 1000
+# Wire size of one vector dimension (float32)
+BYTES_PER_DIMENSION = 4
+
+# Status codes worth retrying: rate limited, or transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
 
 
 def get_index():
-    """Return Pinecone index object"""
+    """Return Pinecone index object (initializes the Pinecone client on first use)"""
+    global _initialized
+    import pinecone  # imported on first use so tools that never touch Pinecone start faster
+
+    # Ensure values exist
+    if not all([PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME]):
+        raise ValueError("Missing one or more Pinecone environment variables.")
+
+    if not _initialized:
+        pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
+        _initialized = True
+
     if PINECONE_INDEX_NAME not in pinecone.list_indexes():
         raise ValueError(f"Pinecone index '{PINECONE_INDEX_NAME}' does not exist.")
     return pinecone.Index(PINECONE_INDEX_NAME)
 
 
-def upsert_embeddings(embeddings: List[List[float]], texts: List[str], batch_size: int = 100):
+class UpsertEngine:
+    def __init__(
+        self,
+        index=None,
+        max_batch_size: int = 100,
+        max_request_bytes: int = MAX_REQUEST_BYTES,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        report_every: float = 0.0,
+    ):
+        """
+        Concurrent, memory-bounded upserts with retries.
+
+        Vectors are read lazily from an iterator and grouped into requests of
+        at most `max_batch_size` vectors and `max_request_bytes` estimated
+        payload; at most `max_concurrency` requests are in flight, so memory
+        stays bounded by the batches being sent. Rate-limited, 5xx and
+        connection errors are retried with exponential backoff and full
+        jitter. A request rejected as too large is split in half, and later
+        batches are capped at the size that went through.
+
+        Args:
+            index: Index to write to (defaults to get_index()).
+            max_batch_size (int): Maximum vectors per request.
+            max_request_bytes (int): Maximum estimated payload per request.
+            max_concurrency (int): Maximum requests in flight.
+            max_retries (int): Retries per request before giving up.
+            backoff_base (float): First backoff delay in seconds.
+            backoff_max (float): Upper bound on a single backoff delay.
+            report_every (float): Seconds between throughput reports (0 disables them).
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.index = index
+        self.max_batch_size = min(max_batch_size, MAX_REQUEST_VECTORS)
+        self.max_request_bytes = max_request_bytes
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.report_every = report_every
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.stats = {"vectors_upserted": 0, "vectors_skipped": 0, "requests": 0, "retries": 0, "splits": 0,
+                      "bytes": 0, "seconds": 0.0}
+
+    @classmethod
+    def from_settings(cls, index=None, report_every: Optional[float] = None) -> "UpsertEngine":
+        """Build an UpsertEngine configured by the `ingest` section of configs/settings.yaml."""
+        return cls(
+            index=index,
+            max_batch_size=get_setting("ingest", "upsert_batch_size", 100),
+            max_request_bytes=get_setting("ingest", "upsert_max_request_bytes", MAX_REQUEST_BYTES),
+            max_concurrency=get_setting("ingest", "upsert_concurrency", 4),
+            max_retries=get_setting("ingest", "upsert_max_retries", 5),
+            report_every=report_every if report_every is not None else get_setting("ingest", "report_every", 10),
+        )
+
+    def upsert(self, items: Iterable[Tuple[str, List[float], dict]], checkpoint=None,
+               on_batch: Optional[Callable[[List[str]], None]] = None) -> Dict[str, float]:
+        """
+        Upsert (id, vector, metadata) items.
+
+        Args:
+            items: Vectors to upsert; consumed lazily.
+            checkpoint: Optional UpsertCheckpoint. Items it lists are skipped,
+                each finished request is recorded in it, and it is cleared once
+                every item is upserted, so a restarted job only sends what is
+                left.
+            on_batch: Called with the IDs of each finished request (from worker threads).
+
+        Returns:
+            Counters of the work done, including throughput in vectors/s.
+        """
+        index = self.index if self.index is not None else get_index()
+        done = checkpoint.done_ids() if checkpoint is not None else set()
+        self._stop.clear()
+        started = time.monotonic()
+        last_report = started
+        in_flight = set()
+
+        def collect(return_when):
+            nonlocal in_flight, last_report
+            finished, in_flight = wait(in_flight, return_when=return_when)
+            for future in finished:
+                future.result()
+            if self.report_every and time.monotonic() - last_report >= self.report_every:
+                self.report()
+                last_report = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="upsert") as pool:
+            try:
+                for batch in self._batches(items, done):
+                    while len(in_flight) >= self.max_concurrency:
+                        collect(FIRST_COMPLETED)
+                    in_flight.add(pool.submit(self._send, index, batch, checkpoint, on_batch))
+                while in_flight:
+                    collect(FIRST_COMPLETED)
+            except BaseException:
+                # Abandon queued retries; requests already sent finish before the pool shuts down
+                self._stop.set()
+                for future in in_flight:
+                    future.cancel()
+                raise
+            finally:
+                with self._lock:
+                    self.stats["seconds"] += time.monotonic() - started
+
+        if checkpoint is not None:
+            checkpoint.clear()
+        if self.report_every:
+            self.report()
+        return dict(self.stats, vectors_per_second=self.throughput())
+
+    def throughput(self) -> float:
+        """Upserted vectors per second of upsert() time."""
+        with self._lock:
+            seconds = self.stats["seconds"]
+            return self.stats["vectors_upserted"] / seconds if seconds > 0 else 0.0
+
+    def report(self):
+        """Print upsert throughput and retry counters."""
+        with self._lock:
+            stats = dict(self.stats)
+        print(f"[upsert] {stats['vectors_upserted']} vectors in {stats['requests']} requests "
+              f"({stats['bytes'] / 1e6:.1f} MB), {stats['retries']} retries, {stats['splits']} splits, "
+              f"{stats['vectors_skipped']} already done")
+
+    def _batches(self, items: Iterable[Tuple[str, List[float], dict]], done) -> Iterator[List[tuple]]:
+        """Group items into requests within the vector-count and payload-size limits."""
+        batch, batch_bytes = [], 0
+        for item in items:
+            if item[0] in done:
+                self.stats["vectors_skipped"] += 1
+                continue
+            size = _payload_bytes(item)
+            if batch and (len(batch) >= self.max_batch_size or batch_bytes + size > self.max_request_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(item)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def _send(self, index, batch: List[tuple], checkpoint, on_batch):
+        """Send one upsert request, retrying transient failures and splitting oversized batches."""
+        for attempt in range(self.max_retries + 1):
+            if self._stop.is_set():
+                raise InterruptedError("upsert stopped")
+            try:
+                index.upsert(vectors=batch)
+                break
+            except Exception as e:
+                if _is_too_large(e) and len(batch) > 1:
+                    half = len(batch) // 2
+                    with self._lock:
+                        self.stats["splits"] += 1
+                        self.max_batch_size = max(1, min(self.max_batch_size, half))
+                    print(f"[upsert] Request of {len(batch)} vectors too large; splitting in two")
+                    self._send(index, batch[:half], checkpoint, on_batch)
+                    self._send(index, batch[half:], checkpoint, on_batch)
+                    return
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.stats["retries"] += 1
+                print(f"[Retry {attempt + 1}] Upsert of {len(batch)} vectors failed: {e!r}")
+                self._stop.wait(self._backoff_delay(attempt))
+
+        ids = [item[0] for item in batch]
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["vectors_upserted"] += len(batch)
+            self.stats["bytes"] += sum(_payload_bytes(item) for item in batch)
+        if checkpoint is not None:
+            checkpoint.add(ids)
+        if on_batch is not None:
+            on_batch(ids)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+def _payload_bytes(item: Tuple[str, List[float], dict]) -> int:
+    """Estimated request size of one (id, vector, metadata) item."""
+    item_id, vector, metadata = item
+    return len(item_id) + len(vector) * BYTES_PER_DIMENSION + len(json.dumps(metadata, default=str)) + 16
+
+
+def _is_retryable(error: Exception) -> bool:
+    """A status in RETRYABLE_STATUSES, or a connection or timeout error; bugs like TypeError are not retried."""
+    status = getattr(error, "status", None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    from urllib3.exceptions import HTTPError  # the Pinecone client's transport errors (timeouts, resets)
+
+    return isinstance(error, (ConnectionError, TimeoutError, HTTPError))
+
+
+def _is_too_large(error: Exception) -> bool:
+    if getattr(error, "status", None) == 413:
+        return True
+    message = str(error).lower()
+    return "too large" in message or "message length" in message or ("exceeds" in message and "size" in message)
+
+
+def iter_items(embeddings: Iterable[List[float]], texts: Iterable[str], ids: Optional[Iterable[str]] = None,
+               metadatas: Optional[Iterable[Dict]] = None) -> Iterator[Tuple[str, List[float], dict]]:
+    """Lazily zip vectors, texts, IDs and metadata into (id, vector, metadata) upsert items."""
+    ids = iter(ids) if ids is not None else None
+    metadatas = iter(metadatas) if metadatas is not None else None
+    for vector, text in zip(embeddings, texts):
+        metadata = {"text": text}
+        if metadatas is not None:
+            metadata.update(next(metadatas))
+        yield (next(ids) if ids is not None else str(uuid4())), vector, metadata
+
+
+def upsert_embeddings(embeddings: List[List[float]], texts: List[str], batch_size: int = 100,
+                      ids: Optional[List[str]] = None, metadatas: Optional[List[Dict]] = None, index=None,
+                      engine: Optional[UpsertEngine] = None, checkpoint=None,
+                      on_batch: Optional[Callable[[List[str]], None]] = None) -> Dict[str, float]:
     """
     Upsert embedded vectors and original text into Pinecone.
 
     Args:
         embeddings: List of embedding vectors.
         texts: List of original text chunks (same order as embeddings).
-        batch_size: Upsert in chunks to avoid memory overload.
+        batch_size: Maximum vectors per upsert request.
+        ids: Vector IDs (same order). Random IDs are generated if omitted;
+            pass deterministic IDs so re-runs overwrite instead of duplicating.
+        metadatas: Extra metadata per vector, merged with {"text": text}.
+        index: Index to write to (defaults to get_index()).
+        engine: UpsertEngine sending the requests (concurrent, with retries;
+            one is built from configs/settings.yaml if omitted).
+        checkpoint: Optional UpsertCheckpoint making the upload resumable (see UpsertEngine.upsert).
+        on_batch: Called with the IDs of each finished request.
+
+    Returns:
+        Upsert counters (see UpsertEngine.upsert).
     """
     if len(embeddings) != len(texts):
         raise ValueError("Number of embeddings and texts must match.")
+    if ids is not None and len(ids) != len(texts):
+        raise ValueError("Number of ids and texts must match.")
+
+    if engine is None:
+        engine = UpsertEngine.from_settings(index, report_every=0)
+        engine.max_batch_size = min(batch_size, engine.max_batch_size)
+    elif index is not None:
+        engine.index = index
+    return engine.upsert(iter_items(embeddings, texts, ids, metadatas), checkpoint=checkpoint, on_batch=on_batch)
 
-    index = get_index()
 
-    items = []
-    for i in range(len(embeddings)):
-        item_id = str(uuid4())
-        vector = embeddings[i]
-        metadata = {"text": texts[i]}
-        items.append((item_id, vector, metadata))
+def delete_embeddings(ids: List[str], batch_size: int = 1000, index=None):
+    """
+    Delete vectors from Pinecone by ID.
+
+    Args:
+        ids: Vector IDs to delete.
+        batch_size: Number of IDs per delete request.
+        index: Index to delete from (defaults to get_index()).
+    """
+    if not ids:
+        return
+    if index is None:
+        index = get_index()
 
-    # Upload in batches
-    for i in
+    for i in range(0, len(ids), batch_size):
+        index.delete(ids=ids[i:i + batch_size])
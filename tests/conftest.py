@@ -0,0 +1,56 @@
+# tests/conftest.py
+
+import pytest
+from langchain.schema import Document
+from chatbot import Chatbot
+from symptom_checker import SymptomChecker
+from tracing import Tracer
+
+GUIDES_CSV = "symptom,suggestion\nworms in stool,Start a deworming treatment\n"
+GUIDE = "Vomiting cats should be offered water in small amounts."
+
+
+class FakeRetriever:
+    """Returns one fixed guide passage and records the queries it was asked."""
+
+    def __init__(self, text: str = GUIDE):
+        self.text = text
+        self.queries = []
+
+    def get_relevant_documents(self, query):
+        self.queries.append(query)
+        return [Document(page_content=self.text)]
+
+    async def aget_relevant_documents(self, query):
+        return self.get_relevant_documents(query)
+
+
+@pytest.fixture
+def guides_csv(tmp_path):
+    """A one-row symptom CSV: "worms in stool" is answered by the symptom checker."""
+    path = tmp_path / "guides.csv"
+    path.write_text(GUIDES_CSV)
+    return path
+
+
+@pytest.fixture
+def make_chatbot(guides_csv):
+    """
+    Factory building a Chatbot over `guides_csv` with a FakeRetriever.
+
+    make_chatbot(llm, guide=..., retriever=..., answer_cache=..., tracer=..., **kwargs):
+    `guide` is the passage the FakeRetriever returns, `retriever` replaces it,
+    the cache is off and tracing on unless given; other keyword arguments
+    (admission, router) are passed to Chatbot.
+    """
+    def make(llm, guide: str = GUIDE, retriever=None, answer_cache=None, tracer=None, **kwargs) -> Chatbot:
+        return Chatbot(
+            llm=llm,
+            retriever=retriever if retriever is not None else FakeRetriever(guide),
+            symptom_checker=SymptomChecker(str(guides_csv), index_dir=None),
+            answer_cache=answer_cache,
+            tracer=tracer if tracer is not None else Tracer(enabled=True),
+            **kwargs,
+        )
+
+    return make
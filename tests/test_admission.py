@@ -0,0 +1,167 @@
+# tests/test_admission.py
+
+import asyncio
+import threading
+import time
+import pytest
+from langchain.chat_models.fake import FakeListChatModel
+from admission import AdmissionController, AdmissionRejected
+
+TIERS = {
+    "free": {"rate_per_minute": 600, "burst": 2, "max_in_flight": 2, "tier_rate_per_minute": 0},
+    "subscriber": {"rate_per_minute": 0, "max_in_flight": 4, "tier_rate_per_minute": 0},
+}
+
+
+def test_user_bucket_limits_the_rate(tmp_path):
+    admission = AdmissionController(str(tmp_path / "admission.sqlite"), tiers=TIERS)
+    for _ in range(2):
+        admission.release(admission.acquire("alice", "free"))
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("alice", "free")
+    assert rejected.value.reason == "rate_limited"
+    assert 0 < rejected.value.retry_after <= 0.1  # 10 tokens per second
+
+    admission.release(admission.acquire("bob", "free"))  # other users have their own bucket
+    time.sleep(0.12)
+    admission.release(admission.acquire("alice", "free"))
+    assert admission.metrics()["rate_limited"] == 1
+
+
+def test_tier_bucket_is_shared_by_its_users():
+    tiers = {"free": {"rate_per_minute": 0, "tier_rate_per_minute": 6, "tier_burst": 2}}
+    admission = AdmissionController(None, tiers=tiers)
+    admission.release(admission.acquire("alice", "free"))
+    admission.release(admission.acquire("bob", "free"))
+    with pytest.raises(AdmissionRejected):
+        admission.acquire("carol", "free")
+    # Calls without a user only count against the global cap
+    admission.release(admission.acquire(None, None))
+
+
+def test_unknown_tier():
+    with pytest.raises(ValueError):
+        AdmissionController(None, tiers=TIERS).acquire("alice", "gold")
+
+
+def test_calls_in_flight_per_user_are_capped():
+    admission = AdmissionController(None, tiers=TIERS)
+    tickets = [admission.acquire("alice", "subscriber") for _ in range(4)]
+    with pytest.raises(AdmissionRejected):
+        admission.acquire("alice", "subscriber")
+    admission.release(tickets[0])
+    admission.release(admission.acquire("alice", "subscriber"))
+
+
+def test_saturated_calls_get_busy_and_their_tokens_back():
+    admission = AdmissionController(None, max_concurrency=1, max_wait=0.05, tiers=TIERS)
+    held = admission.acquire("alice", "free")
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("bob", "free")
+    assert rejected.value.reason == "busy"
+    assert admission.load() == (1, 0)
+
+    admission.release(held)
+    # Both of bob's tokens are still there
+    for _ in range(2):
+        admission.release(admission.acquire("bob", "free"))
+
+
+def test_queue_length_is_capped():
+    admission = AdmissionController(None, max_concurrency=1, max_queue=0, tiers=TIERS)
+    held = admission.acquire("alice", "free")
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected):
+        admission.acquire("bob", "free")
+    assert time.monotonic() - started < 0.5  # refused without waiting
+    admission.release(held)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_free_slots_go_to_users_with_fewer_running_calls():
+    admission = AdmissionController(None, max_concurrency=2, tiers=TIERS)
+    first, second = admission.acquire("alice", "subscriber"), admission.acquire("alice", "subscriber")
+    order = []
+
+    def ask(user_id):
+        ticket = admission.acquire(user_id, "subscriber")
+        order.append(user_id)
+        return ticket
+
+    alice = threading.Thread(target=ask, args=("alice",))
+    alice.start()
+    _wait_for(lambda: admission.load() == (2, 1))
+    bob = threading.Thread(target=ask, args=("bob",))
+    bob.start()
+    _wait_for(lambda: admission.load() == (2, 2))
+
+    # Alice queued first, but she already has a call running and bob has none
+    admission.release(first)
+    bob.join(timeout=5)
+    assert order == ["bob"]
+    admission.release(second)
+    alice.join(timeout=5)
+    assert order == ["bob", "alice"]
+
+
+def test_processes_sharing_the_store_share_the_limits(tmp_path):
+    path = str(tmp_path / "admission.sqlite")
+    first = AdmissionController(path, max_concurrency=1, max_wait=0.05, tiers=TIERS)
+    second = AdmissionController(path, max_concurrency=1, max_wait=0.05, tiers=TIERS)
+
+    held = first.acquire("alice", "free")
+    with pytest.raises(AdmissionRejected) as rejected:
+        second.acquire("bob", "free")
+    assert rejected.value.reason == "busy"
+    first.release(held)
+
+    second.release(second.acquire("alice", "free"))
+    with pytest.raises(AdmissionRejected) as rejected:
+        second.acquire("alice", "free")  # her second token was taken through `first`
+    assert rejected.value.reason == "rate_limited"
+
+
+def test_slots_of_crashed_callers_are_reclaimed():
+    admission = AdmissionController(None, max_concurrency=1, max_wait=1.0, lease_seconds=0.05, tiers=TIERS)
+    admission.acquire("alice", "free")  # never released
+    admission.release(admission.acquire("bob", "free"))
+
+
+def test_async_waiters_leave_the_queue_when_cancelled():
+    admission = AdmissionController(None, max_concurrency=1, tiers=TIERS)
+
+    async def main():
+        held = await admission.aacquire("alice", "free")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(admission.aacquire("bob", "free"), 0.05)
+        assert admission.load() == (1, 0)
+        admission.release(held)
+        async with admission.aslot("bob", "free") as ticket:
+            assert ticket.user_id == "bob"
+
+    asyncio.run(main())
+    assert admission.metrics()["admitted"] == 2
+    assert 'chatvet_admission_admitted_total{tier="free"} 2' in admission.render_prometheus()
+
+
+def test_chatbot_charges_only_llm_answers(make_chatbot):
+    tiers = {"free": dict(TIERS["free"], rate_per_minute=1)}  # no refill while the answers run
+    admission = AdmissionController(None, tiers=tiers)
+    chatbot = make_chatbot(FakeListChatModel(responses=["Offer water."] * 3), admission=admission)
+
+    for _ in range(3):
+        assert "deworming" in chatbot.ask("worms in stool", user_id="alice", tier="free")
+    assert chatbot.ask("My cat is vomiting", user_id="alice", tier="free") == "Offer water."
+    assert chatbot.ask("My cat is still vomiting", user_id="alice", tier="free") == "Offer water."
+    with pytest.raises(AdmissionRejected):
+        chatbot.ask("My cat vomited again", user_id="alice", tier="free")
+
+    assert admission.metrics()["admitted"] == 2
+    assert chatbot.tracer.recent(1)[0]["source"] == "rejected"
+    assert admission.load() == (0, 0)
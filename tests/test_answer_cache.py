@@ -0,0 +1,101 @@
+# tests/test_answer_cache.py
+
+import time
+import numpy as np
+from answer_cache import AnswerCache, mark_knowledge_base_updated, normalize_question
+
+VOCAB = ["dog", "cat", "vomiting", "not", "eating", "my", "is", "the", "fleas", "keeps"]
+
+
+def bag_of_words(text):
+    words = text.split()
+    return [float(words.count(word)) for word in VOCAB] + [0.01]
+
+
+def make_cache(tmp_path, **kwargs):
+    kwargs.setdefault("embed_query", bag_of_words)
+    kwargs.setdefault("similarity_threshold", 0.85)
+    return AnswerCache(version_path=str(tmp_path / "kb_version"), version_check_interval=0, **kwargs)
+
+
+def test_normalize_question():
+    assert normalize_question("  My DOG is vomiting?! ") == "my dog is vomiting"
+
+
+def test_exact_hit_ignores_case_and_punctuation(tmp_path):
+    cache = make_cache(tmp_path, embed_query=None)
+    cache.put("My dog is vomiting", "Withhold food for a few hours.", latency=3.0)
+
+    assert cache.get("my dog is vomiting!!") == "Withhold food for a few hours."
+    assert cache.get("My cat has fleas") is None
+    metrics = cache.metrics()
+    assert metrics["exact_hits"] == 1 and metrics["misses"] == 1
+    assert metrics["hit_rate"] == 0.5
+    assert metrics["seconds_saved"] == 3.0
+
+
+def test_semantic_hit_on_paraphrase(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("my dog is vomiting", "Withhold food for a few hours.", latency=2.0)
+
+    assert cache.get("the dog keeps vomiting") is None
+    assert cache.get("dog is vomiting") == "Withhold food for a few hours."
+    assert cache.metrics()["semantic_hits"] == 1
+
+
+def test_lru_eviction(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("dog vomiting", "a")
+    cache.put("cat not eating", "b")
+    cache.get("dog vomiting")
+    cache.put("cat fleas", "c")
+
+    assert len(cache) == 2
+    assert cache.get("cat not eating") is None
+    assert cache.get("dog vomiting") == "a"
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_ttl_expiry(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0.05)
+    cache.put("dog vomiting", "a")
+    time.sleep(0.1)
+
+    assert cache.get("dog vomiting") is None
+    assert cache.get("dog is vomiting") is None
+    assert len(cache) == 0
+
+
+def test_persists_across_instances(tmp_path):
+    db_path = str(tmp_path / "answers.sqlite")
+    cache = make_cache(tmp_path, path=db_path)
+    cache.put("my dog is vomiting", "a", latency=1.5)
+    cache.close()
+
+    reopened = make_cache(tmp_path, path=db_path)
+    assert reopened.get("My dog is vomiting") == "a"
+    assert reopened.get("dog is vomiting") == "a"
+
+
+def test_reindex_invalidates(tmp_path):
+    db_path = str(tmp_path / "answers.sqlite")
+    cache = make_cache(tmp_path, path=db_path)
+    cache.put("dog vomiting", "a")
+
+    mark_knowledge_base_updated(str(tmp_path / "kb_version"))
+    assert cache.get("dog vomiting") is None
+    assert cache.metrics()["invalidations"] == 1
+
+    cache.put("dog vomiting", "b")
+    cache.close()
+    assert make_cache(tmp_path, path=db_path).get("dog vomiting") == "b"
+
+
+def test_embedding_failure_falls_back_to_exact(tmp_path):
+    def broken(text):
+        raise RuntimeError("embedding API down")
+
+    cache = make_cache(tmp_path, embed_query=broken)
+    cache.put("dog vomiting", "a")
+    assert cache.get("Dog vomiting.") == "a"
+    assert cache.get("dog is vomiting") is None
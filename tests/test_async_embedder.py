@@ -0,0 +1,57 @@
+# tests/test_async_embedder.py
+
+import asyncio
+import time
+import pytest
+from async_embedder import AsyncEmbedder, EmbeddingError, TokenBucket
+from fake_services import FakeEmbeddingServer, fake_embedding
+
+
+def run_against_fake_server(server, texts, **embedder_kwargs):
+    async def main():
+        url = await server.start()
+        try:
+            embedder = AsyncEmbedder(api_key="test", api_base=url, **embedder_kwargs)
+            return embedder, await embedder.embed(texts)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_batched_results_keep_input_order():
+    texts = [f"chunk number {i}" for i in range(250)]
+    server = FakeEmbeddingServer(latency=0.01, dim=8)
+    embedder, vectors = run_against_fake_server(server, texts, max_batch_size=32, max_concurrency=4)
+
+    assert vectors == [fake_embedding(text, 8) for text in texts]
+    assert server.requests == 8  # ceil(250 / 32)
+    assert 1 < server.max_in_flight <= 4
+
+
+def test_rate_limited_batches_are_retried():
+    server = FakeEmbeddingServer(latency=0.0, dim=4, fail_first=2)
+    embedder, vectors = run_against_fake_server(
+        server, ["dog vomiting"], backoff_base=0.01, max_retries=3,
+    )
+
+    assert vectors == [fake_embedding("dog vomiting", 4)]
+    assert embedder.retries == 2
+
+
+def test_gives_up_after_max_retries():
+    server = FakeEmbeddingServer(latency=0.0, dim=4, fail_first=10)
+    with pytest.raises(EmbeddingError):
+        run_against_fake_server(server, ["dog vomiting"], backoff_base=0.001, max_retries=2)
+
+
+def test_token_bucket_limits_rate():
+    async def main():
+        bucket = TokenBucket(capacity=5, refill_per_second=100)
+        start = time.monotonic()
+        for _ in range(25):
+            await bucket.acquire(1)
+        return time.monotonic() - start
+
+    # 5 tokens of burst, then 20 more at 100/s
+    assert asyncio.run(main()) >= 0.18
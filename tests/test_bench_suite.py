@@ -0,0 +1,42 @@
+# tests/test_bench_suite.py
+
+from langchain.vectorstores import Pinecone
+from bench_suite import find_regressions, summarize
+from fake_services import FakeEmbeddings, FakePineconeIndex
+
+
+def test_fake_pinecone_index_serves_langchain_queries():
+    embeddings = FakeEmbeddings(dim=32)
+    texts = ["Vomiting in dogs", "Cat sneezing", "Rabbit not eating"]
+    index = FakePineconeIndex()
+    index.upsert(vectors=[(f"id-{i}", embeddings.embed_query(text), {"text": text, "source": "guides.csv"})
+                          for i, text in enumerate(texts)])
+
+    docs = Pinecone(index, embeddings, "text").similarity_search_with_score("Cat sneezing", k=2)
+    assert docs[0][0].page_content == "Cat sneezing"
+    assert docs[0][0].metadata == {"source": "guides.csv"}
+    assert docs[0][1] > docs[1][1]
+    assert index.vectors["id-1"][1]["text"] == "Cat sneezing"
+    assert index.query_requests == 1
+
+
+def test_summarize_reports_percentiles_and_throughput():
+    result = summarize([0.001] * 98 + [0.010, 0.100], items=200, unit="queries")
+
+    assert result["p50_ms"] == 1.0
+    assert 1.0 < result["p99_ms"] <= 100.0
+    assert round(result["throughput"]) == round(200 / 0.208)
+    assert result["samples"] == 100
+
+
+def test_regressions_are_flagged_beyond_tolerance():
+    baseline = {"ask": summarize([0.100] * 100, 100, "answers"), "chunk": summarize([0.001] * 100, 100, "words")}
+    slower = {"ask": summarize([0.150] * 100, 100, "answers"), "chunk": summarize([0.0012] * 100, 100, "words")}
+    similar = {"ask": summarize([0.110] * 100, 100, "answers")}
+
+    regressions = find_regressions(slower, baseline, tolerance=0.2, min_delta_ms=0.5)
+    assert any(r.startswith("ask: p50_ms") for r in regressions)
+    assert any(r.startswith("ask: throughput") for r in regressions)
+    # +0.2 ms on a 1 ms operation is within the absolute noise floor
+    assert not any(r.startswith("chunk: p") for r in regressions)
+    assert find_regressions(similar, baseline, tolerance=0.2, min_delta_ms=0.5) == []
@@ -0,0 +1,122 @@
+# tests/test_chat_history.py
+
+import multiprocessing
+import pytest
+from chat_history import ChatHistoryStore
+
+
+def test_recent_returns_a_bounded_window_in_order(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite"), window=3)
+    for i in range(5):
+        store.append("alice", "user" if i % 2 == 0 else "bot", f"message {i}")
+
+    assert store.recent("alice") == [
+        {"role": "user", "content": "message 2"},
+        {"role": "bot", "content": "message 3"},
+        {"role": "user", "content": "message 4"},
+    ]
+    store.append("alice", "bot", "message 5")
+    assert [m["content"] for m in store.recent("alice")] == ["message 3", "message 4", "message 5"]
+    assert store.recent("bob") == []
+
+
+def test_older_messages_are_paged_from_disk(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite"), window=2)
+    for i in range(7):
+        store.append("alice", "user", f"message {i}")
+
+    pages = []
+    page = store.page("alice", limit=3)
+    while page:
+        pages.append([m["content"] for m in page])
+        page = store.page("alice", before_id=page[0]["id"], limit=3)
+    assert pages == [["message 4", "message 5", "message 6"], ["message 1", "message 2", "message 3"], ["message 0"]]
+
+
+def test_history_survives_a_restart_and_clear_removes_it(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    store = ChatHistoryStore(path)
+    store.append("alice", "user", "Why is my cat sneezing?")
+    store.close()
+
+    reopened = ChatHistoryStore(path)
+    assert reopened.recent("alice") == [{"role": "user", "content": "Why is my cat sneezing?"}]
+    reopened.clear("alice")
+    assert reopened.recent("alice") == []
+    assert reopened.count("alice") == 0
+
+
+def test_conversation_state_is_saved_and_cleared(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite"))
+    assert store.get_state("alice") is None
+    store.set_state("alice", {"summary": "Luna is vomiting", "turns": [["q", "a"]]})
+    assert store.get_state("alice") == {"summary": "Luna is vomiting", "turns": [["q", "a"]]}
+    store.clear("alice")
+    assert store.get_state("alice") is None
+
+
+def test_cached_windows_are_bounded(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite"), window=2, max_cached_users=3)
+    for user in range(10):
+        store.append(f"user{user}", "user", "hello")
+        store.recent(f"user{user}")
+    assert len(store._windows) == 3
+    # Evicted users are reloaded from disk
+    assert store.recent("user0") == [{"role": "user", "content": "hello"}]
+
+
+def test_writes_from_another_connection_are_visible(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    first, second = ChatHistoryStore(path, window=5), ChatHistoryStore(path, window=5)
+    first.append("alice", "user", "question")
+    assert len(second.recent("alice")) == 1
+    first.append("alice", "bot", "answer")
+    assert [m["content"] for m in second.recent("alice")] == ["question", "answer"]
+
+
+def test_clearing_in_one_store_reaches_the_others_cached_windows(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    first, second = ChatHistoryStore(path, window=5), ChatHistoryStore(path, window=5)
+    first.append("alice", "user", "question")
+    first.append("alice", "bot", "answer")
+    assert len(second.recent("alice")) == 2
+
+    first.clear("alice")
+    assert second.recent("alice") == []
+    first.append("alice", "user", "new question")
+    assert second.recent("alice") == [{"role": "user", "content": "new question"}]
+
+
+def _append_many(path, worker, count):
+    store = ChatHistoryStore(path)
+    for i in range(count):
+        store.append(f"user{i % 10}", "user", f"worker {worker} message {i}")
+    store.close()
+
+
+def test_concurrent_writers_in_several_processes(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    ChatHistoryStore(path).close()  # create the schema once
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_append_many, args=(path, worker, 200)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    store = ChatHistoryStore(path)
+    assert sum(store.count(f"user{u}") for u in range(10)) == 800
+
+
+def test_invalid_window():
+    with pytest.raises(ValueError):
+        ChatHistoryStore(None, window=0)
+
+
+def test_state_is_replaced_only_if_unchanged(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite"))
+    store.set_state("alice", {"summary": "extractive"})
+    assert store.replace_state("alice", {"summary": "extractive"}, {"summary": "llm"})
+    assert not store.replace_state("alice", {"summary": "extractive"}, {"summary": "stale"})
+    assert store.get_state("alice") == {"summary": "llm"}
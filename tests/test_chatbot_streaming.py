@@ -0,0 +1,135 @@
+# tests/test_chatbot_streaming.py
+
+import logging
+import pytest
+from langchain.chat_models.fake import FakeListChatModel
+from answer_cache import AnswerCache
+from chatbot import ERROR_MESSAGE
+from tracing import Tracer
+
+HAIRBALL_GUIDE = "Hairballs are common in long-haired cats."
+
+
+class BrokenLLM:
+    def stream(self, prompt):
+        yield type("Chunk", (), {"content": "Partial"})()
+        raise RuntimeError("connection reset")
+
+
+@pytest.fixture
+def make_chatbot(make_chatbot, tmp_path):
+    """Chatbot answering from the hairball guide, with an answer cache and a trace log in tmp_path."""
+    def make(llm):
+        return make_chatbot(
+            llm,
+            guide=HAIRBALL_GUIDE,
+            answer_cache=AnswerCache(version_path=str(tmp_path / "kb_version")),
+            tracer=Tracer(enabled=True, log_path=str(tmp_path / "traces.jsonl")),
+        )
+
+    return make
+
+
+def test_ask_stream_yields_tokens_incrementally(make_chatbot):
+    chatbot = make_chatbot(FakeListChatModel(responses=["Brush your cat daily."], sleep=0.01))
+
+    pieces = list(chatbot.ask_stream("Why does my cat cough up hairballs?"))
+    assert len(pieces) > 1
+    assert "".join(pieces) == "Brush your cat daily."
+
+    timing = chatbot.timings[-1]
+    assert timing["source"] == "llm"
+    assert 0 < timing["ttft"] < timing["total"]
+
+
+def test_prompt_contains_retrieved_context(make_chatbot):
+    llm = FakeListChatModel(responses=["ok"])
+    chatbot = make_chatbot(llm)
+    seen = []
+    original_stream = llm.stream
+    object.__setattr__(llm, "stream", lambda prompt: seen.append(prompt) or original_stream(prompt))
+
+    chatbot.ask("Why does my cat cough up hairballs?")
+    assert "Hairballs are common" in seen[0]
+    assert "Why does my cat cough up hairballs?" in seen[0]
+
+
+def test_weak_symptom_matches_join_the_context(make_chatbot):
+    llm = FakeListChatModel(responses=["ok"])
+    chatbot = make_chatbot(llm)
+    chatbot.symptom_match_threshold = 0.9
+    seen = []
+    original_stream = llm.stream
+    object.__setattr__(llm, "stream", lambda prompt: seen.append(prompt) or original_stream(prompt))
+
+    chatbot.ask("My cat has worms and hairballs, what should I do about it?")
+    assert "Hairballs are common" in seen[0]
+    assert "Start a deworming treatment" in seen[0]
+
+
+def test_ask_matches_joined_stream_and_caches(make_chatbot):
+    chatbot = make_chatbot(FakeListChatModel(responses=["First answer.", "Second answer."]))
+
+    assert chatbot.ask("Why does my cat cough up hairballs?") == "First answer."
+    # Served from the answer cache, not regenerated
+    assert chatbot.ask("why does my cat cough up hairballs") == "First answer."
+    assert [t["source"] for t in chatbot.timings] == ["llm", "cache"]
+    assert set(chatbot.timing_summary()) == {"llm", "cache"}
+
+
+def test_symptom_checker_answer_is_one_piece(make_chatbot):
+    chatbot = make_chatbot(FakeListChatModel(responses=["unused"]))
+
+    pieces = list(chatbot.ask_stream("worms in stool"))
+    assert len(pieces) == 1
+    assert "deworming" in pieces[0]
+    assert chatbot.timings[-1]["source"] == "symptom_checker"
+
+
+def test_error_mid_stream_keeps_partial_answer(make_chatbot):
+    chatbot = make_chatbot(BrokenLLM())
+
+    answer = chatbot.ask("Why does my cat cough up hairballs?")
+    assert answer.startswith("Partial")
+    assert answer.endswith(ERROR_MESSAGE)
+    assert len(chatbot.answer_cache) == 0
+
+
+def test_ask_records_stage_spans_and_tokens(make_chatbot, tmp_path):
+    import json
+
+    chatbot = make_chatbot(FakeListChatModel(responses=["Brush your cat daily."]))
+    chatbot.ask("Why does my cat cough up hairballs?")
+    chatbot.ask("worms in stool")
+
+    llm_trace, symptom_trace = chatbot.tracer.recent()[::-1]
+    spans = {span["name"] for span in llm_trace["spans"]}
+    assert {"symptom_matching", "answer_cache", "vector_search", "prompt_assembly", "llm_generation"} <= spans
+    assert llm_trace["source"] == "llm" and llm_trace["cache_hit"] is False
+    assert llm_trace["prompt_tokens"] > 0 and llm_trace["completion_tokens"] > 1
+    assert symptom_trace["source"] == "symptom_checker"
+    assert "llm_generation" not in {span["name"] for span in symptom_trace["spans"]}
+
+    logged = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    assert [record["trace_id"] for record in logged] == [llm_trace["trace_id"], symptom_trace["trace_id"]]
+
+
+def test_llm_errors_are_traced(make_chatbot):
+    chatbot = make_chatbot(BrokenLLM())
+    chatbot.ask("Why does my cat cough up hairballs?")
+
+    trace = chatbot.tracer.recent()[0]
+    assert trace["source"] == "error"
+    assert "connection reset" in trace["error"]
+    assert "connection reset" in [span for span in trace["spans"] if span["name"] == "llm_generation"][0]["error"]
+    assert 'chatvet_errors_total{stage="llm_generation"} 1' in chatbot.tracer.render_prometheus()
+
+
+def test_llm_errors_are_logged_with_tracing_disabled(make_chatbot, caplog):
+    chatbot = make_chatbot(BrokenLLM())
+    chatbot.tracer = Tracer(enabled=False)
+    with caplog.at_level(logging.INFO, logger="chatbot"):
+        chatbot.ask("Why does my cat cough up hairballs?")
+
+    error = [record for record in caplog.records if record.levelno == logging.ERROR][0]
+    assert error.exc_info[1].args == ("connection reset",)
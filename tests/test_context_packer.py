@@ -0,0 +1,75 @@
+# tests/test_context_packer.py
+
+from langchain.prompts import PromptTemplate
+from langchain.schema import Document
+from context_packer import ContextPacker
+from preprocessing import chunk_text
+
+TEMPLATE = PromptTemplate(input_variables=["question", "context"],
+                          template="Context:\n{context}\n\nQuestion:\n{question}\n\nAnswer:")
+
+GUIDE = " ".join(f"word{i}" for i in range(300))
+
+
+def make_packer(**kwargs):
+    defaults = dict(prompt_template=TEMPLATE, max_context_tokens=0, context_window=100_000, max_output_tokens=1024)
+    defaults.update(kwargs)
+    return ContextPacker(**defaults)
+
+
+def test_overlapping_chunks_are_joined():
+    chunks = chunk_text(GUIDE, max_chunk_size=100, overlap=20)
+    docs = [Document(page_content=chunk) for chunk in reversed(chunks)]
+
+    packed = make_packer().pack(docs, "question")
+    assert packed.text == GUIDE
+    assert packed.merged == len(chunks) - 1
+    assert packed.tokens < packed.original_tokens
+    assert packed.tokens_saved == packed.original_tokens - packed.tokens
+
+
+def test_duplicates_are_dropped_keeping_the_best_rank():
+    docs = [
+        Document(page_content="Withhold food for 12 hours and offer small sips of water often.", metadata={"rank": 0}),
+        Document(page_content="Brush long-haired cats daily to prevent hairballs."),
+        Document(page_content="withhold food for 12 hours and offer small sips of water often.", metadata={"rank": 2}),
+        Document(page_content="Brush long-haired cats daily"),
+    ]
+
+    packed = make_packer().pack(docs, "question")
+    assert [doc.page_content for doc in packed.documents] == [docs[0].page_content, docs[1].page_content]
+    assert packed.documents[0].metadata == {"rank": 0}
+    assert packed.dropped == 2
+
+
+def test_context_fits_the_budget_in_rank_order():
+    docs = [Document(page_content=f"topic{n} " + " ".join(f"detail{n}x{i}" for i in range(200))) for n in range(5)]
+    packer = make_packer(max_context_tokens=900)
+
+    packed = packer.pack(docs, "question")
+    assert packed.tokens <= packer.budget("question") <= 900
+    assert packed.documents[0].page_content == docs[0].page_content
+    assert packed.truncated == 1
+    assert packed.documents[-1].metadata["truncated"] is True
+    assert packed.dropped == len(docs) - len(packed.documents)
+
+
+def test_budget_reserves_template_question_and_answer():
+    packer = make_packer(context_window=2000, max_output_tokens=500)
+    question = "Why is my dog scratching so much?"
+
+    expected = 2000 - 500 - packer.count(TEMPLATE.format(context="", question="")) - packer.count(question)
+    assert packer.budget(question) == expected
+    assert make_packer(context_window=1000, max_output_tokens=1000).budget(question) == 0
+
+
+def test_metrics_accumulate():
+    packer = make_packer()
+    docs = [Document(page_content="Offer water."), Document(page_content="Offer water.")]
+    packer.pack(docs, "q")
+    packer.pack(docs, "q")
+
+    metrics = packer.metrics()
+    assert metrics["requests"] == 2
+    assert metrics["dropped"] == 2
+    assert metrics["tokens_saved"] > 0
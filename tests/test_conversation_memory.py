@@ -0,0 +1,119 @@
+# tests/test_conversation_memory.py
+
+import threading
+from langchain.chat_models.fake import FakeListChatModel
+from langchain.schema.messages import AIMessageChunk
+from conversation_memory import ConversationMemory
+from token_utils import count_tokens
+
+LONG_ANSWER = "Keep her hydrated and watch her closely. " + "Offer small amounts of water often. " * 40
+
+
+def test_old_turns_are_folded_into_a_bounded_summary():
+    memory = ConversationMemory(recent_turns=2, max_summary_tokens=60)
+    memory.add_turn("My 3 year old cat Luna is vomiting.", "Offer water. Call a vet if it lasts.")
+    for i in range(20):
+        memory.add_turn(f"Question {i} about Luna?", f"Answer {i}. More detail.")
+
+    assert len(memory.turns) == 2
+    assert memory.summarized_turns == 19
+    assert count_tokens(memory.summary) <= 60
+    # The opening question introduces the pet and is kept
+    assert memory.summary.startswith("Asked: My 3 year old cat Luna is vomiting.")
+
+
+def test_render_and_query_carry_earlier_context():
+    memory = ConversationMemory(recent_turns=2)
+    assert memory.render("Is my cat sick?") == "Is my cat sick?"
+
+    memory.add_turn("My cat is vomiting.", "Offer water.")
+    prompt_question = memory.render("What if she's also lethargic?")
+    assert "Pet owner: My cat is vomiting." in prompt_question
+    assert prompt_question.endswith("Current question: What if she's also lethargic?")
+    assert "vomiting" in memory.retrieval_query("What if she's also lethargic?")
+
+
+def test_summarizer_is_used_and_failures_fall_back():
+    memory = ConversationMemory(recent_turns=1)
+    memory.add_turn("q1", "a1")
+    memory.add_turn("q2", "a2", summarize=lambda summary, turns: f"summary of {turns[0][0]}")
+    assert memory.summary == "summary of q1"
+
+    def broken(summary, turns):
+        raise RuntimeError("rate limited")
+
+    memory.add_turn("q3", "a3", summarize=broken)
+    assert "Asked: q2" in memory.summary
+
+
+def test_state_round_trips():
+    memory = ConversationMemory.from_settings()
+    for i in range(5):
+        memory.add_turn(f"q{i}", f"a{i}")
+    restored = ConversationMemory.from_settings(memory.to_dict())
+    assert restored.render("next?") == memory.render("next?")
+    assert restored.summarized_turns == memory.summarized_turns
+
+
+def test_prompt_size_stays_flat_over_a_long_conversation(make_chatbot):
+    chatbot = make_chatbot(FakeListChatModel(responses=[LONG_ANSWER] * 50))
+    chatbot.llm_summary = False
+    memory = ConversationMemory(recent_turns=3, max_turn_tokens=150, max_summary_tokens=200)
+    prompt_tokens = []
+    for turn in range(50):
+        chatbot.ask(f"My cat has been vomiting for {turn + 1} days, should I worry? Question {turn}", memory)
+        prompt_tokens.append(chatbot.tracer.recent(1)[0]["prompt_tokens"])
+
+    assert len(memory.turns) == 3
+    # Once the window and the summary are full, the prompt stops growing
+    assert max(prompt_tokens[10:]) - min(prompt_tokens[10:]) <= 20
+    assert max(prompt_tokens) <= prompt_tokens[0] + 200 + 3 * 150 + 50
+
+
+def test_follow_up_is_retrieved_with_the_conversation(make_chatbot):
+    chatbot = make_chatbot(FakeListChatModel(responses=["Offer water.", "Lethargy with vomiting needs a vet."]))
+    chatbot.llm_summary = False
+    memory = ConversationMemory()
+    chatbot.ask("My cat is vomiting, what should I do?", memory)
+    chatbot.ask("What if she's also lethargic?", memory)
+
+    assert "vomiting" in chatbot.retriever.queries[-1]
+    assert memory.turns[-1] == ("What if she's also lethargic?", "Lethargy with vomiting needs a vet.")
+
+
+def test_follow_ups_are_not_short_circuited_by_an_earlier_symptom(make_chatbot):
+    chatbot = make_chatbot(FakeListChatModel(responses=["Lethargy with vomiting needs a vet."]))
+    chatbot.llm_summary = False
+    memory = ConversationMemory()
+    assert chatbot.ask("Worms in stool", memory).startswith("Based on your symptoms")
+
+    answer = chatbot.ask("What if she's also lethargic and not eating?", memory)
+    assert answer == "Lethargy with vomiting needs a vet."
+    assert "worms in stool" in chatbot.retriever.queries[-1].lower()
+
+
+class SlowSummaryLLM:
+    """Answers at once; its summaries wait until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def stream(self, prompt):
+        yield AIMessageChunk(content="Offer water.")
+
+    def predict(self, prompt):
+        self.release.wait(5)
+        return "Luna, a cat, has been vomiting."
+
+
+def test_llm_summaries_do_not_hold_up_the_answer(make_chatbot):
+    chatbot = make_chatbot(SlowSummaryLLM())
+    memory = ConversationMemory(recent_turns=1)
+    chatbot.ask("My cat Luna is vomiting", memory)
+
+    assert chatbot.ask("What should I feed her?", memory) == "Offer water."
+    assert not memory.pending_summary.done()
+    assert "Asked: My cat Luna is vomiting" in memory.summary  # extractive until the LLM summary is done
+    chatbot.llm.release.set()
+    assert memory.pending_summary.result(timeout=5)
+    assert memory.summary == "Luna, a cat, has been vomiting."
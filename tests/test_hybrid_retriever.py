@@ -0,0 +1,73 @@
+# tests/test_hybrid_retriever.py
+
+import time
+import pytest
+from langchain.schema import Document
+from hybrid_retriever import HybridRetriever
+
+
+class SlowSymptomChecker:
+    def __init__(self, matches, latency=0.0):
+        self.matches = matches
+        self.latency = latency
+
+    def find_closest_symptoms_batch(self, queries, top_k=3):
+        time.sleep(self.latency)
+        return [self.matches[:top_k] for _ in queries]
+
+
+class SlowRetriever:
+    def __init__(self, texts, latency=0.0):
+        self.texts = texts
+        self.latency = latency
+
+    def get_relevant_documents(self, query):
+        time.sleep(self.latency)
+        return [Document(page_content=text) for text in self.texts]
+
+
+LEXICAL = [("dog vomiting", 0.4, "Withhold food"), ("cat vomiting", 0.2, "Offer water")]
+
+
+def test_rrf_ranks_documents_found_by_both_searches_first():
+    retriever = SlowRetriever(["Guide A", "Symptom: cat vomiting\nSuggestion: Offer water", "Guide B"])
+    hybrid = HybridRetriever(SlowSymptomChecker(LEXICAL), retriever, fusion="rrf", top_k=3)
+
+    docs = hybrid.retrieve("vomiting").documents
+    assert docs[0].page_content == "Symptom: cat vomiting\nSuggestion: Offer water"
+    assert len(docs) == 3
+    assert docs[0].metadata["fusion_score"] > docs[1].metadata["fusion_score"]
+
+
+def test_weights_shift_the_ranking():
+    retriever = SlowRetriever(["Guide A"])
+    lexical_first = HybridRetriever(SlowSymptomChecker(LEXICAL), retriever, lexical_weight=0.9, vector_weight=0.1)
+    vector_first = HybridRetriever(SlowSymptomChecker(LEXICAL), retriever, lexical_weight=0.1, vector_weight=0.9)
+
+    assert lexical_first.retrieve("q").documents[0].metadata["source"] == "symptom_checker"
+    assert vector_first.retrieve("q").documents[0].page_content == "Guide A"
+
+
+def test_weighted_fusion_uses_scores():
+    hybrid = HybridRetriever(fusion="weighted", top_k=3)
+    vector = [(Document(page_content="Guide A"), 0.9), (Document(page_content="Guide B"), 0.1)]
+
+    docs = hybrid.fuse(LEXICAL, vector)
+    assert [doc.page_content for doc in docs] == [
+        "Guide A", "Symptom: dog vomiting\nSuggestion: Withhold food", "Symptom: cat vomiting\nSuggestion: Offer water",
+    ]
+    assert docs[0].metadata["fusion_score"] == pytest.approx(0.45)
+
+
+def test_searches_run_concurrently():
+    hybrid = HybridRetriever(SlowSymptomChecker(LEXICAL, latency=0.2), SlowRetriever(["Guide A"], latency=0.2))
+
+    started = time.perf_counter()
+    result = hybrid.retrieve("vomiting")
+    assert time.perf_counter() - started < 0.35
+    assert result.best_lexical_score == 0.4
+
+
+def test_unknown_fusion_method():
+    with pytest.raises(ValueError):
+        HybridRetriever(fusion="max")
@@ -0,0 +1,15 @@
+# tests/test_import_time.py
+
+import pytest
+from bench_import_time import HEAVY_PACKAGES, IMPORT_BUDGETS, measure_import
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS))
+def test_import_stays_within_budget(module):
+    measured = measure_import(module)
+    eager = sorted(set(measured["packages"]) & set(HEAVY_PACKAGES))
+
+    assert eager == [], f"{module} imports {eager} at import time; defer them to first use"
+    assert measured["seconds"] <= IMPORT_BUDGETS[module], (
+        f"{module} took {measured['seconds']:.2f}s to import (budget {IMPORT_BUDGETS[module]}s)"
+    )
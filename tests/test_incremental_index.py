@@ -0,0 +1,82 @@
+# tests/test_incremental_index.py
+
+import pytest
+from embedding_cache import EmbeddingCache, IndexManifest
+from incremental_index import sync_sources
+from fake_services import FakePineconeIndex, fake_embedding
+
+MODEL = "test-model"
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.embedded = []
+
+    def __call__(self, texts):
+        self.embedded.extend(texts)
+        return [fake_embedding(text, 8) for text in texts]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    files = {}
+    for name in ["a", "b", "c"]:
+        path = tmp_path / f"{name}.txt"
+        path.write_text("\n".join(f"{name} chunk {i}" for i in range(5)))
+        files[name] = str(path)
+    return files
+
+
+def load_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def sync(files, tmp_path, index, embedder):
+    db_path = str(tmp_path / "cache.sqlite")
+    return sync_sources(
+        files, load_lines, embedder, EmbeddingCache(db_path), IndexManifest(db_path), MODEL, index=index,
+    )
+
+
+def test_rerun_without_changes_does_nothing(corpus, tmp_path):
+    index, embedder = FakePineconeIndex(), CountingEmbedder()
+    first = sync(corpus, tmp_path, index, embedder)
+    assert first["vectors_upserted"] == 15
+    assert len(index.vectors) == 15
+
+    upserts_before = index.upsert_requests
+    second = sync(corpus, tmp_path, index, embedder)
+    assert second["sources_skipped"] == 3
+    assert len(embedder.embedded) == 15
+    assert index.upsert_requests == upserts_before
+    assert len(index.vectors) == 15
+
+
+def test_edited_source_only_touches_changed_chunks(corpus, tmp_path):
+    index, embedder = FakePineconeIndex(), CountingEmbedder()
+    sync(corpus, tmp_path, index, embedder)
+
+    with open(corpus["b"], "w") as f:
+        f.write("\n".join(["b chunk 0", "b chunk 1", "b chunk 2", "b chunk 3", "b chunk edited"]))
+    stats = sync(corpus, tmp_path, index, embedder)
+
+    assert stats["sources_synced"] == 1
+    assert stats["chunks_embedded"] == 1
+    assert stats["vectors_upserted"] == 1
+    assert stats["vectors_deleted"] == 1
+    texts = {metadata["text"] for _, metadata in index.vectors.values()}
+    assert "b chunk edited" in texts and "b chunk 4" not in texts
+    assert len(index.vectors) == 15
+
+
+def test_deleted_source_vectors_are_removed(corpus, tmp_path):
+    index, embedder = FakePineconeIndex(), CountingEmbedder()
+    sync(corpus, tmp_path, index, embedder)
+
+    del corpus["c"]
+    stats = sync(corpus, tmp_path, index, embedder)
+
+    assert stats["sources_removed"] == 1
+    assert len(index.vectors) == 10
+    assert all(metadata["source"] != "c" for _, metadata in index.vectors.values())
@@ -0,0 +1,118 @@
+# tests/test_ingest_pipeline.py
+
+import time
+import pytest
+from async_embedder import AsyncEmbedder, BlockingEmbedder
+from embedding_cache import EmbeddingCache, IndexManifest
+from ingest_pipeline import IngestPipeline
+from pinecone_utils import UpsertEngine
+from fake_services import FakeEmbeddingServer, FakePineconeIndex, fake_embedding
+
+
+class FlakyIndex(FakePineconeIndex):
+    """Fake index that fails after a number of upsert requests."""
+
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def upsert(self, vectors, **kwargs):
+        if self.fail_after is not None and self.upsert_requests >= self.fail_after:
+            raise ConnectionError("index unavailable")
+        return super().upsert(vectors, **kwargs)
+
+
+def make_sources(tmp_path, num_sources=4, chunks_per_source=50):
+    sources = {}
+    for s in range(num_sources):
+        path = tmp_path / f"guide{s}.txt"
+        path.write_text("\n".join(f"guide {s} chunk {c}" for c in range(chunks_per_source)))
+        sources[f"guide{s}"] = str(path)
+    return sources
+
+
+def load_chunks(path):
+    with open(path) as f:
+        for page, line in enumerate(f, start=1):
+            yield {"text": line.strip(), "page_start": page, "page_end": page}
+
+
+def make_pipeline(tmp_path, index, embedded, **kwargs):
+    def embed(texts):
+        embedded.extend(texts)
+        return [fake_embedding(text, 8) for text in texts]
+
+    db_path = str(tmp_path / "cache.sqlite")
+    return IngestPipeline(load_chunks, embed, EmbeddingCache(db_path), IndexManifest(db_path), "test-model",
+                          index=index, batch_size=10, report_every=0, **kwargs)
+
+
+def test_pipeline_indexes_all_chunks_with_metadata(tmp_path):
+    sources = make_sources(tmp_path)
+    index, embedded = FakePineconeIndex(), []
+    stats = make_pipeline(tmp_path, index, embedded, queue_size=16).run(sources)
+
+    assert stats["vectors_upserted"] == 200
+    assert len(index.vectors) == 200
+    _, metadata = next(iter(index.vectors.values()))
+    assert set(metadata) == {"text", "source", "page_start", "page_end"}
+
+
+def test_interrupted_run_resumes(tmp_path):
+    sources = make_sources(tmp_path)
+    flaky, embedded = FlakyIndex(fail_after=7), []
+
+    # The outage outlasts the upsert retries
+    with pytest.raises(ConnectionError):
+        make_pipeline(tmp_path, flaky, embedded,
+                      upsert_engine=UpsertEngine(flaky, max_batch_size=10, backoff_base=0.001)).run(sources)
+    assert len(flaky.vectors) == 70
+
+    # Second run on a healthy index: finished chunks are neither re-embedded nor re-sent
+    flaky.fail_after = None
+    upserts_before = flaky.upsert_requests
+    embedded_before = len(embedded)
+    stats = make_pipeline(tmp_path, flaky, embedded).run(sources)
+
+    assert stats["vectors_upserted"] == 130
+    assert len(flaky.vectors) == 200
+    assert flaky.upsert_requests - upserts_before == 13
+    assert len(embedded) - embedded_before <= 130
+
+
+def test_queues_stay_bounded(tmp_path):
+    sources = make_sources(tmp_path, num_sources=2, chunks_per_source=500)
+    pipeline = make_pipeline(tmp_path, FakePineconeIndex(latency=0.001), [], queue_size=20)
+    pipeline.run(sources)
+
+    assert pipeline.max_queue_depth["extract->embed"] <= 20
+    assert pipeline.max_queue_depth["embed->upsert"] <= 2
+
+
+
+def test_flushes_share_one_rate_limit(tmp_path):
+    server = FakeEmbeddingServer(latency=0.0, dim=8)
+    url = server.start_in_thread()
+    # One request per text; the first flush uses the whole 120-request burst, refilled at 2 per second
+    embedder = BlockingEmbedder(AsyncEmbedder(api_key="test", api_base=url, max_batch_size=1,
+                                              requests_per_minute=120))
+    durations = []
+
+    def embed(texts):
+        started = time.monotonic()
+        vectors = embedder.embed(texts)
+        durations.append(time.monotonic() - started)
+        return vectors
+
+    db_path = str(tmp_path / "cache.sqlite")
+    pipeline = IngestPipeline(load_chunks, embed, EmbeddingCache(db_path), IndexManifest(db_path), "test-model",
+                              index=FakePineconeIndex(), batch_size=10, embed_batch_size=120, report_every=0)
+    try:
+        stats = pipeline.run(make_sources(tmp_path, num_sources=1, chunks_per_source=121))
+    finally:
+        embedder.close()
+        server.stop_thread()
+
+    assert stats["chunks_embedded"] == 121 and server.requests == 121
+    assert len(durations) == 2
+    assert durations[1] >= 0.4  # waited for the limiter instead of starting with a fresh budget
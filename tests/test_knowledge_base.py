@@ -0,0 +1,218 @@
+# tests/test_knowledge_base.py
+
+import asyncio
+import os
+import threading
+import pytest
+from langchain.schema import Document
+from langchain.schema.messages import AIMessageChunk
+from knowledge_base import KnowledgeBaseWatcher
+from symptom_checker import SymptomChecker
+from tracing import Tracer
+
+
+class GatedLLM:
+    """Streams the prompt's context back, pausing after the first piece until released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def stream(self, prompt):
+        yield AIMessageChunk(content="From: ")
+        self.started.set()
+        self.release.wait(5)
+        yield AIMessageChunk(content="guide A" if "guide A" in prompt else "guide B")
+
+    async def astream(self, prompt):
+        for chunk in self.stream(prompt):
+            yield chunk
+
+
+class StubRetriever:
+    def __init__(self, text: str):
+        self.text = text
+
+    def get_relevant_documents(self, query):
+        return [Document(page_content=self.text)]
+
+
+class StubAnswerCache:
+    def __init__(self):
+        self.answers = {}
+        self.invalidations = 0
+
+    def get(self, question):
+        return self.answers.get(question)
+
+    def put(self, question, answer, latency=0.0):
+        self.answers[question] = answer
+
+    def invalidate(self):
+        self.answers.clear()
+        self.invalidations += 1
+
+
+def write_csv(path, suggestion: str):
+    path.write_text(f"symptom,suggestion\nworms in stool,{suggestion}\n")
+
+
+@pytest.fixture
+def make_chatbot(make_chatbot):
+    def make(answer_cache=None):
+        return make_chatbot(GatedLLM(), retriever=StubRetriever("guide A"), answer_cache=answer_cache,
+                            tracer=Tracer(enabled=False))
+
+    return make
+
+
+def test_requests_in_progress_finish_on_the_old_version(make_chatbot):
+    cache = StubAnswerCache()
+    chatbot = make_chatbot(answer_cache=cache)
+    old = chatbot.knowledge_base
+    chatbot.llm.release.clear()
+    answer = chatbot.ask_stream("Why is my cat vomiting?")
+    assert next(answer) == "From: "
+
+    new = chatbot.swap_knowledge_base(retriever=StubRetriever("guide B"))
+    assert chatbot.knowledge_base is new and new.version == old.version + 1
+    assert old.retired and not old.closed  # still in use
+    chatbot.llm.release.set()
+    assert list(answer) == ["guide A"]
+    assert old.closed and old.readers == 0
+    # Not cached: it rests on the replaced version
+    assert cache.answers == {} and cache.invalidations == 1
+
+    assert chatbot.ask("Why is my cat vomiting?") == "From: guide B"
+    assert chatbot.symptom_checker is old.symptom_checker  # unchanged parts are shared
+
+
+def test_async_requests_use_one_version(make_chatbot):
+    chatbot = make_chatbot()
+
+    async def main():
+        return await chatbot.aask("Why is my cat vomiting?")
+
+    chatbot.swap_knowledge_base(retriever=StubRetriever("guide B"))
+    assert asyncio.run(main()) == "From: guide B"
+    assert chatbot.knowledge_base.readers == 0
+
+
+def test_watcher_rebuilds_the_symptom_checker_once_the_csv_settles(make_chatbot, tmp_path):
+    chatbot = make_chatbot()
+    csv_path = tmp_path / "guides.csv"
+    watcher = KnowledgeBaseWatcher(
+        chatbot,
+        build_symptom_checker=lambda path: SymptomChecker(path, index_dir=None),
+        build_retriever=lambda: StubRetriever("guide B"),
+        csv_path=str(csv_path),
+        pdf_folder=str(tmp_path / "pdfs"),
+        interval=0.01,
+    )
+    assert not watcher.check()
+
+    write_csv(csv_path, "Give a dewormer")
+    os.utime(csv_path, ns=(1, 1))
+    assert not watcher.check()  # may still be being written
+    assert watcher.check()
+    assert chatbot.knowledge_base.version == 2
+    assert chatbot.ask("There are worms in stool") == (
+        "Based on your symptoms, here is some advice:\n- Give a dewormer"
+    )
+    assert not watcher.check()
+    assert watcher.metrics()["reloads"] == 1
+
+
+def test_failed_rebuilds_keep_serving_the_current_version(make_chatbot, tmp_path):
+    chatbot = make_chatbot()
+    csv_path = tmp_path / "guides.csv"
+    watcher = KnowledgeBaseWatcher(
+        chatbot,
+        build_symptom_checker=lambda path: SymptomChecker(path, index_dir=None),
+        build_retriever=lambda: StubRetriever("guide B"),
+        csv_path=str(csv_path),
+        pdf_folder=str(tmp_path / "pdfs"),
+    )
+    csv_path.write_text("not,the,right,columns\n")
+    watcher.check()
+    assert not watcher.check()
+    assert chatbot.knowledge_base.version == 1 and watcher.metrics()["failures"] == 1
+    assert not watcher.check()  # not retried until the file changes again
+
+
+def test_pdf_changes_reindex_and_reopen_the_local_index(make_chatbot, tmp_path):
+    chatbot = make_chatbot()
+    pdf_folder, index_path = tmp_path / "pdfs", tmp_path / "local_index"
+    pdf_folder.mkdir()
+    index_path.mkdir()
+
+    def reindex():
+        (index_path / "CURRENT").write_text("v-2")
+
+    watcher = KnowledgeBaseWatcher(
+        chatbot,
+        build_symptom_checker=lambda path: SymptomChecker(path, index_dir=None),
+        build_retriever=lambda: StubRetriever("guide B"),
+        csv_path=str(tmp_path / "guides.csv"),
+        pdf_folder=str(pdf_folder),
+        local_index_path=str(index_path),
+        reindex=reindex,
+    )
+    (pdf_folder / "parasites.pdf").write_bytes(b"%PDF-1.4")
+    watcher.check()
+    assert watcher.check()
+    assert watcher.metrics()["reindexes"] == 1
+    assert chatbot.ask("Why is my cat vomiting?") == "From: guide B"
+
+
+def test_metrics_do_not_wait_for_a_rebuild(make_chatbot, tmp_path):
+    chatbot = make_chatbot()
+    csv_path = tmp_path / "guides.csv"
+    building, finish = threading.Event(), threading.Event()
+
+    def slow_build(path):
+        building.set()
+        finish.wait(5)
+        return SymptomChecker(path, index_dir=None)
+
+    watcher = KnowledgeBaseWatcher(chatbot, lambda: StubRetriever("guide B"), slow_build, csv_path=str(csv_path),
+                                   pdf_folder=str(tmp_path / "pdfs"))
+    write_csv(csv_path, "Give a dewormer")
+    os.utime(csv_path, ns=(1, 1))
+    watcher.check()
+    reload = threading.Thread(target=watcher.check)
+    reload.start()
+    assert building.wait(5)
+    rendered = []
+    scrape = threading.Thread(target=lambda: rendered.append(watcher.render_prometheus()))
+    scrape.start()
+    scrape.join(timeout=1)
+    finished_during_rebuild = bool(rendered)
+    finish.set()
+    reload.join(timeout=5)
+    assert finished_during_rebuild and "chatvet_kb_version 1" in rendered[0]
+    assert watcher.metrics()["reloads"] == 1
+
+
+def test_requests_racing_swaps_never_see_a_closed_version(make_chatbot):
+    chatbot = make_chatbot()
+    errors = []
+    stop = threading.Event()
+
+    def ask():
+        while not stop.is_set():
+            try:
+                chatbot.ask("Why is my cat vomiting?")
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=ask) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for i in range(200):
+        chatbot.swap_knowledge_base(retriever=StubRetriever("guide A" if i % 2 else "guide B"))
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert errors == []
@@ -0,0 +1,86 @@
+# tests/test_local_vectorstore.py
+
+import numpy as np
+import pytest
+from local_vectorstore import LocalIndexWriter, LocalVectorStore
+from fake_services import FakeEmbeddings, fake_embedding
+
+DIM = 32
+TEXTS = [f"vet guide chunk {i} about {topic}" for i, topic in
+         enumerate(["vomiting", "ear mites", "fleas", "worms", "limping", "sneezing"] * 50)]
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = LocalIndexWriter(str(tmp_path / "index"))
+    writer.upsert([(f"id{i}", fake_embedding(text, DIM), {"text": text, "source": "guide.pdf"})
+                   for i, text in enumerate(TEXTS)])
+    return writer
+
+
+def test_exact_search_finds_the_query_text(writer):
+    writer.publish()
+    store = LocalVectorStore(writer.path, FakeEmbeddings(DIM))
+
+    results = store.similarity_search_with_score(TEXTS[42], k=3)
+    doc, score = results[0]
+    assert doc.page_content == TEXTS[42]
+    assert doc.metadata == {"source": "guide.pdf"}
+    assert score == pytest.approx(1.0, abs=1e-5)
+    assert [s for _, s in results] == sorted((s for _, s in results), reverse=True)
+
+
+def test_retriever_interface(writer):
+    writer.publish()
+    retriever = LocalVectorStore(writer.path, FakeEmbeddings(DIM)).as_retriever(search_kwargs={"k": 5})
+
+    docs = retriever.get_relevant_documents(TEXTS[7])
+    assert len(docs) == 5
+    assert docs[0].page_content == TEXTS[7]
+
+
+def test_deletes_and_new_versions(writer):
+    writer.publish()
+    old_store = LocalVectorStore(writer.path, FakeEmbeddings(DIM))
+
+    writer.delete(ids=["id42"])
+    writer.publish()
+    new_store = LocalVectorStore(writer.path, FakeEmbeddings(DIM))
+
+    assert len(new_store) == len(TEXTS) - 1
+    assert new_store.similarity_search(TEXTS[42], k=1)[0].page_content != TEXTS[42]
+    # Readers of the previous version are unaffected
+    assert old_store.similarity_search(TEXTS[42], k=1)[0].page_content == TEXTS[42]
+
+
+def test_ivf_search_matches_exact_for_stored_vectors(writer):
+    writer.publish(ivf_lists=8)
+    store = LocalVectorStore(writer.path, FakeEmbeddings(DIM), nprobe=2)
+    assert store.centroids is not None
+
+    for i in range(0, len(TEXTS), 37):
+        rows, _ = store.search(fake_embedding(TEXTS[i], DIM), k=1)
+        assert store.record(int(rows[0]))["id"] == f"id{i}"
+
+
+def test_batch_search_matches_single(writer):
+    writer.publish()
+    store = LocalVectorStore(writer.path, FakeEmbeddings(DIM))
+    queries = np.array([fake_embedding(f"question {i}", DIM) for i in range(10)])
+
+    rows, scores = store.search_batch(queries, k=4)
+    for query, row in zip(queries, rows):
+        assert list(store.search(query, k=4)[0]) == list(row)
+
+
+def test_empty_index_returns_no_results(tmp_path):
+    writer = LocalIndexWriter(str(tmp_path / "index"))
+    writer.upsert([("id0", fake_embedding(TEXTS[0], DIM), {"text": TEXTS[0]})])
+    writer.delete(ids=["id0"])
+    writer.publish()
+    store = LocalVectorStore(writer.path, FakeEmbeddings(DIM))
+
+    assert len(store) == 0
+    assert store.similarity_search_with_score(TEXTS[0], k=3) == []
+    rows, scores = store.search_batch(np.array([fake_embedding(TEXTS[0], DIM)]), k=3)
+    assert rows.shape == scores.shape == (1, 0)
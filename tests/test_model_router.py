@@ -0,0 +1,137 @@
+# tests/test_model_router.py
+
+import asyncio
+import time
+import pytest
+from langchain.schema import Document
+from langchain.schema.messages import AIMessageChunk
+from model_router import FirstTokenTimeout, ModelRouter, Route
+
+
+class StubLLM:
+    def __init__(self, answer: str, latency: float = 0.0):
+        self.answer = answer
+        self.latency = latency
+        self.calls = 0
+
+    def stream(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        for piece in self.answer.split(" "):
+            yield AIMessageChunk(content=piece + " ")
+
+    async def astream(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for piece in self.answer.split(" "):
+            yield AIMessageChunk(content=piece + " ")
+
+
+def make_router(strong_latency: float = 0.0, first_token_timeout: float = 0.0, **options) -> ModelRouter:
+    return ModelRouter(
+        {
+            "fast": Route("fast", "gpt-3.5-turbo", expected_latency=1.0, llm=StubLLM("fast answer")),
+            "strong": Route("strong", "gpt-4", expected_latency=5.0, first_token_timeout=first_token_timeout,
+                            fallback="fast", llm=StubLLM("strong answer", latency=strong_latency)),
+        },
+        **options,
+    )
+
+
+def vector(score):
+    return [(Document(page_content="Offer water in small amounts."), score)]
+
+
+def test_confident_short_questions_go_to_the_fast_route():
+    router = make_router()
+    assert router.route("Why is my cat vomiting?", [], vector(0.9)).reason == "confident"
+    assert router.route("Why is my cat vomiting?", [("vomiting", 0.4, "Offer water")], vector(0.5)).route == "fast"
+
+    low = router.route("Why is my cat vomiting?", [], vector(0.5))
+    assert (low.route, low.reason) == ("strong", "low_confidence")
+    long = router.route(" ".join(["word"] * 40), [], vector(0.95))
+    assert (long.route, long.reason) == ("strong", "long_question")
+    # Pinecone results carry no score
+    assert router.route("Why is my cat vomiting?", [], vector(None)).route == "strong"
+    assert router.metrics()["strong"]["reasons"] == {"low_confidence": 2, "long_question": 1}
+
+
+def test_tight_latency_budgets_skip_the_slow_route():
+    router = make_router(latency_budget=3.0)
+    decision = router.route("Why is my cat vomiting?", [], vector(0.5))
+    assert (decision.route, decision.reason) == ("fast", "latency_budget")
+    assert router.route("Why is my cat vomiting?", [], vector(0.5), latency_budget=0).route == "strong"
+    assert router.route("Why is my cat vomiting?", [], vector(0.5), latency_budget=10).route == "strong"
+
+
+def test_slow_first_tokens_fall_back():
+    router = make_router(strong_latency=0.5, first_token_timeout=0.05)
+    decision = router.route("Why is my cat vomiting?", [], vector(0.5))
+    assert "".join(router.stream(decision, "prompt")) == "fast answer "
+    assert (decision.route, decision.fell_back_from) == ("fast", "strong")
+    stats = router.metrics()
+    assert stats["strong"]["timeouts"] == 1 and stats["strong"]["fallbacks"] == 1
+    assert stats["fast"]["answers"] == 1 and stats["strong"]["answers"] == 0
+
+
+def test_abandoned_slow_calls_are_closed_and_counted():
+    router = make_router(strong_latency=0.2, first_token_timeout=0.05)
+    strong = router.routes["strong"].llm
+    sent = []
+
+    def stream(prompt):
+        try:
+            for piece in StubLLM.stream(strong, prompt):
+                sent.append(piece)
+                yield piece
+        finally:
+            sent.append("closed")
+
+    strong.stream = stream
+    decision = router.route("Why is my cat vomiting?", [], vector(0.5))
+    assert "".join(router.stream(decision, "prompt")) == "fast answer "
+    deadline = time.monotonic() + 2
+    while router.metrics()["strong"]["abandoned"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # The slow call ran on until its first chunk, then was closed without reading the rest
+    assert [piece.content for piece in sent[:-1]] == ["strong "] and sent[-1] == "closed"
+    assert router.metrics()["strong"]["abandoned_seconds"] >= 0.1
+    assert 'chatvet_route_abandoned_calls_total{route="strong"} 1' in router.render_prometheus()
+
+
+def test_slow_first_tokens_fall_back_async():
+    router = make_router(strong_latency=0.5, first_token_timeout=0.05)
+    decision = router.route("Why is my cat vomiting?", [], vector(0.5))
+
+    async def main():
+        return "".join([piece async for piece in router.astream(decision, "prompt")])
+
+    assert asyncio.run(main()) == "fast answer "
+    assert decision.fell_back_from == "strong"
+
+
+def test_the_last_route_raises_on_timeout():
+    router = make_router()
+    router.routes["fast"].first_token_timeout = 0.05
+    router.routes["fast"].llm = StubLLM("fast answer", latency=0.5)
+    decision = router.route("Why is my cat vomiting?", [], vector(0.9))
+    with pytest.raises(FirstTokenTimeout):
+        list(router.stream(decision, "prompt"))
+
+
+def test_unknown_routes_are_rejected():
+    with pytest.raises(ValueError):
+        ModelRouter({"fast": Route("fast", "gpt-3.5-turbo")}, default_route="strong")
+
+
+def test_chatbot_answers_through_the_router(make_chatbot):
+    router = make_router()
+    default_llm = StubLLM("default answer")
+    chatbot = make_chatbot(default_llm, router=router)
+    # Unscored retrieval is not confident: the strong route answers
+    assert chatbot.ask("Why is my cat vomiting?") == "strong answer"
+    assert asyncio.run(chatbot.aask("Why is my dog vomiting?")) == "strong answer"
+    assert default_llm.calls == 0
+    assert router.metrics()["strong"]["answers"] == 2
+    trace = chatbot.tracer.recent()[-1]
+    assert trace["route"] == "strong" and trace["route_reason"] == "low_confidence"
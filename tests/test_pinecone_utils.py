@@ -0,0 +1,147 @@
+# tests/test_pinecone_utils.py
+
+import threading
+import pytest
+from urllib3.exceptions import ReadTimeoutError
+from embedding_cache import UpsertCheckpoint
+from pinecone_utils import UpsertEngine, iter_items, upsert_embeddings
+from fake_services import FakePineconeIndex, fake_embedding
+
+
+class ApiError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(message or f"HTTP {status}")
+        self.status = status
+
+
+class ScriptedIndex(FakePineconeIndex):
+    """Fake index failing according to `fail(vectors, request_number)` and tracking concurrency."""
+
+    def __init__(self, fail=None, latency=0.0):
+        super().__init__(latency=latency)
+        self.fail = fail
+        self.attempts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._count_lock = threading.Lock()
+
+    def upsert(self, vectors, **kwargs):
+        with self._count_lock:
+            self.attempts += 1
+            attempt = self.attempts
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.fail is not None:
+                self.fail(vectors, attempt)
+            return super().upsert(vectors, **kwargs)
+        finally:
+            with self._count_lock:
+                self.in_flight -= 1
+
+
+def make_items(count, dim=8):
+    return [(f"id-{i}", fake_embedding(f"chunk {i}", dim), {"text": f"chunk {i}"}) for i in range(count)]
+
+
+def test_items_are_consumed_lazily_with_bounded_requests_in_flight():
+    index = ScriptedIndex(latency=0.01)
+    engine = UpsertEngine(index, max_batch_size=10, max_concurrency=3, backoff_base=0.001)
+    pulled = []
+    ahead = []
+
+    def items():
+        for item in make_items(300):
+            pulled.append(item[0])
+            ahead.append(len(pulled) - len(index.vectors))
+            yield item
+
+    stats = engine.upsert(items())
+    assert len(index.vectors) == 300
+    assert stats["requests"] == 30
+    assert 1 < index.max_in_flight <= 3
+    # Never more than the in-flight batches plus the one being built
+    assert max(ahead) <= 10 * 4 + 1
+    assert stats["vectors_per_second"] > 0
+
+
+def test_batches_respect_the_payload_size_limit():
+    index = ScriptedIndex()
+    items = make_items(20, dim=100)
+    UpsertEngine(index, max_batch_size=100, max_request_bytes=2_000).upsert(items)
+    # Each item is ~450 bytes, so at most 4 fit in a 2 kB request
+    assert index.upsert_requests >= 5
+    assert len(index.vectors) == 20
+
+
+def test_transient_failures_are_retried():
+    def fail(vectors, attempt):
+        if attempt == 1:
+            raise ConnectionError("connection reset")
+        if attempt == 2:
+            raise ReadTimeoutError(None, "/vectors/upsert", "Read timed out.")
+        if attempt == 3:
+            raise ApiError(429)
+
+    index = ScriptedIndex(fail=fail)
+    stats = UpsertEngine(index, max_batch_size=50, max_concurrency=1, backoff_base=0.001).upsert(make_items(100))
+    assert stats["retries"] == 3
+    assert len(index.vectors) == 100
+
+
+@pytest.mark.parametrize("error", [ApiError(400, "invalid vector dimension"), TypeError("unhashable type: 'list'"),
+                                   ValueError("metadata value must be a string")])
+def test_client_errors_are_not_retried(error):
+    def fail(vectors, attempt):
+        raise error
+
+    index = ScriptedIndex(fail=fail)
+    with pytest.raises(type(error)):
+        UpsertEngine(index, max_concurrency=1, backoff_base=0.001).upsert(make_items(10))
+    assert index.attempts == 1
+
+
+def test_oversized_requests_are_split_and_later_batches_shrink():
+    def fail(vectors, attempt):
+        if len(vectors) > 8:
+            raise ApiError(413, "request too large")
+
+    index = ScriptedIndex(fail=fail)
+    engine = UpsertEngine(index, max_batch_size=32, max_concurrency=1)
+    stats = engine.upsert(make_items(64))
+    assert len(index.vectors) == 64
+    assert stats["splits"] >= 2
+    assert engine.max_batch_size <= 8
+
+
+def test_restarted_job_does_not_resend_finished_batches(tmp_path):
+    def fail(vectors, attempt):
+        if attempt > 3:
+            raise ConnectionError("index unavailable")
+
+    checkpoint = UpsertCheckpoint(str(tmp_path / "checkpoint.sqlite"), job="guides")
+    index = ScriptedIndex(fail=fail)
+    with pytest.raises(ConnectionError):
+        UpsertEngine(index, max_batch_size=10, max_concurrency=1, max_retries=1, backoff_base=0.001).upsert(
+            make_items(100), checkpoint=checkpoint)
+    assert len(checkpoint.done_ids()) == 30
+
+    index.fail = None
+    requests_before = index.upsert_requests
+    stats = UpsertEngine(index, max_batch_size=10).upsert(make_items(100), checkpoint=checkpoint)
+    assert index.upsert_requests - requests_before == 7
+    assert stats["vectors_skipped"] == 30
+    assert len(index.vectors) == 100
+    # A finished job leaves no checkpoint behind
+    assert checkpoint.done_ids() == set()
+
+
+def test_upsert_embeddings_merges_text_and_metadata():
+    index = FakePineconeIndex()
+    texts = ["dog vomiting", "cat sneezing"]
+    engine = UpsertEngine(index, max_batch_size=1)
+    upsert_embeddings([fake_embedding(text, 8) for text in texts], texts, ids=["a", "b"],
+                      metadatas=[{"source": "guide.pdf"}] * 2, engine=engine)
+    assert index.upsert_requests == 2
+    assert index.vectors["b"][1] == {"text": "cat sneezing", "source": "guide.pdf"}
+    assert len(list(iter_items([[0.0]], ["x"]))[0][0]) == 36  # random UUIDs without ids
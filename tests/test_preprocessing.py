@@ -0,0 +1,125 @@
+# tests/test_preprocessing.py
+
+import fitz
+import pytest
+from preprocessing import chunk_text, chunk_pages, extract_text_from_pdf, iter_pdf_chunks, preprocess_pdf_file
+
+
+def make_pdf(path, num_pages, words_per_page=120):
+    doc = fitz.open()
+    for p in range(num_pages):
+        page = doc.new_page()
+        words = [f"p{p}w{i}" for i in range(words_per_page)]
+        lines = [" ".join(words[i:i + 10]) for i in range(0, len(words), 10)]
+        page.insert_text((40, 40), "\n".join(lines), fontsize=8)
+    doc.save(str(path))
+    return str(path)
+
+
+@pytest.mark.parametrize("num_words", [0, 10, 500, 950, 1234])
+def test_chunk_pages_matches_chunk_text(num_words):
+    words = [f"w{i}" for i in range(num_words)]
+    pages = [(1 + i // 100, " ".join(words[i:i + 100])) for i in range(0, num_words, 100)]
+
+    chunks = list(chunk_pages(pages, "doc.pdf", max_chunk_size=500, overlap=50))
+    assert [c["text"] for c in chunks] == chunk_text(" ".join(words), 500, 50)
+
+
+def test_chunks_carry_page_metadata():
+    pages = [(1, "a " * 300), (2, "b " * 300), (3, "c " * 300)]
+    chunks = list(chunk_pages(pages, "doc.pdf", max_chunk_size=500, overlap=50))
+
+    assert chunks[0]["source"] == "doc.pdf"
+    assert (chunks[0]["page_start"], chunks[0]["page_end"]) == (1, 2)
+    assert (chunks[1]["page_start"], chunks[1]["page_end"]) == (2, 3)
+
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+    paths = [make_pdf(tmp_path / f"guide{i}.pdf", num_pages=12) for i in range(3)]
+
+    sequential = list(iter_pdf_chunks(paths, max_chunk_size=200, overlap=20, workers=1))
+    parallel = list(iter_pdf_chunks(paths, max_chunk_size=200, overlap=20, workers=2, pages_per_task=5))
+
+    assert parallel == sequential
+    assert [c["source"] for c in sequential] == sorted(c["source"] for c in sequential)
+    assert [c["text"] for c in sequential if c["source"] == paths[0]] == \
+        chunk_text(extract_text_from_pdf(paths[0]), 200, 20)
+    assert preprocess_pdf_file(paths[1], 200, 20) == \
+        [c["text"] for c in sequential if c["source"] == paths[1]]
+
+
+def load_csv_row_by_row(csv_path, text_columns=None):
+    import pandas as pd
+    from preprocessing import clean_text
+
+    df = pd.read_csv(csv_path)
+    if text_columns is None:
+        text_columns = df.select_dtypes(include=["object"]).columns.tolist()
+    texts = []
+    for _, row in df.iterrows():
+        cleaned = clean_text(" ".join(str(row[col]) for col in text_columns if pd.notna(row[col])))
+        if cleaned:
+            texts.append(cleaned)
+    return texts
+
+
+def write_messy_csv(path):
+    path.write_text(
+        "symptom,suggestion,severity,notes\n"
+        "Vomiting in dogs,\"Offer water.\n  Withhold food.\",3,\n"
+        ",,1,\n"
+        "  Cat   sneezing ,See a vet,2,\"  seasonal\tallergy \"\n"
+        "Limping,,5,NA\n"
+        + "".join(f"Symptom {i},Advice {i},{i},\n" for i in range(20))
+    )
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 3, 1000])
+def test_csv_texts_match_row_by_row_loading(tmp_path, chunk_rows):
+    from preprocessing import iter_csv_texts
+
+    path = write_messy_csv(tmp_path / "guides.csv")
+
+    assert list(iter_csv_texts(path, chunk_rows=chunk_rows, engine="pandas")) == load_csv_row_by_row(path)
+    assert list(iter_csv_texts(path, ["suggestion", "severity"], chunk_rows=chunk_rows, engine="pandas")) == \
+        load_csv_row_by_row(path, ["suggestion", "severity"])
+
+
+def test_csv_texts_with_arrow_parser(tmp_path):
+    pytest.importorskip("pyarrow", exc_type=ImportError)
+    from preprocessing import iter_csv_texts
+
+    path = write_messy_csv(tmp_path / "guides.csv")
+    assert list(iter_csv_texts(path, ["symptom", "suggestion"], engine="pyarrow")) == \
+        load_csv_row_by_row(path, ["symptom", "suggestion"])
+
+
+def test_csv_chunks_split_long_rows(tmp_path):
+    from preprocessing import iter_csv_chunks, load_csv_symptom_data, preprocess_csv_file
+
+    long_advice = " ".join(f"w{i}" for i in range(1200))
+    path = tmp_path / "guides.csv"
+    path.write_text(f"symptom,suggestion\nShort,Rest\nLong,{long_advice}\n")
+
+    chunks = iter_csv_chunks(str(path), max_chunk_size=500, overlap=50, engine="pandas")
+    assert next(chunks) == "Short Rest"
+    assert list(chunks) == chunk_text(f"Long {long_advice}", 500, 50)
+    assert preprocess_csv_file(str(path)) == ["Short Rest"] + chunk_text(f"Long {long_advice}", 500, 50)
+    assert load_csv_symptom_data(str(path)) == ["Short Rest", f"Long {long_advice}"]
+
+    # Between max_chunk_size - overlap and max_chunk_size words, chunk_text adds the overlap tail as a second chunk
+    for words in (450, 451, 459, 500):
+        row = " ".join(f"w{i}" for i in range(words))
+        path.write_text(f"suggestion\n{row}\n")
+        expected = chunk_text(row, 500, 50)
+        assert list(iter_csv_chunks(str(path), max_chunk_size=500, overlap=50, engine="pandas")) == expected
+        assert len(expected) == (1 if words <= 450 else 2)
+
+
+def test_unknown_csv_engine(tmp_path):
+    from preprocessing import iter_csv_texts
+
+    path = write_messy_csv(tmp_path / "guides.csv")
+    with pytest.raises(ValueError):
+        list(iter_csv_texts(path, engine="polars"))
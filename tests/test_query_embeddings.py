@@ -0,0 +1,111 @@
+# tests/test_query_embeddings.py
+
+import threading
+import time
+import pytest
+from langchain.embeddings.base import Embeddings
+from query_embeddings import CachedQueryEmbeddings
+from tracing import Tracer
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("embedding API down")
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_repeated_and_trivially_different_questions_hit_the_cache():
+    base = CountingEmbeddings()
+    cached = CachedQueryEmbeddings(base, batch_window=0)
+
+    first = cached.embed_query("Why is my cat sneezing?")
+    assert cached.embed_query("why is my cat  sneezing") == first
+    assert len(base.calls) == 1
+
+    metrics = cached.metrics()
+    assert (metrics["hits"], metrics["misses"]) == (1, 1)
+    assert metrics["hit_rate"] == pytest.approx(0.5)
+
+
+def test_least_recently_used_entries_are_evicted():
+    base = CountingEmbeddings()
+    cached = CachedQueryEmbeddings(base, max_entries=2, batch_window=0)
+
+    cached.embed_query("dog vomiting")
+    cached.embed_query("cat sneezing")
+    cached.embed_query("dog vomiting")  # now most recently used
+    cached.embed_query("rabbit limping")
+    assert cached.metrics()["entries"] == 2
+
+    cached.embed_query("dog vomiting")
+    assert len(base.calls) == 3
+    cached.embed_query("cat sneezing")
+    assert len(base.calls) == 4
+
+
+def test_concurrent_questions_share_one_batched_request():
+    base = CountingEmbeddings(latency=0.01)
+    cached = CachedQueryEmbeddings(base, batch_window=0.05)
+    questions = [f"question {i}" for i in range(8)] + ["question 0"]
+    results = {}
+
+    def ask(i):
+        results[i] = cached.embed_query(questions[i])
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(len(questions))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(base.calls) == 1
+    assert sorted(base.calls[0]) == sorted(set(questions))
+    assert all(results[i] == [float(len(questions[i])), 1.0] for i in results)
+    metrics = cached.metrics()
+    assert (metrics["batches"], metrics["misses"], metrics["coalesced"]) == (1, 8, 1)
+
+
+def test_full_batch_does_not_wait_for_the_window():
+    cached = CachedQueryEmbeddings(CountingEmbeddings(), batch_window=5.0, max_batch_size=2)
+    leader = threading.Thread(target=cached.embed_query, args=("first",))
+    started = time.perf_counter()
+    leader.start()
+    time.sleep(0.05)
+    cached.embed_query("second")
+    leader.join()
+    assert time.perf_counter() - started < 2.0
+
+
+def test_errors_reach_every_waiting_caller_and_are_not_cached():
+    base = CountingEmbeddings(fail=True)
+    cached = CachedQueryEmbeddings(base, batch_window=0)
+
+    with pytest.raises(RuntimeError, match="embedding API down"):
+        cached.embed_query("dog vomiting")
+    base.fail = False
+    assert cached.embed_query("dog vomiting") == [12.0, 1.0]
+    assert cached.metrics()["errors"] == 1
+
+
+def test_metrics_are_exported_through_the_tracer():
+    cached = CachedQueryEmbeddings(CountingEmbeddings(), batch_window=0)
+    cached.embed_query("dog vomiting")
+    cached.embed_query("dog vomiting")
+    tracer = Tracer(enabled=True)
+    tracer.add_collector(cached.render_prometheus)
+
+    text = tracer.render_prometheus()
+    assert 'chatvet_query_embedding_lookups_total{result="hit"} 1' in text
+    assert 'chatvet_query_embedding_batch_size_bucket{le="1"} 1' in text
+    assert "chatvet_query_embedding_batch_size_count 1" in text
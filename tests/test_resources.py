@@ -0,0 +1,83 @@
+# tests/test_resources.py
+
+import threading
+import time
+import pytest
+from resources import ResourceRegistry
+
+
+def test_resources_are_built_lazily_and_once():
+    registry = ResourceRegistry()
+    builds = []
+    registry.register("model", lambda: builds.append(1) or object())
+
+    assert builds == []
+    assert registry.get("model") is registry.get("model")
+    assert builds == [1]
+
+
+def test_concurrent_first_use_builds_once():
+    registry = ResourceRegistry()
+    builds = []
+
+    def slow_factory():
+        builds.append(1)
+        time.sleep(0.1)
+        return object()
+
+    registry.register("index", slow_factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("index"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(result) for result in results}) == 1
+
+
+def test_warmup_builds_dependencies_in_background():
+    registry = ResourceRegistry()
+    registry.register("retriever", lambda: time.sleep(0.05) or "retriever")
+    registry.register("chatbot", lambda: ("chatbot", registry.get("retriever")))
+
+    threads = registry.warmup()
+    assert threads == registry.warmup()  # idempotent across reruns
+    for thread in threads:
+        thread.join()
+    assert registry.is_ready("retriever") and registry.is_ready("chatbot")
+    assert registry.get("chatbot") == ("chatbot", "retriever")
+
+
+def test_close_tears_down_in_reverse_build_order():
+    registry = ResourceRegistry()
+    closed = []
+    registry.register("retriever", lambda: "retriever", close=closed.append)
+    registry.register("chatbot", lambda: registry.get("retriever") + "+bot", close=closed.append)
+
+    registry.get("chatbot")
+    registry.close()
+    assert closed == ["retriever+bot", "retriever"]
+    assert not registry.is_ready("chatbot")
+
+
+def test_failed_build_is_retried():
+    registry = ResourceRegistry()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("pinecone unreachable")
+        return "index"
+
+    registry.register("index", flaky)
+    with pytest.raises(ConnectionError):
+        registry.get("index")
+    assert registry.get("index") == "index"
+
+
+def test_unknown_resource():
+    with pytest.raises(KeyError):
+        ResourceRegistry().get("missing")
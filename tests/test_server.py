@@ -0,0 +1,159 @@
+# tests/test_server.py
+
+import asyncio
+import json
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from langchain.chat_models import ChatOpenAI
+from admission import AdmissionController
+from answer_cache import AnswerCache
+from fake_services import FakeChatServer
+from server import authenticate_request, make_app
+
+QUESTION = "Why does my cat cough up hairballs?"
+
+
+@pytest.fixture
+def make_chatbot(make_chatbot, tmp_path):
+    """Chatbot answering from the hairball guide through an OpenAI-compatible server at `llm_url`."""
+    def make(llm_url):
+        llm = ChatOpenAI(model="gpt-4", openai_api_key="test", openai_api_base=llm_url, streaming=True,
+                         max_retries=0)
+        return make_chatbot(llm, guide="Hairballs are common in long-haired cats.",
+                            answer_cache=AnswerCache(version_path=str(tmp_path / "kb_version")))
+
+    return make
+
+
+def run_with_server(make_chatbot, chat_server, scenario, **app_kwargs):
+    """Start the fake LLM and the API, then run scenario(client, chatbot)."""
+    async def main():
+        url = await chat_server.start()
+        chatbot = make_chatbot(url + "/v1")
+        client = TestClient(TestServer(make_app(chatbot, **app_kwargs)))
+        await client.start_server()
+        try:
+            return await scenario(client, chatbot)
+        finally:
+            await client.close()
+            await chat_server.close()
+
+    return asyncio.run(main())
+
+
+def test_aask_streams_from_llm_over_pooled_session(make_chatbot):
+    chat_server = FakeChatServer(latency=0.05, tokens=5, token_delay=0.0)
+
+    async def scenario(client, chatbot):
+        answers = await asyncio.gather(*(chatbot.aask(f"{QUESTION} {i}") for i in range(8)))
+        return answers, chatbot._aiohttp_session
+
+    answers, session = run_with_server(make_chatbot, chat_server, scenario)
+    assert answers == ["Keep calm calm calm calm"] * 8
+    assert chat_server.max_in_flight > 1
+    assert session is not None
+
+
+def test_ask_endpoints(make_chatbot):
+    chat_server = FakeChatServer(latency=0.0, tokens=3, token_delay=0.0)
+
+    async def scenario(client, chatbot):
+        answer = await (await client.post("/ask", json={"question": QUESTION})).json()
+        stream = await client.post("/ask/stream", json={"question": "worms in stool"})
+        lines = [json.loads(line) for line in (await stream.text()).splitlines()]
+        bad = await client.post("/ask", json={"text": QUESTION})
+        health = await (await client.get("/health")).json()
+        metrics = await (await client.get("/metrics")).text()
+        return answer, lines, bad.status, health, metrics
+
+    answer, lines, bad_status, health, metrics = run_with_server(make_chatbot, chat_server, scenario)
+    assert answer["answer"] == "Keep calm calm"
+    assert "deworming" in lines[0]["token"]
+    assert lines[-1] == {"done": True}
+    assert bad_status == 400
+    assert health["in_flight"] == 0
+    assert 'chatvet_requests_total{source="llm"} 1' in metrics
+    assert 'chatvet_stage_seconds_count{stage="llm_generation"} 1' in metrics
+    assert "chatvet_server_in_flight 0" in metrics
+
+
+def test_slow_answers_time_out(make_chatbot):
+    chat_server = FakeChatServer(latency=2.0)
+
+    async def scenario(client, chatbot):
+        response = await client.post("/ask", json={"question": QUESTION})
+        return response.status, (await (await client.get("/health")).json())["timeouts"]
+
+    status, timeouts = run_with_server(make_chatbot, chat_server, scenario, request_timeout=0.2)
+    assert status == 504
+    assert timeouts == 1
+
+
+def test_requests_beyond_the_queue_are_rejected(make_chatbot):
+    chat_server = FakeChatServer(latency=0.3, tokens=1)
+
+    async def scenario(client, chatbot):
+        responses = await asyncio.gather(*(client.post("/ask", json={"question": f"{QUESTION} {i}"})
+                                           for i in range(4)))
+        return sorted(response.status for response in responses)
+
+    statuses = run_with_server(make_chatbot, chat_server, scenario, max_concurrency=1, max_pending=1)
+    assert statuses == [200, 200, 503, 503]
+
+
+def test_llm_calls_beyond_the_admission_cap_get_retry_after(make_chatbot):
+    chat_server = FakeChatServer(latency=0.3, tokens=1)
+
+    async def scenario(client, chatbot):
+        chatbot.admission = AdmissionController(None, max_concurrency=1, max_wait=0.05)
+        responses = await asyncio.gather(*(client.post("/ask", json={"question": f"{QUESTION} {i}"})
+                                           for i in range(3)))
+        return sorted((response.status, response.headers.get("Retry-After")) for response in responses)
+
+    statuses = run_with_server(make_chatbot, chat_server, scenario)
+    assert statuses == [(200, None), (503, "1"), (503, "1")]
+
+
+def test_api_users_are_limited_independently(make_chatbot):
+    chat_server = FakeChatServer(latency=0.0, tokens=1)
+    tiers = {"free": {"rate_per_minute": 1, "burst": 1, "max_in_flight": 1, "tier_rate_per_minute": 0}}
+    tiers_seen = []
+
+    def user_tier(user_id):
+        tiers_seen.append(user_id)
+        return "free"
+
+    async def scenario(client, chatbot):
+        chatbot.admission = AdmissionController(None, tiers=tiers)
+        statuses = []
+        for i, user in enumerate(["alice", "alice", "bob"]):
+            response = await client.post("/ask", json={"question": f"{QUESTION} {i}"}, headers={"X-User-Id": user})
+            statuses.append(response.status)
+        return statuses
+
+    statuses = run_with_server(make_chatbot, chat_server, scenario, user_tier=user_tier)
+    assert statuses == [200, 429, 200]
+    assert tiers_seen == ["alice", "alice", "bob"]
+
+
+def test_api_keys_identify_the_user(make_chatbot):
+    chat_server = FakeChatServer(latency=0.0, tokens=1)
+    seen = []
+
+    async def scenario(client, chatbot):
+        async def aask(question, user_id=None, tier=None, latency_budget=None):
+            seen.append((user_id, tier))
+            return "ok"
+
+        chatbot.aask = aask
+        known = await client.post("/ask", json={"question": QUESTION}, headers={"Authorization": "Bearer k1"})
+        unknown = await client.post("/ask", json={"question": QUESTION}, headers={"Authorization": "Bearer nope"})
+        anonymous = await client.post("/ask", json={"question": QUESTION}, headers={"X-User-Id": "mallory"})
+        return known.status, unknown.status, anonymous.status
+
+    statuses = run_with_server(
+        make_chatbot, chat_server, scenario, user_tier=lambda user_id: "subscriber",
+        authenticate=lambda request: authenticate_request(request, {"k1": "alice"}),
+    )
+    assert statuses == (200, 401, 200)
+    assert seen == [("alice", "subscriber"), (None, None)]
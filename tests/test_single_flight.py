@@ -0,0 +1,185 @@
+# tests/test_single_flight.py
+
+import asyncio
+import threading
+import time
+import pytest
+from langchain.schema.messages import AIMessageChunk
+from admission import AdmissionRejected
+from chatbot import ERROR_MESSAGE
+from conversation_memory import ConversationMemory
+from single_flight import LeaderFailed, SingleFlight
+
+
+def test_followers_get_the_leaders_stream():
+    single_flight = SingleFlight()
+    flight, leading = single_flight.join("q")
+    assert leading
+    release = threading.Event()
+
+    def pieces():
+        yield "Keep "
+        release.wait(5)
+        yield "calm"
+
+    leader = single_flight.lead("q", flight, pieces())
+    assert next(leader) == "Keep "
+    # A follower joining mid-stream replays what it missed
+    follower_flight, leading = single_flight.join("q")
+    assert follower_flight is flight and not leading
+    received = []
+    follower = threading.Thread(target=lambda: received.extend(single_flight.follow("q", flight)))
+    follower.start()
+    release.set()
+    assert list(leader) == ["calm"]
+    follower.join(timeout=5)
+
+    assert received == ["Keep ", "calm"]
+    assert single_flight.join("q")[1]  # finished flights are forgotten
+    assert single_flight.metrics()["saved"] == 1
+
+
+def test_followers_of_a_failed_leader_are_told():
+    single_flight = SingleFlight()
+    flight, _ = single_flight.join("q")
+
+    def pieces():
+        yield "Keep "
+        raise RuntimeError("connection reset")
+
+    with pytest.raises(RuntimeError):
+        list(single_flight.lead("q", flight, pieces()))
+    with pytest.raises(LeaderFailed):
+        list(single_flight.follow("q", flight))
+    assert single_flight.metrics()["leader_failures"] == 1
+
+
+def test_stalled_leaders_time_out_and_are_dropped():
+    single_flight = SingleFlight(wait_timeout=0.05)
+    flight, _ = single_flight.join("q")
+    with pytest.raises(LeaderFailed):
+        list(single_flight.follow("q", flight))
+    assert single_flight.metrics()["follower_timeouts"] == 1
+    assert single_flight.join("q")[1]
+
+
+def test_async_followers():
+    single_flight = SingleFlight()
+
+    async def pieces():
+        for piece in ("Keep ", "calm"):
+            await asyncio.sleep(0.01)
+            yield piece
+
+    async def collect(stream):
+        return [piece async for piece in stream]
+
+    async def main():
+        flight, _ = single_flight.join("q")
+        followers = [single_flight.afollow("q", single_flight.join("q")[0]) for _ in range(3)]
+        leader = single_flight.alead("q", flight, pieces())
+        return await asyncio.gather(*(collect(follower) for follower in followers), collect(leader))
+
+    assert asyncio.run(main()) == [["Keep ", "calm"]] * 4
+
+
+class SlowLLM:
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+
+    def stream(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        for piece in ("Offer ", "water."):
+            yield AIMessageChunk(content=piece)
+
+    async def astream(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for piece in ("Offer ", "water."):
+            yield AIMessageChunk(content=piece)
+
+
+def test_identical_questions_share_one_answer(make_chatbot):
+    chatbot = make_chatbot(SlowLLM())
+    answers = []
+    questions = ["My cat is vomiting, what should I do?", "my cat is vomiting what should i do"] * 5
+    threads = [threading.Thread(target=lambda q=q: answers.append(chatbot.ask(q))) for q in questions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert answers == ["Offer water."] * 10
+    assert chatbot.llm.calls == 1 and len(chatbot.retriever.queries) == 1
+    assert chatbot.single_flight.metrics()["saved"] == 9
+    assert chatbot.timing_summary()["coalesced"]["count"] == 9
+
+
+def test_identical_async_questions_share_one_answer(make_chatbot):
+    chatbot = make_chatbot(SlowLLM())
+
+    async def main():
+        return await asyncio.gather(*(chatbot.aask("Why is my cat vomiting?") for _ in range(10)))
+
+    assert asyncio.run(main()) == ["Offer water."] * 10
+    assert chatbot.llm.calls == 1
+    assert chatbot.single_flight.metrics()["saved"] == 9
+
+
+def test_follow_ups_are_not_coalesced(make_chatbot):
+    chatbot = make_chatbot(SlowLLM())
+    memories = [ConversationMemory(turns=[(f"My cat {i} is sick.", "Sorry to hear.")]) for i in range(3)]
+    threads = [threading.Thread(target=chatbot.ask, args=("What should I do?", memory)) for memory in memories]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert chatbot.llm.calls == 3
+
+
+class FailingFirstLLM(SlowLLM):
+    def __init__(self, error: Exception):
+        super().__init__(latency=0.0)
+        self.error = error
+        self.fail = threading.Event()
+
+    def stream(self, prompt):
+        if self.calls == 0:
+            self.calls += 1
+            self.fail.wait(5)
+            raise self.error
+        yield from super().stream(prompt)
+
+
+@pytest.mark.parametrize("error, leader_result", [
+    (AdmissionRejected("busy", 1.0), "busy"),
+    (ConnectionError("connection reset"), ERROR_MESSAGE),
+])
+def test_followers_answer_on_their_own_when_the_leader_fails(make_chatbot, error, leader_result):
+    chatbot = make_chatbot(FailingFirstLLM(error))
+    results = {}
+
+    def ask(name):
+        try:
+            results[name] = chatbot.ask("Why is my cat vomiting?")
+        except AdmissionRejected as e:
+            results[name] = e.reason
+
+    leader = threading.Thread(target=ask, args=("leader",))
+    leader.start()
+    deadline = time.monotonic() + 5
+    while chatbot.llm.calls == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    follower = threading.Thread(target=ask, args=("follower",))
+    follower.start()
+    while chatbot.single_flight.metrics()["followers"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    chatbot.llm.fail.set()
+    leader.join(timeout=5)
+    follower.join(timeout=5)
+
+    assert results == {"leader": leader_result, "follower": "Offer water."}
+    assert chatbot.single_flight.metrics()["saved"] == 0
+    assert chatbot.single_flight.metrics()["leader_failures"] == 1
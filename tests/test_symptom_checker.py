@@ -0,0 +1,77 @@
+# tests/test_symptom_checker.py
+
+import os
+import pytest
+from symptom_checker import SymptomChecker, NO_MATCH_MESSAGE, index_fingerprint
+
+checker = SymptomChecker("data/vet_guides.csv")
+
+
+def test_batch_matches_single_queries():
+    """Batched matching returns the same results as one query at a time."""
+    queries = ["My dog is vomiting", "cat sneezing a lot", "puppy has worms in stool"]
+    batch = checker.find_closest_symptoms_batch(queries, top_k=3)
+
+    assert len(batch) == len(queries)
+    for query, matches in zip(queries, batch):
+        assert matches == checker.find_closest_symptoms(query, top_k=3)
+
+
+def test_results_are_sorted_by_score():
+    matches = checker.find_closest_symptoms("dog scratching ears", top_k=5)
+    scores = [score for _, score, _ in matches]
+
+    assert len(matches) == 5
+    assert scores == sorted(scores, reverse=True)
+    assert matches[0][0] == "Dog scratching ears"
+
+
+def test_top_k_larger_than_dataset():
+    matches = checker.find_closest_symptoms("vomiting", top_k=100)
+    assert len(matches) == len(checker.df)
+
+
+def test_empty_batch():
+    assert checker.find_closest_symptoms_batch([]) == []
+
+
+def test_get_suggestions_threshold():
+    assert checker.get_suggestions("Puppy has worms in stool", threshold=0.5)[0].startswith("Worms are common")
+    assert checker.get_suggestions("quantum teleportation", threshold=0.5) == [NO_MATCH_MESSAGE]
+
+
+def test_cached_index_is_reused(tmp_path):
+    """A second checker for the same CSV memory-maps the saved index instead of refitting."""
+    first = SymptomChecker("data/vet_guides.csv", index_dir=str(tmp_path))
+    second = SymptomChecker("data/vet_guides.csv", index_dir=str(tmp_path))
+
+    assert first.index_path == second.index_path
+    assert os.path.isdir(second.index_path)
+    # Memory-mapped read-only, not a private copy
+    assert not second.symptom_tfidf.data.flags.writeable
+
+    queries = ["dog vomiting", "blood in urine", "cat grooming"]
+    assert second.find_closest_symptoms_batch(queries) == first.find_closest_symptoms_batch(queries)
+
+
+def test_index_fingerprint_changes_with_content(tmp_path):
+    csv_path = tmp_path / "guides.csv"
+    csv_path.write_text("symptom,suggestion\nDog vomiting,See a vet.\n")
+    before = index_fingerprint(str(csv_path), "symptom", "suggestion")
+
+    csv_path.write_text("symptom,suggestion\nDog vomiting,See a vet today.\n")
+    assert index_fingerprint(str(csv_path), "symptom", "suggestion") != before
+    assert index_fingerprint(str(csv_path), "symptom", "advice") != index_fingerprint(str(csv_path), "symptom", "suggestion")
+
+
+def test_indexes_of_old_csv_versions_are_pruned(tmp_path):
+    csv_path = tmp_path / "guides.csv"
+    index_dir = tmp_path / "index_cache"
+    (index_dir / "notes").mkdir(parents=True)
+    paths = []
+    for version in range(4):
+        csv_path.write_text(f"symptom,suggestion\nDog vomiting,See a vet ({version}).\n")
+        paths.append(SymptomChecker(str(csv_path), index_dir=str(index_dir)).index_path)
+
+    # The current index and the one before it stay; unrelated entries are left alone
+    assert sorted(os.listdir(index_dir)) == sorted([os.path.basename(p) for p in paths[-2:]] + ["notes"])
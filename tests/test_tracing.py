@@ -0,0 +1,54 @@
+# tests/test_tracing.py
+
+import json
+import time
+from tracing import NOOP_TRACE, Tracer
+
+
+def test_disabled_tracer_hands_out_noops():
+    tracer = Tracer(enabled=False)
+    trace = tracer.start_trace("ask")
+
+    assert trace is NOOP_TRACE
+    with trace.span("llm_generation") as span:
+        span.set(tokens=3)
+    trace.finish(source="llm")
+    assert tracer.recent() == []
+
+
+def test_finished_traces_feed_metrics_and_jsonl(tmp_path):
+    log_path = tmp_path / "logs" / "traces.jsonl"
+    tracer = Tracer(enabled=True, log_path=str(log_path))
+
+    trace = tracer.start_trace("ask", user="demo_user")
+    with trace.span("vector_search"):
+        time.sleep(0.01)
+    try:
+        with trace.span("llm_generation"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    trace.finish(source="llm", cache_hit=False, prompt_tokens=120, completion_tokens=40)
+
+    record = json.loads(log_path.read_text())
+    assert record["user"] == "demo_user" and record["source"] == "llm"
+    assert [span["name"] for span in record["spans"]] == ["vector_search", "llm_generation"]
+    assert record["spans"][0]["duration_ms"] >= 10
+    assert record["spans"][1]["error"] == "RuntimeError: boom"
+
+    metrics = tracer.render_prometheus()
+    assert 'chatvet_stage_seconds_bucket{stage="vector_search",le="0.005"} 0' in metrics
+    assert 'chatvet_stage_seconds_bucket{stage="vector_search",le="+Inf"} 1' in metrics
+    assert 'chatvet_request_seconds_count{source="llm"} 1' in metrics
+    assert 'chatvet_answer_cache_lookups_total{result="miss"} 1' in metrics
+    assert "chatvet_prompt_tokens_total 120" in metrics
+    assert 'chatvet_errors_total{stage="llm_generation"} 1' in metrics
+    tracer.close()
+
+
+def test_recent_keeps_the_newest_traces_first():
+    tracer = Tracer(enabled=True, max_recent=2)
+    for source in ("a", "b", "c"):
+        tracer.start_trace("ask").finish(source=source)
+
+    assert [trace["source"] for trace in tracer.recent()] == ["c", "b"]